@@ -15,9 +15,7 @@ from pathlib import Path
 import environ
 import logging
 from datetime import timedelta
-from utils.helper import create_dir
 from .logging_v import SysLogging, creating_loging_config
-from .helper import ensure_env_file
 
 env = environ.Env(
     DEBUG=(bool, False)
@@ -32,7 +30,7 @@ TEMPLATES = (
     BASE_DIR / "templates",
 )
 
-LOG = create_dir(BASE_DIR / "../../" / "configs/logs/services/auth_service")
+LOG = BASE_DIR / "../../" / "configs/logs/services/auth_service"
 
     
 
@@ -0,0 +1,65 @@
+"""
+Media backends imported on first use.
+
+Every web worker imports the media models, but only the media worker and a
+few views decode anything. The heavy libraries (numpy, Pillow, libmagic,
+PyPDF2, python-pptx/lxml, ffmpeg-python) are therefore exposed here as lazy
+modules: importing a name costs nothing, the real import runs the first time
+an attribute is used.
+
+Usage:
+    >>> from utils.files.backends import np, Image
+    >>> Image.open(file_object)  # Pillow is imported here
+
+Modules that annotate with these names need ``from __future__ import
+annotations`` so the annotations do not trigger the import. A backend that
+is not installed raises ImportError when it is used, not when it is named.
+"""
+import importlib.util
+import sys
+from types import ModuleType
+
+
+class MissingBackend(ModuleType):
+    """Stands in for an optional backend that is not installed."""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        raise ImportError(f"No module named '{self.__name__}'", name=self.__name__)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Returns ``name`` as a module whose code runs on first attribute access
+    (the module itself if it was already imported).
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    try:
+        spec = importlib.util.find_spec(name)
+    except ModuleNotFoundError:
+        spec = None
+    if spec is None:
+        return MissingBackend(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
+ImageColor = lazy_import('PIL.ImageColor')
+ImageOps = lazy_import('PIL.ImageOps')
+ffmpeg = lazy_import('ffmpeg')
+magic = lazy_import('magic')
+PyPDF2 = lazy_import('PyPDF2')
+pptx = lazy_import('pptx')
+docx = lazy_import('docx')
@@ -4,51 +4,149 @@
     const uploadStatus = document.getElementById('uploadStatus');
     const uploadButton = document.getElementById('uploadButton');
     const descriptionInput = document.getElementById('descriptionInput'); // Add description input.
-  
+
+    // Resumable upload protocol (see sys_media/views.py):
+    //   POST   /uploads/                   -> {id, chunk_size, chunk_count, received, url, finalize_url}
+    //   PATCH  /uploads/<id>/  (Upload-Offset header, raw chunk body)
+    //   POST   /uploads/<id>/finalize/     -> {id, file, checksum, processing_status}
+    const UPLOAD_URL = '/uploads/';
+    const PARALLEL_CHUNKS = 4;
+    const MAX_RETRIES = 3;
+
     uploadButton.addEventListener('click', () => {
       const file = fileInput.files[0];
       if (!file) {
         uploadStatus.textContent = 'Please select a file.';
         return;
       }
-      uploadFile(file, '/upload/');
-    });
-  
-    function uploadFile(file, uploadUrl) {
-      const xhr = new XMLHttpRequest();
-      const formData = new FormData();
-      formData.append('file', file);
-      formData.append('description', descriptionInput.value); // Add description to form data.
-  
-      xhr.upload.addEventListener('progress', (event) => {
-        if (event.lengthComputable) {
-          const percentComplete = (event.loaded / event.total) * 100;
-          uploadProgressBar.value = percentComplete;
-        }
-      });
-  
-      xhr.onload = () => {
-        if (xhr.status >= 200 && xhr.status < 300) {
+      // Target model and its fields, e.g. data-target="courses.modulevideolesson"
+      // data-fields='{"lesson": 1, "title": "Welcome"}'
+      const fields = JSON.parse(fileInput.dataset.fields || '{}');
+      fields.description = descriptionInput.value; // Add description to the media row.
+      uploadFile(file, fileInput.dataset.target, fields)
+        .then((response) => {
           uploadStatus.textContent = 'Upload successful!';
-          const response = JSON.parse(xhr.responseText);
           console.log("Uploaded file ID:", response.id); // Access the id of the uploaded file.
-        } else {
-          uploadStatus.textContent = `Upload failed: ${xhr.status} ${xhr.statusText}`;
-        }
+        })
+        .catch((error) => {
+          uploadStatus.textContent = `Upload failed: ${error.message}`;
+        });
+    });
+
+    async function uploadFile(file, target, fields) {
+      const session = await startOrResume(file, target, fields);
+      const received = new Set(session.received);
+      const pending = [];
+      for (let index = 0; index < session.chunk_count; index++) {
+        if (!received.has(index)) pending.push(index);
+      }
+
+      const loaded = new Map(); // bytes sent per chunk, for the progress bar
+      let sent = received.size * session.chunk_size;
+      const showProgress = () => {
+        let total = sent;
+        loaded.forEach((bytes) => { total += bytes; });
+        uploadProgressBar.value = Math.min(100, (total / file.size) * 100);
       };
-  
-      xhr.onerror = () => {
-        uploadStatus.textContent = 'An error occurred during upload.';
+      showProgress();
+
+      // A fixed number of workers pull chunk indexes from the shared queue.
+      const worker = async () => {
+        while (pending.length) {
+          const index = pending.shift();
+          const start = index * session.chunk_size;
+          const chunk = file.slice(start, Math.min(start + session.chunk_size, file.size));
+          await withRetries(() => sendChunk(session.url, start, chunk, (bytes) => {
+            loaded.set(index, bytes);
+            showProgress();
+          }));
+          loaded.delete(index);
+          sent += chunk.size;
+          showProgress();
+        }
       };
-  
-      xhr.open('POST', uploadUrl);
-      xhr.setRequestHeader('X-CSRFToken', getCookie('csrftoken'));
-      xhr.send(formData);
+      await Promise.all(Array.from({length: Math.min(PARALLEL_CHUNKS, pending.length)}, worker));
+
+      uploadStatus.textContent = 'Processing...';
+      const response = await request('POST', session.finalize_url);
+      localStorage.removeItem(resumeKey(file));
+      return response;
+    }
+
+    async function startOrResume(file, target, fields) {
+      const key = resumeKey(file);
+      const url = localStorage.getItem(key);
+      if (url) {
+        try {
+          return await request('GET', url);
+        } catch (error) {
+          localStorage.removeItem(key); // Expired or already finalized.
+        }
+      }
+      const session = await request('POST', UPLOAD_URL, JSON.stringify({
+        filename: file.name,
+        size: file.size,
+        target: target,
+        fields: fields,
+      }));
+      localStorage.setItem(key, session.url);
+      return session;
+    }
+
+    function sendChunk(url, offset, chunk, onProgress) {
+      return new Promise((resolve, reject) => {
+        const xhr = new XMLHttpRequest();
+        xhr.upload.addEventListener('progress', (event) => {
+          if (event.lengthComputable) onProgress(event.loaded);
+        });
+        xhr.onload = () => {
+          if (xhr.status >= 200 && xhr.status < 300) {
+            resolve();
+          } else {
+            reject(new Error(`${xhr.status} ${xhr.statusText}`));
+          }
+        };
+        xhr.onerror = () => reject(new Error('An error occurred during upload.'));
+        xhr.open('PATCH', url);
+        xhr.setRequestHeader('X-CSRFToken', getCookie('csrftoken'));
+        xhr.setRequestHeader('Upload-Offset', String(offset));
+        xhr.setRequestHeader('Content-Type', 'application/offset+octet-stream');
+        xhr.send(chunk);
+      });
+    }
+
+    async function request(method, url, body) {
+      const response = await fetch(url, {
+        method: method,
+        body: body,
+        headers: {'Content-Type': 'application/json', 'X-CSRFToken': getCookie('csrftoken')},
+        credentials: 'same-origin',
+      });
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.error || JSON.stringify(data.errors) || response.statusText);
+      }
+      return data;
+    }
+
+    async function withRetries(send) {
+      for (let attempt = 1; ; attempt++) {
+        try {
+          return await send();
+        } catch (error) {
+          if (attempt >= MAX_RETRIES) throw error;
+          await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** attempt));
+        }
+      }
+    }
+
+    function resumeKey(file) {
+      return `upload:${file.name}:${file.size}:${file.lastModified}`;
     }
-  
+
     function getCookie(name) {
       const value = `; ${document.cookie}`;
       const parts = value.split(`; ${name}=`);
       if (parts.length === 2) return parts.pop().split(';').shift();
     }
-  })();
\ No newline at end of file
+  })();
@@ -13,9 +13,7 @@ import os
 from pathlib import Path
 import environ
 import logging
-from utils.helper import create_dir
 from .logging_v import SysLogging, creating_loging_config
-from .helper import ensure_env_file
 
 env = environ.Env(
     DEBUG=(bool,False)
@@ -28,7 +26,7 @@ TEMPLATES = (
     BASE_DIR / "templates",
 )
 
-LOG = create_dir(BASE_DIR / "../../" / "configs/logs/services/learn_service")
+LOG = BASE_DIR / "../../" / "configs/logs/services/learn_service"
 
     
 
@@ -66,8 +64,7 @@ for env_file in ENVIRONMENT_DIR_FILES:
             settings_log.error(f"Error reading environment file {env_file}: {e}")
             # Consider what to do if reading the .env file fails.
             # Should the program exit?  Use default values?
-    
-    ensure_env_file(env_file)
+
         
 
 
@@ -224,12 +221,7 @@ LANGUAGES = (
     ('rw', 'Kinyarwanda'),
 )
 
-LOCALE_PATH = create_dir(BASE_DIR / 'locale')
-
-
-# Create subdirectories for each language
-for code, _ in LANGUAGES:
-    language_dir = create_dir(LOCALE_PATH / code / 'LC_MESSAGES')
+LOCALE_PATH = BASE_DIR / 'locale'
 
 
 # Static files (CSS, JavaScript, Images)
@@ -241,18 +233,91 @@ STATICFILES_DIRS = [BASE_DIR / "dev_static/"]
 STATIC_ROOT = BASE_DIR / "sys_static/learn"
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = create_dir(BASE_DIR / "sys_media/media/learn")
+MEDIA_ROOT = BASE_DIR / "sys_media/media/learn"
 
-FILE_UPLOAD_TEMP_DIR = create_dir(BASE_DIR / 'sys_media'/ 'media' / 'temp')
+FILE_UPLOAD_TEMP_DIR = BASE_DIR / 'sys_media'/ 'media' / 'temp'
 
-# For optimal performance with model.save():
-FILE_UPLOAD_MAX_MEMORY_SIZE = 200 * 1024 * 1024  # 200MB
-UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024  # 2MB chunks
+# Larger uploads are spooled to FILE_UPLOAD_TEMP_DIR instead of worker memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+# Hash uploads while they are received (size, SHA-256 and MIME type are attached
+# to the UploadedFile, so media models never read an upload twice)
+FILE_UPLOAD_HANDLERS = [
+    'utils.files.uploads.HashingMemoryFileUploadHandler',
+    'utils.files.uploads.HashingTemporaryFileUploadHandler',
+]
+UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024  # 2MB chunks (also the streaming metadata read buffer)
 
 # Add timeout settings
-DATA_UPLOAD_MAX_MEMORY_SIZE = 200 * 1024 * 1024  # 200MB
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB of non-file form data
+
+# Resumable uploads (/uploads/) for files above the nginx body limit
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB per PATCH, well under client_max_body_size
+CHUNKED_UPLOAD_MAX_SIZE = 10 * 1024 * 1024 * 1024  # 10GB
+CHUNKED_UPLOAD_EXPIRY = 24 * 60 * 60  # unfinished uploads are purged after a day
 REQUEST_TIMEOUT = 300  # 5 minutes
 
+# Media post-processing (checksum, page count, dimensions, duration, thumbnails)
+# runs in `manage.py run_media_worker`. Set the broker to None to process inline.
+MEDIA_PROCESSING_BROKER = 'sys_media.queue.DatabaseBroker'
+MEDIA_PROCESSING_MAX_ATTEMPTS = 3
+MEDIA_PROCESSING_RETRY_DELAY = 30  # seconds, doubled on every retry
+MEDIA_PROCESSING_LOCK_TIMEOUT = 15 * 60  # requeue jobs of workers that died
+# Extracted metadata (ffprobe, mutagen) cached by checksum in a SQLite file shared
+# by every worker; point all services at the same file to share it between them.
+# Keep it on a persistent volume (see configs/docker-compose.yaml).
+MEDIA_METADATA_CACHE_PATH = env("MEDIA_METADATA_CACHE_PATH",
+                                default=str(BASE_DIR / "sys_media" / "cache" / "metadata.sqlite3"))
+MEDIA_METADATA_CACHE_LOCK_TIMEOUT = 5 * 60  # seconds to wait for another worker's extraction
+
+# Adaptive bitrate (HLS/DASH) packaging of lesson and intro videos
+VIDEO_ENCODING_WORKERS = 2  # renditions encoded in parallel by the media worker
+VIDEO_STREAM_SEGMENT_SECONDS = 6
+VIDEO_STREAM_DASH = False  # also write a DASH manifest next to the HLS playlists
+
+# Random access to stored files on remote storages (header sniffing, page counting)
+RANGED_READ_BLOCK_SIZE = 256 * 1024  # bytes fetched per range request block
+RANGED_READ_CACHE_BLOCKS = 32  # blocks kept in memory per open file
+
+# Responsive image renditions (ImageFile models, profile pictures)
+IMAGE_RENDITION_WIDTHS = (160, 320, 640, 960, 1280, 1920)
+IMAGE_RENDITION_FORMATS = ('avif', 'webp', 'jpeg')  # formats Pillow cannot encode are skipped
+IMAGE_RENDITION_QUALITY = {'avif': 55, 'webp': 78, 'jpeg': 80}
+# On-demand resizing (/images/) for widths not listed above
+IMAGE_RESIZE_MAX_WIDTH = 2560
+IMAGE_RESIZE_WIDTH_STEP = 16  # requested widths are rounded up to a multiple of this
+IMAGE_RESIZE_CACHE_DIR = BASE_DIR / "sys_media/cache/learn/images"
+IMAGE_RESIZE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+IMAGE_RESIZE_CACHE_SECONDS = 30 * 24 * 60 * 60
+
+# Audio waveforms: min/max peaks at several zoom levels, stored by checksum
+WAVEFORM_SAMPLE_RATE = 22050  # ffmpeg decodes to mono PCM at this rate
+WAVEFORM_SAMPLES_PER_PEAK = 256  # finest zoom level
+WAVEFORM_ZOOM_FACTOR = 4  # each level merges this many peaks of the previous one
+WAVEFORM_LEVELS = 5
+WAVEFORM_BITS = 8  # 8 or 16 bits per stored value
+# Mel spectrograms, built column by column from the same PCM stream
+SPECTROGRAM_SAMPLE_RATE = 22050
+SPECTROGRAM_N_FFT = 2048
+SPECTROGRAM_N_MELS = 128
+SPECTROGRAM_SECONDS_PER_COLUMN = 0.05  # time resolution when the duration is unknown
+SPECTROGRAM_FRAMES_PER_COLUMN = 4  # FFT frames averaged into each column
+SPECTROGRAM_MAX_COLUMNS = 4096  # columns are merged (resolution halved) beyond this
+
+# Admin changelists (utils.sys_mixins.admin): unfiltered tables larger than this
+# are counted from the planner statistics instead of COUNT(*)
+ADMIN_EXACT_COUNT_THRESHOLD = 10000
+
+# Course catalog full-text search (courses.search)
+COURSE_SEARCH_CONFIGS = {}  # language code -> PostgreSQL text search configuration, overrides the defaults
+COURSE_SEARCH_PAGE_SIZE = 20
+COURSE_SEARCH_MAX_PAGE_SIZE = 100
+COURSE_SEARCH_HEADLINE_WORDS = 35
+
+# Module and lesson order keys (utils.rank_fields): manage.py rebalance_ranks
+# respaces the siblings of keys grown longer than this by repeated moves into
+# one gap or by appends (one character per 35 rows)
+RANK_REBALANCE_LENGTH = 12
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
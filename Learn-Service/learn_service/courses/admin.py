@@ -1,7 +1,10 @@
+from django import forms
 from django.contrib import admin
+from django.db.models import Q
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from .models import *
+from . import search
 from django.urls import reverse
 from django.utils import timezone
 from sys_media.courses import *
@@ -10,6 +13,7 @@ from sys_media.mixins import (
     DocumentAdminMixin, 
     ImageAdminMixin
     )
+from utils.sys_mixins.admin import AdminPerformanceMixin, AutocompleteFilter, SortableAdminMixin
 
 
 
@@ -45,6 +49,7 @@ class CourseThumbnaileAdmin(ImageAdminMixin, admin.ModelAdmin):
                 'content_type',
                 'file_size',
                 'checksum',
+                'processing_status',
                 'height',
                 'width',
                 'slug',
@@ -88,6 +93,7 @@ class CourseDocumentAdmin(DocumentAdminMixin, admin.ModelAdmin):
                 'content_type',
                 'file_size',
                 'checksum',
+                'processing_status',
                 'page_count',
                 'slug',
             )
@@ -130,6 +136,7 @@ class CourseVideoIntroAdmin(VideoAdminMixin, admin.ModelAdmin):
                 'content_type',
                 'file_size',
                 'checksum',
+                'processing_status',
                 'slug',
             )
         }),
@@ -177,6 +184,7 @@ class ModuleThumbnailAdmin(ImageAdminMixin, admin.ModelAdmin):
                 'content_type',
                 'file_size',
                 'checksum',
+                'processing_status',
                 'height',
                 'width',
                 'slug',
@@ -221,6 +229,7 @@ class ModuleVideoIntroAdmin(VideoAdminMixin, admin.ModelAdmin):
                 'content_type',
                 'file_size',
                 'checksum',
+                'processing_status',
                 'slug',
             )
         }),
@@ -261,6 +270,7 @@ class ModuleDocumentAdmin(DocumentAdminMixin, admin.ModelAdmin):
                 'content_type',
                 'file_size',
                 'checksum',
+                'processing_status',
                 'page_count',
                 'slug',
             )
@@ -305,6 +315,7 @@ class ModuleImageLessonAdmin(ImageAdminMixin, admin.ModelAdmin):
                 'content_type',
                 'file_size',
                 'checksum',
+                'processing_status',
                 'height',
                 'width',
                 'slug',
@@ -337,6 +348,7 @@ class ModuleVideoLessonAdmin(VideoAdminMixin, admin.ModelAdmin):
         'created_at',
         'updated_at',
         'checksum',
+        'processing_status',
         'file_size',
         'content_type',
         'slug',
@@ -358,6 +370,7 @@ class ModuleVideoLessonAdmin(VideoAdminMixin, admin.ModelAdmin):
                 'content_type',
                 'file_size',
                 'checksum',
+                'processing_status',
                 'slug',
             )
         }),
@@ -399,6 +412,7 @@ class ModuleDocumentLessonAdmin(DocumentAdminMixin, admin.ModelAdmin):
                 'content_type',
                 'file_size',
                 'checksum',
+                'processing_status',
                 'page_count',
                 'slug',
             )
@@ -415,8 +429,9 @@ class ModuleDocumentLessonAdmin(DocumentAdminMixin, admin.ModelAdmin):
 
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(AdminPerformanceMixin, admin.ModelAdmin):
     list_display = ('name', 'slug',  'is_active', 'created_at', 'course_count')
+    count_annotations = {'course_count': 'courses'}
     search_fields = ('name', 'description')
     list_filter = ('is_active',)
     readonly_fields = ('created_at',)
@@ -424,13 +439,46 @@ class CategoryAdmin(admin.ModelAdmin):
     ordering = ('name',)
 
     def course_count(self, obj):
-        # return obj.courses.count()
-        ...
+        return obj.course_count
     course_count.short_description = 'Courses'
+    course_count.admin_order_field = 'course_count'
+
+
+@admin.register(Tag)
+class TagAdmin(AdminPerformanceMixin, admin.ModelAdmin):
+    list_display = ('name', 'slug', 'language', 'course_count', 'created_at')
+    list_filter = ('language',)
+    search_fields = ('name', 'slug')
+    readonly_fields = ('course_count', 'created_at')
+    ordering = ('language', 'name')
+    actions = ['recount_selected']
+
+    def recount_selected(self, request, queryset):
+        updated = queryset.recount()
+        self.message_user(request, _(f"{updated} tag counts were recomputed."))
+    recount_selected.short_description = _("Recompute published course counts")
+
+
+class CourseAdminForm(forms.ModelForm):
+    tag_names = forms.CharField(
+        label=_("Tags"),
+        required=False,
+        help_text=_("Use commas to separate tags. Example: python, django, web development"),
+    )
+
+    class Meta:
+        model = Course
+        exclude = ('tags',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['tag_names'].initial = ', '.join(self.instance.get_tags)
 
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(AdminPerformanceMixin, admin.ModelAdmin):
+    form = CourseAdminForm
     list_display = (
         'title_with_status', 'category_display', 
         'instructor__last_name',
@@ -446,8 +494,9 @@ class CourseAdmin(admin.ModelAdmin):
         ('level', admin.ChoicesFieldListFilter),
         ('language', admin.ChoicesFieldListFilter),
         ('created_at', admin.DateFieldListFilter),
+        ('category', AutocompleteFilter),
+        ('instructor', AutocompleteFilter),
     )
-    date_hierarchy = 'created_at'
     search_fields = (
         'title', 'short_description', 'description',
         'instructor__first_name', 'instructor__last_name', 'instructor__email',
@@ -455,16 +504,28 @@ class CourseAdmin(admin.ModelAdmin):
     )
     actions = ['publish_selected', 'unpublish_selected', 'feature_selected', 'unfeature_selected']
     fieldsets = (
-        (_('Basic Information'), {'fields': ('title', 'slug', 'short_description', 'description', 'tags')}),
+        (_('Basic Information'), {'fields': ('title', 'slug', 'short_description', 'description', 'tag_names')}),
         (_('Classification'), {'fields': ('category', 'instructor', 'level', 'language'), 'classes': ('collapse',)}),
         (_('Pricing'), {'fields': ('price', 'is_free'), 'classes': ('collapse',)}),
         (_('Publication'), {'fields': ('is_published', 'published_at', 'is_featured'), 'classes': ('collapse',)}),
-        (_('Metadata'), {'fields': ('duration', 'created_at', 'updated_at'), 'classes': ('collapse',)}),
+        (_('Metadata'), {'fields': ('duration', 'lesson_count', 'video_count', 'created_at', 'updated_at'), 'classes': ('collapse',)}),
     )
-    readonly_fields = ('slug', 'created_at', 'updated_at')
+    readonly_fields = ('slug', 'duration', 'lesson_count', 'video_count', 'created_at', 'updated_at')
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('instructor', 'category')
+        return super().get_queryset(request).select_related('instructor', 'category').defer('search_vector')
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Matches the GIN indexed search vector (title, descriptions, tags) or
+        the exact instructor email, instead of icontains scans over
+        ``search_fields`` (kept for databases without full-text search).
+        """
+        search_term = search_term.strip()
+        if not search_term or not search.supports_full_text(queryset.db):
+            return super().get_search_results(request, queryset, search_term)
+        query = search.build_search_query(search_term)
+        return queryset.filter(Q(search_vector=query) | Q(instructor__email__iexact=search_term)), False
 
     def title_with_status(self, obj):
         status = '✅' if obj.is_published else '❌'
@@ -532,12 +593,12 @@ class CourseAdmin(admin.ModelAdmin):
     duration_formatted.admin_order_field = 'duration'
 
     def publish_selected(self, request, queryset):
-        updated = queryset.update(is_published=True, published_at=timezone.now())
+        updated = queryset.set_published(True, published_at=timezone.now())
         self.message_user(request, _(f"{updated} courses were successfully published."))
     publish_selected.short_description = _("Publish selected courses")
 
     def unpublish_selected(self, request, queryset):
-        updated = queryset.update(is_published=False)
+        updated = queryset.set_published(False)
         self.message_user(request, _(f"{updated} courses were successfully unpublished."))
     unpublish_selected.short_description = _("Unpublish selected courses")
 
@@ -558,19 +619,23 @@ class CourseAdmin(admin.ModelAdmin):
             obj.published_at = timezone.now()
         super().save_model(request, obj, form, change)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.set_tags(form.cleaned_data.get('tag_names', ''))
+
 
 @admin.register(Module)
-class ModuleAdmin(admin.ModelAdmin):
-    list_display = ('title', 'course', 'order', 'is_published', 'created_at')
-    list_filter = ('is_published', 'course')
+class ModuleAdmin(SortableAdminMixin, AdminPerformanceMixin, admin.ModelAdmin):
+    list_display = ('title', 'course', 'order', 'lesson_count', 'duration', 'is_published', 'created_at')
+    list_filter = ('is_published', ('course', AutocompleteFilter))
     search_fields = ('title', 'slug', 'course__title')
     ordering = ('order',)
 
 
 @admin.register(Lesson)
-class LessonAdmin(admin.ModelAdmin):
-    list_display = ('title', 'module', 'is_published', 'is_preview', 'order', 'created_at')
-    list_filter = ('is_published', 'is_preview', 'created_at', 'module')
+class LessonAdmin(SortableAdminMixin, AdminPerformanceMixin, admin.ModelAdmin):
+    list_display = ('title', 'module', 'is_published', 'is_preview', 'order', 'video_count', 'duration', 'created_at')
+    list_filter = ('is_published', 'is_preview', 'created_at', ('module', AutocompleteFilter))
     search_fields = ('title', 'module__title', 'slug')
     ordering = ('order',)
 
@@ -0,0 +1,514 @@
+"""
+Bulk import of curricula described by a manifest (``manage.py import_courses``).
+
+A manifest lists categories and courses, each course its modules and media,
+each module its lessons and media:
+
+    {
+      "categories": [{"name": "Programming", "description": "..."}],
+      "courses": [{
+        "title": "Django", "instructor": "teacher@example.com", "category": "Programming",
+        "short_description": "...", "description": "...", "level": "beginner",
+        "language": "en", "tags": ["python", "web"], "is_published": false,
+        "thumbnails": ["django/cover.png"], "documents": [], "videos": [],
+        "modules": [{
+          "title": "Basics", "thumbnails": [], "documents": [], "videos": [],
+          "lessons": [{"title": "Setup", "is_preview": true,
+                       "images": [], "documents": [], "videos": ["django/setup.mp4"]}]
+        }]
+      }]
+    }
+
+Media entries are paths relative to the files directory, or objects with a
+``file`` path and optional ``title``, ``description``, ``is_public`` and
+``alt_text``.
+
+The import runs in dependency order: the manifest is validated, the files
+are hashed and probed in a process pool, rows are created with
+``bulk_create`` level by level and new content is written to storage by a
+thread pool. Rows are matched on their natural keys (category name, course
+title and instructor, module and lesson position) and media on their
+parent and checksum, so importing a manifest again only creates what is
+missing: an interrupted import is resumed by running it again.
+"""
+import logging
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils.text import slugify
+
+from sys_media.abstract import AbstractFileModel
+from sys_media.courses import (
+    CourseDocument, CourseThumbnail, CourseVideoIntro,
+    ModuleDocument, ModuleThumbnail, ModuleVideoIntro,
+    ModuleDocumentLesson, ModuleImageLesson, ModuleVideoLesson,
+)
+from sys_media.helper import get_blob_path
+from sys_media.models import MediaJob, StoredBlob
+from sys_media.queue import DatabaseBroker, get_broker
+from utils.files.metadata import StreamingMetadataExtractor
+from utils.files.metadata_cache import get_metadata_cache
+from utils.rank_fields import rank_sequence
+from utils.slug_fields import allocate_slugs
+from .models import Category, Course, CourseTag, Lesson, Module, Tag, parse_tag_names
+
+logger = logging.getLogger('utils')
+
+# Version of the probing done by extract_media (metadata cache key)
+EXTRACTION_VERSION = '1'
+
+# Manifest fields copied onto the rows
+COURSE_FIELDS = ('short_description', 'description', 'price', 'is_free', 'level', 'language',
+                 'is_published', 'is_featured')
+MODULE_FIELDS = ('description', 'is_published')
+LESSON_FIELDS = ('description', 'is_preview', 'is_published')
+MEDIA_FIELDS = ('title', 'description', 'is_public', 'alt_text')
+
+# Media lists of each level: manifest key -> (model, foreign key to the parent)
+MEDIA_MODELS = {
+    'course': {
+        'thumbnails': (CourseThumbnail, 'course'),
+        'documents': (CourseDocument, 'course'),
+        'videos': (CourseVideoIntro, 'course'),
+    },
+    'module': {
+        'thumbnails': (ModuleThumbnail, 'module'),
+        'documents': (ModuleDocument, 'module'),
+        'videos': (ModuleVideoIntro, 'module'),
+    },
+    'lesson': {
+        'images': (ModuleImageLesson, 'lesson'),
+        'documents': (ModuleDocumentLesson, 'lesson'),
+        'videos': (ModuleVideoLesson, 'lesson'),
+    },
+}
+
+
+class ManifestError(ValueError):
+    """Raised when a manifest does not describe an importable curriculum."""
+
+
+def extract_media(path: str, model_label: str) -> Dict:
+    """
+    Metadata of a file as the media model would extract it on save
+    (size, checksum, MIME type and the type specific fields), runs in the
+    import process pool. The type specific probing is cached by checksum,
+    so a resumed import only hashes the files again.
+    """
+    model = apps.get_model(model_label)
+    metadata = StreamingMetadataExtractor(name=path).consume_path(path).get_metadata()
+
+    def probe():
+        instance = model()
+        instance._apply_metadata(metadata)
+        with open(path, 'rb') as file_object:
+            instance.file = File(file_object, name=os.path.basename(path))
+            instance.extract_type_metadata(file_object)
+        return {field: getattr(instance, field) for field in model.METADATA_FIELDS}
+
+    return get_metadata_cache().get_or_compute(
+        metadata['checksum'], f"import:{model._meta.label_lower}", EXTRACTION_VERSION, probe,
+    )
+
+
+class MediaEntry:
+    """A media file of the manifest, attached to the row of ``owner`` once it exists."""
+
+    def __init__(self, model, fk: str, owner, path: str, fields: dict):
+        self.model = model
+        self.fk = fk
+        self.owner = owner
+        self.path = path
+        self.fields = fields
+        self.metadata = None
+
+
+class CourseImporter:
+    """
+    Imports a manifest (see the module docstring).
+
+    Usage:
+        >>> importer = CourseImporter(manifest, root='/imports/partner')
+        >>> importer.run()
+        {'categories': 1, 'courses': 12, 'modules': 80, 'lessons': 640, 'media': 1210, 'files': 1180}
+    """
+
+    def __init__(self,
+                 manifest: dict,
+                 root: str,
+                 instructor: Optional[str] = None,
+                 workers: Optional[int] = None,
+                 storage_threads: int = 8,
+                 batch_size: int = 500) -> None:
+        """
+        Args:
+            manifest: The parsed manifest
+            root: Directory the media paths are relative to
+            instructor: Email of the instructor of courses that name none
+            workers: Extraction processes (1 extracts in this process)
+            storage_threads: Concurrent storage writes
+            batch_size: Rows per INSERT
+        """
+        self.manifest = manifest
+        self.root = os.path.realpath(root)
+        self.instructor = instructor
+        self.workers = workers or os.cpu_count() or 1
+        self.storage_threads = storage_threads
+        self.batch_size = batch_size
+        self.created = Counter()
+        self.categories: Dict[str, Category] = {}
+        self.media: List[MediaEntry] = []
+        self.media_by_owner = defaultdict(list)
+
+    def run(self) -> Counter:
+        """
+        Returns:
+            Number of created rows per kind, and of files written to storage.
+        """
+        plan = self.validate()
+        self.extract()
+        self.create_categories(plan['categories'])
+        courses = self.create_courses(plan['courses'])
+        modules = self.create_modules(courses)
+        self.create_lessons(modules)
+        self.create_media()
+        if self.created:
+            # bulk_create sends no signals: rebuild the totals of the courses touched
+            Course.objects.filter(pk__in=[course.pk for course in courses]).recompute_rollups(self.batch_size)
+        return self.created
+
+    # Validation
+
+    def validate(self) -> dict:
+        """
+        Checks the whole manifest before anything is written: required
+        fields, field values, instructors and files.
+        """
+        errors = []
+        categories = {}
+        for spec in self.manifest.get('categories', []):
+            if not spec.get('name'):
+                errors.append("categories: a category needs a name")
+                continue
+            categories[spec['name']] = spec
+
+        emails = {spec.get('instructor') or self.instructor for spec in self.manifest.get('courses', [])}
+        users = {user.email: user for user in get_user_model().objects.filter(email__in=emails - {None})}
+
+        courses = []
+        for position, spec in enumerate(self.manifest.get('courses', [])):
+            where = f"courses[{position}]"
+            email = spec.get('instructor') or self.instructor
+            if email not in users:
+                errors.append(f"{where}: unknown instructor {email!r}")
+                continue
+            course = Course(title=spec.get('title', ''), instructor=users[email],
+                            **self.pick(spec, COURSE_FIELDS))
+            course.category_name = spec.get('category')
+            course.tag_names = spec.get('tags', [])
+            if course.category_name:
+                categories.setdefault(course.category_name, {'name': course.category_name})
+            # The default price (0, free courses) is below the field's own minimum
+            unchecked = {'category', 'instructor'} | ({'price'} if 'price' not in spec else set())
+            errors.extend(self.check(course, where, exclude=unchecked))
+            course.modules_plan = []
+            self.plan_media('course', course, spec, where, errors)
+            for index, module_spec in enumerate(spec.get('modules', [])):
+                module_where = f"{where}.modules[{index}]"
+                module = Module(title=module_spec.get('title', ''), **self.pick(module_spec, MODULE_FIELDS))
+                module.position = module_spec.get('order', index)
+                if not isinstance(module.position, int):
+                    errors.append(f"{module_where}.order: the position must be an integer")
+                    module.position = index
+                errors.extend(self.check(module, module_where, exclude={'course'}))
+                module.lessons_plan = []
+                self.plan_media('module', module, module_spec, module_where, errors)
+                for lesson_index, lesson_spec in enumerate(module_spec.get('lessons', [])):
+                    lesson_where = f"{module_where}.lessons[{lesson_index}]"
+                    lesson = Lesson(title=lesson_spec.get('title', ''), **self.pick(lesson_spec, LESSON_FIELDS))
+                    lesson.position = lesson_spec.get('order', lesson_index)
+                    if not isinstance(lesson.position, int):
+                        errors.append(f"{lesson_where}.order: the position must be an integer")
+                        lesson.position = lesson_index
+                    errors.extend(self.check(lesson, lesson_where, exclude={'module', 'duration'}))
+                    self.plan_media('lesson', lesson, lesson_spec, lesson_where, errors)
+                    module.lessons_plan.append(lesson)
+                course.modules_plan.append(module)
+            courses.append(course)
+
+        if errors:
+            raise ManifestError("\n".join(errors))
+        return {'categories': categories, 'courses': courses}
+
+    @staticmethod
+    def pick(spec: dict, fields: tuple) -> dict:
+        return {field: spec[field] for field in fields if field in spec}
+
+    @staticmethod
+    def check(instance, where: str, exclude: set) -> List[str]:
+        """Field validation without database lookups (foreign keys and slugs are set later)."""
+        try:
+            instance.clean_fields(exclude={'slug', *exclude})
+        except ValidationError as e:
+            return [f"{where}.{field}: {' '.join(messages)}" for field, messages in e.message_dict.items()]
+        return []
+
+    def plan_media(self, level: str, owner, spec: dict, where: str, errors: list) -> None:
+        for key, (model, fk) in MEDIA_MODELS[level].items():
+            entries = spec.get(key, [])
+            for index, entry in enumerate([entries] if isinstance(entries, (str, dict)) else entries):
+                entry = {'file': entry} if isinstance(entry, str) else entry
+                path = os.path.realpath(os.path.join(self.root, entry.get('file', '')))
+                if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+                    errors.append(f"{where}.{key}[{index}]: no file {entry.get('file')!r} in {self.root}")
+                    continue
+                extension = os.path.splitext(path)[1][1:].lower()
+                if extension not in model.ALLOWED_EXTENSIONS:
+                    errors.append(f"{where}.{key}[{index}]: {extension!r} files are not accepted as {key}")
+                    continue
+                media = MediaEntry(model, fk, owner, path, self.pick(entry, MEDIA_FIELDS))
+                self.media.append(media)
+                self.media_by_owner[id(owner)].append(media)
+
+    # Extraction
+
+    def extract(self) -> None:
+        """Hashes and probes every distinct (file, model) pair, in a process pool."""
+        tasks = sorted({(entry.path, entry.model._meta.label) for entry in self.media})
+        if self.workers > 1 and len(tasks) > 1:
+            # Spawned, not forked: children must not inherit the database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'),
+                                     initializer=django.setup) as pool:
+                results = dict(zip(tasks, pool.map(extract_media, *zip(*tasks), chunksize=8)))
+        else:
+            results = {task: extract_media(*task) for task in tasks}
+        for entry in self.media:
+            entry.metadata = results[(entry.path, entry.model._meta.label)]
+
+    # Rows, in dependency order
+
+    def bulk_create(self, model, objs: list, kind: str) -> list:
+        if not objs:
+            return objs
+        with transaction.atomic():
+            model.objects.bulk_create(allocate_slugs(objs), batch_size=self.batch_size)
+        self.created[kind] += len(objs)
+        return objs
+
+    def create_categories(self, specs: dict) -> None:
+        existing = set(Category.objects.filter(name__in=specs).values_list('name', flat=True))
+        self.bulk_create(Category, [
+            Category(name=name, **self.pick(spec, ('description', 'is_active')))
+            for name, spec in specs.items() if name not in existing
+        ], 'categories')
+        self.categories = {category.name: category for category in Category.objects.filter(name__in=specs)}
+
+    def create_courses(self, courses: List[Course]) -> List[Course]:
+        existing = {
+            (course.title, course.instructor_id): course
+            for course in Course.objects.filter(title__in={course.title for course in courses}).defer('search_vector')
+        }
+        new = []
+        for index, course in enumerate(courses):
+            course.category = self.categories.get(course.category_name)
+            found = existing.get((course.title, course.instructor_id))
+            if found is None:
+                new.append(course)
+            else:
+                found.modules_plan = course.modules_plan
+                self.reattach(course, found)
+                courses[index] = found
+        self.bulk_create(Course, new, 'courses')
+        self.tag_courses(new)
+        Course.objects.filter(pk__in=[course.pk for course in new]).update_search_vector()
+        return courses
+
+    def tag_courses(self, courses: List[Course]) -> None:
+        """Tags new courses: one tag lookup per language, one INSERT, one count update per multiplicity."""
+        by_language = defaultdict(list)
+        for course in courses:
+            by_language[course.language].append(course)
+        links = []
+        for language, language_courses in by_language.items():
+            names = [name for course in language_courses for name in parse_tag_names(course.tag_names)]
+            tags = {tag.slug: tag for tag in Tag.objects.for_names(names, language)}
+            for course in language_courses:
+                links.extend(CourseTag(course=course, tag=tags[slug]) for slug in
+                             (slugify(name, allow_unicode=True) for name in parse_tag_names(course.tag_names))
+                             if slug in tags)
+        CourseTag.objects.bulk_create(links, batch_size=self.batch_size)
+        published = [course.pk for course in courses if course.is_published]
+        Tag.objects.adjust_course_counts(CourseTag.objects.filter(course__in=published), 1)
+
+    @staticmethod
+    def place(planned: list, rows: list) -> list:
+        """
+        Pairs the children planned for a parent, in manifest order, with its
+        existing ``rows`` (ranked) by position. Planned children past the
+        existing ones are given keys after the last row.
+
+        Returns:
+            (planned, existing row or None) pairs
+        """
+        planned = sorted(planned, key=lambda child: child.position)
+        keys = rank_sequence(rows[-1].order if rows else None, None, len(planned) - len(rows))
+        for child, key in zip(planned[len(rows):], keys):
+            child.order = key
+        return [(child, rows[index] if index < len(rows) else None) for index, child in enumerate(planned)]
+
+    def create_modules(self, courses: List[Course]) -> List[Module]:
+        existing = defaultdict(list)
+        for module in Module.objects.filter(course__in=[course.pk for course in courses]).order_by('order'):
+            existing[module.course_id].append(module)
+        modules, new = [], []
+        for course in courses:
+            for module, found in self.place(course.modules_plan, existing[course.pk]):
+                module.course = course
+                if found is None:
+                    new.append(module)
+                else:
+                    found.lessons_plan = module.lessons_plan
+                    self.reattach(module, found)
+                    module = found
+                modules.append(module)
+        self.bulk_create(Module, new, 'modules')
+        return modules
+
+    def create_lessons(self, modules: List[Module]) -> None:
+        existing = defaultdict(list)
+        for lesson in Lesson.objects.filter(module__in=[module.pk for module in modules]).order_by('order'):
+            existing[lesson.module_id].append(lesson)
+        new = []
+        for module in modules:
+            for lesson, found in self.place(module.lessons_plan, existing[module.pk]):
+                lesson.module = module
+                if found is None:
+                    new.append(lesson)
+                else:
+                    self.reattach(lesson, found)
+        self.bulk_create(Lesson, new, 'lessons')
+
+    def reattach(self, planned, row) -> None:
+        """Points the media planned for ``planned`` at the existing ``row``."""
+        for entry in self.media_by_owner.pop(id(planned), []):
+            entry.owner = row
+
+    # Media
+
+    def create_media(self) -> None:
+        """
+        Creates the media rows that do not exist yet (same parent and
+        checksum), writing content that is not stored yet concurrently and
+        recording the blob references.
+        """
+        missing = self.missing_media()
+        blobs = self.store_blobs(missing)
+
+        broker = get_broker()
+        rows = defaultdict(list)
+        for entry in missing:
+            model = entry.model
+            deferred = model.extract_deferred_metadata is not AbstractFileModel.extract_deferred_metadata
+            fields = {name: value for name, value in entry.fields.items()
+                      if name != 'alt_text' or hasattr(model, 'alt_text')}
+            fields.setdefault('title', os.path.splitext(os.path.basename(entry.path))[0])
+            rows[model].append(model(
+                **{entry.fk: entry.owner},
+                **fields,
+                **entry.metadata,
+                file=blobs[entry.metadata['checksum']],
+                original_filename=os.path.basename(entry.path),
+                processing_status=model.PENDING if broker is not None and deferred else model.READY,
+            ))
+
+        references = Counter(entry.metadata['checksum'] for entry in missing)
+        with transaction.atomic():
+            for model, objs in rows.items():
+                self.bulk_create(model, objs, 'media')
+                self.queue(broker, [obj for obj in objs if obj.processing_status == model.PENDING])
+            per_count = defaultdict(list)
+            for checksum, count in references.items():
+                per_count[count].append(checksum)
+            for count, checksums in per_count.items():
+                StoredBlob.objects.filter(checksum__in=checksums).update(ref_count=F('ref_count') + count)
+
+    def missing_media(self) -> List[MediaEntry]:
+        existing = set()
+        by_model = defaultdict(list)
+        for entry in self.media:
+            by_model[(entry.model, entry.fk)].append(entry)
+        for (model, fk), entries in by_model.items():
+            attname = model._meta.get_field(fk).attname
+            owners = {entry.owner.pk for entry in entries}
+            existing.update(
+                (model, owner, checksum) for owner, checksum in
+                model.objects.filter(**{f"{attname}__in": owners}).values_list(attname, 'checksum')
+            )
+        missing, seen = [], set()
+        for entry in self.media:
+            key = (entry.model, entry.owner.pk, entry.metadata['checksum'])
+            if key not in existing and key not in seen:
+                seen.add(key)
+                missing.append(entry)
+        return missing
+
+    def store_blobs(self, entries: List[MediaEntry]) -> Dict[str, str]:
+        """
+        Storage names of the content of ``entries`` by checksum, writing the
+        content that is not stored yet with ``storage_threads`` concurrent
+        writes. A blob written by an interrupted import is not written again.
+        """
+        sources = {entry.metadata['checksum']: entry for entry in entries}
+        names = dict(StoredBlob.objects.filter(checksum__in=sources).values_list('checksum', 'name'))
+        new = {checksum: entry for checksum, entry in sources.items() if checksum not in names}
+
+        def write(checksum: str) -> str:
+            entry = new[checksum]
+            name = get_blob_path(checksum, entry.path)
+            if default_storage.exists(name):
+                return name
+            with open(entry.path, 'rb') as file_object:
+                return default_storage.save(name, File(file_object, name=os.path.basename(entry.path)))
+
+        with ThreadPoolExecutor(max_workers=self.storage_threads) as pool:
+            written = dict(zip(new, pool.map(write, new)))
+        if written:
+            self.created['files'] += len(written)
+
+        StoredBlob.objects.bulk_create([
+            StoredBlob(checksum=checksum, name=name, size=new[checksum].metadata['file_size'],
+                       metadata=new[checksum].metadata, ref_count=0)
+            for checksum, name in written.items()
+        ], batch_size=self.batch_size, ignore_conflicts=True)
+        names.update(StoredBlob.objects.filter(checksum__in=written).values_list('checksum', 'name'))
+        return names
+
+    @staticmethod
+    def queue(broker, objs: list) -> None:
+        """Queues the background work (thumbnails, renditions, streams) of new media rows."""
+        if broker is None or not objs:
+            return
+        if not isinstance(broker, DatabaseBroker):
+            for obj in objs:
+                broker.enqueue(obj)
+            return
+        content_type = ContentType.objects.get_for_model(objs[0], for_concrete_model=False)
+        MediaJob.objects.bulk_create([
+            MediaJob(content_type=content_type, object_id=obj.pk, file_name=obj.file.name,
+                     max_attempts=getattr(settings, 'MEDIA_PROCESSING_MAX_ATTEMPTS', 3))
+            for obj in objs
+        ], ignore_conflicts=True)
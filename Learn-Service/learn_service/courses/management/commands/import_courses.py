@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import time
+import zipfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.importer import CourseImporter, ManifestError
+
+MANIFEST_NAMES = ('manifest.json', 'manifest.yaml', 'manifest.yml')
+
+
+def parse_manifest(name: str, content: bytes) -> dict:
+    if name.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise CommandError("YAML manifests need PyYAML (pip install pyyaml), or use JSON")
+        return yaml.safe_load(content)
+    return json.loads(content)
+
+
+class Command(BaseCommand):
+    help = ("Imports categories, courses, modules, lessons and their media from a JSON or YAML manifest "
+            "and a directory or zip of files. Running it again resumes an interrupted import: existing "
+            "rows and media (same parent and checksum) are skipped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest', help='Manifest file (.json, .yaml), or a zip holding manifest.json and the files')
+        parser.add_argument('--files', help="Directory or zip of the media files (default: the manifest's directory)")
+        parser.add_argument('--instructor', help='Email of the instructor of courses that name none')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Processes hashing and probing files')
+        parser.add_argument('--storage-threads', type=int, default=8, help='Concurrent storage writes')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        path = options['manifest']
+        if not os.path.isfile(path):
+            raise CommandError(f"No manifest at {path}")
+        files = options['files'] or (path if zipfile.is_zipfile(path) else os.path.dirname(os.path.abspath(path)))
+
+        os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=settings.FILE_UPLOAD_TEMP_DIR) as extracted:
+            if zipfile.is_zipfile(files):
+                # Worker processes read plain files; zipfile drops absolute and '..' members
+                with zipfile.ZipFile(files) as archive:
+                    archive.extractall(extracted)
+                files = extracted
+            manifest = self.load_manifest(path)
+
+            importer = CourseImporter(
+                manifest, files,
+                instructor=options['instructor'],
+                workers=options['workers'],
+                storage_threads=options['storage_threads'],
+                batch_size=options['batch_size'],
+            )
+            started = time.perf_counter()
+            try:
+                created = importer.run()
+            except ManifestError as e:
+                raise CommandError(f"Invalid manifest:\n{e}")
+
+        summary = ', '.join(f"{count} {kind}" for kind, count in created.items()) or 'nothing new'
+        self.stdout.write(self.style.SUCCESS(f"Imported {summary} in {time.perf_counter() - started:.1f}s"))
+
+    def load_manifest(self, path: str) -> dict:
+        if not zipfile.is_zipfile(path):
+            with open(path, 'rb') as manifest:
+                return parse_manifest(path, manifest.read())
+        with zipfile.ZipFile(path) as archive:
+            for name in MANIFEST_NAMES:
+                if name in archive.namelist():
+                    return parse_manifest(name, archive.read(name))
+        raise CommandError(f"{path} holds none of {', '.join(MANIFEST_NAMES)}")
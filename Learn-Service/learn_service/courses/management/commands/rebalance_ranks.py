@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Length
+
+from courses.models import Lesson, Module
+
+DEFAULT_REBALANCE_LENGTH = 12
+
+
+class Command(BaseCommand):
+    help = ("Respaces the order keys of the modules and lessons of parents whose keys grew longer than "
+            "RANK_REBALANCE_LENGTH, from repeated moves into the same gap or many rows appended. "
+            "Meant to run periodically.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--length', type=int,
+                            default=getattr(settings, 'RANK_REBALANCE_LENGTH', DEFAULT_REBALANCE_LENGTH),
+                            help='Respace the siblings of keys longer than this')
+        parser.add_argument('--all', action='store_true', help='Respace every parent')
+
+    def handle(self, *args, **options):
+        for model, parent in ((Module, 'course'), (Lesson, 'module')):
+            rows = model.objects.all()
+            if not options['all']:
+                rows = rows.annotate(key_length=Length('order')).filter(key_length__gt=options['length'])
+            parents = list(rows.order_by().values_list(parent, flat=True).distinct())
+            rewritten = sum(model.objects.filter(**{parent: pk}).rebalance() for pk in parents)
+            self.stdout.write(self.style.SUCCESS(
+                f"Respaced {rewritten} {model._meta.verbose_name_plural} of {len(parents)} parents"
+            ))
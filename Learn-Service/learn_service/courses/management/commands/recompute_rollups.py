@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = ("Rebuilds the duration, lesson and video totals of lessons, modules and courses from the videos, "
+            "repairing rows written without signals (bulk_create, QuerySet.update, raw SQL).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('courses', nargs='*', help='Slugs of the courses to repair (default: all)')
+        parser.add_argument('--courses-per-transaction', type=int, default=100,
+                            help='Courses recomputed in one transaction')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Lessons per UPDATE')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.order_by('pk')
+        if options['courses']:
+            courses = courses.filter(slug__in=options['courses'])
+            missing = set(options['courses']) - set(courses.values_list('slug', flat=True))
+            if missing:
+                raise CommandError(f"No course with the slug {', '.join(sorted(missing))}")
+        pks = list(courses.values_list('pk', flat=True))
+        step = max(options['courses_per_transaction'], 1)
+
+        started = time.perf_counter()
+        corrected = 0
+        for start in range(0, len(pks), step):
+            corrected += Course.objects.filter(pk__in=pks[start:start + step]).recompute_rollups(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed the rollups of {len(pks)} courses in {time.perf_counter() - started:.1f}s "
+            f"({corrected} lessons corrected)"
+        ))
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='tags',
+            field=models.TextField(blank=True, db_index=True, help_text='Use commas to separate tags. Example: python, django, web development', max_length=500, null=True, verbose_name='Comma-separated list of tags for the course.'),
+        ),
+        migrations.DeleteModel(
+            name='Tag',
+        ),
+    ]
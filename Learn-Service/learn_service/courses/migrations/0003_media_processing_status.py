@@ -0,0 +1,73 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:34
+
+from django.db import migrations, models
+
+
+MEDIA_MODELS = (
+    'coursethumbnail', 'coursedocument', 'coursevideointro',
+    'modulethumbnail', 'modulevideointro', 'moduledocument',
+    'modulevideolesson', 'moduledocumentlesson', 'moduleimagelesson',
+)
+
+
+def mark_processed_files_ready(apps, schema_editor):
+    # Rows saved before the queue existed already carry their metadata.
+    for model_name in MEDIA_MODELS:
+        model = apps.get_model('courses', model_name)
+        model.objects.exclude(checksum='').update(processing_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_sync_course_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursedocument',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', editable=False, help_text='Whether metadata extraction for the file has finished', max_length=10, verbose_name='Processing status'),
+        ),
+        migrations.AddField(
+            model_name='coursethumbnail',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', editable=False, help_text='Whether metadata extraction for the file has finished', max_length=10, verbose_name='Processing status'),
+        ),
+        migrations.AddField(
+            model_name='coursevideointro',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', editable=False, help_text='Whether metadata extraction for the file has finished', max_length=10, verbose_name='Processing status'),
+        ),
+        migrations.AddField(
+            model_name='moduledocument',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', editable=False, help_text='Whether metadata extraction for the file has finished', max_length=10, verbose_name='Processing status'),
+        ),
+        migrations.AddField(
+            model_name='moduledocumentlesson',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', editable=False, help_text='Whether metadata extraction for the file has finished', max_length=10, verbose_name='Processing status'),
+        ),
+        migrations.AddField(
+            model_name='moduleimagelesson',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', editable=False, help_text='Whether metadata extraction for the file has finished', max_length=10, verbose_name='Processing status'),
+        ),
+        migrations.AddField(
+            model_name='modulethumbnail',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', editable=False, help_text='Whether metadata extraction for the file has finished', max_length=10, verbose_name='Processing status'),
+        ),
+        migrations.AddField(
+            model_name='modulevideointro',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', editable=False, help_text='Whether metadata extraction for the file has finished', max_length=10, verbose_name='Processing status'),
+        ),
+        migrations.AddField(
+            model_name='modulevideolesson',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', editable=False, help_text='Whether metadata extraction for the file has finished', max_length=10, verbose_name='Processing status'),
+        ),
+        migrations.RunPython(mark_processed_files_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_media_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursevideointro',
+            name='dash_manifest',
+            field=models.CharField(blank=True, editable=False, help_text='Storage path of the adaptive stream DASH manifest', max_length=255, verbose_name='DASH manifest'),
+        ),
+        migrations.AddField(
+            model_name='coursevideointro',
+            name='hls_manifest',
+            field=models.CharField(blank=True, editable=False, help_text='Storage path of the adaptive stream master playlist', max_length=255, verbose_name='HLS manifest'),
+        ),
+        migrations.AddField(
+            model_name='modulevideointro',
+            name='dash_manifest',
+            field=models.CharField(blank=True, editable=False, help_text='Storage path of the adaptive stream DASH manifest', max_length=255, verbose_name='DASH manifest'),
+        ),
+        migrations.AddField(
+            model_name='modulevideointro',
+            name='hls_manifest',
+            field=models.CharField(blank=True, editable=False, help_text='Storage path of the adaptive stream master playlist', max_length=255, verbose_name='HLS manifest'),
+        ),
+        migrations.AddField(
+            model_name='modulevideolesson',
+            name='dash_manifest',
+            field=models.CharField(blank=True, editable=False, help_text='Storage path of the adaptive stream DASH manifest', max_length=255, verbose_name='DASH manifest'),
+        ),
+        migrations.AddField(
+            model_name='modulevideolesson',
+            name='hls_manifest',
+            field=models.CharField(blank=True, editable=False, help_text='Storage path of the adaptive stream master playlist', max_length=255, verbose_name='HLS manifest'),
+        ),
+    ]
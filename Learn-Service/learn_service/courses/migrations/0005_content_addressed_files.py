@@ -0,0 +1,60 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:46
+
+import django.core.validators
+import sys_media.helper
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_video_adaptive_stream'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='coursedocument',
+            name='file',
+            field=models.FileField(help_text='Uploaded document file', max_length=255, upload_to=sys_media.helper.get_blob_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'txt', 'rtf', 'odt'])], verbose_name='Document file'),
+        ),
+        migrations.AlterField(
+            model_name='coursethumbnail',
+            name='file',
+            field=models.ImageField(blank=True, help_text='Uploaded image file', max_length=255, upload_to=sys_media.helper.get_blob_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'gif', 'webp', 'svg'])], verbose_name='Image file'),
+        ),
+        migrations.AlterField(
+            model_name='coursevideointro',
+            name='file',
+            field=models.FileField(help_text='Uploaded video file', max_length=255, upload_to=sys_media.helper.get_blob_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'webm', 'mov', 'avi', 'mkv'])], verbose_name='Video file'),
+        ),
+        migrations.AlterField(
+            model_name='moduledocument',
+            name='file',
+            field=models.FileField(help_text='Uploaded document file', max_length=255, upload_to=sys_media.helper.get_blob_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'txt', 'rtf', 'odt'])], verbose_name='Document file'),
+        ),
+        migrations.AlterField(
+            model_name='moduledocumentlesson',
+            name='file',
+            field=models.FileField(help_text='Uploaded document file', max_length=255, upload_to=sys_media.helper.get_blob_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'txt', 'rtf', 'odt'])], verbose_name='Document file'),
+        ),
+        migrations.AlterField(
+            model_name='moduleimagelesson',
+            name='file',
+            field=models.ImageField(blank=True, help_text='Uploaded image file', max_length=255, upload_to=sys_media.helper.get_blob_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'gif', 'webp', 'svg'])], verbose_name='Image file'),
+        ),
+        migrations.AlterField(
+            model_name='modulethumbnail',
+            name='file',
+            field=models.ImageField(blank=True, help_text='Uploaded image file', max_length=255, upload_to=sys_media.helper.get_blob_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'gif', 'webp', 'svg'])], verbose_name='Image file'),
+        ),
+        migrations.AlterField(
+            model_name='modulevideointro',
+            name='file',
+            field=models.FileField(help_text='Uploaded video file', max_length=255, upload_to=sys_media.helper.get_blob_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'webm', 'mov', 'avi', 'mkv'])], verbose_name='Video file'),
+        ),
+        migrations.AlterField(
+            model_name='modulevideolesson',
+            name='file',
+            field=models.FileField(help_text='Uploaded video file', max_length=255, upload_to=sys_media.helper.get_blob_upload_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'webm', 'mov', 'avi', 'mkv'])], verbose_name='Video file'),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:22
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+
+def build_search_vectors(apps, schema_editor):
+    # Filled before the GIN index is created, which is faster than updating it row by row
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # A copy of courses.search.course_search_vector() as it is now, so later changes to it
+    # do not change what this migration writes
+    config = Case(
+        When(language='en', then=Value('english')),
+        When(language='es', then=Value('spanish')),
+        When(language='fr', then=Value('french')),
+        default=Value('simple'),
+    )
+    vector = (
+        SearchVector('title', config=config, weight='A')
+        + SearchVector('short_description', config=config, weight='B')
+        + SearchVector('tags', config=config, weight='B')
+        + SearchVector('description', config=config, weight='C')
+    )
+    apps.get_model('courses', 'course').objects.update(search_vector=vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_content_addressed_files'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='description',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='tags',
+            field=models.TextField(blank=True, help_text='Use commas to separate tags. Example: python, django, web development', max_length=500, null=True, verbose_name='Comma-separated list of tags for the course.'),
+        ),
+        migrations.AlterField(
+            model_name='coursedocument',
+            name='description',
+            field=models.TextField(blank=True, help_text='Description of the file', null=True, verbose_name='Description'),
+        ),
+        migrations.AlterField(
+            model_name='coursethumbnail',
+            name='description',
+            field=models.TextField(blank=True, help_text='Description of the file', null=True, verbose_name='Description'),
+        ),
+        migrations.AlterField(
+            model_name='coursevideointro',
+            name='description',
+            field=models.TextField(blank=True, help_text='Description of the file', null=True, verbose_name='Description'),
+        ),
+        migrations.AlterField(
+            model_name='moduledocument',
+            name='description',
+            field=models.TextField(blank=True, help_text='Description of the file', null=True, verbose_name='Description'),
+        ),
+        migrations.AlterField(
+            model_name='moduledocumentlesson',
+            name='description',
+            field=models.TextField(blank=True, help_text='Description of the file', null=True, verbose_name='Description'),
+        ),
+        migrations.AlterField(
+            model_name='moduleimagelesson',
+            name='description',
+            field=models.TextField(blank=True, help_text='Description of the file', null=True, verbose_name='Description'),
+        ),
+        migrations.AlterField(
+            model_name='modulethumbnail',
+            name='description',
+            field=models.TextField(blank=True, help_text='Description of the file', null=True, verbose_name='Description'),
+        ),
+        migrations.AlterField(
+            model_name='modulevideointro',
+            name='description',
+            field=models.TextField(blank=True, help_text='Description of the file', null=True, verbose_name='Description'),
+        ),
+        migrations.AlterField(
+            model_name='modulevideolesson',
+            name='description',
+            field=models.TextField(blank=True, help_text='Description of the file', null=True, verbose_name='Description'),
+        ),
+        migrations.RunPython(build_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='course',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='idx_course_search_vector'),
+        ),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils.text import slugify
+
+BATCH_SIZE = 2000
+
+
+def parse_tag_names(text):
+    names = {}
+    for name in (text or '').split(','):
+        name = ' '.join(name.split())[:100]
+        slug = slugify(name, allow_unicode=True)
+        if slug and slug not in names:
+            names[slug] = name
+    return names
+
+
+def copy_tags(apps, schema_editor):
+    """Splits the comma-separated Course.tag_text into Tag rows and CourseTag links."""
+    Course = apps.get_model('courses', 'Course')
+    Tag = apps.get_model('courses', 'Tag')
+    CourseTag = apps.get_model('courses', 'CourseTag')
+
+    courses = Course.objects.exclude(tag_text__isnull=True).exclude(tag_text='')
+    course_tags = {}
+    tags = {}
+    for pk, language, text in courses.values_list('pk', 'language', 'tag_text').iterator(chunk_size=BATCH_SIZE):
+        names = parse_tag_names(text)
+        course_tags[pk] = [(language, slug) for slug in names]
+        for slug, name in names.items():
+            tags.setdefault((language, slug), name)
+    if not tags:
+        return
+
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=slug, language=language) for (language, slug), name in tags.items()],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+    tag_ids = {(language, slug): pk for pk, language, slug in Tag.objects.values_list('pk', 'language', 'slug')}
+    CourseTag.objects.bulk_create(
+        [CourseTag(course_id=course, tag_id=tag_ids[key]) for course, keys in course_tags.items() for key in keys],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+    counts = (
+        CourseTag.objects.filter(course__is_published=True)
+        .values('tag').annotate(total=Count('pk')).values_list('tag', 'total')
+    )
+    per_count = {}
+    for tag, total in counts:
+        per_count.setdefault(total, []).append(tag)
+    for total, tag_ids in per_count.items():
+        Tag.objects.filter(pk__in=tag_ids).update(course_count=total)
+
+
+def restore_tag_text(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    CourseTag = apps.get_model('courses', 'CourseTag')
+    names = {}
+    for course, name in CourseTag.objects.order_by('pk').values_list('course', 'tag__name').iterator(chunk_size=BATCH_SIZE):
+        names.setdefault(course, []).append(name)
+    for course, course_names in names.items():
+        Course.objects.filter(pk=course).update(tag_text=', '.join(course_names))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_course_search_vector'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='course',
+            old_name='tags',
+            new_name='tag_text',
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Name')),
+                ('slug', models.SlugField(allow_unicode=True, max_length=100, verbose_name='Slug')),
+                ('language', models.CharField(choices=[('en', '🇺🇸 English'), ('es', '🇪🇸 Spanish'), ('fr', '🇫🇷 French'), ('rw', '🇷🇼 Kinyarwanda')], default='en', max_length=10, verbose_name='Language')),
+                ('course_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Published courses')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['language', '-course_count'], name='idx_tag_language_count')],
+                'constraints': [models.UniqueConstraint(fields=('language', 'slug'), name='unique_tag_language_slug')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='courses.course')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_links', to='courses.tag')),
+            ],
+            options={
+                'verbose_name': 'Course tag',
+                'verbose_name_plural': 'Course tags',
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='courses', through='courses.CourseTag', to='courses.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='coursetag',
+            index=models.Index(fields=['tag', 'course'], name='idx_coursetag_tag_course'),
+        ),
+        migrations.AddConstraint(
+            model_name='coursetag',
+            constraint=models.UniqueConstraint(fields=('course', 'tag'), name='unique_course_tag'),
+        ),
+        migrations.RunPython(copy_tags, restore_tag_text),
+        migrations.RemoveField(
+            model_name='course',
+            name='tag_text',
+        ),
+    ]
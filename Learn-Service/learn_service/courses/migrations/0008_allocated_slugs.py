@@ -0,0 +1,79 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:31
+
+import utils.slug_fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_course_tags'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.CategorySlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.CourseSlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='coursedocument',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.MediaSlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='coursethumbnail',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.MediaSlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='coursevideointro',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.MediaSlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.LessonSlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='module',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.ModuleSlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='moduledocument',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.MediaSlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='moduledocumentlesson',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.MediaSlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='moduleimagelesson',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.MediaSlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='modulethumbnail',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.MediaSlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='modulevideointro',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.MediaSlug.get_slug, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='modulevideolesson',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.MediaSlug.get_slug, unique=True),
+        ),
+    ]
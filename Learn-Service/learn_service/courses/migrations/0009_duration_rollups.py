@@ -0,0 +1,89 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:45
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 2000
+ZERO = datetime.timedelta(0)
+
+
+def build_rollups(apps, schema_editor):
+    """Fills the lesson, module and course totals from the videos (Course.recompute_rollups, frozen)."""
+    Course = apps.get_model('courses', 'Course')
+    Module = apps.get_model('courses', 'Module')
+    Lesson = apps.get_model('courses', 'Lesson')
+
+    rows = (
+        Lesson.objects.order_by().annotate(seconds=Sum('videos__duration'), videos_total=Count('videos'))
+        .values_list('pk', 'seconds', 'videos_total')
+    )
+    lessons = [Lesson(pk=pk, duration=datetime.timedelta(seconds=seconds or 0), video_count=videos)
+               for pk, seconds, videos in rows.iterator(chunk_size=BATCH_SIZE)]
+    Lesson.objects.bulk_update(lessons, ['duration', 'video_count'], batch_size=BATCH_SIZE)
+
+    lessons = Lesson.objects.filter(module=OuterRef('pk')).order_by().values('module')
+    Module.objects.update(
+        duration=Coalesce(Subquery(lessons.annotate(total=Sum('duration')).values('total')), Value(ZERO)),
+        lesson_count=Coalesce(Subquery(lessons.annotate(total=Count('pk')).values('total')), 0),
+        video_count=Coalesce(Subquery(lessons.annotate(total=Sum('video_count')).values('total')), 0),
+    )
+    modules = Module.objects.filter(course=OuterRef('pk')).order_by().values('course')
+    Course.objects.update(
+        duration=Coalesce(Subquery(modules.annotate(total=Sum('duration')).values('total')), Value(ZERO)),
+        lesson_count=Coalesce(Subquery(modules.annotate(total=Sum('lesson_count')).values('total')), 0),
+        video_count=Coalesce(Subquery(modules.annotate(total=Sum('video_count')).values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_allocated_slugs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='video_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='video_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='duration',
+            field=models.DurationField(default=datetime.timedelta(0), editable=False),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='video_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='duration',
+            field=models.DurationField(blank=True, editable=False, help_text='Total length of course (HH:MM:SS)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='duration',
+            field=models.DurationField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:50
+
+from collections import defaultdict
+
+import utils.rank_fields
+from django.db import migrations
+
+BATCH_SIZE = 2000
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def spread(count):
+    """utils.rank_fields.rank_spread, frozen."""
+    width = 1
+    while len(DIGITS) ** width <= count:
+        width += 1
+    space = len(DIGITS) ** width
+    keys = []
+    for index in range(count):
+        value, digits = space * (index + 1) // (count + 1), []
+        for position in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
+
+
+def rank_rows(model, parent):
+    """Replaces the integer positions (now their text) by keys spread in the same order, per parent."""
+    groups = defaultdict(list)
+    for pk, parent_id, order in model.objects.values_list('pk', parent, 'order').iterator(chunk_size=BATCH_SIZE):
+        groups[parent_id].append((int(order or 0), pk))
+    rows = []
+    for positions in groups.values():
+        rows.extend(model(pk=pk, order=key) for (_, pk), key in zip(sorted(positions), spread(len(positions))))
+    write_orders(model, rows)
+
+
+def unrank_rows(model, parent):
+    """Replaces the keys by the positions 1..n in the same order, per parent, for the integer column."""
+    groups = defaultdict(list)
+    rows = model.objects.order_by(parent, 'order', 'pk').values_list('pk', parent)
+    for pk, parent_id in rows.iterator(chunk_size=BATCH_SIZE):
+        groups[parent_id].append(pk)
+    write_orders(model, [model(pk=pk, order=str(position))
+                         for pks in groups.values() for position, pk in enumerate(pks, 1)])
+
+
+def write_orders(model, rows):
+    # Off the key space first: a new value may still be held by another row
+    model.objects.bulk_update([model(pk=row.pk, order=f'-{row.pk}') for row in rows], ['order'], batch_size=BATCH_SIZE)
+    model.objects.bulk_update(rows, ['order'], batch_size=BATCH_SIZE)
+
+
+def rank_curriculum(apps, schema_editor):
+    rank_rows(apps.get_model('courses', 'Module'), 'course')
+    rank_rows(apps.get_model('courses', 'Lesson'), 'module')
+
+
+def unrank_curriculum(apps, schema_editor):
+    unrank_rows(apps.get_model('courses', 'Module'), 'course')
+    unrank_rows(apps.get_model('courses', 'Lesson'), 'module')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_duration_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lesson',
+            name='order',
+            field=utils.rank_fields.RankField(blank=True, db_index=True, default='', max_length=64, scope=('module',)),
+        ),
+        migrations.AlterField(
+            model_name='module',
+            name='order',
+            field=utils.rank_fields.RankField(blank=True, default='', max_length=64, scope=('course',)),
+        ),
+        migrations.RunPython(rank_curriculum, unrank_curriculum),
+    ]
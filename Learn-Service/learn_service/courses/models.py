@@ -1,16 +1,25 @@
-from django.db import models
-from django_extensions.db.fields import AutoSlugField
+from datetime import timedelta
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from utils.slug_fields import (
-    CourseSlug, CategorySlug, 
+    AutoSlugField, CourseSlug, CategorySlug, 
     ModuleSlug, LessonSlug
 )
+from utils.rank_fields import RankField, RankedMixin, RankQuerySet
+from . import search
 
 User = get_user_model()
 
+ZERO_DURATION = timedelta(0)
+
 class Category(models.Model):
     name = models.CharField(
         max_length=100, 
@@ -24,7 +33,6 @@ class Category(models.Model):
     )
     description = models.TextField(
         blank=True, 
-        db_index=True
         )
     icon = models.ImageField(upload_to='category_icon/', null=True, blank=True)
     is_active = models.BooleanField(default=True)
@@ -54,7 +62,178 @@ class Category(models.Model):
     
 
 
-class Course(models.Model):
+class RollupQuerySet(models.QuerySet):
+
+    def shift_rollups(self, duration: timedelta = ZERO_DURATION, lessons: int = 0, videos: int = 0) -> int:
+        """
+        Adds a change of the content below these rows to their ``duration``,
+        ``lesson_count`` and ``video_count`` totals in one UPDATE, without
+        reading them.
+
+        Returns:
+            int: Number of updated rows
+        """
+        changes = {}
+        if duration:
+            changes['duration'] = Coalesce(F('duration'), Value(ZERO_DURATION)) + Value(duration)
+        if lessons:
+            changes['lesson_count'] = F('lesson_count') + lessons
+        if videos:
+            changes['video_count'] = F('video_count') + videos
+        return self.update(**changes) if changes else 0
+
+
+class CurriculumQuerySet(RankQuerySet, RollupQuerySet):
+    """Modules and lessons: ranked (see utils.rank_fields) and rolled up."""
+
+
+class RollupMixin:
+    """
+    Model with totals of its content (``ROLLUP_FIELDS``), kept up to date by
+    ``shift_rollups`` (see courses.signals) and rebuilt by
+    ``recompute_rollups``. A plain save() of a loaded row leaves them out:
+    its copy may be older than the last shift. Nor does it write the
+    deferred fields, which the caller did not load.
+    """
+    ROLLUP_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if not (self._state.adding or args or kwargs.get('force_insert')) and kwargs.get('update_fields') is None:
+            skipped = {*self.ROLLUP_FIELDS, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.attname not in skipped]
+        super().save(*args, **kwargs)
+
+
+class CourseQuerySet(RollupQuerySet):
+
+    def search(self, text: str, language: str = None, highlight: bool = True):
+        """
+        Courses matching ``text``, best match first.
+
+        On PostgreSQL the GIN indexed ``search_vector`` is matched, results
+        are annotated with ``rank`` and, with ``highlight``, with
+        ``title_highlight`` and ``description_highlight`` (see
+        ``courses.search``). Other databases get an unranked ``icontains``
+        match with the same annotations.
+
+        Args:
+            text: User input (websearch syntax: "phrases", or, -exclusions)
+            language: Restrict to courses in this language and stem with its
+                configuration
+            highlight: Annotate headlines (computed per returned row only,
+                so slice the queryset first)
+        """
+        queryset = (self.filter(language=language) if language else self).defer('search_vector')
+        if not search.supports_full_text(self.db):
+            queryset = queryset.filter(search.fallback_filter(text)).annotate(rank=models.Value(0.0))
+            if highlight:
+                queryset = queryset.annotate(title_highlight=models.F('title'),
+                                             description_highlight=models.F('short_description'))
+            return queryset
+        query = search.build_search_query(text, language)
+        queryset = queryset.filter(search_vector=query).annotate(rank=search.search_rank(query))
+        if highlight:
+            queryset = queryset.annotate(
+                title_highlight=search.search_headline('title', query, highlight_all=True),
+                description_highlight=search.search_headline('description', query),
+            )
+        return queryset.order_by('-rank', '-created_at')
+
+    def tagged(self, slug: str, language: str = None):
+        """Courses carrying the tag ``slug`` (an index lookup on the through table)."""
+        tags = Tag.objects.filter(slug=slug)
+        if language:
+            tags = tags.filter(language=language)
+        return self.filter(tag_links__tag__in=tags)
+
+    def tag_facets(self, limit: int = 20):
+        """
+        Tags of these courses with the number of courses carrying each one,
+        most used first: ``[{'slug', 'name', 'language', 'count'}, ...]``.
+        """
+        return list(
+            CourseTag.objects.filter(course__in=self.order_by().values('pk'))
+            .values(slug=F('tag__slug'), name=F('tag__name'), language=F('tag__language'))
+            .annotate(count=Count('course'))
+            .order_by('-count', 'slug')[:limit]
+        )
+
+    def set_published(self, published: bool, **fields) -> int:
+        """
+        Publishes or unpublishes these courses in one UPDATE and adjusts the
+        published course counts of their tags. Courses already in that state
+        are left untouched.
+
+        Returns:
+            int: Number of changed courses
+        """
+        with transaction.atomic(using=self.db):
+            pks = list(self.exclude(is_published=published).select_for_update().values_list('pk', flat=True))
+            updated = Course.objects.filter(pk__in=pks).update(is_published=published, **fields)
+            Tag.objects.adjust_course_counts(CourseTag.objects.filter(course__in=pks), 1 if published else -1)
+        return updated
+
+    def update_search_vector(self) -> int:
+        """
+        Rebuilds the search vector of these courses in one UPDATE (a no-op
+        without PostgreSQL).
+
+        Returns:
+            int: Number of updated courses
+        """
+        if not search.supports_full_text(self.db):
+            return 0
+        return self.update(search_vector=search.course_search_vector())
+
+    def recompute_rollups(self, batch_size: int = 1000) -> int:
+        """
+        Rebuilds the duration, lesson and video totals of these courses, their
+        modules and lessons from the videos, repairing what the incremental
+        rollups missed (``bulk_create`` and ``update`` send no signals).
+
+        Lesson totals are summed in Python (SQLite cannot turn seconds into a
+        duration) and only written where they differ; modules and courses
+        then take one UPDATE each.
+
+        Returns:
+            int: Number of lessons whose totals were corrected
+        """
+        courses = self.order_by().values('pk')
+        changed = []
+        corrected = 0
+        with transaction.atomic(using=self.db):
+            rows = (
+                Lesson.objects.filter(module__course__in=courses).order_by()
+                .annotate(seconds=Sum('videos__duration'), videos_total=Count('videos'))
+                .values_list('pk', 'duration', 'video_count', 'seconds', 'videos_total')
+            )
+            for pk, duration, video_count, seconds, videos_total in rows.iterator(chunk_size=batch_size):
+                total = timedelta(seconds=seconds or 0)
+                if (duration, video_count) != (total, videos_total):
+                    changed.append(Lesson(pk=pk, duration=total, video_count=videos_total))
+                if len(changed) >= batch_size:
+                    corrected += Lesson.objects.bulk_update(changed, ['duration', 'video_count'])
+                    changed = []
+            if changed:
+                corrected += Lesson.objects.bulk_update(changed, ['duration', 'video_count'])
+
+            lessons = Lesson.objects.filter(module=OuterRef('pk')).order_by().values('module')
+            Module.objects.filter(course__in=courses).update(
+                duration=Coalesce(Subquery(lessons.annotate(total=Sum('duration')).values('total')), Value(ZERO_DURATION)),
+                lesson_count=Coalesce(Subquery(lessons.annotate(total=Count('pk')).values('total')), 0),
+                video_count=Coalesce(Subquery(lessons.annotate(total=Sum('video_count')).values('total')), 0),
+            )
+            modules = Module.objects.filter(course=OuterRef('pk')).order_by().values('course')
+            Course.objects.filter(pk__in=courses).update(
+                duration=Coalesce(Subquery(modules.annotate(total=Sum('duration')).values('total')), Value(ZERO_DURATION)),
+                lesson_count=Coalesce(Subquery(modules.annotate(total=Sum('lesson_count')).values('total')), 0),
+                video_count=Coalesce(Subquery(modules.annotate(total=Sum('video_count')).values('total')), 0),
+            )
+        return corrected
+
+
+class Course(RollupMixin, models.Model):
 
     LEVEL_CHOICES = (
         ('beginner', 'Beginner'),
@@ -85,9 +264,7 @@ class Course(models.Model):
         max_length=300,
         db_index=True
         )
-    description = models.TextField(
-        db_index=True
-        )
+    description = models.TextField()
 
     price = models.DecimalField(
         max_digits=10, decimal_places=2, 
@@ -119,7 +296,10 @@ class Course(models.Model):
         db_index=True
         )
 
-    duration = models.DurationField(help_text="Total length of course (HH:MM:SS)", null=True, blank=True)
+    # Totals of the lessons, maintained from the videos (see RollupMixin)
+    duration = models.DurationField(help_text="Total length of course (HH:MM:SS)", null=True, blank=True, editable=False)
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    video_count = models.PositiveIntegerField(default=0, editable=False)
 
     is_featured = models.BooleanField(
         _("Whether the course is featured."), 
@@ -127,15 +307,20 @@ class Course(models.Model):
         db_index=True
         )
     
-    tags = models.TextField(
-        _("Comma-separated list of tags for the course."),
-        max_length=500,
+    tags = models.ManyToManyField(
+        'courses.Tag',
+        through='courses.CourseTag',
+        related_name='courses',
         blank=True,
-        null=True,
-        db_index=True,
-        help_text=_("Use commas to separate tags. Example: python, django, web development")
         )
 
+    # Weighted full-text vector of the searchable fields, maintained on save (see courses.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = CourseQuerySet.as_manager()
+
+    ROLLUP_FIELDS = ('duration', 'lesson_count', 'video_count')
+
     class Meta:
         verbose_name = _("Course")
         verbose_name_plural = _("Courses")
@@ -153,11 +338,44 @@ class Course(models.Model):
             models.Index(fields=['language'], name='idx_course_language'),
             models.Index(fields=['is_published'], name='idx_course_is_published'),
             models.Index(fields=['published_at'], name='idx_course_published_at'),
+            GinIndex(fields=['search_vector'], name='idx_course_search_vector'),
         ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_published = instance.__dict__.get('is_published')
+        return instance
+
+    def save(self, *args, **kwargs):
+        was_published = getattr(self, '_loaded_is_published', False)
+        adding = self._state.adding
+        # Left deferred, the flag is not written: no need to load it
+        deferred = 'is_published' in self.get_deferred_fields()
+        with transaction.atomic():
+            if was_published is None and not (adding or deferred):
+                # Set on a row loaded without it: read the value it replaces
+                was_published = Course.objects.filter(pk=self.pk).values_list('is_published', flat=True).get()
+            super().save(*args, **kwargs)
+            if not (adding or deferred) and self.is_published != was_published:
+                # Tags added later count themselves (see courses.signals)
+                Tag.objects.adjust_course_counts(self.tag_links.all(), 1 if self.is_published else -1)
+        if not deferred:
+            self._loaded_is_published = self.is_published
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'language', *search.COLUMN_FIELDS}.intersection(update_fields):
+            self.update_search_vector()
+
+    def update_search_vector(self):
+        """
+        Rebuilds the search vector from the saved fields (computed by the
+        database, in the configuration of the course language).
+        """
+        Course.objects.filter(pk=self.pk).update_search_vector()
+
     @property
     def is_paid(self):
         return self.price > 0
@@ -176,7 +394,21 @@ class Course(models.Model):
     
     @property
     def get_tags(self):
-        return self.tags.split(',') if self.tags else []
+        return [tag.name for tag in self.tags.all()]
+
+    def set_tags(self, names):
+        """
+        Replaces the course tags with ``names`` (a list or a comma-separated
+        string), creating missing tags in the course language.
+        """
+        self.tags.set(Tag.objects.for_names(names, self.language))
+
+    def recompute_rollups(self):
+        """
+        Rebuilds the totals of the course, its modules and lessons (see
+        ``CourseQuerySet.recompute_rollups``).
+        """
+        Course.objects.filter(pk=self.pk).recompute_rollups()
     
     # def publish(self):
     #     if self.published_at <= now():
@@ -189,7 +421,148 @@ class Course(models.Model):
 
 
 
-class Module(models.Model):
+def parse_tag_names(names) -> list:
+    """
+    Tag names from a list or a comma-separated string: whitespace collapsed,
+    empty names dropped and duplicates (same slug) removed, order kept.
+    """
+    if isinstance(names, str):
+        names = names.split(',')
+    unique = {}
+    for name in names:
+        name = ' '.join(str(name).split())[:Tag._meta.get_field('name').max_length]
+        slug = slugify(name, allow_unicode=True)
+        if slug and slug not in unique:
+            unique[slug] = name
+    return list(unique.values())
+
+
+class TagQuerySet(models.QuerySet):
+
+    def for_names(self, names, language: str) -> list:
+        """
+        The tags named ``names`` in ``language``, created in bulk when missing.
+
+        Args:
+            names: List or comma-separated string of tag names
+            language: Course.LANGUAGE_CHOICES code
+        """
+        names = {slugify(name, allow_unicode=True): name for name in parse_tag_names(names)}
+        if not names:
+            return []
+        self.bulk_create(
+            [Tag(name=name, slug=slug, language=language) for slug, name in names.items()],
+            ignore_conflicts=True,
+        )
+        tags = {tag.slug: tag for tag in self.filter(language=language, slug__in=names)}
+        return [tags[slug] for slug in names if slug in tags]
+
+    def adjust_course_counts(self, links, delta: int) -> None:
+        """
+        Adds ``delta`` to the published course count of the tags of
+        ``links`` (CourseTag rows), once per link: one UPDATE per distinct
+        multiplicity, not per tag.
+        """
+        per_count = {}
+        for row in links.order_by().values('tag').annotate(links=Count('pk')):
+            per_count.setdefault(row['links'], []).append(row['tag'])
+        for links_count, tag_ids in per_count.items():
+            self.filter(pk__in=tag_ids).update(course_count=F('course_count') + delta * links_count)
+
+    def recount(self) -> int:
+        """
+        Recomputes every published course count from scratch (repairs counts
+        after raw SQL or ``QuerySet.update`` on ``is_published``).
+
+        Returns:
+            int: Number of updated tags
+        """
+        published = (
+            CourseTag.objects.filter(tag=OuterRef('pk'), course__is_published=True)
+            .order_by().values('tag').annotate(total=Count('pk')).values('total')
+        )
+        return self.update(course_count=Coalesce(Subquery(published, output_field=models.PositiveIntegerField()), 0))
+
+    def popular(self, language: str = None):
+        """Tags used by at least one published course, most used first."""
+        queryset = self.filter(course_count__gt=0)
+        if language:
+            queryset = queryset.filter(language=language)
+        return queryset.order_by('-course_count', 'slug')
+
+
+class Tag(models.Model):
+    """
+    A normalized course tag. Tags are per language: "cuisine" in French and
+    in English are two rows, so facets never mix catalogs.
+
+    ``course_count`` is the number of published courses carrying the tag,
+    maintained incrementally when courses are tagged, untagged, published,
+    unpublished or deleted (``TagQuerySet.recount`` rebuilds it).
+    """
+    name = models.CharField(_("Name"), max_length=100)
+    slug = models.SlugField(_("Slug"), max_length=100, allow_unicode=True)
+    language = models.CharField(
+        _("Language"),
+        max_length=10,
+        choices=Course.LANGUAGE_CHOICES,
+        default='en'
+        )
+    course_count = models.PositiveIntegerField(
+        _("Published courses"),
+        default=0,
+        editable=False
+        )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TagQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Tag")
+        verbose_name_plural = _("Tags")
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['language', 'slug'], name='unique_tag_language_slug'),
+        ]
+        indexes = [
+            models.Index(fields=['language', '-course_count'], name='idx_tag_language_count'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.name = ' '.join(self.name.split())
+        if not self.slug:
+            self.slug = slugify(self.name, allow_unicode=True)
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        if not created:
+            # The name is part of the search vector of its courses
+            self.courses.all().update_search_vector()
+
+
+class CourseTag(models.Model):
+    course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey('courses.Tag', on_delete=models.CASCADE, related_name='course_links')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Course tag")
+        verbose_name_plural = _("Course tags")
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'tag'], name='unique_course_tag'),
+        ]
+        indexes = [
+            # "courses tagged X": the unique constraint covers the other direction
+            models.Index(fields=['tag', 'course'], name='idx_coursetag_tag_course'),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id} - {self.tag_id}"
+
+
+class Module(RankedMixin, RollupMixin, models.Model):
     slug = AutoSlugField(
         populate_from=ModuleSlug.get_slug,
         unique=True,
@@ -198,7 +571,8 @@ class Module(models.Model):
     course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='modules')
     title = models.CharField(max_length=255, db_index=True)
     description = models.TextField(blank=True, null=True)
-    order = models.PositiveIntegerField(default=0)
+    # Fractional key: a move rewrites the moved module only (see utils.rank_fields)
+    order = RankField(scope=('course', ))
     is_published = models.BooleanField(
         default=False, 
         db_index=True
@@ -209,6 +583,15 @@ class Module(models.Model):
         )
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Totals of the lessons, maintained from the videos (see RollupMixin)
+    duration = models.DurationField(default=ZERO_DURATION, editable=False)
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    video_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CurriculumQuerySet.as_manager()
+
+    ROLLUP_FIELDS = ('duration', 'lesson_count', 'video_count')
+
     class Meta:
         verbose_name = _("Course Module")
         verbose_name_plural = _("Course Modules")
@@ -222,8 +605,26 @@ class Module(models.Model):
         ]
         ordering = ['order']
 
+    # Relations __str__ reads, joined by admin querysets listing modules
+    str_select_related = ('course',)
+
     def __str__(self):
         return f"{self.course.title} - {self.title}"    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_course_id = instance.__dict__.get('course_id')
+        return instance
+
+    @staticmethod
+    def shift_rollups(module_id, duration: timedelta = ZERO_DURATION, lessons: int = 0, videos: int = 0):
+        """
+        Applies a change of the lessons of a module to the totals of the
+        module and its course: one UPDATE per level.
+        """
+        Module.objects.filter(pk=module_id).shift_rollups(duration, lessons, videos)
+        Course.objects.filter(modules=module_id).shift_rollups(duration, lessons, videos)
     
     @property
     def get_thumbnails(self):
@@ -238,7 +639,7 @@ class Module(models.Model):
         self.get_document.all()
     
 
-class Lesson(models.Model):
+class Lesson(RankedMixin, RollupMixin, models.Model):
     slug = AutoSlugField(
         populate_from=LessonSlug.get_slug,
         unique=True,
@@ -248,8 +649,11 @@ class Lesson(models.Model):
     title = models.CharField(max_length=255, db_index=True)
     description = models.TextField(blank=True, null=True)
     
-    duration = models.DurationField(null=True, blank=True)
-    order = models.PositiveIntegerField(default=0, db_index=True)
+    # Totals of the videos (see RollupMixin)
+    duration = models.DurationField(null=True, blank=True, editable=False)
+    video_count = models.PositiveIntegerField(default=0, editable=False)
+    # Fractional key: a move rewrites the moved lesson only (see utils.rank_fields)
+    order = RankField(scope=('module', ), db_index=True)
 
     is_preview = models.BooleanField(default=False, db_index=True)
     is_published = models.BooleanField(default=False, db_index=True)
@@ -257,6 +661,10 @@ class Lesson(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CurriculumQuerySet.as_manager()
+
+    ROLLUP_FIELDS = ('duration', 'video_count')
+
     class Meta:
         verbose_name = _("Course Module Lesson")
         verbose_name_plural = _("Course Module Lessons")
@@ -271,8 +679,17 @@ class Lesson(models.Model):
             models.Index(fields=['is_preview', 'is_published']),
         ]
 
+    # Relations __str__ reads, joined by admin querysets listing lessons
+    str_select_related = ('module',)
+
     def __str__(self):
         return f"{self.module.title} - {self.title}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_module_id = instance.__dict__.get('module_id')
+        return instance
     
     @property
     def get_images(self):
@@ -285,6 +702,16 @@ class Lesson(models.Model):
     @property
     def get_videos(self):
         return self.videos.all()
+    
+    @staticmethod
+    def shift_rollups(lesson_id, duration: timedelta = ZERO_DURATION, videos: int = 0):
+        """
+        Applies a change of the videos of a lesson to the totals of the
+        lesson, its module and its course: one UPDATE per level.
+        """
+        Lesson.objects.filter(pk=lesson_id).shift_rollups(duration, videos=videos)
+        Module.objects.filter(lessons=lesson_id).shift_rollups(duration, videos=videos)
+        Course.objects.filter(modules__lessons=lesson_id).shift_rollups(duration, videos=videos)
 
 
 
@@ -0,0 +1,143 @@
+"""
+Full-text search of the course catalog.
+
+Every course keeps a ``search_vector`` (tsvector) built with the text search
+configuration of its language and weighted by field:
+
+    A  title
+    B  short description, tags
+    C  description
+
+Tags live in their own table (``Tag`` through ``CourseTag``); their names are
+aggregated into the vector by a subquery. The column has a GIN index, so a match is an index lookup, and results are
+ranked with ``ts_rank`` and highlighted with ``ts_headline``. Full-text
+search is PostgreSQL only; on other databases (tests, local SQLite) the
+catalog falls back to ``icontains`` matching without ranking.
+"""
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Case, Exists, F, OuterRef, Q, Subquery, TextField, Value, When
+from django.utils.html import escape
+
+# PostgreSQL text search configuration per Course.LANGUAGE_CHOICES code.
+# There is no Kinyarwanda stemmer: 'simple' only lowercases.
+SEARCH_CONFIGS = {
+    'en': 'english',
+    'es': 'spanish',
+    'fr': 'french',
+    'rw': 'simple',
+}
+DEFAULT_CONFIG = 'simple'
+
+# Fields indexed in the vector, with their weight
+SEARCH_FIELDS = (
+    ('title', 'A'),
+    ('short_description', 'B'),
+    ('tags', 'B'),
+    ('description', 'C'),
+)
+INDEXED_FIELDS = tuple(field for field, weight in SEARCH_FIELDS)
+# Columns of the course row among them
+COLUMN_FIELDS = tuple(field for field in INDEXED_FIELDS if field != 'tags')
+
+
+def get_search_configs() -> dict:
+    """SEARCH_CONFIGS, extended or overridden by the COURSE_SEARCH_CONFIGS setting."""
+    return {**SEARCH_CONFIGS, **getattr(settings, 'COURSE_SEARCH_CONFIGS', {})}
+
+
+def get_search_config(language: str) -> str:
+    return get_search_configs().get(language, DEFAULT_CONFIG)
+
+
+def supports_full_text(using: str = 'default') -> bool:
+    return connections[using].vendor == 'postgresql'
+
+
+def language_config():
+    """The configuration of each row's own language, as an SQL expression."""
+    return Case(
+        *[When(language=code, then=Value(config)) for code, config in get_search_configs().items()],
+        default=Value(DEFAULT_CONFIG),
+    )
+
+
+def tag_names():
+    """Space separated names of a course's tags, as a subquery on the course row."""
+    from .models import CourseTag
+
+    names = (
+        CourseTag.objects.filter(course=OuterRef('pk')).order_by().values('course')
+        .annotate(names=StringAgg('tag__name', delimiter=' ')).values('names')
+    )
+    return Subquery(names, output_field=TextField())
+
+
+def course_search_vector():
+    """
+    Expression of a course's weighted search vector, evaluated by the
+    database (``UPDATE ... SET search_vector = <expression>``).
+    """
+    config = language_config()
+    vector = None
+    for field, weight in SEARCH_FIELDS:
+        part = SearchVector(tag_names() if field == 'tags' else field, config=config, weight=weight)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def build_search_query(text: str, language: str = None) -> SearchQuery:
+    """
+    Parses user input with ``websearch_to_tsquery`` (quoted phrases, ``or``,
+    ``-exclusions``).
+
+    With a language, the input is stemmed with that language's
+    configuration. Without one, it is parsed with every configuration and
+    the results are OR-ed, so a query matches courses in any language and
+    stays a constant the GIN index can be used for.
+    """
+    configs = [get_search_config(language)] if language else list(dict.fromkeys(get_search_configs().values()))
+    query = None
+    for config in configs:
+        part = SearchQuery(text, config=config, search_type='websearch')
+        query = part if query is None else query | part
+    return query
+
+
+def search_rank(query: SearchQuery):
+    # Normalization 32 (rank / (rank + 1)) keeps ranks in [0, 1)
+    return SearchRank(F('search_vector'), query, normalization=32)
+
+
+def search_headline(field: str, query: SearchQuery, **options):
+    """Highlighted fragments of ``field``, the matches wrapped in <mark>."""
+    max_words = getattr(settings, 'COURSE_SEARCH_HEADLINE_WORDS', 35)
+    options = {
+        'start_sel': '<mark>',
+        'stop_sel': '</mark>',
+        'max_words': max_words,
+        'min_words': max(max_words // 3, 1),
+        'max_fragments': 2,
+        **options,
+    }
+    return SearchHeadline(field, query, config=language_config(), **options)
+
+
+def highlight_html(fragment: str) -> str:
+    """Escapes a headline for HTML, keeping only the <mark> tags added by ``search_headline``."""
+    return escape(fragment).replace('&lt;mark&gt;', '<mark>').replace('&lt;/mark&gt;', '</mark>')
+
+
+def fallback_filter(text: str) -> Q:
+    """Every word of ``text`` in one of the searched fields (non-PostgreSQL databases)."""
+    from .models import CourseTag
+
+    condition = Q()
+    for word in text.split():
+        word_condition = Q(Exists(CourseTag.objects.filter(course=OuterRef('pk'), tag__name__icontains=word)))
+        for field in COLUMN_FIELDS:
+            word_condition |= Q(**{f'{field}__icontains': word})
+        condition &= word_condition
+    return condition
@@ -0,0 +1,165 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from sys_media.courses import ModuleVideoLesson
+from .models import ZERO_DURATION, Course, CourseTag, Lesson, Module, Tag
+
+
+def get_links(instance, reverse: bool, pk_set):
+    """The CourseTag rows an m2m_changed signal is about."""
+    if reverse:
+        links = CourseTag.objects.filter(tag=instance)
+        return links.filter(course__in=pk_set) if pk_set else links
+    links = CourseTag.objects.filter(course=instance)
+    return links.filter(tag__in=pk_set) if pk_set else links
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def update_course_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keeps the published course counts and the search vectors in step with
+    ``course.tags`` and ``tag.courses`` changes.
+    """
+    if action in ('post_add', 'pre_remove', 'pre_clear'):
+        # Links are counted while they exist: after an add, before a removal
+        links = get_links(instance, reverse, pk_set)
+        Tag.objects.adjust_course_counts(links.filter(course__is_published=True), 1 if action == 'post_add' else -1)
+        if reverse and action == 'pre_clear':
+            instance._cleared_courses = list(links.values_list('course', flat=True))
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            courses = [instance.pk]
+        elif action == 'post_clear':
+            courses = instance.__dict__.pop('_cleared_courses', [])
+        else:
+            courses = pk_set
+        Course.objects.filter(pk__in=courses).update_search_vector()
+
+
+@receiver(pre_delete, sender=Course)
+def release_tag_counts(sender, instance, **kwargs):
+    # The through rows go with the cascade, which sends no m2m_changed
+    if instance.is_published:
+        Tag.objects.adjust_course_counts(CourseTag.objects.filter(course=instance), -1)
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_courses(sender, instance, **kwargs):
+    instance._deleted_courses = list(instance.course_links.values_list('course', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def update_tag_courses(sender, instance, **kwargs):
+    Course.objects.filter(pk__in=instance.__dict__.pop('_deleted_courses', [])).update_search_vector()
+
+
+# Duration and count rollups: each change is applied as a delta to the
+# lesson, module and course totals, one UPDATE per level
+
+def is_saved(update_fields, *names) -> bool:
+    return update_fields is None or not update_fields.isdisjoint(names)
+
+
+def is_cascaded(sender, origin) -> bool:
+    """Whether a row goes with the deletion of another model's row, which gives back the totals of its content itself."""
+    if origin is None:
+        return False
+    return (origin.model if isinstance(origin, QuerySet) else type(origin)) is not sender
+
+
+@receiver(pre_save, sender=ModuleVideoLesson)
+def snapshot_video(sender, instance, raw, **kwargs):
+    # Built by hand with a pk there is no load time snapshot: read what the
+    # totals hold before the row is written over, not after
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    missing = [name for name in ('lesson_id', 'duration') if name not in loaded]
+    if raw or instance.pk is None or not missing:
+        return
+    row = sender._base_manager.filter(pk=instance.pk).values(*missing).first()
+    if row is not None:
+        instance._loaded_values = {**loaded, **row}
+
+
+@receiver(post_save, sender=ModuleVideoLesson)
+def roll_up_video(sender, instance, created, update_fields, raw, **kwargs):
+    if raw:
+        return
+    seconds = instance.duration or 0
+    with transaction.atomic():
+        if created:
+            Lesson.shift_rollups(instance.lesson_id, timedelta(seconds=seconds), 1)
+        else:
+            previous_lesson = instance.get_original_value('lesson_id')
+            previous = instance.get_original_value('duration') or 0
+            lesson_id = instance.lesson_id if is_saved(update_fields, 'lesson', 'lesson_id') else previous_lesson
+            if not is_saved(update_fields, 'duration'):
+                seconds = previous
+            if lesson_id != previous_lesson:
+                Lesson.shift_rollups(previous_lesson, -timedelta(seconds=previous), -1)
+                Lesson.shift_rollups(lesson_id, timedelta(seconds=seconds), 1)
+            elif seconds != previous:
+                Lesson.shift_rollups(lesson_id, timedelta(seconds=seconds - previous))
+    if is_saved(update_fields, 'duration'):
+        instance.remember_value('duration')
+    if is_saved(update_fields, 'lesson', 'lesson_id'):
+        instance.remember_value('lesson_id')
+
+
+@receiver(pre_delete, sender=ModuleVideoLesson)
+def release_video(sender, instance, origin=None, **kwargs):
+    if not is_cascaded(sender, origin):
+        seconds = instance.get_original_value('duration') or 0
+        Lesson.shift_rollups(instance.get_original_value('lesson_id'), -timedelta(seconds=seconds), -1)
+
+
+@receiver(post_save, sender=Lesson)
+def roll_up_lesson(sender, instance, created, update_fields, raw, **kwargs):
+    if raw or not is_saved(update_fields, 'module', 'module_id'):
+        return
+    if created:
+        Module.shift_rollups(instance.module_id, instance.duration or ZERO_DURATION, 1, instance.video_count)
+    else:
+        # Without a load time snapshot (built by hand) a move is left to recompute_rollups
+        previous = getattr(instance, '_loaded_module_id', instance.module_id)
+        if previous != instance.module_id:
+            duration, videos = Lesson.objects.filter(pk=instance.pk).values_list('duration', 'video_count').get()
+            duration = duration or ZERO_DURATION
+            with transaction.atomic():
+                Module.shift_rollups(previous, -duration, -1, -videos)
+                Module.shift_rollups(instance.module_id, duration, 1, videos)
+    instance._loaded_module_id = instance.module_id
+
+
+@receiver(pre_delete, sender=Lesson)
+def release_lesson(sender, instance, origin=None, **kwargs):
+    if not is_cascaded(sender, origin):
+        duration, videos = Lesson.objects.filter(pk=instance.pk).values_list('duration', 'video_count').get()
+        Module.shift_rollups(instance.module_id, -(duration or ZERO_DURATION), -1, -videos)
+
+
+@receiver(post_save, sender=Module)
+def roll_up_module(sender, instance, created, update_fields, raw, **kwargs):
+    # A new module is empty: only a move to another course changes totals
+    if raw or not is_saved(update_fields, 'course', 'course_id'):
+        return
+    previous = getattr(instance, '_loaded_course_id', instance.course_id)
+    if not created and previous != instance.course_id:
+        duration, lessons, videos = (Module.objects.filter(pk=instance.pk)
+                                     .values_list('duration', 'lesson_count', 'video_count').get())
+        with transaction.atomic():
+            Course.objects.filter(pk=previous).shift_rollups(-duration, -lessons, -videos)
+            Course.objects.filter(pk=instance.course_id).shift_rollups(duration, lessons, videos)
+    instance._loaded_course_id = instance.course_id
+
+
+@receiver(pre_delete, sender=Module)
+def release_module(sender, instance, origin=None, **kwargs):
+    if not is_cascaded(sender, origin):
+        duration, lessons, videos = (Module.objects.filter(pk=instance.pk)
+                                     .values_list('duration', 'lesson_count', 'video_count').get())
+        Course.objects.filter(pk=instance.course_id).shift_rollups(-duration, -lessons, -videos)
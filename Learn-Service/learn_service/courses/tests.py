@@ -1,3 +1,488 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+from PIL import Image
+from django.contrib.admin import site as admin_site
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper
+from django.db.models.sql.subqueries import UpdateQuery
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+from courses import search
+from courses.models import Category, Course, Lesson, Module, Tag, parse_tag_names
+from sys_media.courses import CourseThumbnail, ModuleDocumentLesson, ModuleVideoLesson
+from sys_media.models import StoredBlob
+from utils.sys_mixins.admin import EstimatedCountPaginator, estimate_count
+from utils.tests.duration import mp4_bytes
 
-# Create your tests here.
+
+def postgres_sql(queryset) -> str:
+    """SQL of a queryset as the PostgreSQL backend would run it (no server needed)."""
+    wrapper = DatabaseWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'})
+    sql, params = queryset.query.get_compiler(connection=wrapper).as_sql()
+    return sql % tuple(repr(param) for param in params)
+
+
+class CourseSearchTests(TestCase):
+    """
+    Test suite for the course catalog full-text search.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user(email="teacher@example.com", password="secret",
+                                              first_name="Grace", last_name="Hopper")
+        category = Category.objects.create(name="Programming")
+        cls.django = Course.objects.create(
+            title="Django for <beginners>", category=category, instructor=instructor, is_published=True,
+            short_description="Build web apps", description="Models, views and templates",
+        )
+        cls.django.set_tags("python, web")
+        cls.french = Course.objects.create(
+            title="Cuisine française", category=category, instructor=instructor, is_published=True,
+            short_description="Recettes", description="Pain et fromage", language='fr',
+        )
+        Course.objects.create(
+            title="Django internals", category=category, instructor=instructor,
+            short_description="Draft", description="Unpublished",
+        )
+
+    def test_configurations_follow_course_languages(self):
+        self.assertEqual({code for code, label in Course.LANGUAGE_CHOICES}, set(search.SEARCH_CONFIGS))
+        self.assertEqual(search.get_search_config('rw'), 'simple')
+        self.assertEqual(search.get_search_config('xx'), 'simple')
+
+    def test_postgres_query_uses_the_indexed_vector(self):
+        with patch.object(search, 'supports_full_text', return_value=True):
+            sql = postgres_sql(Course.objects.search('web apps', highlight=False))
+            french_sql = postgres_sql(Course.objects.search('pain', language='fr', highlight=False))
+        self.assertIn('"courses_course"."search_vector" @@ ', sql)
+        self.assertIn("websearch_to_tsquery('english'::regconfig, 'web apps')", sql)
+        self.assertIn("websearch_to_tsquery('simple'::regconfig, 'web apps')", sql)
+        self.assertIn('ts_rank(', sql)
+        self.assertNotIn("'english'::regconfig", french_sql)
+        self.assertIn("websearch_to_tsquery('french'::regconfig, 'pain')", french_sql)
+
+    def test_postgres_vector_is_weighted_per_language(self):
+        query = Course.objects.filter(pk=self.django.pk).query.chain(UpdateQuery)
+        query.add_update_values({'search_vector': search.course_search_vector()})
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'})
+        sql, params = query.get_compiler(connection=wrapper).as_sql()
+        self.assertEqual(sql.count('setweight(to_tsvector('), 4)
+        for config in ('english', 'spanish', 'french', 'simple'):
+            self.assertIn(config, params)
+        self.assertIn('END::regconfig', sql)
+
+    def test_fallback_search_without_postgres(self):
+        results = list(Course.objects.filter(is_published=True).search('django web'))
+        self.assertEqual(results, [self.django])
+        self.assertEqual(list(Course.objects.search('pain', language='en')), [])
+
+    def test_search_api(self):
+        response = self.client.get(reverse('courses:course-search'), {'q': 'django'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([result['slug'] for result in data['results']], [self.django.slug])
+        self.assertEqual(data['results'][0]['title_highlight'], 'Django for &lt;beginners&gt;')
+        self.assertFalse(data['has_next'])
+
+        self.assertEqual(self.client.get(reverse('courses:course-search')).status_code, 400)
+        response = self.client.get(reverse('courses:course-search'), {'q': 'django', 'language': 'xx'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_highlight_keeps_only_marks(self):
+        self.assertEqual(search.highlight_html('<b>x</b> <mark>django</mark>'),
+                         '&lt;b&gt;x&lt;/b&gt; <mark>django</mark>')
+
+
+class TagTests(TestCase):
+    """
+    Test suite for normalized tags and their published course counts.
+    """
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(email="teacher@example.com", password="secret",
+                                                   first_name="Ada", last_name="Lovelace")
+        self.category = Category.objects.create(name="Programming")
+
+    def create_course(self, title, **fields):
+        return Course.objects.create(title=title, category=self.category, instructor=self.instructor,
+                                     short_description="short", description="long", **fields)
+
+    def counts(self):
+        return dict(Tag.objects.values_list('slug', 'course_count'))
+
+    def test_names_are_normalized(self):
+        self.assertEqual(parse_tag_names(" Python, web   development,python,, "), ['Python', 'web development'])
+        course = self.create_course("Django")
+        course.set_tags(["Django", "REST APIs"])
+        french = self.create_course("Django en français", language='fr')
+        french.set_tags("django")
+        self.assertEqual(sorted(Tag.objects.values_list('language', 'slug')),
+                         [('en', 'django'), ('en', 'rest-apis'), ('fr', 'django')])
+
+    def test_counts_follow_tagging_and_publication(self):
+        course = self.create_course("Django", is_published=True)
+        draft = self.create_course("Flask")
+        course.set_tags("python, django")
+        draft.set_tags("python")
+        self.assertEqual(self.counts(), {'python': 1, 'django': 1})
+
+        draft.is_published = True
+        draft.save()
+        self.assertEqual(self.counts(), {'python': 2, 'django': 1})
+
+        course.set_tags("python")
+        self.assertEqual(self.counts(), {'python': 2, 'django': 0})
+
+        Course.objects.filter(pk=draft.pk).set_published(False)
+        self.assertEqual(self.counts()['python'], 1)
+
+        course.delete()
+        self.assertEqual(self.counts()['python'], 0)
+
+    def test_reverse_side_and_recount(self):
+        tag = Tag.objects.create(name="Testing")
+        courses = [self.create_course(f"Course {index}", is_published=True) for index in range(3)]
+        tag.courses.add(*courses)
+        tag.refresh_from_db()
+        self.assertEqual(tag.course_count, 3)
+        tag.courses.clear()
+        tag.refresh_from_db()
+        self.assertEqual(tag.course_count, 0)
+
+        tag.courses.add(courses[0])
+        Tag.objects.update(course_count=42)
+        Tag.objects.recount()
+        tag.refresh_from_db()
+        self.assertEqual(tag.course_count, 1)
+
+    def test_filter_and_facets(self):
+        first = self.create_course("Django", is_published=True)
+        second = self.create_course("Flask", is_published=True)
+        first.set_tags("python, web")
+        second.set_tags("python")
+        self.assertEqual(list(Course.objects.tagged('web')), [first])
+        self.assertEqual(set(Course.objects.tagged('python')), {first, second})
+        facets = Course.objects.filter(is_published=True).tag_facets()
+        self.assertEqual([(facet['slug'], facet['count']) for facet in facets], [('python', 2), ('web', 1)])
+
+        response = self.client.get(reverse('courses:tag-list'), {'language': 'en'})
+        self.assertEqual([tag['slug'] for tag in response.json()['results']], ['python', 'web'])
+
+
+class AdminChangelistTests(TestCase):
+    """
+    Test suite for the admin changelist performance layer.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@example.com", password="secret",
+                                                   first_name="Root", last_name="Admin")
+        self.client.force_login(self.admin)
+        self.category = Category.objects.create(name="Programming")
+        self.course = Course.objects.create(title="Django", category=self.category, instructor=self.admin,
+                                            short_description="short", description="long")
+
+    def add_lessons(self, count):
+        for index in range(count):
+            module = Module.objects.create(course=self.course, title=f"Module {index}")
+            Lesson.objects.create(module=module, title=f"Lesson {index}")
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:courses_lesson_changelist')
+        self.add_lessons(2)
+        few = self.changelist_queries(url)
+        self.add_lessons(8)
+        self.assertEqual(self.changelist_queries(url), few)
+
+    def test_autocomplete_filter_loads_only_the_selection(self):
+        self.add_lessons(3)
+        module = Module.objects.first()
+        response = self.client.get(reverse('admin:courses_lesson_changelist'), {'module__id__exact': module.pk})
+        content = response.content.decode()
+        self.assertIn('data-ajax--url="/admin/autocomplete/"', content)
+        self.assertIn(f'<option value="{module.pk}" selected>', content)
+        self.assertEqual(content.count('Module 1 - ') + content.count('Module 2 - '), 0)
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+
+    def test_category_course_count_is_annotated(self):
+        Category.objects.create(name="Empty")
+        response = self.client.get(reverse('admin:courses_category_changelist'), {'o': '-5'})
+        counts = [(category.name, category.course_count) for category in response.context['cl'].result_list]
+        self.assertEqual(counts, [("Programming", 1), ("Empty", 0)])
+
+    def test_derived_select_related(self):
+        request = RequestFactory().get('/')
+        request.user = self.admin
+        lesson_admin = admin_site._registry[Lesson]
+        self.assertEqual(lesson_admin.get_list_select_related(request), ('module', 'module__course'))
+        thumbnail_admin = admin_site._registry[CourseThumbnail]
+        self.assertEqual(thumbnail_admin.get_list_select_related(request), ('course',))
+
+    def test_counts_are_exact_without_postgres(self):
+        self.assertIsNone(estimate_count(Course.objects.all()))
+        self.assertEqual(EstimatedCountPaginator(Course.objects.all(), 10).count, 1)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MEDIA_PROCESSING_BROKER=None,
+                   MEDIA_METADATA_CACHE_PATH=os.path.join(tempfile.mkdtemp(), 'metadata.sqlite3'))
+class ImportCoursesTests(TestCase):
+    """
+    Test suite for the manifest based bulk import.
+    """
+
+    def setUp(self):
+        User.objects.create_user(email="teacher@example.com", password="secret",
+                                 first_name="Grace", last_name="Hopper")
+        self.root = tempfile.mkdtemp()
+        Image.new('RGB', (64, 48)).save(os.path.join(self.root, 'cover.png'))
+        with open(os.path.join(self.root, 'notes.txt'), 'wb') as notes:
+            notes.write(b"Lesson notes\n")
+        with open(os.path.join(self.root, 'setup.mp4'), 'wb') as video:
+            video.write(mp4_bytes(1000, 90000))
+        self.manifest = {
+            'categories': [{'name': "Programming"}],
+            'courses': [{
+                'title': "Django", 'instructor': "teacher@example.com", 'category': "Programming",
+                'short_description': "Web apps", 'description': "Models and views", 'is_published': True,
+                'tags': ["python", "web"], 'thumbnails': ["cover.png"],
+                'modules': [{
+                    'title': "Basics",
+                    'thumbnails': [{'file': "cover.png", 'title': "Basics cover"}],
+                    'lessons': [
+                        {'title': "Setup", 'videos': ["setup.mp4"], 'documents': ["notes.txt"]},
+                        {'title': "Setup", 'documents': ["notes.txt"]},
+                    ],
+                }],
+            }],
+        }
+
+    def run_import(self, manifest=None) -> str:
+        path = os.path.join(self.root, 'manifest.json')
+        with open(path, 'w') as manifest_file:
+            json.dump(manifest or self.manifest, manifest_file)
+        output = io.StringIO()
+        call_command('import_courses', path, workers=1, stdout=output)
+        return output.getvalue()
+
+    def test_import_creates_the_curriculum(self):
+        output = self.run_import()
+        self.assertIn("1 categories, 1 courses, 1 modules, 2 lessons, 3 files, 5 media", output)
+
+        course = Course.objects.get(title="Django")
+        self.assertEqual(course.category.name, "Programming")
+        self.assertEqual(sorted(course.get_tags), ["python", "web"])
+        self.assertEqual(Tag.objects.get(slug='python').course_count, 1)
+        lessons = list(Lesson.objects.filter(module__course=course).order_by('order'))
+        self.assertEqual([lesson.slug for lesson in lessons], ['setup', 'setup-2'])
+        self.assertEqual(lessons[0].duration.total_seconds(), 90)
+        self.assertEqual(course.duration.total_seconds(), 90)
+        self.assertEqual((course.lesson_count, course.video_count), (2, 1))
+
+        thumbnail = course.thumbnails.get()
+        self.assertEqual((thumbnail.width, thumbnail.height, thumbnail.processing_status), (64, 48, 'ready'))
+        self.assertEqual(ModuleVideoLesson.objects.get().duration, 90)
+        # The same content is stored once, referenced by every row
+        notes = ModuleDocumentLesson.objects.all()
+        self.assertEqual(len({document.file.name for document in notes}), 1)
+        self.assertEqual(StoredBlob.objects.get(name=notes[0].file.name).ref_count, 2)
+        self.assertEqual(StoredBlob.objects.get(name=thumbnail.file.name).ref_count, 2)
+
+    def test_import_is_resumable(self):
+        self.run_import()
+        self.manifest['courses'][0]['modules'][0]['lessons'].append({'title': "Deploy", 'documents': ["notes.txt"]})
+        output = self.run_import()
+        self.assertIn("Imported 1 lessons, 1 media in", output)
+        self.assertEqual(Lesson.objects.count(), 3)
+        self.assertEqual(StoredBlob.objects.get(name=ModuleDocumentLesson.objects.first().file.name).ref_count, 3)
+        self.assertIn("nothing new", self.run_import())
+
+    def test_invalid_manifest_writes_nothing(self):
+        self.manifest['courses'][0].update(level='expert', instructor="nobody@example.com")
+        self.manifest['courses'].append({'title': "Flask", 'instructor': "teacher@example.com",
+                                         'short_description': "s", 'description': "d",
+                                         'level': 'expert', 'thumbnails': ["../cover.png", "notes.txt"]})
+        with self.assertRaises(CommandError) as raised:
+            self.run_import()
+        message = str(raised.exception)
+        self.assertIn("courses[0]: unknown instructor 'nobody@example.com'", message)
+        self.assertIn("courses[1].level:", message)
+        self.assertIn("courses[1].thumbnails[0]: no file '../cover.png'", message)
+        self.assertIn("courses[1].thumbnails[1]: 'txt' files are not accepted as thumbnails", message)
+        self.assertFalse(Category.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MEDIA_PROCESSING_BROKER=None,
+                   MEDIA_METADATA_CACHE_PATH=os.path.join(tempfile.mkdtemp(), 'metadata.sqlite3'))
+class DurationRollupTests(TestCase):
+    """
+    Test suite for the incrementally maintained duration and count rollups.
+    """
+
+    def setUp(self):
+        instructor = User.objects.create_user(email="teacher@example.com", password="secret",
+                                              first_name="Grace", last_name="Hopper")
+        self.course = Course.objects.create(title="Django", instructor=instructor,
+                                            short_description="short", description="long")
+        self.other_course = Course.objects.create(title="Flask", instructor=instructor,
+                                                  short_description="short", description="long")
+        self.module = Module.objects.create(course=self.course, title="Basics")
+        self.lessons = [Lesson.objects.create(module=self.module, title=f"Lesson {index}") for index in range(2)]
+
+    def add_video(self, lesson, seconds: int) -> ModuleVideoLesson:
+        return ModuleVideoLesson.objects.create(
+            lesson=lesson, title="Video", file=SimpleUploadedFile("video.mp4", mp4_bytes(1000, seconds * 1000)))
+
+    def totals(self, model, pk) -> tuple:
+        fields = ['duration', *(['lesson_count'] if model is not Lesson else []), 'video_count']
+        row = model.objects.values_list(*fields).get(pk=pk)
+        return (int((row[0] or timedelta(0)).total_seconds()), *row[1:])
+
+    def test_video_changes_shift_every_level(self):
+        video = self.add_video(self.lessons[0], 90)
+        self.add_video(self.lessons[1], 30)
+        self.assertEqual(self.totals(Lesson, self.lessons[0].pk), (90, 1))
+        self.assertEqual(self.totals(Module, self.module.pk), (120, 2, 2))
+        self.assertEqual(self.totals(Course, self.course.pk), (120, 2, 2))
+
+        video.duration = 60
+        with CaptureQueriesContext(connection) as queries:
+            video.save(update_fields=['duration'])
+        rollups = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE') and '"duration" = (COALESCE(' in query['sql']]
+        self.assertEqual(len(rollups), 3)
+        self.assertEqual(self.totals(Course, self.course.pk), (90, 2, 2))
+
+        video.lesson = self.lessons[1]
+        video.save()
+        self.assertEqual(self.totals(Lesson, self.lessons[0].pk), (0, 0))
+        self.assertEqual(self.totals(Lesson, self.lessons[1].pk), (90, 2))
+        self.assertEqual(self.totals(Module, self.module.pk), (90, 2, 2))
+
+        video.delete()
+        self.assertEqual(self.totals(Lesson, self.lessons[1].pk), (30, 1))
+        self.assertEqual(self.totals(Course, self.course.pk), (30, 2, 1))
+
+    def test_video_built_by_hand_shifts_totals(self):
+        video = self.add_video(self.lessons[0], 90)
+        # No load time snapshot: the previous lesson and duration are read before the write
+        ModuleVideoLesson(pk=video.pk, lesson=self.lessons[1], file=video.file.name,
+                          duration=60).save(update_fields=['lesson', 'duration'])
+        self.assertEqual(self.totals(Lesson, self.lessons[0].pk), (0, 0))
+        self.assertEqual(self.totals(Lesson, self.lessons[1].pk), (60, 1))
+        self.assertEqual(self.totals(Course, self.course.pk), (60, 2, 1))
+
+    def test_lesson_and_module_membership(self):
+        self.add_video(self.lessons[0], 90)
+        other_module = Module.objects.create(course=self.other_course, title="Basics")
+        Lesson.objects.get(pk=self.lessons[0].pk).move(parent=other_module)
+        self.assertEqual(self.totals(Course, self.course.pk), (0, 1, 0))
+        self.assertEqual(self.totals(Module, other_module.pk), (90, 1, 1))
+        self.assertEqual(self.totals(Course, self.other_course.pk), (90, 1, 1))
+
+        Module.objects.get(pk=other_module.pk).move(before=self.module)
+        self.assertEqual(self.totals(Course, self.course.pk), (90, 2, 1))
+        self.assertEqual(self.totals(Course, self.other_course.pk), (0, 0, 0))
+
+        # Cascaded rows leave the totals to the deleted root
+        self.lessons[1].delete()
+        self.assertEqual(self.totals(Course, self.course.pk), (90, 1, 1))
+        Module.objects.filter(pk=other_module.pk).delete()
+        self.assertEqual(self.totals(Course, self.course.pk), (0, 0, 0))
+        self.assertEqual(self.totals(Module, self.module.pk), (0, 0, 0))
+
+    def test_plain_save_keeps_newer_totals(self):
+        course = Course.objects.get(pk=self.course.pk)
+        self.add_video(self.lessons[0], 90)
+        course.title = "Django 5"
+        course.save()
+        self.assertEqual(self.totals(Course, course.pk), (90, 2, 1))
+
+    def test_save_of_a_deferred_row(self):
+        Course.objects.filter(pk=self.course.pk).update(is_published=True, language='fr')
+        course = Course.objects.only('title', 'instructor').get(pk=self.course.pk)
+        course.title = "Django 5"
+        # One UPDATE of the loaded fields, in the savepoint of Course.save: no SELECT of deferred ones
+        with self.assertNumQueries(3):
+            course.save()
+        self.assertEqual(Course.objects.values_list('title', 'is_published', 'language').get(pk=course.pk),
+                         ("Django 5", True, 'fr'))
+
+    def test_recompute_repairs_drift(self):
+        self.add_video(self.lessons[0], 90)
+        Lesson.objects.update(duration=None, video_count=7)
+        Module.objects.update(lesson_count=0)
+        Course.objects.update(duration=timedelta(hours=5), video_count=0)
+        output = io.StringIO()
+        call_command('recompute_rollups', stdout=output)
+        self.assertIn("Recomputed the rollups of 2 courses", output.getvalue())
+        self.assertIn("(2 lessons corrected)", output.getvalue())
+        self.assertEqual(self.totals(Lesson, self.lessons[0].pk), (90, 1))
+        self.assertEqual(self.totals(Module, self.module.pk), (90, 2, 1))
+        self.assertEqual(self.totals(Course, self.course.pk), (90, 2, 1))
+        self.assertEqual(self.totals(Course, self.other_course.pk), (0, 0, 0))
+        with self.assertRaises(CommandError):
+            call_command('recompute_rollups', 'missing-course', stdout=output)
+
+
+class CurriculumOrderingTests(TestCase):
+    """
+    Test suite for the drag-and-drop ordering of modules and lessons.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@example.com", password="secret",
+                                                   first_name="Root", last_name="Admin")
+        self.client.force_login(self.admin)
+        course = Course.objects.create(title="Django", instructor=self.admin,
+                                       short_description="short", description="long")
+        self.module = Module.objects.create(course=course, title="Basics")
+        self.lessons = [Lesson.objects.create(module=self.module, title=f"Lesson {index}") for index in range(3)]
+
+    def titles(self) -> list:
+        return list(self.module.lessons.values_list('title', flat=True))
+
+    def test_changelist_is_sortable_within_a_parent(self):
+        url = reverse('admin:courses_lesson_changelist')
+        self.assertFalse(self.client.get(url).context['sortable'])
+        response = self.client.get(url, {'module__id__exact': self.module.pk})
+        self.assertTrue(response.context['sortable'])
+        self.assertContains(response, '/admin/courses/lesson/__pk__/move/')
+
+    def test_move_endpoint(self):
+        url = reverse('admin:courses_lesson_move', args=[self.lessons[2].pk])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'before': self.lessons[0].pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['order'], Lesson.objects.get(pk=self.lessons[2].pk).order)
+        self.assertEqual(self.titles(), ["Lesson 2", "Lesson 0", "Lesson 1"])
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE "courses_lesson"')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(self.client.post(url, {'after': 0}).status_code, 400)
+        self.assertEqual(self.client.post(url).status_code, 400)
+
+    def test_rebalance_command(self):
+        for _ in range(10):
+            self.lessons[2].move(after=self.lessons[0])
+            self.lessons[1].move(after=self.lessons[0])
+        output = io.StringIO()
+        call_command('rebalance_ranks', length=3, stdout=output)
+        self.assertIn("Respaced 3 Course Module Lessons of 1 parents", output.getvalue())
+        self.assertEqual(self.titles(), ["Lesson 0", "Lesson 1", "Lesson 2"])
+        self.assertEqual(max(len(order) for order in self.module.lessons.values_list('order', flat=True)), 1)
@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import CourseSearchView, TagListView
+
+app_name = 'courses'
+
+urlpatterns = [
+    path('search/', CourseSearchView.as_view(), name='course-search'),
+    path('tags/', TagListView.as_view(), name='tag-list'),
+]
@@ -1,3 +1,83 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import JsonResponse
+from django.views import View
 
-# Create your views here.
+from .models import Course, Tag
+from .search import highlight_html
+
+
+class CourseSearchView(View):
+    """
+    Full-text search of the published catalog, best match first.
+
+    Query: ``q`` (websearch syntax), optional ``language`` (en, es, fr, rw),
+    ``category`` and ``tag`` (slugs), ``page`` and ``page_size`` (at most
+    COURSE_SEARCH_MAX_PAGE_SIZE).
+    """
+
+    def get(self, request):
+        text = request.GET.get('q', '').strip()
+        if not text:
+            return JsonResponse({'error': 'q is required'}, status=400)
+        language = request.GET.get('language') or None
+        if language and language not in dict(Course.LANGUAGE_CHOICES):
+            return JsonResponse({'error': 'Unknown language'}, status=400)
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+            page_size = int(request.GET.get('page_size', getattr(settings, 'COURSE_SEARCH_PAGE_SIZE', 20)))
+        except ValueError:
+            return JsonResponse({'error': 'page and page_size must be integers'}, status=400)
+        page_size = min(max(page_size, 1), getattr(settings, 'COURSE_SEARCH_MAX_PAGE_SIZE', 100))
+
+        queryset = Course.objects.filter(is_published=True)
+        if request.GET.get('category'):
+            queryset = queryset.filter(category__slug=request.GET['category'])
+        if request.GET.get('tag'):
+            queryset = queryset.tagged(request.GET['tag'], language=language)
+        queryset = queryset.search(text, language=language).select_related('category').prefetch_related('tags')
+        # One extra row tells whether there is a next page without a COUNT(*)
+        start = (page - 1) * page_size
+        courses = list(queryset[start:start + page_size + 1])
+
+        return JsonResponse({
+            'query': text,
+            'page': page,
+            'page_size': page_size,
+            'has_next': len(courses) > page_size,
+            'results': [{
+                'slug': course.slug,
+                'title': course.title,
+                'title_highlight': highlight_html(course.title_highlight),
+                'short_description': course.short_description,
+                'highlight': highlight_html(course.description_highlight or ''),
+                'language': course.language,
+                'level': course.level,
+                'category': course.category.slug if course.category else None,
+                'tags': [tag.slug for tag in course.tags.all()],
+                'is_free': course.is_free,
+                'price': str(course.price),
+                'rank': round(course.rank, 6),
+            } for course in courses[:page_size]],
+        })
+
+
+class TagListView(View):
+    """
+    Tag facets of the published catalog, most used first, read from the
+    maintained ``Tag.course_count``.
+
+    Query: optional ``language`` and ``limit`` (at most 200).
+    """
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.GET.get('limit', 50)), 1), 200)
+        except ValueError:
+            return JsonResponse({'error': 'limit must be an integer'}, status=400)
+        tags = Tag.objects.popular(request.GET.get('language') or None)[:limit]
+        return JsonResponse({'results': [{
+            'slug': tag.slug,
+            'name': tag.name,
+            'language': tag.language,
+            'course_count': tag.course_count,
+        } for tag in tags]})
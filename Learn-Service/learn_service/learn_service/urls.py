@@ -24,6 +24,8 @@ from django.conf import settings
 base_urls = [
     path('admin/', admin.site.urls),
     path('i18n/', include('django.conf.urls.i18n')),
+    path('', include('sys_media.urls')),  # resumable uploads, image resizing
+    path('courses/', include('courses.urls')),  # catalog search
     # path('jsi18n/', JavaScriptCatalog.as_view(), name='javascript-catalog'),
     path('welcome/', lambda request: HttpResponse('<center><h1 style="margin-top: 30%">Welcome to Ubuntu Academy!</h1></center>')),
 ]
@@ -1,20 +1,43 @@
-from django.db import models
+from django.db import models, transaction
 import os
 import logging
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import FileExtensionValidator
 from typing import List, Optional
-from django_extensions.db.fields import AutoSlugField
-from utils.slug_fields import MediaSlug
-from .helper import get_file_upload_path
+from utils.slug_fields import AutoSlugField, MediaSlug
+from .helper import get_file_upload_path, get_blob_path, get_blob_upload_path
 from utils.files.process_file import FileProcessor, DocumentPageCounter
+from utils.files.metadata import StreamingMetadataExtractor, MIME_SNIFF_BYTES
+from utils.files.duration import probe_duration
+from utils.files.streaming import AdaptiveStreamPackager, delete_stream_directory
+from utils.files.ranged import get_local_path, get_remote_url, open_ranged
+from utils.files.image_probe import ImageProbeError, probe_image
+from utils.files.waveform import WaveformError, delete_peaks, ensure_peaks, open_peaks
 from django.core.files.storage import default_storage
-import io
-from PIL import Image
+from django.core.files import File
+from utils.files.backends import Image
 from utils.sys_mixins.media import AutoDeleteFileMixin
+from .models import ImageRendition, StoredBlob
+from .renditions import ResponsiveImageMixin
+from .queue import get_broker
 
 logger = logging.getLogger('models')
 
+
+def read_duration(field_file, file_object) -> Optional[int]:
+    """
+    Duration in whole seconds from the media header. The local path (upload
+    temp file or file system storage) or the object URL is handed to the
+    ffprobe fallback so it does not have to be piped.
+    """
+    path = None
+    if hasattr(file_object, 'temporary_file_path'):
+        path = file_object.temporary_file_path()
+    elif getattr(field_file, '_committed', True):
+        path = get_local_path(field_file.name) or get_remote_url(field_file.name)
+    seconds = probe_duration(file_object, name=field_file.name, path=path)
+    return round(seconds) if seconds is not None else None
+
 class AbstractFileModel(AutoDeleteFileMixin, models.Model):
     """
     Abstract base model providing a unified structure for handling file uploads
@@ -39,13 +62,26 @@ class AbstractFileModel(AutoDeleteFileMixin, models.Model):
         updated_at (DateTimeField): Timestamp of last update.
         is_public (BooleanField): Visibility flag for public access.
         slug (AutoSlugField): Unique slug for reference in URLs.
+        processing_status (CharField): State of the post-processing of the file.
 
     Abstract: True
     """
     
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    READY = 'ready'
+    FAILED = 'failed'
+    
+    PROCESSING_STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (PROCESSING, _('Processing')),
+        (READY, _('Ready')),
+        (FAILED, _('Failed')),
+    )
+    
     file = models.FileField(
         _('File'),
-        upload_to=get_file_upload_path,
+        upload_to=get_blob_upload_path,
         max_length=255,
         help_text=_('Uploaded file')    
     )
@@ -70,7 +106,6 @@ class AbstractFileModel(AutoDeleteFileMixin, models.Model):
         _('Description'),
         blank=True,
         null=True,
-        db_index=True,
         help_text=_('Description of the file')
     )
     
@@ -128,6 +163,15 @@ class AbstractFileModel(AutoDeleteFileMixin, models.Model):
         slugify_function=MediaSlug.slug_method
     )
     
+    processing_status = models.CharField(
+        _('Processing status'),
+        max_length=10,
+        choices=PROCESSING_STATUS_CHOICES,
+        default=PENDING,
+        editable=False,
+        db_index=True,
+        help_text=_('Whether metadata extraction for the file has finished')
+    )
         
     class Meta:
         abstract: bool = True
@@ -142,38 +186,275 @@ class AbstractFileModel(AutoDeleteFileMixin, models.Model):
         """
         return self.title or self.original_filename or str(self.file)
     
+    # Fields filled in by the metadata pipeline, extended by subclasses.
+    METADATA_FIELDS = ('content_type', 'checksum', 'file_size')
+    
+    # Fields only filled in by the background worker (duration, thumbnails).
+    DEFERRED_FIELDS = ()
+    
     def save(self, *args, **kwargs):
         """
         Custom save method that handles:
         - Capturing original filename
         - Extracting file metadata (size, content type, checksum)
+
+        Metadata is computed before the row is written, so creating a file
+        is a single INSERT. A new upload is read once, from memory or its
+        local temporary file, and the stored file is never re-read. Whether
+        the file changed is decided from the snapshot taken at load time.
+
+        When settings.MEDIA_PROCESSING_BROKER is set only the size, MIME
+        type and checksum are filled in here; the row is saved as pending and
+        the rest of the work is queued, so the request does not depend on the
+        file size. The row, its blob references (the new file's and the
+        replaced one's) and its job are written in one transaction: a failed
+        enqueue rolls the row back. A replaced file leaves storage once the
+        transaction commits.
+
+        Uploads are stored once per content (see StoredBlob): an upload whose
+        checksum is already stored points at the existing blob, is not
+        written again and reuses the blob's metadata.
         """
         # Capture original filename
         if not self.original_filename and hasattr(self.file, 'name'):
             self.original_filename = os.path.basename(self.file.name)
-            
-        self.delete_old_file_on_change('file')  # ← this is your custom helper
         
-        # Initial save
-        super().save(*args, **kwargs)
+        previous_name = self.get_original_value('file') if self.pk else None
+        uploaded = bool(self.file) and not getattr(self.file, '_committed', True)
+        blob = self._resolve_blob() if uploaded else None
+        
+        update_fields = kwargs.get('update_fields')
+        broker = None
+        if blob is not None and self._reuse_blob_metadata(blob):
+            self.processing_status = self.READY
+            if update_fields is not None:
+                kwargs['update_fields'] = (set(update_fields) | set(self.METADATA_FIELDS)
+                                           | set(self.DEFERRED_FIELDS) | {'processing_status'})
+        elif self._file_needs_metadata(update_fields):
+            broker = get_broker()
+            if broker is None:
+                self.extract_metadata(hashed=uploaded)
+                self.processing_status = self.READY
+            else:
+                self.extract_basic_metadata(hashed=uploaded)
+                self.processing_status = self.PENDING
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.METADATA_FIELDS) | {'processing_status'}
         
-        update_fields = kwargs.get('update_fields', [])
-        if not self.checksum or 'file' in update_fields:
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.file and self.file.name != previous_name:
+                self._reference_blob(written=uploaded and blob is None)
+            # Released with the save: a failed save keeps the reference of the old file
+            self.delete_old_file_on_change('file', old_name=previous_name or '')
+            if broker is not None:
+                broker.enqueue(self)
+        self.remember_value('file')
+    
+    def _file_needs_metadata(self, update_fields=None) -> bool:
+        """
+        Returns True when the file is new, was replaced or was never processed.
+        """
+        if not self.file:
+            return False
+        if update_fields is not None and 'file' not in update_fields:
+            return False
+        if not getattr(self.file, '_committed', True):
+            return True
+        if not self.checksum and self.processing_status not in (self.PENDING, self.PROCESSING):
+            return True
+        return self.file.name != self.get_original_value('file')
+    
+    def _resolve_blob(self) -> Optional[StoredBlob]:
+        """
+        Hashes a new upload and, when the same content is already stored,
+        points the file field at that blob so the upload is not written.
 
-            metadata = FileProcessor(self.file).get_metadata()
+        Returns:
+            The existing blob, or None when the upload is new content.
+        """
+        self._apply_metadata(self._hash_upload(self.file.file))
+        blob = StoredBlob.objects.filter(checksum=self.checksum).first()
+        if blob is not None:
+            self.file = blob.name
+            return blob
+        name = get_blob_path(self.checksum, self.file.name)
+        if default_storage.exists(name):
+            # Written by an upload whose transaction was rolled back.
+            self.file = name
+        return None
+    
+    def _reuse_blob_metadata(self, blob: StoredBlob) -> bool:
+        """
+        Copies the metadata of an already processed blob. Deferred fields
+        (thumbnails, streams) are taken from a processed row of the same model.
 
-            self.content_type = metadata.get("mime_type", self.content_type)
-            self.checksum = metadata.get("checksum", self.checksum)
-            self.file_size = metadata.get("size", self.file_size)
+        Returns:
+            bool: True when nothing is left to extract for this row.
+        """
+        if any(field not in blob.metadata for field in self.METADATA_FIELDS):
+            return False
+        for field in self.METADATA_FIELDS:
+            setattr(self, field, blob.metadata[field])
+        return not self.DEFERRED_FIELDS or self._reuse_twin_deferred(blob.name)
+    
+    def _reuse_twin_deferred(self, name: str) -> bool:
+        """
+        Fills the empty deferred fields (thumbnails, streams) from a
+        processed row of the same model using the file ``name``.
 
-            update_fields = list(set(update_fields + [
-                "content_type", "checksum", "file_size", 
-            ]))
+        Returns:
+            bool: True when such a row was found.
+        """
+        twin = (
+            type(self)._base_manager
+            .filter(file=name, processing_status=self.READY)
+            .exclude(pk=self.pk)
+            .only(*self.DEFERRED_FIELDS)
+            .first()
+        )
+        if twin is None:
+            return False
+        for field in self.DEFERRED_FIELDS:
+            value = getattr(twin, field)
+            if not getattr(self, field):
+                setattr(self, field, getattr(value, 'name', value))
+        return True
+    
+    def _reference_blob(self, written: bool) -> None:
+        """
+        Counts this row as a reference to its blob, recording the blob when
+        this save wrote it.
+        """
+        if not written:
+            StoredBlob.objects.retain(self.file.name)
+            return
+        metadata = self.get_blob_metadata() if self.processing_status == self.READY else {}
+        blob = StoredBlob.objects.register(self.checksum, self.file.name, self.file_size, metadata)
+        if blob.name != self.file.name:
+            # The same content was committed concurrently: keep a single copy.
+            default_storage.delete(self.file.name)
+            self.file.name = blob.name
+            type(self)._base_manager.filter(pk=self.pk).update(file=blob.name)
+    
+    def get_blob_metadata(self) -> dict:
+        """Metadata field values shared by every row using the same content."""
+        return {field: getattr(self, field) for field in self.METADATA_FIELDS}
+    
+    def release_file(self, name: str) -> bool:
+        return StoredBlob.objects.release(name)
+    
+    def extract_basic_metadata(self, hashed: bool = False) -> None:
+        """
+        Fills the size and MIME type from the first bytes of the file, and
+        clears everything the background worker will compute.
+
+        Args:
+            hashed: Size, MIME type and checksum were already computed while
+                hashing the upload
+        """
+        if not hashed:
+            extractor = StreamingMetadataExtractor(name=self.file.name)
+            with default_storage.open(self.file.name, 'rb') as file_object:
+                extractor.update(file_object.read(MIME_SNIFF_BYTES))
+            self.file_size = default_storage.size(self.file.name)
+            self.content_type = extractor.detect_mime_type()
+            self.checksum = ''
+        for field in self.METADATA_FIELDS[len(AbstractFileModel.METADATA_FIELDS):]:
+            setattr(self, field, None)
+    
+    def process_media(self) -> None:
+        """
+        Runs the queued extraction for the stored file and saves the results
+        (called by the media worker).
+
+        Content that was already processed (for any media model) reuses the
+        metadata kept on its blob instead of being parsed again, and the
+        thumbnails and streams of a processed row of the same model instead
+        of rendering them again.
+        """
+        if not self.checksum:
+            self._apply_metadata(FileProcessor(self.file).get_metadata())
+        blob = StoredBlob.objects.filter(name=self.file.name).first()
+        if blob is not None and all(field in blob.metadata for field in self.METADATA_FIELDS):
+            for field in self.METADATA_FIELDS:
+                setattr(self, field, blob.metadata[field])
+        else:
+            with open_ranged(self.file.name) as file_object:
+                self.extract_type_metadata(file_object)
+            if blob is not None:
+                blob.remember_metadata(self.get_blob_metadata())
+        if self.DEFERRED_FIELDS:
+            self._reuse_twin_deferred(self.file.name)
+        self.extract_deferred_metadata()
+        self.processing_status = self.READY
+        self.save(update_fields=[*self.METADATA_FIELDS, *self.DEFERRED_FIELDS, 'processing_status'])
+    
+    def extract_metadata(self, hashed: bool = False) -> None:
+        """
+        Fills the metadata fields from the file without saving the instance.
+
+        Uploads that are not in storage yet are read from memory or from their
+        temporary file; already stored files are opened for ranged reads, so
+        only the headers the type specific parsers look at are fetched.
+
+        Args:
+            hashed: Size, MIME type and checksum were already computed while
+                hashing the upload
+        """
+        if not getattr(self.file, '_committed', True):
+            upload = self.file.file
+            if not hashed:
+                self._apply_metadata(self._hash_upload(upload))
+            self.extract_type_metadata(upload)
+            upload.seek(0)
+            return
         
-        if update_fields:
-            # Final save if needed
-            kwargs["update_fields"] = update_fields
-            super().save(*args, **kwargs)
+        if not hashed:
+            self._apply_metadata(FileProcessor(self.file).get_metadata())
+        with open_ranged(self.file.name) as file_object:
+            self.extract_type_metadata(file_object)
+    
+    def _hash_upload(self, upload) -> dict:
+        """
+        Size, checksum and MIME type of an upload, read once from memory or
+        from its temporary file. Uploads hashed while they were received
+        carry the result in ``metadata`` and are not read at all.
+        """
+        metadata = getattr(upload, 'metadata', None)
+        if metadata:
+            return metadata
+        extractor = StreamingMetadataExtractor(
+            name=self.file.name,
+            expected_size=getattr(upload, 'size', None),
+        )
+        if hasattr(upload, 'temporary_file_path'):
+            extractor.consume_path(upload.temporary_file_path())
+        else:
+            extractor.consume_file(upload)
+        upload.seek(0)
+        return extractor.get_metadata()
+    
+    def _apply_metadata(self, metadata: dict) -> None:
+        self.content_type = metadata.get("mime_type", self.content_type)
+        self.checksum = metadata.get("checksum", self.checksum)
+        self.file_size = metadata.get("size", self.file_size)
+    
+    def extract_type_metadata(self, file_object) -> None:
+        """
+        Hook for file type specific metadata (dimensions, page count, ...).
+
+        Args:
+            file_object: Open, seekable binary file positioned anywhere
+        """
+        pass
+    
+    def extract_deferred_metadata(self) -> None:
+        """
+        Hook for work that only runs in the background worker (ffmpeg probing,
+        thumbnails). Fills the fields listed in DEFERRED_FIELDS.
+        """
+        pass
     
     @property
     def get_extension(self) -> str:
@@ -209,18 +490,15 @@ class AbstractFileModel(AutoDeleteFileMixin, models.Model):
         """
         raise NotImplementedError("get_absolute_url must be implemented in a subclass")
     
-    def delete(self, *args, **kwargs):
+    def release_files(self) -> None:
         """
-        Deletes both the model instance and its file from storage.
+        Drops the references of a deleted row (see sys_media.signals, which
+        also covers cascade deletes), its files leaving storage on commit.
         """
-        # Store the file path
         self.delete_file('file')
-        
-        # Delete the model instance
-        super().delete(*args, **kwargs)
 
 
-class ImageFile(AbstractFileModel):
+class ImageFile(ResponsiveImageMixin, AbstractFileModel):
     """
     Model for storing image files, inheriting metadata and logic from
     AbstractFileModel. Includes image-specific properties such as width,
@@ -236,7 +514,7 @@ class ImageFile(AbstractFileModel):
     
     file = models.ImageField(
         _('Image file'),
-        upload_to=get_file_upload_path,
+        upload_to=get_blob_upload_path,
         validators=[FileExtensionValidator(allowed_extensions=ALLOWED_EXTENSIONS)],
         max_length=255,
         blank=True,
@@ -275,27 +553,39 @@ class ImageFile(AbstractFileModel):
         verbose_name: str = _('Image file')
         verbose_name_plural: str = _('Image files')
     
-    def save(self, *args, **kwargs):
+    METADATA_FIELDS = AbstractFileModel.METADATA_FIELDS + ('width', 'height')
+    
+    def extract_type_metadata(self, file_object) -> None:
         """
-        Saves the image file and updates width/height after saving,
-        if not already set.
+        Reads the displayed width/height (EXIF orientation applied) and the
+        content type from the image header; only a few KB are read and the
+        image is not decoded. PIL is the fallback for headers the probe does
+        not understand.
         """
-        super().save(*args, **kwargs)
-        
-        # Update image dimensions if not set
-        update_fields = []
-        if (self.width is None or self.height is None) and self.file:
-            try:
-                with default_storage.open(self.file.name) as file_content:
-                    f = file_content.read() 
-                    img = Image.open(io.BytesIO(f))
-                    self.width, self.height = img.size
-                    update_fields.extend(['width', 'height'])
-            except (ImportError, OSError, AttributeError, Exception):
-                pass
-        
-        if update_fields:
-            super().save(update_fields=update_fields)
+        try:
+            info = probe_image(file_object, name=self.file.name)
+            self.width, self.height = info.display_size
+            self.content_type = info.mime_type
+            return
+        except ImageProbeError as e:
+            logger.debug(f"Image header probe failed for {self.file.name}: {e}")
+        try:
+            file_object.seek(0)
+            with Image.open(file_object) as img:
+                self.width, self.height = img.size
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read image dimensions of {self.file.name}: {e}")
+    
+    def extract_deferred_metadata(self) -> None:
+        """
+        Stores the responsive renditions (see ResponsiveImageMixin). Content
+        that was already uploaded shares its blob and keeps its renditions.
+        """
+        self.generate_renditions()
+    
+    def discard_file(self, name: str) -> None:
+        super().discard_file(name)
+        ImageRendition.objects.delete_for(name)
 
 
 class DocumentFile(AbstractFileModel):
@@ -310,7 +600,7 @@ class DocumentFile(AbstractFileModel):
     
     file = models.FileField(
         _('Document file'),
-        upload_to=get_file_upload_path,
+        upload_to=get_blob_upload_path,
         validators=[FileExtensionValidator(allowed_extensions=ALLOWED_EXTENSIONS)],
         max_length=255,
         help_text=_('Uploaded document file')
@@ -325,19 +615,18 @@ class DocumentFile(AbstractFileModel):
         help_text=_('Number of pages in the document')
     )
     
-    def save(self, *args, **kwargs) -> None:
-        # Check if the object is being created for the first time
-        # is_new = self._state.adding
+    METADATA_FIELDS = AbstractFileModel.METADATA_FIELDS + ('page_count',)
     
-        # Save the file first so it's available in storage for reading
-        super().save(*args, **kwargs)
-        
-        pages = DocumentPageCounter(self.file).count_pages()
-        if pages is not None:
-           self.page_count = pages  
-        else: self.page_count = 1
-        # Save only the updated field to avoid triggering full update
-        super().save(update_fields=['page_count'])
+    def extract_type_metadata(self, file_object) -> None:
+        """
+        Counts the pages of the document from the given file object.
+        """
+        pages = DocumentPageCounter(
+            self.file,
+            file_object=file_object,
+            mime_type=self.content_type,
+        ).count_pages()
+        self.page_count = pages if pages is not None else 1
             
     
     class Meta(AbstractFileModel.Meta):
@@ -353,16 +642,21 @@ class VideoFile(AbstractFileModel):
     Model for uploading video content with additional fields for
     duration and an optional thumbnail.
 
+    Subclasses with ADAPTIVE_STREAMING set also get an HLS (and optionally
+    DASH) bitrate ladder, packaged by the media worker next to the original.
+
     Fields:
         duration (PositiveIntegerField): Video duration in seconds.
         thumbnail (ImageField): Optional preview image.
+        hls_manifest (CharField): Storage path of the HLS master playlist.
+        dash_manifest (CharField): Storage path of the DASH manifest.
     """
     
     ALLOWED_EXTENSIONS = ['mp4', 'webm', 'mov', 'avi', 'mkv']
     
     file = models.FileField(
         _('Video file'),
-        upload_to=get_file_upload_path,
+        upload_to=get_blob_upload_path,
         validators=[FileExtensionValidator(allowed_extensions=ALLOWED_EXTENSIONS)],
         max_length=255,
         help_text=_('Uploaded video file')
@@ -385,10 +679,119 @@ class VideoFile(AbstractFileModel):
         help_text=_('Thumbnail image for the video')
     )
     
+    hls_manifest = models.CharField(
+        _('HLS manifest'),
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text=_('Storage path of the adaptive stream master playlist')
+    )
+    
+    dash_manifest = models.CharField(
+        _('DASH manifest'),
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text=_('Storage path of the adaptive stream DASH manifest')
+    )
+    
     class Meta(AbstractFileModel.Meta):
         abstract: bool = True
         verbose_name = _('Video file')
         verbose_name_plural = _('Video files')
+    
+    METADATA_FIELDS = AbstractFileModel.METADATA_FIELDS + ('duration',)
+    DEFERRED_FIELDS = ('thumbnail', 'hls_manifest', 'dash_manifest')
+    
+    # Package an adaptive bitrate ladder for this model (see utils.files.streaming).
+    ADAPTIVE_STREAMING = False
+    
+    def save(self, *args, **kwargs):
+        """
+        Drops the packaged stream of a replaced video with the save.
+        """
+        with transaction.atomic():
+            if (self.hls_manifest or self.dash_manifest) and self.file.name != self.get_original_value('file'):
+                self.delete_stream()
+                update_fields = kwargs.get('update_fields')
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(update_fields) | {'hls_manifest', 'dash_manifest'}
+            super().save(*args, **kwargs)
+    
+    def release_files(self) -> None:
+        self.delete_stream()
+        super().release_files()
+    
+    @property
+    def stream_directory(self) -> str:
+        """
+        Storage directory of the packaged streams, next to the original file.
+        Each packaging run writes into a fresh subdirectory; rows of the same
+        model sharing a blob share the stream of the first one processed.
+        """
+        return f"{os.path.splitext(self.file.name)[0]}_{self._meta.model_name}_stream"
+    
+    @property
+    def hls_url(self) -> Optional[str]:
+        return default_storage.url(self.hls_manifest) if self.hls_manifest else None
+    
+    @property
+    def dash_url(self) -> Optional[str]:
+        return default_storage.url(self.dash_manifest) if self.dash_manifest else None
+    
+    @property
+    def playback_url(self) -> str:
+        """The adaptive stream once packaged, the progressive file until then."""
+        return self.hls_url or self.file.url
+    
+    def delete_stream(self) -> None:
+        """
+        Deletes the packaged renditions from storage when the transaction
+        commits, unless another row still plays them, and clears the manifests.
+        """
+        manifest = self.hls_manifest or self.dash_manifest
+        if manifest and not (
+            type(self)._base_manager
+            .filter(models.Q(hls_manifest=manifest) | models.Q(dash_manifest=manifest))
+            .exclude(pk=self.pk)
+            .exists()
+        ):
+            directory = os.path.dirname(manifest)
+            transaction.on_commit(lambda: delete_stream_directory(directory))
+        self.hls_manifest = ''
+        self.dash_manifest = ''
+    
+    def extract_type_metadata(self, file_object) -> None:
+        """
+        Reads the duration from the container header (mvhd, EBML Info, ...).
+        """
+        self.duration = read_duration(self.file, file_object)
+    
+    def extract_deferred_metadata(self) -> None:
+        """
+        Creates a thumbnail with ffmpeg if the video has none and packages the
+        adaptive stream, both from a single prepared source file.
+        """
+        needs_thumbnail = not self.thumbnail
+        needs_stream = self.ADAPTIVE_STREAMING and not self.hls_manifest
+        if not (needs_thumbnail or needs_stream):
+            return
+        # Imported here: the converter pulls in ffmpeg, librosa and matplotlib.
+        from utils.files.converter import VideoProcessor
+        
+        thumbnail = None
+        with open_ranged(self.file.name) as file_object:
+            processor = VideoProcessor(File(file_object, name=self.file.name))
+            processor.duration = self.duration
+            with processor.prepared() as source:
+                if needs_thumbnail:
+                    thumbnail = processor.create_thumbnail()
+                if needs_stream:
+                    manifests = AdaptiveStreamPackager(source).package_to_storage(self.stream_directory)
+                    self.hls_manifest = manifests['hls']
+                    self.dash_manifest = manifests['dash'] or ''
+        if thumbnail is not None:
+            self.thumbnail.save(thumbnail.name, thumbnail, save=False)
 
 
 class AudioFile(AbstractFileModel):
@@ -404,7 +807,7 @@ class AudioFile(AbstractFileModel):
     
     file = models.FileField(
         _('Audio file'),
-        upload_to=get_file_upload_path,
+        upload_to=get_blob_upload_path,
         validators=[FileExtensionValidator(allowed_extensions=ALLOWED_EXTENSIONS)],
         max_length=255,
         help_text=_('Uploaded audio file')
@@ -423,5 +826,46 @@ class AudioFile(AbstractFileModel):
         abstract: bool = True
         verbose_name: str = _('Audio file')
         verbose_name_plural: str = _('Audio files')
+    
+    METADATA_FIELDS = AbstractFileModel.METADATA_FIELDS + ('duration',)
+    
+    def extract_type_metadata(self, file_object) -> None:
+        """
+        Reads the duration from the audio header (Xing/VBRI, STREAMINFO, ...).
+        """
+        self.duration = read_duration(self.file, file_object)
+    
+    def extract_deferred_metadata(self) -> None:
+        """
+        Builds the waveform peaks file of the content (shared by every upload
+        with the same checksum).
+        """
+        if not self.checksum:
+            return
+        try:
+            ensure_peaks(self.checksum, self.file.name)
+        except (OSError, WaveformError) as e:
+            logger.warning(f"Could not build the waveform of {self.file.name}: {e}")
+    
+    def get_waveform(self, points: int = 100) -> Optional[List[float]]:
+        """
+        Normalized peak amplitudes for a waveform of ``points`` bars, read
+        from the zoom level closest to that resolution.
+
+        Returns:
+            None until the media worker has built the peaks file.
+        """
+        peaks = open_peaks(self.checksum) if self.checksum else None
+        if peaks is None:
+            return None
+        with peaks:
+            return peaks.amplitudes(points)
+    
+    def release_file(self, name: str) -> bool:
+        checksum = StoredBlob.objects.filter(name=name).values_list('checksum', flat=True).first()
+        released = super().release_file(name)
+        if released and checksum:
+            transaction.on_commit(lambda: delete_peaks(checksum))
+        return released
         
     
\ No newline at end of file
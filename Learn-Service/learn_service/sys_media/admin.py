@@ -1,3 +1,37 @@
 from django.contrib import admin
+from .models import ImageRendition, MediaJob, StoredBlob, UploadSession
 
-# Register your models here.
+
+@admin.register(MediaJob)
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ('content_type', 'object_id', 'file_name', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status', 'content_type')
+    search_fields = ('file_name', 'last_error')
+    readonly_fields = ('content_type', 'object_id', 'file_name', 'attempts', 'last_error', 'worker', 'locked_at', 'created_at', 'updated_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'created_at')
+    search_fields = ('checksum', 'name')
+    readonly_fields = ('checksum', 'name', 'size', 'ref_count', 'metadata', 'created_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'user', 'size', 'target_type', 'status', 'created_at')
+    list_filter = ('status', 'target_type')
+    search_fields = ('file_name',)
+    readonly_fields = ('user', 'file_name', 'size', 'chunk_size', 'target_type', 'fields', 'object_id', 'status', 'created_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(ImageRendition)
+class ImageRenditionAdmin(admin.ModelAdmin):
+    list_display = ('source', 'width', 'height', 'format', 'size', 'created_at')
+    list_filter = ('format',)
+    search_fields = ('source', 'file')
+    readonly_fields = ('source', 'width', 'height', 'format', 'file', 'size', 'created_at')
+    ordering = ('source', 'width')
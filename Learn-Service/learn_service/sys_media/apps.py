@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SysMediaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sys_media'
+
+    def ready(self):
+        from .signals import connect_media_receivers
+        connect_media_receivers()
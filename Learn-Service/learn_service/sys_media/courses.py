@@ -40,6 +40,8 @@ class CourseVideoIntro(VideoFile):
         on_delete=models.CASCADE, 
         related_name='videointro',
         )
+    ADAPTIVE_STREAMING = True
+
     class Meta(MetaFile):
         app_label = "courses"
         verbose_name = _("Course Video Intro")
@@ -123,10 +125,14 @@ class ModuleVideoLesson(VideoFile):
         on_delete=models.CASCADE, 
         related_name='videos',
         )
+    ADAPTIVE_STREAMING = True
+
     class Meta(MetaFile):
         app_label = "courses"
         verbose_name = _("Module Lesson Video")
         verbose_name_plural = _("Module Lesson videos")
         
     def get_absolute_url(self):
-        ...
\ No newline at end of file
+        ...
+
+    # The duration is rolled up to the lesson, module and course by courses.signals
\ No newline at end of file
@@ -23,4 +23,27 @@ def get_file_upload_path(
         str(now.year),
         str(now.month),
         f"{uuid.uuid4()}_{filename}"
-    )
\ No newline at end of file
+    )
+
+
+def get_blob_path(checksum: str, filename: str) -> str:
+    """
+    Content addressed storage path of a file.
+    Format: blobs/<aa>/<bb>/<sha256><extension>
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return os.path.join('blobs', checksum[:2], checksum[2:4], f"{checksum}{extension}")
+
+
+def get_blob_upload_path(
+    instance: models.Model,
+    filename: str
+) -> str:
+    """
+    Stores uploads under their checksum so identical files share one blob.
+    Falls back to get_file_upload_path when the checksum is not known yet.
+    """
+    checksum = getattr(instance, 'checksum', '')
+    if not checksum:
+        return get_file_upload_path(instance, filename)
+    return get_blob_path(checksum, filename)
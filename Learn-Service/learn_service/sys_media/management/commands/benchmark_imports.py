@@ -0,0 +1,90 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Media backends that should only be imported by code that decodes media
+HEAVY_MODULES = (
+    'numpy', 'PIL.Image', 'ffmpeg', 'magic', 'PyPDF2', 'pptx', 'docx', 'lxml.etree',
+    'librosa', 'matplotlib', 'mutagen', 'pydub', 'scipy', 'numba',
+)
+
+# Runs in a fresh interpreter: imports the target and reports the time, the
+# resident memory it added and which heavy modules ended up loaded.
+PROBE = """
+import importlib, json, sys, time
+
+def rss_kb():
+    try:
+        with open('/proc/self/status') as status:
+            return next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+    except (OSError, StopIteration):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+target = sys.argv[1]
+import django
+if target == 'django':
+    start, base = time.perf_counter(), 0
+    from django.conf import settings
+    django.setup()
+    importlib.import_module(settings.ROOT_URLCONF)
+else:
+    django.setup()  # modules are measured on top of a booted service
+    start, base = time.perf_counter(), rss_kb()
+    importlib.import_module(target)
+seconds = time.perf_counter() - start
+loaded = [name for name in sys.argv[2:] if name in sys.modules
+          and type(sys.modules[name]).__name__ != '_LazyModule']
+print(json.dumps({'seconds': seconds, 'rss_kb': rss_kb() - base, 'loaded': loaded}))
+"""
+
+
+class Command(BaseCommand):
+    help = ("Measures the cold import time and resident memory of the service (django.setup() plus the "
+            "URLconf) or of modules imported on top of it, each in fresh interpreters, and lists the heavy "
+            "media backends they load.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', default=['django'],
+                            help="'django' (default) or dotted module names, e.g. utils.files.converter")
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per target')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def measure(self, target: str) -> dict:
+        environment = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE))
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE, target, *HEAVY_MODULES],
+            capture_output=True, text=True, env=environment, cwd=settings.BASE_DIR,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f"Importing {target} failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        results = {}
+        for target in options['targets']:
+            runs = [self.measure(target) for _ in range(max(options['runs'], 1))]
+            results[target] = {
+                'seconds': statistics.median(run['seconds'] for run in runs),
+                'rss_kb': statistics.median(run['rss_kb'] for run in runs),
+                'loaded': runs[-1]['loaded'],
+            }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for target, result in results.items():
+            self.stdout.write(
+                f"{target}: {result['seconds'] * 1000:.0f} ms, +{result['rss_kb'] / 1024:.1f} MB RSS "
+                f"(median of {options['runs']})"
+            )
+            if result['loaded']:
+                self.stdout.write(self.style.WARNING(f"  heavy modules loaded: {', '.join(result['loaded'])}"))
+            else:
+                self.stdout.write(self.style.SUCCESS("  no heavy media modules loaded"))
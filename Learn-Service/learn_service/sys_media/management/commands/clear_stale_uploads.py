@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from sys_media.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Deletes resumable uploads that were not finalized within CHUNKED_UPLOAD_EXPIRY, with their chunks."
+
+    def handle(self, *args, **options):
+        removed = 0
+        for session in UploadSession.objects.expired().iterator():
+            session.discard()
+            session.delete()
+            removed += 1
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} stale upload(s)"))
@@ -0,0 +1,33 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from sys_media.models import MediaJob
+from sys_media.queue import run_job
+
+
+class Command(BaseCommand):
+    help = "Runs queued media post-processing jobs (page count, dimensions, duration, thumbnails)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the runnable jobs and exit')
+        parser.add_argument('--batch', type=int, default=5, help='Jobs claimed per round trip')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"Media worker {worker} started")
+        processed = 0
+        while True:
+            jobs = MediaJob.objects.claim(worker, limit=options['batch'])
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            for job in jobs:
+                run_job(job)
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} media job(s)"))
@@ -0,0 +1,57 @@
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from sys_media.models import ImageRendition, StoredBlob
+from sys_media.signals import get_media_models
+from utils.files.waveform import delete_peaks
+
+
+def discard_blob(name: str, checksum: str) -> None:
+    default_storage.delete(name)
+    ImageRendition.objects.delete_for(name)
+    delete_peaks(checksum)
+
+
+class Command(BaseCommand):
+    help = ("Deletes the stored blobs no media row uses (ref_count 0, or references lost to rows deleted "
+            "without signals), with their files, renditions and waveform peaks, and corrects the ref_count "
+            "of the others.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+
+    def handle(self, *args, **options):
+        models = [model for model in get_media_models() if not model._meta.proxy]
+        used = Counter()
+        for model in models:
+            used.update(model._base_manager.order_by().values_list('file', flat=True).iterator())
+        candidates = [pk for pk, name, ref_count in StoredBlob.objects.values_list('pk', 'name', 'ref_count').iterator()
+                      if ref_count != used[name]]
+
+        removed = corrected = 0
+        for pk in candidates:
+            with transaction.atomic():
+                # Locked, and checked again: an upload may have taken the blob since
+                blob = StoredBlob.objects.select_for_update().filter(pk=pk).first()
+                if blob is None:
+                    continue
+                references = sum(model._base_manager.filter(file=blob.name).count() for model in models)
+                if references:
+                    if references != blob.ref_count:
+                        corrected += 1
+                        if not options['dry_run']:
+                            StoredBlob.objects.filter(pk=pk).update(ref_count=references)
+                    continue
+                removed += 1
+                if options['dry_run']:
+                    self.stdout.write(f"Would delete {blob.name}")
+                    continue
+                blob.delete()
+                transaction.on_commit(lambda name=blob.name, checksum=blob.checksum: discard_blob(name, checksum))
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would delete' if options['dry_run'] else 'Deleted'} {removed} unused blob(s), "
+            f"{corrected} reference count(s) corrected"
+        ))
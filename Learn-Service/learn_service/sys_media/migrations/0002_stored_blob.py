@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sys_media', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checksum', models.CharField(max_length=64, unique=True, verbose_name='Checksum')),
+                ('name', models.CharField(help_text='Storage path of the blob', max_length=255, unique=True, verbose_name='Name')),
+                ('size', models.BigIntegerField(verbose_name='Size')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='References')),
+                ('metadata', models.JSONField(blank=True, default=dict, verbose_name='Metadata')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Stored blob',
+                'verbose_name_plural': 'Stored blobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
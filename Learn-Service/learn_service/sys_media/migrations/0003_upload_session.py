@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 01:51
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('sys_media', '0002_stored_blob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255, verbose_name='File name')),
+                ('size', models.BigIntegerField(verbose_name='Size')),
+                ('chunk_size', models.PositiveIntegerField(verbose_name='Chunk size')),
+                ('fields', models.JSONField(blank=True, default=dict, help_text='Field values of the media row created on finalize', verbose_name='Fields')),
+                ('object_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('complete', 'Complete')], default='uploading', max_length=10, verbose_name='Status')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('target_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Upload session',
+                'verbose_name_plural': 'Upload sessions',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
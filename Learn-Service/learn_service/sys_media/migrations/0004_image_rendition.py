@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sys_media', '0003_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Storage path of the original image', max_length=255, verbose_name='Source')),
+                ('width', models.PositiveIntegerField(verbose_name='Width')),
+                ('height', models.PositiveIntegerField(verbose_name='Height')),
+                ('format', models.CharField(choices=[('avif', 'AVIF'), ('webp', 'WebP'), ('jpeg', 'JPEG')], max_length=4, verbose_name='Format')),
+                ('file', models.FileField(max_length=255, upload_to='', verbose_name='File')),
+                ('size', models.PositiveIntegerField(verbose_name='Size')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Image rendition',
+                'verbose_name_plural': 'Image renditions',
+                'ordering': ['source', 'width'],
+                'constraints': [models.UniqueConstraint(fields=('source', 'width', 'format'), name='unique_image_rendition')],
+            },
+        ),
+    ]
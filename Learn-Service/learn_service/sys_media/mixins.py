@@ -1,16 +1,19 @@
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from .abstract import ImageFile, VideoFile, DocumentFile
+from .renditions import prefetch_renditions
+from utils.sys_mixins.admin import AdminPerformanceMixin
 
-class VideoAdminMixin:
+class VideoAdminMixin(AdminPerformanceMixin):
     search_fields = ('title', 'original_filename', 'description', 'checksum')
-    list_filter = ('is_public', 'created_at', 'content_type')
+    list_filter = ('is_public', 'processing_status', 'created_at', 'content_type')
     ordering = ('-created_at',)
     readonly_fields = (
         'video_preview',
         'created_at',
         'updated_at',
         'checksum',
+        'processing_status',
         'file_size',
         'content_type',
         'slug',
@@ -26,6 +29,20 @@ class VideoAdminMixin:
     human_readable_size.short_description = _('File Size')  
 
     def video_preview(self, obj):
+        if obj.pk and getattr(obj, 'hls_manifest', ''):
+            # Adaptive stream: native HLS on Safari, hls.js everywhere else.
+            return format_html(
+                '<video id="video-preview-{}" width="320" height="240" controls '
+                'data-hls="{}" data-fallback="{}"></video>'
+                '<script src="https://cdn.jsdelivr.net/npm/hls.js@1"></script>'
+                '<script>(function () {{'
+                'var video = document.getElementById("video-preview-{}");'
+                'if (video.canPlayType("application/vnd.apple.mpegurl")) {{ video.src = video.dataset.hls; }}'
+                'else if (window.Hls && Hls.isSupported()) {{ var hls = new Hls(); hls.loadSource(video.dataset.hls); hls.attachMedia(video); }}'
+                'else {{ video.src = video.dataset.fallback; }}'
+                '}})();</script>',
+                obj.pk, obj.hls_url, obj.file.url, obj.pk
+            )
         if obj.pk and obj.file and obj.content_type and obj.content_type.startswith('video/'):
             return format_html(
                 '<video width="320" height="240" controls>'
@@ -37,15 +54,16 @@ class VideoAdminMixin:
     video_preview.short_description = _('Video Preview')
 
 
-class DocumentAdminMixin:
+class DocumentAdminMixin(AdminPerformanceMixin):
     search_fields = ('title', 'original_filename', 'description', 'checksum', 'page_count')
-    list_filter = ('is_public', 'created_at', 'content_type')
+    list_filter = ('is_public', 'processing_status', 'created_at', 'content_type')
     ordering = ('-created_at',)
     readonly_fields = (
         'document_preview',
         'created_at',
         'updated_at',
         'checksum',
+        'processing_status',
         'file_size',
         'content_type',
         'page_count',
@@ -78,14 +96,15 @@ class DocumentAdminMixin:
     document_preview.short_description = _('Document Preview')
 
 
-class ImageAdminMixin:
+class ImageAdminMixin(AdminPerformanceMixin):
     search_fields = ('title', 'original_filename', 'description', 'checksum', 'width', 'file_preview')
-    list_filter = ('is_public', 'created_at', 'content_type')
+    list_filter = ('is_public', 'processing_status', 'created_at', 'content_type')
     ordering = ('-created_at',)
     readonly_fields = (
         'created_at',
         'updated_at',
         'checksum',
+        'processing_status',
         'file_size',
         'content_type',
         'height',
@@ -101,12 +120,18 @@ class ImageAdminMixin:
         return _("Unknown")
     human_readable_size.short_description = _('File Size')
 
+    def get_changelist_instance(self, request):
+        """Loads the renditions of the listed images in one query."""
+        changelist = super().get_changelist_instance(request)
+        prefetch_renditions(changelist.result_list)
+        return changelist
+
     def is_image_preview(self, obj):
-        """Shows a thumbnail preview if the file is an image."""
+        """Shows a thumbnail preview (a small rendition) if the file is an image."""
         if obj.content_type and obj.content_type.startswith('image/'):
             return format_html(
-                '<img src="{}" width="60" height="30" style="object-fit: cover; border: 1px solid #ccc;" />',
-                obj.file.url
+                '<img src="{}" width="60" height="30" loading="lazy" style="object-fit: cover; border: 1px solid #ccc;" />',
+                obj.rendition_url(120)
             )
         return "-"
     is_image_preview.short_description = _('Preview')
@@ -116,7 +141,7 @@ class ImageAdminMixin:
         if obj.content_type and obj.content_type.startswith('image/'):
             return format_html(
                 '<img src="{}" style="max-height: 200px; max-width: 100%; object-fit: contain; border: 1px solid #ccc;" />',
-                obj.file.url
+                obj.rendition_url(640)
             )
         return _("No preview available")
     file_preview.short_description = _('File Preview')
\ No newline at end of file
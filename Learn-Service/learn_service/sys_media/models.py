@@ -1 +1,516 @@
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
+from utils.files.metadata import StreamingMetadataExtractor, get_chunk_size
+from utils.files.uploads import AssembledUploadedFile
+from utils.files.image_probe import ImageProbeError, probe_image
+from utils.files.ranged import open_ranged
+from utils.files.renditions import (
+    IMAGE_FORMATS, ImageDiskCache, ImageResizer, get_rendition_formats, get_rendition_widths, plan_widths,
+)
+
+logger = logging.getLogger('models')
+
+
+class MediaJobQuerySet(models.QuerySet):
+
+    def claim(self, worker: str, limit: int = 1):
+        """
+        Locks up to ``limit`` runnable jobs for ``worker`` and marks them running.
+
+        Runnable jobs are pending jobs whose ``run_after`` has passed, plus
+        running jobs whose lock is older than MEDIA_PROCESSING_LOCK_TIMEOUT
+        (their worker died). Rows already locked by another worker are skipped.
+        """
+        now = timezone.now()
+        stale = now - timedelta(seconds=getattr(settings, 'MEDIA_PROCESSING_LOCK_TIMEOUT', 15 * 60))
+        with transaction.atomic():
+            jobs = list(
+                self.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=MediaJob.PENDING, run_after__lte=now)
+                    | Q(status=MediaJob.RUNNING, locked_at__lt=stale)
+                )
+                .order_by('run_after', 'pk')[:limit]
+            )
+            if jobs:
+                self.filter(pk__in=[job.pk for job in jobs]).update(
+                    status=MediaJob.RUNNING,
+                    worker=worker,
+                    locked_at=now,
+                    attempts=F('attempts') + 1,
+                )
+        for job in jobs:
+            job.status, job.worker, job.locked_at = MediaJob.RUNNING, worker, now
+            job.attempts += 1
+        return jobs
+
+
+class MediaJob(models.Model):
+    """
+    Deferred post-processing of a stored media file (checksum, page count,
+    dimensions, duration, thumbnails).
+
+    A job is identified by the media row and its file name, so saving the same
+    file twice never queues the work twice. Jobs are picked up by
+    ``manage.py run_media_worker``.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    )
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    target = GenericForeignKey('content_type', 'object_id')
+
+    file_name = models.CharField(
+        _('File name'),
+        max_length=255,
+        help_text=_('Stored file the job was queued for')
+    )
+    status = models.CharField(
+        _('Status'),
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(_('Attempts'), default=0)
+    max_attempts = models.PositiveSmallIntegerField(_('Max attempts'), default=3)
+    last_error = models.TextField(_('Last error'), blank=True)
+
+    run_after = models.DateTimeField(_('Run after'), default=timezone.now)
+    worker = models.CharField(_('Worker'), max_length=100, blank=True)
+    locked_at = models.DateTimeField(_('Locked at'), null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = MediaJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Media job')
+        verbose_name_plural = _('Media jobs')
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id', 'file_name'],
+                name='unique_media_job_file'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='idx_media_job_runnable'),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type.model}:{self.object_id} ({self.status})"
+
+    def get_target(self):
+        """
+        Returns the media instance, or None when it was deleted since.
+        Uses the base manager so custom default managers cannot hide it.
+        """
+        model = self.content_type.model_class()
+        if model is None:
+            return None
+        return model._base_manager.filter(pk=self.object_id).first()
+
+    def mark_done(self) -> None:
+        self.status = self.DONE
+        self.last_error = ''
+        self.locked_at = None
+        self.save(update_fields=['status', 'last_error', 'locked_at', 'updated_at'])
+
+    def mark_failed(self, error: Exception) -> bool:
+        """
+        Records a failed attempt and schedules a retry with exponential backoff
+        (MEDIA_PROCESSING_RETRY_DELAY, doubled per attempt).
+
+        Returns:
+            bool: True if the job will be retried, False if it gave up.
+        """
+        self.last_error = f"{type(error).__name__}: {error}"
+        self.locked_at = None
+        retry = self.attempts < self.max_attempts
+        if retry:
+            delay = getattr(settings, 'MEDIA_PROCESSING_RETRY_DELAY', 30) * 2 ** max(self.attempts - 1, 0)
+            self.status = self.PENDING
+            self.run_after = timezone.now() + timedelta(seconds=delay)
+        else:
+            self.status = self.FAILED
+        self.save(update_fields=['status', 'last_error', 'locked_at', 'run_after', 'updated_at'])
+        return retry
+
+
+class StoredBlobQuerySet(models.QuerySet):
+
+    def register(self, checksum: str, name: str, size: int, metadata: dict = None) -> 'StoredBlob':
+        """
+        Records a newly written blob with one reference.
+
+        When an upload of the same content committed first, the reference is
+        added to that blob instead; the caller must then drop its own copy
+        (the returned blob's name differs from ``name``).
+        """
+        try:
+            with transaction.atomic():
+                return self.create(checksum=checksum, name=name, size=size,
+                                   metadata=metadata or {}, ref_count=1)
+        except IntegrityError:
+            self.filter(checksum=checksum).update(ref_count=F('ref_count') + 1)
+            return self.get(checksum=checksum)
+
+    def retain(self, name: str) -> bool:
+        """
+        Adds a reference to the blob stored under ``name``.
+
+        Returns:
+            bool: False if ``name`` is not a blob (e.g. a legacy upload path).
+        """
+        return bool(self.filter(name=name).update(ref_count=F('ref_count') + 1))
+
+    def release(self, name: str) -> bool:
+        """
+        Drops a reference to the blob stored under ``name``.
+
+        Returns:
+            bool: True when nothing references the file any more and it can be
+            deleted from storage. Files that are not blobs are never shared.
+        """
+        with transaction.atomic():
+            blob = self.select_for_update().filter(name=name).first()
+            if blob is None:
+                return True
+            if blob.ref_count > 1:
+                self.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return False
+            blob.delete()
+            return True
+
+
+class StoredBlob(models.Model):
+    """
+    A media file stored once under its SHA-256 checksum.
+
+    Media rows that upload the same content point their file field at the
+    same blob; ``ref_count`` tracks how many of them do, and the file is only
+    removed from storage when the last one lets go of it. ``metadata`` keeps
+    the extracted fields of the content (size, MIME type, dimensions, page
+    count, duration) so duplicate uploads skip the extraction entirely.
+    """
+
+    checksum = models.CharField(_('Checksum'), max_length=64, unique=True)
+    name = models.CharField(
+        _('Name'),
+        max_length=255,
+        unique=True,
+        help_text=_('Storage path of the blob')
+    )
+    size = models.BigIntegerField(_('Size'))
+    ref_count = models.PositiveIntegerField(_('References'), default=0)
+    metadata = models.JSONField(_('Metadata'), default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = StoredBlobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Stored blob')
+        verbose_name_plural = _('Stored blobs')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    def remember_metadata(self, values: dict) -> None:
+        """Merges extracted field values into the shared metadata."""
+        merged = {**self.metadata, **values}
+        if merged != self.metadata:
+            self.metadata = merged
+            type(self).objects.filter(pk=self.pk).update(metadata=merged)
+
+
+class UploadSessionQuerySet(models.QuerySet):
+
+    def expired(self):
+        """Sessions older than CHUNKED_UPLOAD_EXPIRY that were never finished."""
+        age = timedelta(seconds=getattr(settings, 'CHUNKED_UPLOAD_EXPIRY', 24 * 60 * 60))
+        return self.filter(status=UploadSession.UPLOADING, created_at__lt=timezone.now() - age)
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload: the client announces the file, sends fixed size
+    chunks in any order (and in parallel), then finalizes it.
+
+    Chunks are written as separate files under FILE_UPLOAD_TEMP_DIR, so a
+    chunk can be retried or resumed after a broken connection without
+    holding anything in memory. Finalizing concatenates them into one file,
+    hashing it on the way, and hands it to the target media model.
+    """
+
+    UPLOADING = 'uploading'
+    COMPLETE = 'complete'
+
+    STATUS_CHOICES = (
+        (UPLOADING, _('Uploading')),
+        (COMPLETE, _('Complete')),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    file_name = models.CharField(_('File name'), max_length=255)
+    size = models.BigIntegerField(_('Size'))
+    chunk_size = models.PositiveIntegerField(_('Chunk size'))
+
+    target_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    fields = models.JSONField(_('Fields'), default=dict, blank=True,
+                              help_text=_('Field values of the media row created on finalize'))
+    object_id = models.PositiveBigIntegerField(null=True, blank=True)
+
+    status = models.CharField(_('Status'), max_length=10, choices=STATUS_CHOICES, default=UPLOADING)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = UploadSessionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Upload session')
+        verbose_name_plural = _('Upload sessions')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+    @property
+    def chunk_count(self) -> int:
+        return max(1, -(-self.size // self.chunk_size))
+
+    @property
+    def directory(self) -> str:
+        root = getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None) or tempfile.gettempdir()
+        return os.path.join(root, 'chunked', str(self.pk))
+
+    def chunk_path(self, index: int) -> str:
+        return os.path.join(self.directory, f'{index:06d}.part')
+
+    @property
+    def assembled_path(self) -> str:
+        return os.path.join(self.directory, 'assembled')
+
+    def chunk_length(self, index: int) -> int:
+        """Expected length of a chunk; only the last one may be shorter."""
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def received_chunks(self) -> list:
+        """Indexes of the chunks stored so far."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[:-5]) for name in names if name.endswith('.part'))
+
+    def write_chunk(self, offset: int, stream, length: int) -> int:
+        """
+        Stores the chunk starting at ``offset``, streamed from ``stream``.
+
+        The chunk is written to a scratch file and renamed into place, so a
+        retried or concurrent upload of the same chunk never leaves it torn.
+
+        Returns:
+            int: Index of the stored chunk.
+
+        Raises:
+            ValueError: If the offset or length does not match a chunk.
+        """
+        if offset % self.chunk_size or not 0 <= offset < self.size:
+            raise ValueError(f"Offset {offset} is not the start of a chunk")
+        index = offset // self.chunk_size
+        if length != self.chunk_length(index):
+            raise ValueError(f"Chunk {index} must be {self.chunk_length(index)} bytes, got {length}")
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.chunk_path(index)
+        scratch = f'{path}.{uuid.uuid4().hex}'
+        written = 0
+        try:
+            with open(scratch, 'wb') as part:
+                while written < length:
+                    data = stream.read(min(get_chunk_size(), length - written))
+                    if not data:
+                        break
+                    part.write(data)
+                    written += len(data)
+            if written != length:
+                raise ValueError(f"Chunk {index} ended after {written} of {length} bytes")
+            os.replace(scratch, path)
+        finally:
+            if os.path.exists(scratch):
+                os.unlink(scratch)
+        return index
+
+    def missing_chunks(self) -> list:
+        received = set(self.received_chunks())
+        return [index for index in range(self.chunk_count) if index not in received]
+
+    def assemble(self) -> AssembledUploadedFile:
+        """
+        Concatenates the chunks into one file and computes its size, checksum
+        and MIME type in the same pass, so the file is never read again. The
+        chunks are kept until ``discard()``.
+
+        Raises:
+            ValueError: If chunks are missing.
+        """
+        missing = self.missing_chunks()
+        if missing:
+            raise ValueError(f"Missing chunks: {missing[:10]}")
+        path = self.assembled_path
+        extractor = StreamingMetadataExtractor(name=self.file_name, expected_size=self.size)
+        with open(path, 'wb') as assembled:
+            for index in range(self.chunk_count):
+                with open(self.chunk_path(index), 'rb') as part:
+                    for data in iter(lambda: part.read(extractor.chunk_size), b''):
+                        extractor.update(data)
+                        assembled.write(data)
+        metadata = extractor.get_metadata()
+        return AssembledUploadedFile(path, self.file_name, metadata['mime_type'], metadata)
+
+    def discard_assembled(self) -> None:
+        """Removes the assembled file, when it was not moved into storage."""
+        try:
+            os.unlink(self.assembled_path)
+        except FileNotFoundError:
+            pass
+
+    def discard(self) -> None:
+        """Removes the chunks and scratch files from disk."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class ImageRenditionQuerySet(models.QuerySet):
+
+    def for_sources(self, sources) -> dict:
+        """Renditions of several source files in one query, grouped by source name."""
+        grouped = {source: [] for source in sources}
+        for rendition in self.filter(source__in=grouped):
+            grouped[rendition.source].append(rendition)
+        return grouped
+
+    def generate(self, source: str, widths=None, formats=None, storage=None) -> list:
+        """
+        Encodes and stores the missing renditions of an image.
+
+        The source is decoded once for all sizes. Widths larger than the
+        source are skipped and vector images (SVG) get no renditions.
+
+        Args:
+            source: Storage name of the original image
+            widths: Widths to produce (settings.IMAGE_RENDITION_WIDTHS)
+            formats: Formats to produce (settings.IMAGE_RENDITION_FORMATS)
+            storage: Storage holding the source and the renditions
+
+        Returns:
+            list: Every rendition of the source
+        """
+        storage = storage or default_storage
+        widths = widths or get_rendition_widths()
+        formats = formats or get_rendition_formats()
+        existing = set(self.filter(source=source).values_list('width', 'format'))
+        rows = []
+        with open_ranged(source, storage) as file_object:
+            try:
+                info = probe_image(file_object, name=source)
+            except ImageProbeError as e:
+                logger.warning(f"No renditions for {source}: {e}")
+                return []
+            if info.format == 'svg':
+                return []
+            planned = [width for width in plan_widths(info.display_size[0], widths)
+                       if any((width, image_format) not in existing for image_format in formats)]
+            for encoded in ImageResizer(file_object, name=source).encode(planned, formats):
+                if (encoded.width, encoded.format) in existing:
+                    continue
+                name = encoded.name
+                if not storage.exists(name):
+                    name = storage.save(name, ContentFile(encoded.content))
+                rows.append(self.model(source=source, width=encoded.width, height=encoded.height,
+                                       format=encoded.format, file=name, size=len(encoded.content)))
+        self.bulk_create(rows, ignore_conflicts=True)
+        return list(self.filter(source=source))
+
+    def delete_for(self, source: str, storage=None) -> None:
+        """Deletes the renditions of a source that is gone, with their files."""
+        storage = storage or default_storage
+        names = set(self.filter(source=source).values_list('file', flat=True))
+        self.filter(source=source).delete()
+        # Identical sources stored under different names share rendition files.
+        shared = set(self.filter(file__in=names).values_list('file', flat=True))
+        for name in names - shared:
+            storage.delete(name)
+        ImageDiskCache().purge(source)
+
+
+class ImageRendition(models.Model):
+    """
+    A resized, re-encoded copy of an image (see ResponsiveImageMixin).
+
+    Renditions are keyed by the storage name of the original, so duplicate
+    uploads (which share a blob) share their renditions. Rendition files are
+    named after a hash of their content and never change, so they can be
+    served with a far future expiry.
+    """
+
+    AVIF = 'avif'
+    WEBP = 'webp'
+    JPEG = 'jpeg'
+
+    FORMAT_CHOICES = (
+        (AVIF, 'AVIF'),
+        (WEBP, 'WebP'),
+        (JPEG, 'JPEG'),
+    )
+
+    source = models.CharField(_('Source'), max_length=255, help_text=_('Storage path of the original image'))
+    width = models.PositiveIntegerField(_('Width'))
+    height = models.PositiveIntegerField(_('Height'))
+    format = models.CharField(_('Format'), max_length=4, choices=FORMAT_CHOICES)
+    file = models.FileField(_('File'), max_length=255)
+    size = models.PositiveIntegerField(_('Size'))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ImageRenditionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Image rendition')
+        verbose_name_plural = _('Image renditions')
+        ordering = ['source', 'width']
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'width', 'format'], name='unique_image_rendition'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.width}w {self.format}"
+
+    @property
+    def mime_type(self) -> str:
+        return IMAGE_FORMATS[self.format][1]
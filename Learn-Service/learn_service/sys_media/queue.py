@@ -0,0 +1,113 @@
+import logging
+from functools import lru_cache
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import MediaJob
+
+logger = logging.getLogger('models')
+
+
+class BaseBroker:
+    """
+    Hands media post-processing off to somewhere other than the request.
+
+    Brokers are selected with settings.MEDIA_PROCESSING_BROKER (a dotted path).
+    Setting it to None keeps the processing inline in ``save()``.
+    """
+
+    def enqueue(self, instance) -> Optional[MediaJob]:
+        raise NotImplementedError("enqueue must be implemented in a subclass")
+
+
+class DatabaseBroker(BaseBroker):
+    """
+    Stores jobs in the MediaJob table; ``manage.py run_media_worker`` runs them.
+
+    Media models enqueue inside the transaction that saves the row (see
+    AbstractFileModel.save), so a worker never sees a job for a row that
+    was rolled back, nor a pending row without its job.
+    """
+
+    def enqueue(self, instance) -> MediaJob:
+        content_type = ContentType.objects.get_for_model(instance, for_concrete_model=False)
+        job, created = MediaJob.objects.get_or_create(
+            content_type=content_type,
+            object_id=instance.pk,
+            file_name=instance.file.name,
+            defaults={'max_attempts': getattr(settings, 'MEDIA_PROCESSING_MAX_ATTEMPTS', 3)},
+        )
+        if not created and job.status in (MediaJob.DONE, MediaJob.FAILED):
+            # Same file queued again (e.g. resaved after a failure): start over.
+            job.status = MediaJob.PENDING
+            job.attempts = 0
+            job.last_error = ''
+            job.save(update_fields=['status', 'attempts', 'last_error', 'updated_at'])
+        return job
+
+
+class InProcessBroker(DatabaseBroker):
+    """
+    Records the job like DatabaseBroker and runs it in the current process as
+    soon as the transaction commits. Meant for tests and local development.
+    """
+
+    def enqueue(self, instance) -> MediaJob:
+        job = super().enqueue(instance)
+        transaction.on_commit(lambda: run_pending_job(job.pk))
+        return job
+
+
+@lru_cache(maxsize=None)
+def _load_broker(path: str) -> BaseBroker:
+    return import_string(path)()
+
+
+def get_broker() -> Optional[BaseBroker]:
+    """
+    Returns the configured broker, or None when processing runs inline.
+    """
+    path = getattr(settings, 'MEDIA_PROCESSING_BROKER', None)
+    return _load_broker(path) if path else None
+
+
+def run_pending_job(job_id: int, worker: str = 'in-process') -> None:
+    """Claims a single job by id and runs it (used by InProcessBroker)."""
+    for job in MediaJob.objects.filter(pk=job_id).claim(worker):
+        run_job(job)
+
+
+def run_job(job: MediaJob) -> bool:
+    """
+    Runs a claimed job against its media instance.
+
+    Jobs for deleted rows or for a file that has since been replaced are
+    closed without doing anything; a failing job is retried with backoff
+    until ``max_attempts`` is reached, after which the media row is marked
+    failed.
+
+    Returns:
+        bool: True if the job finished (or was obsolete), False if it failed.
+    """
+    instance = job.get_target()
+    if instance is None or instance.file.name != job.file_name:
+        logger.info(f"Skipping obsolete media job {job.pk}")
+        job.mark_done()
+        return True
+
+    model = type(instance)
+    model._base_manager.filter(pk=instance.pk).update(processing_status=model.PROCESSING)
+    try:
+        instance.process_media()
+    except Exception as e:
+        logger.exception(f"Media job {job.pk} failed for {job.file_name}")
+        if not job.mark_failed(e):
+            model._base_manager.filter(pk=instance.pk).update(processing_status=model.FAILED)
+        return False
+
+    job.mark_done()
+    return True
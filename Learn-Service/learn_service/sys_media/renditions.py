@@ -0,0 +1,111 @@
+from typing import Iterable, List, Optional, Tuple
+
+from django.core import signing
+from django.urls import reverse
+
+from utils.files.renditions import IMAGE_FORMATS, get_rendition_formats, get_rendition_widths, plan_widths
+from .models import ImageRendition
+
+RESIZE_SALT = 'sys_media.image-resize'
+
+
+def get_resize_url(source: str, width: int, image_format: str) -> str:
+    """
+    URL of the on-demand resize endpoint for a stored image. The source is
+    signed, so only images the site links to can be resized.
+    """
+    token = signing.dumps(source, salt=RESIZE_SALT, compress=True)
+    return reverse('sys_media:image-resize', args=[token, width, image_format])
+
+
+def load_resize_source(token: str) -> Optional[str]:
+    """Storage name signed by ``get_resize_url``, or None for a forged token."""
+    try:
+        return signing.loads(token, salt=RESIZE_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def prefetch_renditions(instances: Iterable['ResponsiveImageMixin']) -> None:
+    """Loads the renditions of many images (a catalog page, an admin list) in one query."""
+    instances = [instance for instance in instances if instance.get_rendition_source()]
+    grouped = ImageRendition.objects.for_sources({instance.get_rendition_source() for instance in instances})
+    for instance in instances:
+        source = instance.get_rendition_source()
+        instance._renditions_cache = (source, grouped[source])
+
+
+class ResponsiveImageMixin:
+    """
+    Resized WebP/AVIF/JPEG copies of a model's image with ``srcset`` helpers.
+
+    Renditions are generated by the media worker (``generate_renditions``)
+    and recorded in ImageRendition. Until they exist, the helpers point at
+    the on-demand resize endpoint, so pages never fall back to the original.
+    SVG images are served as they are.
+    """
+
+    # Image field the renditions are made from.
+    RENDITION_FIELD = 'file'
+    # Widths to produce, defaults to settings.IMAGE_RENDITION_WIDTHS.
+    RENDITION_WIDTHS: Optional[Tuple[int, ...]] = None
+
+    def get_rendition_source(self) -> Optional[str]:
+        name = getattr(getattr(self, self.RENDITION_FIELD, None), 'name', None)
+        if not name or name.lower().endswith('.svg'):
+            return None
+        return name
+
+    def get_rendition_widths(self) -> List[int]:
+        widths = self.RENDITION_WIDTHS or get_rendition_widths()
+        source_width = getattr(self, 'width', None)
+        return plan_widths(source_width, widths) if source_width else sorted(widths)
+
+    def generate_renditions(self) -> List[ImageRendition]:
+        source = self.get_rendition_source()
+        renditions = ImageRendition.objects.generate(source, widths=self.RENDITION_WIDTHS) if source else []
+        self._renditions_cache = (source, renditions)
+        return renditions
+
+    def get_renditions(self, image_format: Optional[str] = None) -> List[ImageRendition]:
+        """Stored renditions, narrowest first (cached on the instance)."""
+        source = self.get_rendition_source()
+        cached = getattr(self, '_renditions_cache', None)
+        if cached is None or cached[0] != source:
+            renditions = list(ImageRendition.objects.filter(source=source)) if source else []
+            self._renditions_cache = cached = (source, renditions)
+        renditions = sorted(cached[1], key=lambda rendition: rendition.width)
+        if image_format is not None:
+            renditions = [rendition for rendition in renditions if rendition.format == image_format]
+        return renditions
+
+    def srcset(self, image_format: str = 'webp') -> str:
+        """``srcset`` attribute value for one format."""
+        source = self.get_rendition_source()
+        if not source:
+            return ''
+        renditions = self.get_renditions(image_format)
+        if renditions:
+            return ', '.join(f"{rendition.file.url} {rendition.width}w" for rendition in renditions)
+        return ', '.join(f"{get_resize_url(source, width, image_format)} {width}w"
+                         for width in self.get_rendition_widths())
+
+    def rendition_url(self, width: int, image_format: str = 'jpeg') -> str:
+        """URL of the narrowest image at least ``width`` pixels wide."""
+        source = self.get_rendition_source()
+        image = getattr(self, self.RENDITION_FIELD)
+        if not source:
+            return image.url if image else ''
+        renditions = self.get_renditions(image_format)
+        for rendition in renditions:
+            if rendition.width >= width:
+                return rendition.file.url
+        source_width = getattr(self, 'width', None)
+        if renditions and source_width and renditions[-1].width >= source_width:
+            return renditions[-1].file.url
+        return get_resize_url(source, width, image_format)
+
+    def picture_sources(self) -> List[Tuple[str, str]]:
+        """(MIME type, srcset) pairs for ``<source>`` elements, best compression first."""
+        return [(IMAGE_FORMATS[image_format][1], self.srcset(image_format))
+                for image_format in get_rendition_formats() if image_format != 'jpeg']
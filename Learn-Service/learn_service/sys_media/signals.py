@@ -1,9 +1,30 @@
 from django.db.models.signals import (
     pre_save, post_save, pre_delete, post_delete
 )
+from django.apps import apps
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model  # Get the custom user model if using one
 
 User = get_user_model()
 
 
+def get_media_models() -> list:
+    """Every installed media model (subclass of AbstractFileModel)."""
+    from .abstract import AbstractFileModel
+    return [model for model in apps.get_models() if issubclass(model, AbstractFileModel)]
+
+
+def release_media_files(sender, instance, **kwargs):
+    """
+    Drops the blob reference (and stream, renditions) of a deleted media
+    row. As a signal it also runs for the rows removed by a cascade, which
+    Model.delete() is not called for.
+    """
+    instance.release_files()
+
+
+def connect_media_receivers():
+    # One receiver per media model: a receiver for every sender would disable
+    # fast (signal-less) deletes of all models
+    for model in get_media_models():
+        post_delete.connect(release_media_files, sender=model, dispatch_uid=f'release_media_files.{model._meta.label}')
@@ -0,0 +1,43 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def srcset(image, image_format='webp'):
+    """
+    ``srcset`` value of an image model using ResponsiveImageMixin.
+
+    Usage:
+        <img src="{% rendition_url course_thumbnail 640 %}"
+             srcset="{% srcset course_thumbnail 'jpeg' %}" sizes="(max-width: 600px) 100vw, 320px">
+    """
+    return image.srcset(image_format) if image else ''
+
+
+@register.simple_tag
+def rendition_url(image, width, image_format='jpeg'):
+    """URL of the narrowest rendition at least ``width`` pixels wide."""
+    return image.rendition_url(int(width), image_format) if image else ''
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', width=640, alt='', css_class='', loading='lazy'):
+    """
+    ``<picture>`` with AVIF/WebP sources and a JPEG ``<img>`` fallback.
+
+    Usage:
+        {% responsive_image thumbnail sizes="(max-width: 600px) 100vw, 320px" width=320 alt=course.title %}
+    """
+    if not image:
+        return ''
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime_type, value, sizes) for mime_type, value in image.picture_sources() if value),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async"></picture>',
+        sources, image.rendition_url(int(width)), image.srcset('jpeg'), sizes,
+        alt or getattr(image, 'alt_text', None) or '', css_class, loading,
+    )
@@ -9,4 +9,484 @@
 # @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
 # class FileTests(TestCase):
 #     def setUp(self):
-#         self.storage = default_storage._wrapped  # Access real storage
\ No newline at end of file
+#         self.storage = default_storage._wrapped  # Access real storage
+
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+from django.db import DatabaseError
+from django.template import Context, Template
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from PIL import Image
+from users.models import Profile, User
+from courses.models import Category, Course, Module, Lesson
+from sys_media.courses import CourseDocument, CourseThumbnail, ModuleVideoLesson
+from sys_media.models import ImageRendition, MediaJob, StoredBlob, UploadSession
+from sys_media.renditions import get_resize_url
+from sys_media.queue import run_job
+from utils.tests.duration import mp4_bytes
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MEDIA_PROCESSING_BROKER=None)
+class MediaSavePipelineTests(TestCase):
+    """
+    The media save pipeline writes each row once and never re-fetches it.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(email="instructor@example.com", password="secret",
+                                        first_name="Ada", last_name="Lovelace")
+        category = Category.objects.create(name="Programming")
+        self.course = Course.objects.create(title="Django", category=category, instructor=user,
+                                            short_description="short", description="long")
+
+    def test_create_is_a_single_insert(self):
+        document = CourseDocument(course=self.course, title="Syllabus",
+                                  file=SimpleUploadedFile("syllabus.txt", b"one\ntwo\nthree\n"))
+        # 1. StoredBlob lookup by checksum: the content is not stored yet
+        # 2. SAVEPOINT: the row and its blob reference are saved together
+        # 3. Slug uniqueness lookup
+        # 4. The INSERT of the document, metadata included
+        # 5-7. StoredBlob.register: INSERT of the blob with ref_count=1, in a savepoint
+        # 8. RELEASE SAVEPOINT
+        with self.assertNumQueries(8):
+            document.save()
+        document.refresh_from_db()
+        self.assertEqual(document.file_size, 14)
+        self.assertEqual(document.page_count, 3)
+        self.assertEqual(len(document.checksum), 64)
+
+    def test_update_uses_loaded_snapshot(self):
+        document = CourseDocument.objects.create(course=self.course, title="Syllabus",
+                                                 file=SimpleUploadedFile("syllabus.txt", b"one\n"))
+        document = CourseDocument.objects.get(pk=document.pk)
+        old_name = document.file.name
+        document.file = SimpleUploadedFile("syllabus-v2.txt", b"one\ntwo\n")
+        # 1. StoredBlob lookup by checksum: the new content is not stored yet
+        # 2. SAVEPOINT: the row, its blob reference and the old release are saved together
+        # 3. The UPDATE of the document, from the snapshot taken at load (no SELECT)
+        # 4-6. StoredBlob.register: INSERT of the new blob with ref_count=1, in a savepoint
+        # 7-10. StoredBlob.release of the old file, in a savepoint: SELECT ... FOR UPDATE
+        #       of its blob, then DELETE (it was the last reference)
+        # 11. RELEASE SAVEPOINT; the old file leaves storage on commit
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(11):
+            document.save()
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertEqual(document.page_count, 2)
+
+    def test_image_size_from_header_with_exif_orientation(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # phone held upright: stored landscape, displayed portrait
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 48)).save(buffer, 'JPEG', exif=exif.tobytes())
+        thumbnail = CourseThumbnail(course=self.course, title="Cover",
+                                    file=SimpleUploadedFile("cover.jpg", buffer.getvalue()))
+        with patch('sys_media.abstract.Image.open') as image_open:
+            thumbnail.save()
+        image_open.assert_not_called()
+        self.assertEqual((thumbnail.width, thumbnail.height), (48, 64))
+        self.assertEqual(thumbnail.content_type, 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(),
+                   MEDIA_PROCESSING_BROKER='sys_media.queue.DatabaseBroker',
+                   MEDIA_PROCESSING_RETRY_DELAY=0)
+class MediaProcessingQueueTests(TestCase):
+    """
+    Saving queues the heavy extraction instead of running it in the request.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(email="worker@example.com", password="secret",
+                                        first_name="Grace", last_name="Hopper")
+        category = Category.objects.create(name="Systems")
+        self.course = Course.objects.create(title="Queues", category=category, instructor=user,
+                                            short_description="short", description="long")
+
+    def create_document(self, name="notes.txt", content=b"a\nb\nc\n"):
+        return CourseDocument.objects.create(course=self.course, title="Notes",
+                                             file=SimpleUploadedFile(name, content))
+
+    def test_save_defers_extraction(self):
+        document = self.create_document()
+        self.assertEqual(document.processing_status, CourseDocument.PENDING)
+        self.assertEqual(document.file_size, 6)
+        self.assertEqual(len(document.checksum), 64)
+        self.assertIsNone(document.page_count)
+        self.assertEqual(MediaJob.objects.filter(status=MediaJob.PENDING).count(), 1)
+
+    def test_failed_enqueue_rolls_the_row_back(self):
+        with patch('sys_media.queue.DatabaseBroker.enqueue', side_effect=DatabaseError("queue")):
+            with self.assertRaises(DatabaseError):
+                self.create_document()
+        self.assertFalse(CourseDocument.objects.exists())
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_worker_fills_metadata(self):
+        document = self.create_document()
+        jobs = MediaJob.objects.claim("test")
+        self.assertEqual(len(jobs), 1)
+        self.assertTrue(run_job(jobs[0]))
+        document.refresh_from_db()
+        self.assertEqual(document.processing_status, CourseDocument.READY)
+        self.assertEqual(document.page_count, 3)
+        self.assertEqual(len(document.checksum), 64)
+        self.assertEqual(MediaJob.objects.get().status, MediaJob.DONE)
+        # Nothing left to claim, and resaving does not queue the file again.
+        document.title = "Renamed"
+        document.save()
+        self.assertEqual(MediaJob.objects.claim("test"), [])
+
+    def test_same_checksum_reuses_metadata(self):
+        first = self.create_document()
+        run_job(MediaJob.objects.claim("test")[0])
+        with patch.object(CourseDocument, 'extract_type_metadata') as extract:
+            second = self.create_document(name="copy.txt")
+        extract.assert_not_called()
+        # Already processed content is ready at once, nothing is queued.
+        self.assertEqual(MediaJob.objects.claim("test"), [])
+        second.refresh_from_db()
+        self.assertEqual(second.processing_status, CourseDocument.READY)
+        self.assertEqual(second.page_count, 3)
+        self.assertEqual(second.checksum, CourseDocument.objects.get(pk=first.pk).checksum)
+
+    def test_failures_are_retried_then_marked_failed(self):
+        document = self.create_document()
+        with patch.object(CourseDocument, 'process_media', side_effect=OSError("disk")):
+            for _ in range(3):
+                self.assertFalse(run_job(MediaJob.objects.claim("test")[0]))
+        job = MediaJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (MediaJob.FAILED, 3))
+        self.assertIn("disk", job.last_error)
+        document.refresh_from_db()
+        self.assertEqual(document.processing_status, CourseDocument.FAILED)
+
+    def test_pending_twins_share_one_stream(self):
+        module = Module.objects.create(course=self.course, title="Intro", order=1)
+        lesson = Lesson.objects.create(module=module, title="Welcome", order=1)
+        content = mp4_bytes(1000, 5000)
+        videos = [ModuleVideoLesson.objects.create(lesson=lesson, title=name,
+                                                   file=SimpleUploadedFile(name, content))
+                  for name in ("clip.mp4", "copy.mp4")]
+        self.assertEqual(MediaJob.objects.filter(status=MediaJob.PENDING).count(), 2)
+
+        def package(video):
+            if not video.hls_manifest:
+                video.hls_manifest = f"{video.stream_directory}/{video.pk}/master.m3u8"
+
+        with patch.object(ModuleVideoLesson, 'extract_deferred_metadata', autospec=True,
+                          side_effect=package) as extract:
+            for _ in videos:
+                self.assertTrue(run_job(MediaJob.objects.claim("test")[0]))
+        self.assertEqual(extract.call_count, 2)
+        manifests = {video.hls_manifest for video in ModuleVideoLesson.objects.filter(pk__in=[v.pk for v in videos])}
+        # The second one processed plays the stream of the first one
+        self.assertEqual(len(manifests), 1)
+
+    @override_settings(MEDIA_PROCESSING_BROKER='sys_media.queue.InProcessBroker')
+    def test_in_process_broker_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            document = self.create_document()
+        document.refresh_from_db()
+        self.assertEqual(document.processing_status, CourseDocument.READY)
+        self.assertEqual(document.page_count, 3)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MEDIA_PROCESSING_BROKER=None)
+class ContentAddressedStorageTests(TestCase):
+    """
+    Identical uploads share one stored blob, counted by reference.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(email="author@example.com", password="secret",
+                                        first_name="Edsger", last_name="Dijkstra")
+        category = Category.objects.create(name="Storage")
+        self.course = Course.objects.create(title="Blobs", category=category, instructor=user,
+                                            short_description="short", description="long")
+
+    def create_document(self, name, content=b"same\ncontent\n"):
+        return CourseDocument.objects.create(course=self.course, title=name,
+                                             file=SimpleUploadedFile(name, content))
+
+    def test_duplicate_upload_is_not_written_again(self):
+        first = self.create_document("a.txt")
+        with patch.object(default_storage, 'save') as save, \
+                patch.object(CourseDocument, 'extract_type_metadata') as extract:
+            second = self.create_document("b.txt")
+        save.assert_not_called()
+        extract.assert_not_called()
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertEqual(second.original_filename, "b.txt")
+        self.assertEqual(second.page_count, 2)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+
+    def test_blob_is_deleted_with_its_last_reference(self):
+        first = self.create_document("a.txt")
+        second = self.create_document("b.txt")
+        name = first.file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_cascade_delete_releases_the_blob(self):
+        name = self.create_document("a.txt").file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_replacing_a_shared_file_keeps_the_blob(self):
+        first = self.create_document("a.txt")
+        second = self.create_document("b.txt")
+        second.file = SimpleUploadedFile("c.txt", b"other\n")
+        second.save()
+        self.assertTrue(default_storage.exists(first.file.name))
+        self.assertEqual(StoredBlob.objects.get(name=first.file.name).ref_count, 1)
+        self.assertEqual(StoredBlob.objects.get(name=second.file.name).ref_count, 1)
+
+    def test_failed_save_keeps_the_old_reference(self):
+        first = self.create_document("a.txt")
+        second = CourseDocument.objects.get(pk=self.create_document("b.txt").pk)
+        second.file = SimpleUploadedFile("c.txt", b"other\n")
+        with patch('django.db.models.Model.save_base', side_effect=DatabaseError("disk full")):
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(DatabaseError):
+                second.save()
+        self.assertEqual(StoredBlob.objects.get(name=first.file.name).ref_count, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(first.file.name))
+
+    def test_sweep_deletes_blobs_no_row_uses(self):
+        lost = self.create_document("a.txt")
+        kept = self.create_document("b.txt", b"kept\n")
+        # Deleted without signals: the reference is never released
+        CourseDocument.objects.filter(pk=lost.pk)._raw_delete(CourseDocument.objects.db)
+        StoredBlob.objects.filter(name=kept.file.name).update(ref_count=3)
+        output = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('sweep_blobs', stdout=output)
+        self.assertIn("Deleted 1 unused blob(s), 1 reference count(s) corrected", output.getvalue())
+        self.assertFalse(default_storage.exists(lost.file.name))
+        self.assertEqual(list(StoredBlob.objects.values_list('name', 'ref_count')), [(kept.file.name, 1)])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MEDIA_PROCESSING_BROKER=None)
+class DurationRollupTests(TestCase):
+    """
+    Video durations are read from the header and rolled up to lesson and course.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(email="editor@example.com", password="secret",
+                                        first_name="Alan", last_name="Turing")
+        category = Category.objects.create(name="Media")
+        self.course = Course.objects.create(title="Video", category=category, instructor=user,
+                                            short_description="short", description="long")
+        module = Module.objects.create(course=self.course, title="Intro", order=1)
+        self.lesson = Lesson.objects.create(module=module, title="Welcome", order=1)
+
+    def add_video(self, seconds):
+        return ModuleVideoLesson.objects.create(
+            lesson=self.lesson, title=f"Clip {seconds}",
+            file=SimpleUploadedFile(f"clip{seconds}.mp4", mp4_bytes(1000, seconds * 1000)),
+        )
+
+    def test_durations_roll_up(self):
+        first = self.add_video(90)
+        self.add_video(30)
+        self.assertEqual(first.duration, 90)
+        self.lesson.refresh_from_db()
+        self.course.refresh_from_db()
+        self.assertEqual(self.lesson.duration.total_seconds(), 120)
+        self.assertEqual(self.course.duration.total_seconds(), 120)
+
+        first.delete()
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.duration.total_seconds(), 30)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), FILE_UPLOAD_TEMP_DIR=tempfile.mkdtemp(),
+                   MEDIA_PROCESSING_BROKER=None, CHUNKED_UPLOAD_CHUNK_SIZE=4)
+class ChunkedUploadTests(TestCase):
+    """
+    Resumable uploads accept chunks in any order and create the media row.
+    """
+
+    content = b"one\ntwo\nthree\n"
+
+    def setUp(self):
+        user = User.objects.create_superuser(email="admin@example.com", password="secret",
+                                             first_name="Barbara", last_name="Liskov")
+        category = Category.objects.create(name="Uploads")
+        self.course = Course.objects.create(title="Chunks", category=category, instructor=user,
+                                            short_description="short", description="long")
+        self.client.force_login(user)
+
+    def start(self, **overrides):
+        payload = {'filename': 'notes.txt', 'size': len(self.content), 'target': 'courses.coursedocument',
+                   'fields': {'course': self.course.pk, 'title': 'Notes'}, **overrides}
+        return self.client.post('/uploads/', json.dumps(payload), content_type='application/json')
+
+    def send(self, url, offset):
+        return self.client.patch(url, self.content[offset:offset + 4],
+                                 content_type='application/offset+octet-stream',
+                                 HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunks_in_any_order_are_assembled(self):
+        session = self.start().json()
+        self.assertEqual(session['chunk_count'], 4)
+        for offset in (12, 4, 0):
+            self.assertEqual(self.send(session['url'], offset).status_code, 204)
+        self.assertEqual(self.client.get(session['url']).json()['received'], [0, 1, 3])
+        self.assertEqual(self.client.post(session['finalize_url']).status_code, 409)
+
+        self.send(session['url'], 8)
+        with patch('sys_media.abstract.StreamingMetadataExtractor') as extractor:
+            response = self.client.post(session['finalize_url'])
+        extractor.assert_not_called()  # hashed while assembling, not read again
+        self.assertEqual(response.status_code, 201)
+        document = CourseDocument.objects.get(pk=response.json()['id'])
+        self.assertEqual(document.checksum, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(document.page_count, 3)
+        self.assertEqual(document.original_filename, 'notes.txt')
+        upload = UploadSession.objects.get()
+        self.assertEqual(upload.status, UploadSession.COMPLETE)
+        self.assertFalse(os.path.exists(upload.directory))
+        # A second finalize finds the upload complete
+        self.assertEqual(self.client.post(session['finalize_url']).status_code, 404)
+
+    def test_rejected_file_keeps_its_chunks(self):
+        session = self.start(filename='notes.exe').json()
+        for offset in (0, 4, 8, 12):
+            self.send(session['url'], offset)
+        self.assertEqual(self.client.post(session['finalize_url']).status_code, 400)
+        upload = UploadSession.objects.get()
+        self.assertEqual(upload.status, UploadSession.UPLOADING)
+        self.assertEqual(upload.received_chunks(), [0, 1, 2, 3])
+        self.assertFalse(os.path.exists(upload.assembled_path))
+
+        self.assertEqual(self.client.delete(session['url']).status_code, 204)
+        self.assertFalse(os.path.exists(upload.directory))
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_misaligned_chunk_is_rejected(self):
+        session = self.start().json()
+        self.assertEqual(self.send(session['url'], 2).status_code, 409)
+        response = self.client.patch(session['url'], b'xy', content_type='application/offset+octet-stream',
+                                     HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(response.status_code, 409)
+
+    def test_invalid_fields_fail_before_upload(self):
+        self.assertEqual(self.start(fields={'title': 'No course'}).status_code, 400)
+        self.assertEqual(self.start(target='users.user').status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), MEDIA_PROCESSING_BROKER='sys_media.queue.InProcessBroker',
+                   IMAGE_RENDITION_WIDTHS=(160, 320), IMAGE_RENDITION_FORMATS=('webp', 'jpeg'),
+                   IMAGE_RESIZE_CACHE_DIR=tempfile.mkdtemp())
+class ImageRenditionTests(TestCase):
+    """
+    Images get resized renditions and srcset helpers instead of serving originals.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(email="designer@example.com", password="secret",
+                                        first_name="Susan", last_name="Kare")
+        category = Category.objects.create(name="Design")
+        self.course = Course.objects.create(title="Icons", category=category, instructor=user,
+                                            short_description="short", description="long")
+
+    def image(self, size=(800, 600)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'green').save(buffer, 'JPEG')
+        return SimpleUploadedFile("cover.jpg", buffer.getvalue())
+
+    def create_thumbnail(self, size=(800, 600)):
+        with self.captureOnCommitCallbacks(execute=True):
+            thumbnail = CourseThumbnail.objects.create(course=self.course, title="Cover", file=self.image(size))
+        return CourseThumbnail.objects.get(pk=thumbnail.pk)
+
+    def test_worker_stores_renditions(self):
+        thumbnail = self.create_thumbnail()
+        renditions = thumbnail.get_renditions('webp')
+        self.assertEqual([(item.width, item.height) for item in renditions], [(160, 120), (320, 240)])
+        self.assertTrue(all(default_storage.exists(item.file.name) for item in renditions))
+        self.assertEqual(thumbnail.srcset('webp'),
+                         f"{renditions[0].file.url} 160w, {renditions[1].file.url} 320w")
+        self.assertEqual(thumbnail.rendition_url(200), thumbnail.get_renditions('jpeg')[1].file.url)
+
+    def test_duplicate_upload_shares_renditions(self):
+        first = self.create_thumbnail()
+        with patch.object(ImageRendition.objects, 'generate') as generate:
+            second = self.create_thumbnail()
+        generate.assert_not_called()
+        self.assertEqual(second.srcset('jpeg'), first.srcset('jpeg'))
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(ImageRendition.objects.count(), 4)
+        names = [item.file.name for item in second.get_renditions()]
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(ImageRendition.objects.exists())
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+    def test_replaced_avatar_keeps_the_default_picture(self):
+        default = default_storage.save("user_profile/default.png", self.image())
+        user = User.objects.create_user(email="avatar@example.com", password="secret",
+                                        first_name="Ada", last_name="Lovelace")
+        profile = Profile.objects.create(user=user)
+        profile.generate_renditions()
+        profile.profile_picture = self.image()
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertTrue(default_storage.exists(default))
+        self.assertEqual(ImageRendition.objects.count(), 4)  # the default's, shared by every profile
+
+        uploaded = profile.profile_picture.name
+        profile.generate_renditions()
+        profile.profile_picture = self.image()
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertFalse(default_storage.exists(uploaded))
+        self.assertFalse(ImageRendition.objects.filter(source=uploaded).exists())
+        self.assertEqual(ImageRendition.objects.count(), 4)
+
+    @override_settings(MEDIA_PROCESSING_BROKER=None)
+    def test_resize_endpoint(self):
+        thumbnail = CourseThumbnail.objects.create(course=self.course, title="Cover", file=self.image())
+        self.assertIn('/images/', thumbnail.srcset('webp'))  # not generated yet: resized on demand
+
+        response = self.client.get(get_resize_url(thumbnail.file.name, 320, 'webp'))
+        rendition = ImageRendition.objects.get()
+        self.assertRedirects(response, rendition.file.url, fetch_redirect_response=False)
+
+        response = self.client.get(get_resize_url(thumbnail.file.name, 250, 'jpeg'))
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.width, 256)  # rounded up to IMAGE_RESIZE_WIDTH_STEP
+        self.assertEqual(ImageRendition.objects.count(), 1)
+
+        self.assertEqual(self.client.get('/images/forged/320.webp').status_code, 404)
+
+    def test_responsive_image_tag(self):
+        thumbnail = self.create_thumbnail()
+        html = Template('{% load media_images %}{% responsive_image image sizes="320px" width=320 %}').render(
+            Context({'image': thumbnail}))
+        webp = thumbnail.get_renditions('webp')[1].file.url
+        self.assertIn(f'<source type="image/webp" srcset="{thumbnail.srcset("webp")}" sizes="320px">', html)
+        self.assertIn(webp, html)
+        self.assertNotIn(thumbnail.file.url, html)
@@ -0,0 +1,13 @@
+from django.urls import path
+from .views import ImageResizeView, UploadCreateView, UploadDetailView, UploadFinalizeView
+
+app_name = 'sys_media'
+
+urlpatterns = [
+    # Resumable chunked uploads
+    path('uploads/', UploadCreateView.as_view(), name='upload-create'),
+    path('uploads/<uuid:upload_id>/', UploadDetailView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:upload_id>/finalize/', UploadFinalizeView.as_view(), name='upload-finalize'),
+    # On-demand image resizing
+    path('images/<str:token>/<int:width>.<str:image_format>', ImageResizeView.as_view(), name='image-resize'),
+]
@@ -1,3 +1,240 @@
-from django.shortcuts import render
+import json
+import logging
 
-# Create your views here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.forms import modelform_factory
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
+from django.views import View
+
+from utils.files.backends import Image
+from utils.files.ranged import open_ranged
+from utils.files.renditions import (
+    IMAGE_FORMATS, ImageDiskCache, ImageResizer, get_rendition_formats, get_rendition_widths,
+)
+from .abstract import AbstractFileModel
+from .models import ImageRendition, UploadSession
+from .renditions import load_resize_source
+
+logger = logging.getLogger('models')
+
+
+def get_upload_target(label: str):
+    """
+    Returns the concrete media model for an ``app_label.model`` label, or
+    None when the label does not name one.
+    """
+    try:
+        model = apps.get_model(label)
+    except (LookupError, ValueError):
+        return None
+    if not issubclass(model, AbstractFileModel) or model._meta.abstract:
+        return None
+    return model
+
+
+def get_media_form(model, with_file: bool = True):
+    """ModelForm for every editable field of a media model (optionally without the file)."""
+    return modelform_factory(model, exclude=() if with_file else ('file',))
+
+
+def upload_status(session: UploadSession) -> dict:
+    received = session.received_chunks()
+    return {
+        'id': str(session.pk),
+        'size': session.size,
+        'chunk_size': session.chunk_size,
+        'chunk_count': session.chunk_count,
+        'received': received,
+        'url': reverse('sys_media:upload-detail', args=[session.pk]),
+        'finalize_url': reverse('sys_media:upload-finalize', args=[session.pk]),
+    }
+
+
+class UploadSessionMixin(LoginRequiredMixin):
+    raise_exception = True
+
+    def get_session(self, upload_id, lock: bool = False) -> UploadSession:
+        """The user's unfinished upload, locked until the transaction ends with ``lock``."""
+        sessions = UploadSession.objects.select_for_update() if lock else UploadSession.objects
+        return get_object_or_404(
+            sessions,
+            pk=upload_id,
+            user=self.request.user,
+            status=UploadSession.UPLOADING,
+        )
+
+
+class UploadCreateView(UploadSessionMixin, View):
+    """
+    Starts a resumable upload.
+
+    Body (JSON): {"filename": str, "size": int, "target": "courses.modulevideolesson",
+                  "fields": {"lesson": 1, "title": "..."}}
+    """
+
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+            file_name = str(data['filename'])
+            size = int(data['size'])
+            fields = dict(data.get('fields') or {})
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'filename, size and target are required'}, status=400)
+
+        model = get_upload_target(data.get('target', ''))
+        if model is None:
+            return JsonResponse({'error': 'Unknown upload target'}, status=400)
+        opts = model._meta
+        if not request.user.has_perm(f'{opts.app_label}.add_{opts.model_name}'):
+            return JsonResponse({'error': 'Permission denied'}, status=403)
+
+        max_size = getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', 10 * 1024 ** 3)
+        if not 0 < size <= max_size:
+            return JsonResponse({'error': f'Size must be between 1 and {max_size} bytes'}, status=400)
+
+        # Fail before any byte is sent when the row could not be created.
+        fields.pop('file', None)
+        form = get_media_form(model, with_file=False)(data=fields)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+
+        session = UploadSession.objects.create(
+            user=request.user,
+            file_name=file_name,
+            size=size,
+            chunk_size=getattr(settings, 'CHUNKED_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024),
+            target_type=ContentType.objects.get_for_model(model, for_concrete_model=False),
+            fields=fields,
+        )
+        response = JsonResponse(upload_status(session), status=201)
+        response['Location'] = reverse('sys_media:upload-detail', args=[session.pk])
+        return response
+
+
+class UploadDetailView(UploadSessionMixin, View):
+    """
+    GET: resume information (received chunk indexes).
+    PATCH: one chunk as the raw body, starting at the ``Upload-Offset`` header.
+    DELETE: abort the upload.
+    """
+
+    def get(self, request, upload_id):
+        return JsonResponse(upload_status(self.get_session(upload_id)))
+
+    def patch(self, request, upload_id):
+        session = self.get_session(upload_id)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Upload-Offset and Content-Length are required'}, status=400)
+        try:
+            index = session.write_chunk(offset, request, length)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=409)
+        response = HttpResponse(status=204)
+        response['Upload-Offset'] = str(offset + session.chunk_length(index))
+        return response
+
+    def delete(self, request, upload_id):
+        with transaction.atomic():
+            # Waits for a finalize in progress, which would be using the chunks
+            session = self.get_session(upload_id, lock=True)
+            session.discard()
+            session.delete()
+        return HttpResponse(status=204)
+
+
+class UploadFinalizeView(UploadSessionMixin, View):
+    """
+    Assembles the chunks and creates the media row from the stored fields.
+
+    The session row stays locked until the media row is saved, so a second
+    finalize of the same upload waits and then finds it complete. The chunks
+    are only removed once the row exists (or by DELETE): a rejected file can
+    be finalized again without being uploaded again.
+    """
+
+    def post(self, request, upload_id):
+        with transaction.atomic():
+            session = self.get_session(upload_id, lock=True)
+            try:
+                upload = session.assemble()
+            except ValueError as e:
+                return JsonResponse({'error': str(e), 'received': session.received_chunks()}, status=409)
+
+            form_class = get_media_form(session.target_type.model_class())
+            try:
+                form = form_class(data=session.fields, files={'file': upload})
+                if not form.is_valid():
+                    return JsonResponse({'errors': form.errors}, status=400)
+                instance = form.save()
+                session.object_id = instance.pk
+                session.status = UploadSession.COMPLETE
+                session.save(update_fields=['object_id', 'status'])
+            finally:
+                upload.close()
+                session.discard_assembled()
+        session.discard()
+
+        logger.info(f"Chunked upload {session.pk} stored as {instance.file.name}")
+        return JsonResponse({
+            'id': instance.pk,
+            'file': instance.file.url,
+            'checksum': instance.checksum,
+            'processing_status': instance.processing_status,
+        }, status=201)
+
+
+class ImageResizeView(View):
+    """
+    Serves an image resized to a width (rounded up to IMAGE_RESIZE_WIDTH_STEP)
+    in a rendition format, for URLs built by ``get_resize_url``.
+
+    Widths listed in IMAGE_RENDITION_WIDTHS become stored renditions on
+    first request and are redirected to; any other width is kept in a size
+    bounded LRU cache on local disk (IMAGE_RESIZE_CACHE_DIR).
+    """
+
+    def get(self, request, token, width, image_format):
+        source = load_resize_source(token)
+        max_width = getattr(settings, 'IMAGE_RESIZE_MAX_WIDTH', 2560)
+        if source is None or image_format not in get_rendition_formats() or not 0 < width <= max_width:
+            raise Http404
+        step = getattr(settings, 'IMAGE_RESIZE_WIDTH_STEP', 16)
+        width = min(-(-width // step) * step, max_width)
+
+        rendition = ImageRendition.objects.filter(source=source, width=width, format=image_format).first()
+        if rendition is None and width in get_rendition_widths() and default_storage.exists(source):
+            renditions = ImageRendition.objects.generate(source, widths=[width], formats=[image_format])
+            # Sources narrower than the width get a rendition at their own width.
+            candidates = [item for item in renditions if item.format == image_format and item.width <= width]
+            rendition = max(candidates, key=lambda item: item.width, default=None)
+        if rendition is not None:
+            return redirect(rendition.file.url)
+
+        cache = ImageDiskCache()
+        path = cache.get(source, width, image_format)
+        if path is None:
+            if not default_storage.exists(source):
+                raise Http404
+            try:
+                with open_ranged(source) as file_object:
+                    encoded = next(ImageResizer(file_object, name=source).encode([width], [image_format]))
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                logger.warning(f"Could not resize {source}: {e}")
+                raise Http404
+            path = cache.put(source, width, image_format, encoded.content)
+        try:
+            response = FileResponse(open(path, 'rb'), content_type=IMAGE_FORMATS[image_format][1])
+        except FileNotFoundError:
+            raise Http404  # Pruned by another process in between.
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'IMAGE_RESIZE_CACHE_SECONDS', 30 * 24 * 60 * 60)}"
+        return response
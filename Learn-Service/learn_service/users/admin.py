@@ -1,13 +1,14 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from utils.sys_mixins.admin import AdminPerformanceMixin
 from .models import User, Profile
 
 @admin.register(Profile)
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(AdminPerformanceMixin, admin.ModelAdmin):
     list_display = ('user', 'profile_picture', 'country')
     search_fields = ('user__email', 'user__first_name', 'user__last_name', 'country')
-    list_filter = ('country', 'user__first_name')
+    list_filter = ('country',)
 
     fieldsets = (
         (None, {
@@ -25,9 +26,10 @@ class ProfileInline(admin.TabularInline):
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(AdminPerformanceMixin, BaseUserAdmin):
     # Fields to be displayed in the list view
-    list_display = ('email', 'get_fullname', 'slug', 'is_active', 'is_staff', 'date_joined', 'updated_at', 'last_login')
+    list_display = ('email', 'get_fullname', 'slug', 'course_count', 'is_active', 'is_staff', 'date_joined', 'updated_at', 'last_login')
+    count_annotations = {'course_count': 'courses'}
     search_fields = ('email', 'first_name', 'last_name')
     list_filter = ('is_active', 'is_staff', 'date_joined', 'updated_at')
     ordering = ('-date_joined',)
@@ -60,6 +62,11 @@ class UserAdmin(BaseUserAdmin):
     get_fullname.admin_order_field = 'first_name'
     get_fullname.short_description = _('Full Name')
 
+    def course_count(self, obj):
+        return obj.course_count
+    course_count.admin_order_field = 'course_count'
+    course_count.short_description = _('Courses')
+
     # Custom actions to bulk activate/deactivate users
     actions = ['activate_users', 'deactivate_users']
 
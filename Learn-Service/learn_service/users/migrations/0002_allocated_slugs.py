@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:31
+
+import utils.slug_fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='slug',
+            field=utils.slug_fields.AutoSlugField(blank=True, editable=False, populate_from=utils.slug_fields.UserSlug.get_slug, unique=True),
+        ),
+    ]
@@ -3,10 +3,11 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.utils.timezone import now
-from django_extensions.db.fields import AutoSlugField
 from django_countries.fields import CountryField
-from utils.slug_fields import UserSlug
+from utils.slug_fields import AutoSlugField, UserSlug
 from utils.sys_mixins.media import AutoDeleteFileMixin
+from sys_media.models import ImageRendition
+from sys_media.renditions import ResponsiveImageMixin
 
 
 
@@ -78,9 +79,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     
 
 
-class Profile(AutoDeleteFileMixin, models.Model):
+class Profile(ResponsiveImageMixin, AutoDeleteFileMixin, models.Model):
     """User profile model for additional user information."""
     
+    # Avatars are shown small; larger sizes are resized on demand.
+    RENDITION_FIELD = 'profile_picture'
+    RENDITION_WIDTHS = (160, 320)
+    
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     profile_picture = models.ImageField(upload_to="user_profiles", default="user_profile/default.png", blank=True, null=True)
     bio = models.TextField(max_length=500, blank=True, null=True) 
@@ -92,12 +97,21 @@ class Profile(AutoDeleteFileMixin, models.Model):
     def save(self, *args, **kwargs) -> None:
         self.delete_old_file_on_change('profile_picture')
         super().save(*args, **kwargs)
+        self.remember_value('profile_picture')
         
     # def delete(self, *args, **kwargs):
     #     self.delete_file('profile_picture')
     #     super().delete(*args, **kwargs)
     
     
+    def release_file(self, name: str) -> bool:
+        # The default picture is shared by every profile: never deleted
+        return name != "user_profile/default.png"
+    
+    def discard_file(self, name: str) -> None:
+        super().discard_file(name)
+        ImageRendition.objects.delete_for(name)
+    
     def delete(self, *args, **kwargs):
         if self.profile_picture.name != "user_profile/default.png":
             self.delete_file('profile_picture')
@@ -1,24 +1,85 @@
 import os
 import logging
+import shutil
+import subprocess
 import tempfile
+import threading
 import uuid
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, List, Tuple, BinaryIO, Union
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple, BinaryIO, Union, Iterator
 from pathlib import Path
 
-import ffmpeg
-import numpy as np
-from PIL import Image
-import librosa
-import matplotlib.pyplot as plt
 from django.core.files import File
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import UploadedFile
 from django.conf import settings
 from django.utils import timezone
 
+from .backends import ffmpeg
+from .spectrogram import build_spectrogram
+from .waveform import build_peaks, render_waveform
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Input name telling ffmpeg to read the source from its stdin
+PIPE_SOURCE = 'pipe:0'
+
+
+def _jpeg_end(data: bytearray, start: int) -> int:
+    """
+    Returns the offset just past the EOI marker of the JPEG starting at
+    ``start``, or -1 if the image is not complete yet. Marker segments are
+    skipped by their length and the entropy coded data is scanned for the
+    first marker that is not byte stuffing or a restart marker.
+    """
+    pos = start + 2
+    while pos + 2 <= len(data):
+        if data[pos] != 0xFF:
+            raise ProcessingFailedError("Corrupt MJPEG stream")
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1  # fill byte
+            continue
+        if marker == 0xD9:
+            return pos + 2
+        if pos + 4 > len(data):
+            return -1
+        pos += 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+        if marker != 0xDA:
+            continue
+        while True:
+            pos = data.find(b'\xff', pos)
+            if pos < 0 or pos + 1 >= len(data):
+                return -1
+            following = data[pos + 1]
+            if following == 0x00 or 0xD0 <= following <= 0xD7:
+                pos += 2
+                continue
+            break
+    return -1
+
+
+def split_jpeg_frames(buffer: bytearray) -> Iterator[bytes]:
+    """
+    Pops every complete JPEG image from the front of an MJPEG byte buffer,
+    leaving a partial trailing image in place for the next read.
+    """
+    while True:
+        start = buffer.find(b'\xff\xd8')
+        if start < 0:
+            # Keep a trailing 0xFF, it may be the first half of the next SOI
+            del buffer[:-1 if buffer.endswith(b'\xff') else len(buffer)]
+            return
+        end = _jpeg_end(buffer, start)
+        if end < 0:
+            del buffer[:start]
+            return
+        frame = bytes(buffer[start:end])
+        del buffer[:end]
+        yield frame
+
 
 class ProcessingError(Exception):
     """Base exception for all processing errors"""
@@ -67,6 +128,9 @@ class Processor(ABC):
         self.file_extension = self._get_extension(self.filename)
         self.output_dir = output_dir or os.path.join(settings.MEDIA_ROOT, 'processed')
         self.temp_file = None
+        self._source_path = None
+        self._source_users = 0
+        self._shared = 0
         self.processing_started = None
         self.processing_completed = None
         self.metadata = {}
@@ -95,50 +159,173 @@ class Processor(ABC):
                 f"Supported formats: {supported}"
             )
     
-    def _prepare_file(self) -> str:
+    def _resolve_local_path(self) -> Optional[str]:
+        """
+        Finds an existing on-disk path for the source, if there is one: the
+        temporary file of a large upload, a FileSystemStorage file, or a
+        File wrapping an open local file.
+        """
+        candidate = self.file_obj
+        for _ in range(3):
+            if candidate is None:
+                break
+            if hasattr(candidate, 'temporary_file_path'):
+                return candidate.temporary_file_path()
+            try:
+                path = getattr(candidate, 'path', None)
+            except (NotImplementedError, ValueError):
+                path = None
+            if not isinstance(path, str):
+                name = getattr(candidate, 'name', None)
+                path = name if isinstance(name, str) and os.path.isabs(name) else None
+            if path and os.path.isfile(path):
+                return path
+            candidate = getattr(candidate, 'file', None)
+        return None
+    
+    def _is_seekable(self) -> bool:
+        seekable = getattr(self.file_obj, 'seekable', None)
+        try:
+            return bool(seekable()) if callable(seekable) else hasattr(self.file_obj, 'seek')
+        except (ValueError, OSError):
+            return False
+    
+    def _temp_path(self) -> str:
+        """Returns a fresh path with the source extension in the upload temp dir."""
+        temp_dir = getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None) or tempfile.gettempdir()
+        return os.path.join(temp_dir, f"{uuid.uuid4().hex}.{self.file_extension}")
+    
+    def _resolve_source(self, allow_pipe: bool = False) -> str:
+        """
+        Picks the cheapest input ffmpeg/librosa can read, copying only as a
+        last resort:
+        
+        1. the existing on-disk path when it has the right extension
+        2. a hard link to it (same data, right extension)
+        3. ``pipe:0`` for a non-seekable source the caller streams to ffmpeg
+        4. a temporary copy
+        """
+        local_path = self._resolve_local_path()
+        if local_path:
+            if self._get_extension(local_path) == self.file_extension:
+                logger.debug(f"Using source file in place: {local_path}")
+                return local_path
+            link_path = self._temp_path()
+            try:
+                os.link(local_path, link_path)
+                self.temp_file = link_path
+                logger.debug(f"Hard linked source file to {link_path}")
+                return link_path
+            except OSError:
+                # Other file system: copyfile lets the kernel copy (or reflink)
+                self.temp_file = link_path
+                shutil.copyfile(local_path, link_path)
+                return link_path
+        
+        if allow_pipe and not self._is_seekable():
+            logger.debug(f"Streaming {self.filename} to ffmpeg through stdin")
+            return PIPE_SOURCE
+        
+        temp_path = self.temp_file = self._temp_path()
+        self.file_obj.seek(0)
+        chunk_size = getattr(settings, 'UPLOAD_CHUNK_SIZE', 2 * 1024 * 1024)
+        with open(temp_path, 'wb') as dst:
+            if hasattr(self.file_obj, 'chunks'):
+                for chunk in self.file_obj.chunks(chunk_size):
+                    dst.write(chunk)
+            else:
+                shutil.copyfileobj(self.file_obj, dst, chunk_size)
+        logger.debug(f"Prepared temporary file: {temp_path}")
+        return temp_path
+    
+    def _prepare_file(self, allow_pipe: bool = False) -> str:
         """
-        Prepare file for processing by creating a temporary file.
+        Prepare file for processing, reusing the source prepared by an
+        enclosing operation or ``prepared()`` block.
         
+        Args:
+            allow_pipe: The caller can feed ``pipe:0`` through ``_run_ffmpeg``
+            
         Returns:
-            Path to the temporary file
+            Path to the source file, or ``pipe:0``
         """
         try:
-            # Create a named temporary file with the correct extension
-            suffix = f".{self.file_extension}"
-            self.temp_file = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
-            
-            # Write the file content to the temporary file
-            if hasattr(self.file_obj, 'temporary_file_path'):
-                # For TemporaryUploadedFile (large files)
-                temp_path = self.file_obj.temporary_file_path()
-                with open(temp_path, 'rb') as src:
-                    with open(self.temp_file.name, 'wb') as dst:
-                        for chunk in iter(lambda: src.read(4096), b''):
-                            dst.write(chunk)
-            else:
-                # For InMemoryUploadedFile (small files) or regular File objects
-                self.file_obj.seek(0)
-                with open(self.temp_file.name, 'wb') as dst:
-                    for chunk in self.file_obj.chunks():
-                        dst.write(chunk)
-            
-            logger.debug(f"Prepared temporary file: {self.temp_file.name}")
-            return self.temp_file.name
-        
+            if self._source_path is None or (self._source_path == PIPE_SOURCE and not allow_pipe):
+                self._source_path = self._resolve_source(allow_pipe and not self._shared)
+            self._source_users += 1
+            return self._source_path
         except Exception as e:
-            if self.temp_file and os.path.exists(self.temp_file.name):
-                os.unlink(self.temp_file.name)
+            # Take and release a reference so a partial copy is removed
+            self._source_users += 1
+            self._cleanup()
             logger.error(f"Error preparing file: {str(e)}")
             raise FileReadError(f"Failed to read file: {str(e)}")
     
     def _cleanup(self) -> None:
-        """Clean up temporary files."""
-        if self.temp_file and os.path.exists(self.temp_file.name):
+        """
+        Releases the prepared source; the temporary file (if one was needed)
+        is removed once no operation or ``prepared()`` block uses it.
+        """
+        self._source_users = max(self._source_users - 1, 0)
+        if self._source_users or self._shared:
+            return
+        self._source_path = None
+        if self.temp_file and os.path.exists(self.temp_file):
             try:
-                os.unlink(self.temp_file.name)
-                logger.debug(f"Cleaned up temporary file: {self.temp_file.name}")
+                os.unlink(self.temp_file)
+                logger.debug(f"Cleaned up temporary file: {self.temp_file}")
             except Exception as e:
                 logger.warning(f"Failed to clean up temporary file: {str(e)}")
+        self.temp_file = None
+    
+    @contextmanager
+    def prepared(self) -> Iterator[str]:
+        """
+        Prepares the source once and shares it with every operation run in
+        the block, instead of preparing it again for each of them.
+        
+        Usage:
+            >>> with processor.prepared():
+            ...     thumbnail = processor.create_thumbnail()
+            ...     compressed = processor.compress_video()
+        """
+        path = self._prepare_file()
+        self._shared += 1
+        try:
+            yield path
+        finally:
+            self._shared -= 1
+            self._cleanup()
+    
+    def _iter_source_chunks(self) -> Iterator[bytes]:
+        chunk_size = getattr(settings, 'UPLOAD_CHUNK_SIZE', 2 * 1024 * 1024)
+        if hasattr(self.file_obj, 'chunks'):
+            yield from self.file_obj.chunks(chunk_size)
+        else:
+            yield from iter(lambda: self.file_obj.read(chunk_size), b'')
+    
+    def _run_ffmpeg(self, stream, source: str) -> None:
+        """
+        Runs an ffmpeg-python stream, feeding the source through stdin when
+        it was prepared as ``pipe:0``.
+        """
+        stream = stream.overwrite_output()
+        if source != PIPE_SOURCE:
+            stream.run(quiet=True)
+            return
+        process = subprocess.Popen(
+            stream.compile(), stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            for chunk in self._iter_source_chunks():
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass  # ffmpeg stops reading once it has what it needs
+        finally:
+            process.stdin.close()
+        if process.wait() != 0:
+            raise ProcessingFailedError(f"ffmpeg exited with status {process.returncode}")
     
     def generate_output_path(self, suffix: str = "", extension: Optional[str] = None) -> str:
         """
@@ -171,10 +358,9 @@ class Processor(ABC):
         try:
             with open(file_path, 'rb') as f:
                 name = os.path.basename(file_path)
-                django_file = File(f, name=name)
-                # Read the content to create a proper File object
-                content = django_file.read()
-                django_file.seek(0)
+                # Keep the content in memory: the source file is closed (and
+                # possibly deleted) before the caller reads it
+                django_file = ContentFile(f.read(), name=name)
             
             if delete_after:
                 os.unlink(file_path)
@@ -302,15 +488,14 @@ class VideoProcessor(Processor):
         output_path = self.generate_output_path(f"frame_{int(time_position)}", "jpg")
         
         try:
-            file_path = self._prepare_file()
+            file_path = self._prepare_file(allow_pipe=True)
             
             # Extract frame using ffmpeg
-            (
+            self._run_ffmpeg(
                 ffmpeg
                 .input(file_path, ss=time_position)
-                .output(output_path, vframes=1)
-                .overwrite_output()
-                .run(quiet=True)
+                .output(output_path, vframes=1),
+                file_path
             )
             
             logger.debug(f"Frame extracted to {output_path}")
@@ -324,6 +509,84 @@ class VideoProcessor(Processor):
         finally:
             self._cleanup()
     
+    def iter_frames(self, 
+                    interval: float = 1.0, 
+                    max_frames: Optional[int] = None,
+                    resize: Optional[Tuple[int, int]] = None,
+                    quality: int = 3) -> Iterator[File]:
+        """
+        Yield frames sampled at regular intervals from a single ffmpeg run.
+        
+        The video is decoded once: the ``fps`` filter samples one frame per
+        interval, ``scale`` resizes it, and the frames are streamed back as
+        MJPEG over stdout and split in memory. Nothing is written to disk.
+        
+        Args:
+            interval: Time interval between frames in seconds
+            max_frames: Maximum number of frames to extract
+            resize: Optional tuple of (width, height) to resize frames
+            quality: JPEG quality scale (2 = best, 31 = worst)
+            
+        Yields:
+            In-memory Django File objects (JPEG), in time order
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        
+        file_path = self._prepare_file(allow_pipe=True)
+        process = None
+        feeder = None
+        try:
+            stream = ffmpeg.input(file_path).filter('fps', fps=1 / interval)
+            if resize:
+                stream = stream.filter('scale', resize[0], resize[1])
+            output_args = {'format': 'image2pipe', 'vcodec': 'mjpeg', 'q:v': quality}
+            if max_frames:
+                output_args['frames:v'] = max_frames
+            
+            piped = file_path == PIPE_SOURCE
+            process = subprocess.Popen(
+                stream.output('pipe:1', **output_args).compile(),
+                stdin=subprocess.PIPE if piped else subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+            if piped:
+                feeder = threading.Thread(target=self._feed_stdin, args=(process,), daemon=True)
+                feeder.start()
+            
+            base = os.path.splitext(os.path.basename(self.filename))[0]
+            buffer = bytearray()
+            index = 0
+            for chunk in iter(lambda: process.stdout.read(64 * 1024), b''):
+                buffer.extend(chunk)
+                for frame in split_jpeg_frames(buffer):
+                    yield ContentFile(frame, name=f"{base}_frame_{int(index * interval)}.jpg")
+                    index += 1
+            
+            if process.wait() != 0:
+                raise ProcessingFailedError(f"ffmpeg exited with status {process.returncode}")
+            logger.info(f"Extracted {index} frames from {self.filename}")
+        finally:
+            if process and process.poll() is None:
+                process.kill()  # the consumer stopped early
+                process.wait()
+            if feeder:
+                feeder.join(timeout=5)
+            self._cleanup()
+    
+    def _feed_stdin(self, process: subprocess.Popen) -> None:
+        """Streams the source into an ffmpeg process reading ``pipe:0``."""
+        try:
+            for chunk in self._iter_source_chunks():
+                process.stdin.write(chunk)
+        except (BrokenPipeError, ValueError):
+            pass  # ffmpeg exited or stopped reading
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+    
     def extract_frames(self, 
                       interval: float = 1.0, 
                       max_frames: Optional[int] = None,
@@ -342,50 +605,10 @@ class VideoProcessor(Processor):
         logger.info(f"Extracting frames at {interval}s intervals from {self.filename}")
         
         try:
-            # Extract metadata if not already done
-            if not self.metadata:
-                self.extract_metadata()
-            
-            if not self.duration:
-                video_stream = next((s for s in self.metadata['streams'] if s.get('codec_type') == 'video'), None)
-                self.duration = float(self.metadata['format'].get('duration', 0))
-            
-            # Calculate frame positions
-            frame_positions = np.arange(0, self.duration, interval)
-            if max_frames and len(frame_positions) > max_frames:
-                frame_positions = frame_positions[:max_frames]
-            
-            frames = []
-            for pos in frame_positions:
-                frame = self.extract_frame(pos)
-                
-                # Resize if requested
-                if resize and frame:
-                    # Need to process image with PIL
-                    with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp:
-                        temp_path = temp.name
-                        with open(temp_path, 'wb') as f:
-                            frame.seek(0)
-                            f.write(frame.read())
-                    
-                    # Resize with PIL
-                    with Image.open(temp_path) as img:
-                        img = img.resize(resize)
-                        img.save(temp_path)
-                    
-                    # Convert back to Django file
-                    frame = self.save_to_django_file(temp_path)
-                
-                frames.append(frame)
-            
-            logger.info(f"Extracted {len(frames)} frames from {self.filename}")
-            return frames
-            
+            return list(self.iter_frames(interval, max_frames=max_frames, resize=resize))
         except Exception as e:
             logger.error(f"Multiple frame extraction failed: {str(e)}")
             raise ProcessingFailedError(f"Failed to extract frames: {str(e)}")
-        finally:
-            self._cleanup()
     
     def compress_video(self, 
                        target_size_mb: float = 10.0,
@@ -453,11 +676,14 @@ class VideoProcessor(Processor):
             Django File object containing the thumbnail
         """
         try:
-            # Extract metadata if not already done
-            if not self.metadata:
-                self.extract_metadata()
-            
-            if not self.duration:
+            # The source can only be piped when no probe is needed first
+            needs_probe = time_position is None and not self.duration
+            file_path = self._prepare_file(allow_pipe=not needs_probe)
+            
+            # Probe only when the duration is needed and not already known
+            if needs_probe:
+                if not self.metadata:
+                    self.extract_metadata()
                 self.duration = float(self.metadata['format'].get('duration', 0))
             
             # Default to 10% of the video duration if time_position not specified
@@ -467,16 +693,13 @@ class VideoProcessor(Processor):
             logger.info(f"Creating thumbnail at {time_position}s from {self.filename}")
             output_path = self.generate_output_path("thumbnail", "jpg")
             
-            file_path = self._prepare_file()
-            
             # Create thumbnail using ffmpeg
-            (
+            self._run_ffmpeg(
                 ffmpeg
                 .input(file_path, ss=time_position)
                 .filter('scale', size[0], size[1])
-                .output(output_path, vframes=1)
-                .overwrite_output()
-                .run(quiet=True)
+                .output(output_path, vframes=1),
+                file_path
             )
             
             logger.debug(f"Thumbnail created at {output_path}")
@@ -559,6 +782,10 @@ class AudioProcessor(Processor):
         """
         Generate a waveform image from the audio file.
         
+        The audio is streamed through ffmpeg into min/max peaks (see
+        ``utils.files.waveform``) and the image is drawn from the peaks, so
+        memory does not grow with the duration.
+        
         Args:
             width: Width of the waveform image
             height: Height of the waveform image
@@ -568,83 +795,62 @@ class AudioProcessor(Processor):
             Django File object containing the waveform image
         """
         logger.info(f"Generating waveform for {self.filename}")
-        output_path = self.generate_output_path("waveform", "png")
         
         try:
-            file_path = self._prepare_file()
-            
-            # Load audio using librosa
-            y, sr = librosa.load(file_path, sr=None)
+            file_path = self._prepare_file(allow_pipe=True)
+            with build_peaks(self.file_obj if file_path == PIPE_SOURCE else file_path) as peaks:
+                content = render_waveform(peaks, width, height, color)
             
-            # Set up the figure with the specified dimensions
-            plt.figure(figsize=(width/100, height/100), dpi=100)
-            plt.axis('off')  # Hide the axes
-            
-            # Plot the waveform
-            plt.plot(np.linspace(0, len(y)/sr, len(y)), y, color=color)
-            
-            # Adjust limits
-            plt.ylim(-1, 1)
-            plt.tight_layout(pad=0)
-            
-            # Save the figure
-            plt.savefig(output_path, bbox_inches='tight', pad_inches=0)
-            plt.close()
-            
-            logger.debug(f"Waveform generated at {output_path}")
-            return self.save_to_django_file(output_path)
+            name = os.path.basename(self.generate_output_path("waveform", "png"))
+            logger.debug(f"Waveform generated for {self.filename}")
+            return ContentFile(content, name=name)
             
         except Exception as e:
             logger.error(f"Waveform generation failed: {str(e)}")
-            if os.path.exists(output_path):
-                os.unlink(output_path)
             raise ProcessingFailedError(f"Failed to generate waveform: {str(e)}")
         finally:
             self._cleanup()
     
     def generate_spectrogram(self, 
                             width: int = 1000, 
-                            height: int = 500) -> File:
+                            height: int = 500,
+                            seconds_per_column: Optional[float] = None) -> File:
         """
-        Generate a spectrogram image from the audio file.
+        Generate a mel spectrogram image from the audio file.
+        
+        The audio is streamed through ffmpeg in blocks and the image is built
+        column by column (see ``utils.files.spectrogram``), so memory and FFT
+        work depend on the image size rather than on the duration.
         
         Args:
             width: Width of the spectrogram image
             height: Height of the spectrogram image
+            seconds_per_column: Audio covered by one computed column; by
+                default the duration is spread over ``width`` columns
             
         Returns:
             Django File object containing the spectrogram image
         """
         logger.info(f"Generating spectrogram for {self.filename}")
-        output_path = self.generate_output_path("spectrogram", "png")
         
         try:
-            file_path = self._prepare_file()
-            
-            # Load audio using librosa
-            y, sr = librosa.load(file_path, sr=None)
+            file_path = self._prepare_file(allow_pipe=True)
+            if seconds_per_column is None:
+                duration = self.duration
+                if not duration and file_path != PIPE_SOURCE:
+                    duration = float(ffmpeg.probe(file_path)['format'].get('duration', 0))
+                seconds_per_column = duration / width if duration else None
             
-            # Set up the figure with the specified dimensions
-            plt.figure(figsize=(width/100, height/100), dpi=100)
-            plt.axis('off')  # Hide the axes
+            spectrogram = build_spectrogram(self.file_obj if file_path == PIPE_SOURCE else file_path,
+                                            seconds_per_column)
+            content = spectrogram.render(width, height)
             
-            # Compute and display the spectrogram
-            S = librosa.feature.melspectrogram(y=y, sr=sr)
-            S_dB = librosa.power_to_db(S, ref=np.max)
-            librosa.display.specshow(S_dB, sr=sr, x_axis='time', y_axis='mel')
-            
-            # Save the figure
-            plt.tight_layout(pad=0)
-            plt.savefig(output_path, bbox_inches='tight', pad_inches=0)
-            plt.close()
-            
-            logger.debug(f"Spectrogram generated at {output_path}")
-            return self.save_to_django_file(output_path)
+            name = os.path.basename(self.generate_output_path("spectrogram", "png"))
+            logger.debug(f"Spectrogram generated for {self.filename}")
+            return ContentFile(content, name=name)
             
         except Exception as e:
             logger.error(f"Spectrogram generation failed: {str(e)}")
-            if os.path.exists(output_path):
-                os.unlink(output_path)
             raise ProcessingFailedError(f"Failed to generate spectrogram: {str(e)}")
         finally:
             self._cleanup()
@@ -667,7 +873,7 @@ class AudioProcessor(Processor):
         output_path = self.generate_output_path("converted", target_format)
         
         try:
-            file_path = self._prepare_file()
+            file_path = self._prepare_file(allow_pipe=True)
             
             # Define quality settings
             quality_settings = {
@@ -679,12 +885,11 @@ class AudioProcessor(Processor):
             settings = quality_settings.get(quality, quality_settings['medium'])
             
             # Convert using ffmpeg
-            (
+            self._run_ffmpeg(
                 ffmpeg
                 .input(file_path)
-                .output(output_path, **settings)
-                .overwrite_output()
-                .run(quiet=True)
+                .output(output_path, **settings),
+                file_path
             )
             
             logger.debug(f"Audio converted to {output_path}")
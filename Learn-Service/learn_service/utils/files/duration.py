@@ -0,0 +1,407 @@
+import logging
+import os
+import shutil
+import struct
+import subprocess
+from typing import Optional, BinaryIO, Tuple, Iterator
+
+logger = logging.getLogger('utils')
+
+# Bytes read from the end of an Ogg stream to find the last page.
+OGG_TAIL_BYTES = 64 * 1024
+
+# MPEG audio lookup tables (kbps / Hz), indexed by the header bit fields.
+MP3_BITRATES = {
+    # (version is MPEG1, layer): table
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG1
+    2: (22050, 24000, 16000),  # MPEG2
+    0: (11025, 12000, 8000),   # MPEG2.5
+}
+
+# EBML element ids (Matroska/WebM), including their length marker bits.
+EBML_HEADER = 0x1A45DFA3
+EBML_SEGMENT = 0x18538067
+EBML_INFO = 0x1549A966
+EBML_TIMECODE_SCALE = 0x2AD7B1
+EBML_DURATION = 0x4489
+EBML_CLUSTER = 0x1F43B675
+
+
+class DurationParseError(Exception):
+    """Raised when a container header is truncated or not understood."""
+    pass
+
+
+class MediaDurationProbe:
+    """
+    Reads the duration of audio/video files from their container headers.
+
+    Only the few boxes/chunks/frames that carry timing information are read,
+    everything else is skipped with ``seek``, so probing a large file costs a
+    few KB of I/O. ``ffprobe`` is only used when the header cannot be parsed.
+
+    Supported containers:
+    - MP4/MOV/M4A: ``moov/mvhd`` timescale and duration
+    - Matroska/WebM: Segment Info ``TimecodeScale`` and ``Duration``
+    - WAV: ``data`` chunk size divided by the ``fmt `` byte rate
+    - FLAC: STREAMINFO total samples and sample rate
+    - Ogg (Vorbis/Opus): granule position of the last page
+    - MP3: Xing/Info or VBRI frame count, constant bitrate otherwise
+
+    Usage:
+        >>> with default_storage.open(name, 'rb') as file_object:
+        ...     seconds = MediaDurationProbe(file_object, name=name).get_duration()
+    """
+
+    def __init__(self,
+                 file_object: BinaryIO,
+                 name: Optional[str] = None,
+                 path: Optional[str] = None) -> None:
+        """
+        Args:
+            file_object: Open, seekable binary file
+            name: File name, only used in log messages
+            path: Local path handed to ffprobe by the fallback (the file is
+                piped to ffprobe's stdin when not given)
+        """
+        self.file_object = file_object
+        self.name = name or getattr(file_object, 'name', None)
+        self.path = path
+
+    def get_duration(self, fallback: bool = True) -> Optional[float]:
+        """
+        Returns the duration in seconds, or None when it cannot be determined.
+
+        Args:
+            fallback: Run ffprobe when the header cannot be parsed
+        """
+        try:
+            duration = self.read_header_duration()
+        except (DurationParseError, struct.error, OSError, ValueError) as e:
+            logger.debug(f"Header duration parsing failed for {self.name}: {e}")
+            duration = None
+        if duration is None and fallback:
+            duration = self.ffprobe_duration()
+        return duration
+
+    def read_header_duration(self) -> Optional[float]:
+        """
+        Dispatches on the file signature to the matching header parser.
+        """
+        head = self._read_at(0, 12)
+        if head[4:8] in (b'ftyp', b'moov', b'mdat', b'wide', b'free', b'skip'):
+            return self._mp4_duration()
+        if head[:4] == struct.pack('>I', EBML_HEADER):
+            return self._ebml_duration()
+        if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+            return self._wav_duration()
+        if head[:4] == b'fLaC':
+            return self._flac_duration()
+        if head[:4] == b'OggS':
+            return self._ogg_duration()
+        if head[:3] == b'ID3' or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+            return self._mp3_duration()
+        return None
+
+    # -------------------------------------------------------------- helpers
+
+    def _read_at(self, offset: int, size: int) -> bytes:
+        self.file_object.seek(offset)
+        return self.file_object.read(size)
+
+    def _read_exact(self, offset: int, size: int) -> bytes:
+        data = self._read_at(offset, size)
+        if len(data) != size:
+            raise DurationParseError(f"Unexpected end of file at offset {offset}")
+        return data
+
+    def _file_size(self) -> int:
+        self.file_object.seek(0, os.SEEK_END)
+        return self.file_object.tell()
+
+    # ------------------------------------------------------------- MP4/MOV
+
+    def _iter_boxes(self, start: int, end: Optional[int]) -> Iterator[Tuple[bytes, int, int]]:
+        """Yields (type, payload offset, box end) for the boxes in [start, end)."""
+        offset = start
+        while end is None or offset + 8 <= end:
+            header = self._read_at(offset, 8)
+            if len(header) < 8:
+                return
+            size, box_type = struct.unpack('>I4s', header)
+            payload = offset + 8
+            if size == 1:
+                size = struct.unpack('>Q', self._read_exact(payload, 8))[0]
+                payload += 8
+            elif size == 0:
+                size = (end if end is not None else self._file_size()) - offset
+            if size < payload - offset:
+                raise DurationParseError(f"Invalid {box_type!r} box size")
+            yield box_type, payload, offset + size
+            offset += size
+
+    def _mp4_duration(self) -> Optional[float]:
+        for box_type, payload, box_end in self._iter_boxes(0, None):
+            if box_type != b'moov':
+                continue
+            for child_type, child_payload, _ in self._iter_boxes(payload, box_end):
+                if child_type != b'mvhd':
+                    continue
+                version = self._read_exact(child_payload, 1)[0]
+                if version == 1:
+                    timescale, duration = struct.unpack('>IQ', self._read_exact(child_payload + 20, 12))
+                else:
+                    timescale, duration = struct.unpack('>II', self._read_exact(child_payload + 12, 8))
+                if not timescale or duration in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+                    return None
+                return duration / timescale
+        return None
+
+    # ------------------------------------------------------- Matroska/WebM
+
+    def _read_vint(self, offset: int, keep_marker: bool) -> Tuple[int, int]:
+        """Reads an EBML variable length integer, returns (value, length)."""
+        first = self._read_exact(offset, 1)[0]
+        length = 1
+        while length <= 8 and not first & (0x80 >> (length - 1)):
+            length += 1
+        if length > 8:
+            raise DurationParseError("Invalid EBML variable length integer")
+        data = self._read_exact(offset, length)
+        value = int.from_bytes(data, 'big')
+        if not keep_marker:
+            value &= (1 << (7 * length)) - 1
+            if value == (1 << (7 * length)) - 1:
+                value = -1  # unknown size
+        return value, length
+
+    def _iter_elements(self, start: int, end: Optional[int]) -> Iterator[Tuple[int, int, int]]:
+        """Yields (id, payload offset, payload size) for the elements in [start, end)."""
+        offset = start
+        while end is None or offset < end:
+            if not self._read_at(offset, 1):
+                return
+            element_id, id_length = self._read_vint(offset, keep_marker=True)
+            size, size_length = self._read_vint(offset + id_length, keep_marker=False)
+            payload = offset + id_length + size_length
+            yield element_id, payload, size
+            if size < 0:
+                return  # unknown-size element: nothing after it can be located
+            offset = payload + size
+
+    def _ebml_duration(self) -> Optional[float]:
+        for element_id, payload, size in self._iter_elements(0, None):
+            if element_id != EBML_SEGMENT:
+                continue
+            segment_end = payload + size if size >= 0 else None
+            for child_id, child_payload, child_size in self._iter_elements(payload, segment_end):
+                if child_id == EBML_CLUSTER:
+                    return None  # Info always precedes the clusters
+                if child_id != EBML_INFO:
+                    continue
+                timecode_scale, duration = 1000000, None
+                for info_id, info_payload, info_size in self._iter_elements(child_payload, child_payload + child_size):
+                    data = self._read_exact(info_payload, info_size)
+                    if info_id == EBML_TIMECODE_SCALE:
+                        timecode_scale = int.from_bytes(data, 'big')
+                    elif info_id == EBML_DURATION:
+                        duration = struct.unpack('>f' if info_size == 4 else '>d', data)[0]
+                if duration is None:
+                    return None
+                return duration * timecode_scale / 1e9
+        return None
+
+    # ----------------------------------------------------------------- WAV
+
+    def _wav_duration(self) -> Optional[float]:
+        byte_rate = None
+        offset = 12
+        while True:
+            header = self._read_at(offset, 8)
+            if len(header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                byte_rate = struct.unpack('<I', self._read_exact(offset + 16, 4))[0]
+            elif chunk_id == b'data':
+                if not byte_rate:
+                    return None
+                # Streams written without a final size report 0 or 0xFFFFFFFF.
+                if chunk_size in (0, 0xFFFFFFFF):
+                    chunk_size = self._file_size() - offset - 8
+                return chunk_size / byte_rate
+            offset += 8 + chunk_size + (chunk_size & 1)
+
+    # ---------------------------------------------------------------- FLAC
+
+    def _flac_duration(self) -> Optional[float]:
+        block_header = self._read_exact(4, 4)
+        if block_header[0] & 0x7F != 0:
+            raise DurationParseError("FLAC stream does not start with STREAMINFO")
+        info = self._read_exact(8, 18)
+        packed = int.from_bytes(info[10:18], 'big')
+        sample_rate = packed >> 44
+        total_samples = packed & 0xFFFFFFFFF
+        if not sample_rate or not total_samples:
+            return None
+        return total_samples / sample_rate
+
+    # ----------------------------------------------------------------- Ogg
+
+    def _ogg_duration(self) -> Optional[float]:
+        first_page = self._read_exact(0, 27)
+        serial = first_page[14:18]
+        segments = first_page[26]
+        packet = self._read_at(27 + segments, 19)
+        if packet.startswith(b'\x01vorbis'):
+            sample_rate = struct.unpack('<I', packet[12:16])[0]
+            pre_skip = 0
+        elif packet.startswith(b'OpusHead'):
+            # Opus granule positions always count 48 kHz samples.
+            sample_rate = 48000
+            pre_skip = struct.unpack('<H', packet[10:12])[0]
+        else:
+            return None
+
+        size = self._file_size()
+        tail_start = max(0, size - OGG_TAIL_BYTES)
+        tail = self._read_at(tail_start, size - tail_start)
+        position = tail.rfind(b'OggS')
+        while position >= 0:
+            page = tail[position:position + 27]
+            if len(page) == 27 and page[14:18] == serial:
+                granule = struct.unpack('<q', page[6:14])[0]
+                if granule >= 0 and sample_rate:
+                    return max(granule - pre_skip, 0) / sample_rate
+            position = tail.rfind(b'OggS', 0, position)
+        return None
+
+    # ----------------------------------------------------------------- MP3
+
+    def _mp3_duration(self) -> Optional[float]:
+        offset = 0
+        head = self._read_exact(0, 10)
+        if head[:3] == b'ID3':
+            tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            offset = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+
+        # Find the first frame sync within a small window after the tag.
+        window = self._read_at(offset, 4096)
+        index = 0
+        while True:
+            index = window.find(b'\xff', index)
+            if index < 0 or index + 4 > len(window):
+                raise DurationParseError("No MPEG audio frame found")
+            if window[index + 1] & 0xE0 == 0xE0:
+                break
+            index += 1
+        offset += index
+        header = int.from_bytes(window[index:index + 4], 'big')
+
+        version_bits = (header >> 19) & 0x3
+        layer_bits = (header >> 17) & 0x3
+        bitrate_index = (header >> 12) & 0xF
+        sample_rate_index = (header >> 10) & 0x3
+        channel_mode = (header >> 6) & 0x3
+        if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+            raise DurationParseError("Invalid MPEG audio frame header")
+
+        mpeg1 = version_bits == 3
+        layer = 4 - layer_bits
+        sample_rate = MP3_SAMPLE_RATES[version_bits][sample_rate_index]
+        bitrate = MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+        if layer == 1:
+            samples_per_frame = 384
+        elif layer == 2 or mpeg1:
+            samples_per_frame = 1152
+        else:
+            samples_per_frame = 576
+
+        # Xing/Info header sits right after the side information.
+        if mpeg1:
+            side_info = 17 if channel_mode == 3 else 32
+        else:
+            side_info = 9 if channel_mode == 3 else 17
+        xing = self._read_at(offset + 4 + side_info, 12)
+        if xing[:4] in (b'Xing', b'Info'):
+            flags = struct.unpack('>I', xing[4:8])[0]
+            if flags & 0x1:
+                frames = struct.unpack('>I', xing[8:12])[0]
+                return frames * samples_per_frame / sample_rate
+
+        vbri = self._read_at(offset + 36, 18)
+        if vbri[:4] == b'VBRI':
+            frames = struct.unpack('>I', vbri[14:18])[0]
+            return frames * samples_per_frame / sample_rate
+
+        # Constant bitrate: the audio payload size gives the duration.
+        size = self._file_size()
+        if self._read_at(size - 128, 3) == b'TAG':
+            size -= 128
+        return (size - offset) * 8 / bitrate
+
+    # ------------------------------------------------------------- ffprobe
+
+    def ffprobe_duration(self) -> Optional[float]:
+        """
+        Asks ffprobe for the container duration. The local path is used when
+        known, otherwise the file is streamed to ffprobe's stdin.
+        """
+        ffprobe = shutil.which('ffprobe')
+        if not ffprobe:
+            logger.warning(f"ffprobe is not installed, no duration for {self.name}")
+            return None
+        cmd = [
+            ffprobe, '-v', 'error',
+            '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1',
+            '-i', self.path or 'pipe:0',
+        ]
+        try:
+            if self.path:
+                result = subprocess.run(cmd, capture_output=True, check=True, timeout=60)
+            else:
+                self.file_object.seek(0)
+                with subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      stderr=subprocess.DEVNULL) as process:
+                    try:
+                        shutil.copyfileobj(self.file_object, process.stdin)
+                    except BrokenPipeError:
+                        pass  # ffprobe stops reading once it has what it needs
+                    finally:
+                        process.stdin.close()
+                    stdout = process.stdout.read()
+                    if process.wait(timeout=60) != 0:
+                        raise subprocess.CalledProcessError(process.returncode, cmd)
+                result = subprocess.CompletedProcess(cmd, 0, stdout=stdout)
+            return float(result.stdout.strip())
+        except (subprocess.SubprocessError, ValueError, OSError) as e:
+            logger.warning(f"ffprobe failed for {self.name}: {e}")
+            return None
+
+
+def probe_duration(file_object: BinaryIO,
+                   name: Optional[str] = None,
+                   path: Optional[str] = None,
+                   fallback: bool = True) -> Optional[float]:
+    """
+    Duration in seconds of an audio/video file, read from its header.
+
+    Args:
+        file_object: Open, seekable binary file
+        name: File name used in log messages
+        path: Local path for the ffprobe fallback, if any
+        fallback: Run ffprobe when the header cannot be parsed
+
+    Returns:
+        Duration in seconds, or None if unknown
+    """
+    return MediaDurationProbe(file_object, name=name, path=path).get_duration(fallback=fallback)
@@ -0,0 +1,239 @@
+import logging
+import re
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Optional, Tuple
+
+logger = logging.getLogger('utils')
+
+# Upper bound on the bytes read while looking for the dimensions. JPEG
+# headers are walked with seeks, only the EXIF block and frame header are read.
+IMAGE_PROBE_MAX_BYTES = 64 * 1024
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, arithmetic).
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+JPEG_APP1 = 0xE1
+EXIF_ORIENTATION_TAG = 0x0112
+
+SVG_LENGTH = re.compile(rb'^\s*([0-9]*\.?[0-9]+)\s*(px)?\s*$')
+
+
+class ImageProbeError(Exception):
+    """Raised when an image header is truncated or not understood."""
+    pass
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    """Format and size of an image as stored, plus its EXIF orientation (1-8)."""
+    format: str
+    mime_type: str
+    width: int
+    height: int
+    orientation: int = 1
+
+    @property
+    def display_size(self) -> Tuple[int, int]:
+        """(width, height) once EXIF orientation is applied; 5-8 are rotated by 90 degrees."""
+        if self.orientation in (5, 6, 7, 8):
+            return self.height, self.width
+        return self.width, self.height
+
+
+class ImageHeaderProbe:
+    """
+    Reads image dimensions from the file header without decoding pixels.
+
+    Supported formats:
+    - JPEG: SOFn frame header, orientation from the EXIF APP1 segment
+    - PNG: IHDR chunk
+    - GIF: logical screen descriptor
+    - WebP: VP8, VP8L and VP8X (extended) headers
+    - SVG: ``width``/``height`` of the root element, ``viewBox`` otherwise
+
+    Usage:
+        >>> with default_storage.open(name, 'rb') as file_object:
+        ...     info = ImageHeaderProbe(file_object, name=name).probe()
+        >>> info.display_size
+        (3024, 4032)
+    """
+
+    def __init__(self,
+                 file_object: BinaryIO,
+                 name: Optional[str] = None,
+                 max_bytes: int = IMAGE_PROBE_MAX_BYTES) -> None:
+        """
+        Args:
+            file_object: Open, seekable binary file
+            name: File name, only used in log messages
+            max_bytes: Bytes read at most (JPEG segments are skipped with seek)
+        """
+        self.file_object = file_object
+        self.name = name or getattr(file_object, 'name', None)
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def probe(self) -> ImageInfo:
+        """
+        Dispatches on the file signature to the matching header parser.
+
+        Raises:
+            ImageProbeError: Unknown format or damaged header
+        """
+        try:
+            head = self._read_at(0, 32)
+            if head[:3] == b'\xff\xd8\xff':
+                return self._jpeg()
+            if head[:8] == b'\x89PNG\r\n\x1a\n':
+                return self._png(head)
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return self._gif(head)
+            if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+                return self._webp(head)
+            if b'<' in head[:32]:
+                return self._svg()
+        except (struct.error, IndexError, ValueError) as e:
+            raise ImageProbeError(f"Damaged image header in {self.name}: {e}") from e
+        raise ImageProbeError(f"Unknown image format: {self.name}")
+
+    # -------------------------------------------------------------- helpers
+
+    def _read_at(self, offset: int, size: int) -> bytes:
+        if self.bytes_read + size > self.max_bytes:
+            raise ImageProbeError(f"No dimensions in the first {self.max_bytes} bytes of {self.name}")
+        self.file_object.seek(offset)
+        data = self.file_object.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def _read_exact(self, offset: int, size: int) -> bytes:
+        data = self._read_at(offset, size)
+        if len(data) != size:
+            raise ImageProbeError(f"Unexpected end of file at offset {offset}")
+        return data
+
+    # ---------------------------------------------------------------- JPEG
+
+    def _jpeg(self) -> ImageInfo:
+        offset, orientation = 2, 1
+        while True:
+            marker = self._read_exact(offset, 4)
+            if marker[0] != 0xFF:
+                raise ImageProbeError("Invalid JPEG marker")
+            if marker[1] == 0xFF:
+                offset += 1  # fill byte
+                continue
+            code = marker[1]
+            length = struct.unpack('>H', marker[2:4])[0]
+            if code in JPEG_SOF_MARKERS:
+                height, width = struct.unpack('>HH', self._read_exact(offset + 5, 4))
+                return ImageInfo('jpeg', 'image/jpeg', width, height, orientation)
+            if code == 0xDA:
+                raise ImageProbeError("Scan data before the frame header")
+            if code == JPEG_APP1 and orientation == 1:
+                header = self._read_exact(offset + 4, 6)
+                if header == b'Exif\x00\x00':
+                    orientation = self._exif_orientation(offset + 10, length - 8)
+            offset += 2 + length
+
+    def _exif_orientation(self, offset: int, size: int) -> int:
+        """Orientation from IFD0 of the TIFF structure inside an EXIF block."""
+        tiff = self._read_exact(offset, 8)
+        endian = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+        if endian is None:
+            return 1
+        ifd = struct.unpack(endian + 'I', tiff[4:8])[0]
+        if ifd + 2 > size:
+            return 1
+        entries = struct.unpack(endian + 'H', self._read_exact(offset + ifd, 2))[0]
+        table = self._read_exact(offset + ifd + 2, min(entries, (size - ifd - 2) // 12) * 12)
+        for index in range(0, len(table), 12):
+            tag, kind, _, value = struct.unpack(endian + 'HHI4s', table[index:index + 12])
+            if tag == EXIF_ORIENTATION_TAG and kind == 3:  # SHORT, stored inline
+                orientation = struct.unpack(endian + 'H', value[:2])[0]
+                return orientation if 1 <= orientation <= 8 else 1
+        return 1
+
+    # ------------------------------------------------------- PNG, GIF, WebP
+
+    def _png(self, head: bytes) -> ImageInfo:
+        if head[12:16] != b'IHDR':
+            raise ImageProbeError("PNG does not start with IHDR")
+        width, height = struct.unpack('>II', head[16:24])
+        return ImageInfo('png', 'image/png', width, height)
+
+    def _gif(self, head: bytes) -> ImageInfo:
+        width, height = struct.unpack('<HH', head[6:10])
+        return ImageInfo('gif', 'image/gif', width, height)
+
+    def _webp(self, head: bytes) -> ImageInfo:
+        chunk = head[12:16]
+        data = head[20:32]
+        if chunk == b'VP8X':
+            width = 1 + int.from_bytes(data[4:7], 'little')
+            height = 1 + int.from_bytes(data[7:10], 'little')
+        elif chunk == b'VP8L':
+            if data[0] != 0x2F:
+                raise ImageProbeError("Invalid VP8L signature")
+            bits = struct.unpack('<I', data[1:5])[0]
+            width, height = 1 + (bits & 0x3FFF), 1 + ((bits >> 14) & 0x3FFF)
+        elif chunk == b'VP8 ':
+            if data[3:6] != b'\x9d\x01\x2a':
+                raise ImageProbeError("Invalid VP8 start code")
+            width, height = struct.unpack('<HH', data[6:10])
+            width, height = width & 0x3FFF, height & 0x3FFF
+        else:
+            raise ImageProbeError(f"Unknown WebP chunk {chunk!r}")
+        return ImageInfo('webp', 'image/webp', width, height)
+
+    # ----------------------------------------------------------------- SVG
+
+    def _svg(self) -> ImageInfo:
+        text = self._read_at(0, min(self.max_bytes - self.bytes_read, 16 * 1024))
+        match = re.search(rb'<svg\b([^>]*)>', text, re.IGNORECASE)
+        if match is None:
+            raise ImageProbeError("No <svg> root element")
+        attributes = dict(
+            (key.lower(), value)
+            for key, _, value in re.findall(rb'([\w:-]+)\s*=\s*(["\'])(.*?)\2', match.group(1), re.DOTALL)
+        )
+        width, height = self._svg_length(attributes.get(b'width')), self._svg_length(attributes.get(b'height'))
+        view_box = attributes.get(b'viewbox')
+        if (width is None or height is None) and view_box:
+            values = [float(value) for value in re.split(rb'[\s,]+', view_box.strip())]
+            if len(values) == 4 and values[2] > 0 and values[3] > 0:
+                if width is None and height is None:
+                    width, height = values[2], values[3]
+                elif width is None:
+                    width = height * values[2] / values[3]
+                else:
+                    height = width * values[3] / values[2]
+        if width is None or height is None:
+            raise ImageProbeError("SVG without absolute size or viewBox")
+        return ImageInfo('svg', 'image/svg+xml', round(width), round(height))
+
+    @staticmethod
+    def _svg_length(value: Optional[bytes]) -> Optional[float]:
+        """User units or px only; relative lengths (%, em) have no intrinsic size."""
+        match = SVG_LENGTH.match(value or b'')
+        return float(match.group(1)) if match else None
+
+
+def probe_image(file_object: BinaryIO,
+                name: Optional[str] = None,
+                max_bytes: int = IMAGE_PROBE_MAX_BYTES) -> ImageInfo:
+    """
+    Format, size and EXIF orientation of an image, read from its header.
+
+    Args:
+        file_object: Open, seekable binary file
+        name: File name used in error messages
+        max_bytes: Bytes read at most
+
+    Returns:
+        ImageInfo
+
+    Raises:
+        ImageProbeError: Unknown format or damaged header
+    """
+    return ImageHeaderProbe(file_object, name=name, max_bytes=max_bytes).probe()
@@ -9,9 +9,12 @@ from typing import Dict, Any, Optional, List, Tuple, Union
 from abc import ABC, abstractmethod
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
-from django.core.cache import cache
 from pathlib import Path
 
+from .metadata_cache import get_metadata_cache
+from .ranged import get_local_path, get_remote_url, open_ranged
+from .waveform import build_peaks, ensure_peaks, open_peaks
+
 logger = logging.getLogger('media.processors')
 
 class MediaProcessorException(Exception):
@@ -25,6 +28,10 @@ class MediaProcessor(ABC):
     Provides common functionality for processing different types of media files.
     """
     
+    # Bump when extract_metadata returns different values: cached results of
+    # the previous version are then ignored and pruned.
+    METADATA_VERSION = 1
+    
     def __init__(self, file_field, checksum=None):
         """
         Initialize with a file field and optional checksum.
@@ -35,9 +42,17 @@ class MediaProcessor(ABC):
         """
         self.file_field = file_field
         self.checksum = checksum
-        self.file_path = file_field.path if hasattr(file_field, 'path') else None
         self.file_name = file_field.name if hasattr(file_field, 'name') else None
+        self.storage = getattr(file_field, 'storage', None) or default_storage
+        # Local path on file system storages; ffmpeg also reads remote URLs
+        # with range requests, so object storages work without a download.
+        self.file_path = get_local_path(self.file_name, self.storage) if self.file_name else None
+        self.source = self.file_path or (get_remote_url(self.file_name, self.storage) if self.file_name else None)
         self.errors = []
+
+    def open_file(self):
+        """Opens the media file for random access on any storage backend."""
+        return open_ranged(self.file_name, self.storage)
     
     @abstractmethod
     def process(self) -> Dict[str, Any]:
@@ -51,7 +66,7 @@ class MediaProcessor(ABC):
         pass
     
     @abstractmethod
-    def get_metadata(self) -> Dict[str, Any]:
+    def extract_metadata(self) -> Dict[str, Any]:
         """
         Extract metadata from the media file.
         Must be implemented by subclasses.
@@ -61,29 +76,28 @@ class MediaProcessor(ABC):
         """
         pass
     
-    def get_cached_result(self, cache_key: str, timeout: int = 3600) -> Optional[Dict[str, Any]]:
+    def get_metadata(self) -> Dict[str, Any]:
         """
-        Get cached processing result if available.
+        Metadata of the media file, extracted once per content.
+        
+        With a checksum the result is kept in the shared metadata cache under
+        (checksum, processor, METADATA_VERSION): other workers and services
+        reuse it, and concurrent calls for the same content wait for a single
+        extraction. Failed extractions are not cached.
         
-        Args:
-            cache_key: Key for cache lookup
-            timeout: Cache timeout in seconds
-            
         Returns:
-            Cached result or None if not available
+            Dict containing metadata specific to the media type
         """
-        return cache.get(cache_key)
+        if not self.checksum:
+            return self.extract_metadata()
+        return get_metadata_cache().get_or_compute(
+            self.checksum, self.get_cache_name(), self.METADATA_VERSION,
+            self.extract_metadata, should_store=lambda metadata: not self.errors,
+        )
     
-    def set_cached_result(self, cache_key: str, result: Dict[str, Any], timeout: int = 3600) -> None:
-        """
-        Cache processing result for future use.
-        
-        Args:
-            cache_key: Key for cache storage
-            result: Data to cache
-            timeout: Cache timeout in seconds
-        """
-        cache.set(cache_key, result, timeout)
+    @classmethod
+    def get_cache_name(cls) -> str:
+        return f"{cls.__module__}.{cls.__qualname__}"
     
     def handle_error(self, error_message: str, exception: Optional[Exception] = None) -> None:
         """
@@ -143,20 +157,13 @@ class VideoProcessor(MediaProcessor):
             self.handle_error("Video processing failed", e)
             return {}
     
-    def get_metadata(self) -> Dict[str, Any]:
+    def extract_metadata(self) -> Dict[str, Any]:
         """
         Extract metadata from video file using FFmpeg or similar tool.
         
         Returns:
             Dict containing video metadata (duration, dimensions, codec, etc.)
         """
-        # Use caching if checksum is available
-        if self.checksum:
-            cache_key = f"video_metadata_{self.checksum}"
-            cached_result = self.get_cached_result(cache_key)
-            if cached_result:
-                return cached_result
-        
         metadata = {
             'duration': None,
             'width': None,
@@ -167,9 +174,9 @@ class VideoProcessor(MediaProcessor):
         }
         
         # Use FFmpeg if available for accurate metadata
-        if self.ffmpeg_available and self.file_path:
+        if self.ffmpeg_available and self.source:
             try:
-                probe = self.ffmpeg.probe(self.file_path)
+                probe = self.ffmpeg.probe(self.source)
                 
                 # Extract video stream data
                 video_stream = next((stream for stream in probe['streams'] 
@@ -207,11 +214,6 @@ class VideoProcessor(MediaProcessor):
             except Exception as e:
                 self.handle_error("FFmpeg metadata extraction failed", e)
         
-        # Cache the result if we have a checksum
-        if self.checksum:
-            cache_key = f"video_metadata_{self.checksum}"
-            self.set_cached_result(cache_key, metadata)
-        
         return metadata
     
     def generate_thumbnail(self, timestamp: float = 0.0, size: Tuple[int, int] = (640, 360)) -> Optional[str]:
@@ -225,7 +227,7 @@ class VideoProcessor(MediaProcessor):
         Returns:
             Path to the generated thumbnail or None if failed
         """
-        if not self.ffmpeg_available or not self.file_path:
+        if not self.ffmpeg_available or not self.source:
             self.handle_error("Cannot generate thumbnail without FFmpeg or valid file")
             return None
         
@@ -237,7 +239,7 @@ class VideoProcessor(MediaProcessor):
             # Extract the frame using FFmpeg
             (
                 self.ffmpeg
-                .input(self.file_path, ss=timestamp)
+                .input(self.source, ss=timestamp)
                 .filter('scale', size[0], size[1])
                 .output(temp_path, vframes=1)
                 .overwrite_output()
@@ -272,7 +274,7 @@ class VideoProcessor(MediaProcessor):
         Returns:
             Frame image data as bytes or None if failed
         """
-        if not self.ffmpeg_available or not self.file_path:
+        if not self.ffmpeg_available or not self.source:
             return None
         
         try:
@@ -283,7 +285,7 @@ class VideoProcessor(MediaProcessor):
             # Extract the frame using FFmpeg
             (
                 self.ffmpeg
-                .input(self.file_path, ss=timestamp)
+                .input(self.source, ss=timestamp)
                 .output(temp_path, vframes=1)
                 .overwrite_output()
                 .run(capture_stdout=True, capture_stderr=True)
@@ -352,20 +354,13 @@ class AudioProcessor(MediaProcessor):
             self.handle_error("Audio processing failed", e)
             return {}
     
-    def get_metadata(self) -> Dict[str, Any]:
+    def extract_metadata(self) -> Dict[str, Any]:
         """
         Extract metadata from audio file using Mutagen or similar library.
         
         Returns:
             Dict containing audio metadata (duration, sample rate, etc.)
         """
-        # Use caching if checksum is available
-        if self.checksum:
-            cache_key = f"audio_metadata_{self.checksum}"
-            cached_result = self.get_cached_result(cache_key)
-            if cached_result:
-                return cached_result
-        
         metadata = {
             'duration': None,
             'bitrate': None,
@@ -380,9 +375,11 @@ class AudioProcessor(MediaProcessor):
         }
         
         # Use Mutagen if available for accurate metadata
-        if self.mutagen_available and self.file_path:
+        if self.mutagen_available and self.file_name:
             try:
-                audio = self.mutagen.File(self.file_path)
+                # Mutagen seeks to the tags and stream headers it needs.
+                with self.open_file() as file_object:
+                    audio = self.mutagen.File(file_object)
                 
                 if audio:
                     # Extract basic audio metadata
@@ -443,69 +440,35 @@ class AudioProcessor(MediaProcessor):
             except Exception as e:
                 self.handle_error("Mutagen metadata extraction failed", e)
         
-        # Cache the result if we have a checksum
-        if self.checksum:
-            cache_key = f"audio_metadata_{self.checksum}"
-            self.set_cached_result(cache_key, metadata)
-        
         return metadata
     
     def generate_waveform_data(self, num_points: int = 100) -> Optional[List[float]]:
         """
         Generate waveform data for visualization.
         
+        The audio is decoded once by ffmpeg into a multi-resolution peaks file
+        (stored by checksum, so later calls only read the matching zoom level).
+        
         Args:
             num_points: Number of amplitude points to generate
             
         Returns:
             List of amplitude values or None if failed
         """
-        if not self.file_path:
+        if not self.file_name:
             return None
         
         try:
-            # Attempt to use specialized libraries if available
-            try:
-                import numpy as np
-                from pydub import AudioSegment
-                
-                # Load audio file
-                audio = AudioSegment.from_file(self.file_path)
-                
-                # Convert to mono for simplicity
-                audio = audio.set_channels(1)
-                
-                # Get raw audio data as numpy array
-                samples = np.array(audio.get_array_of_samples())
-                
-                # Normalize
-                samples = samples / np.max(np.abs(samples))
-                
-                # Resample to desired number of points
-                samples_per_point = len(samples) // num_points
-                
-                waveform = []
-                for i in range(num_points):
-                    start = i * samples_per_point
-                    end = (i + 1) * samples_per_point
-                    if end > len(samples):
-                        end = len(samples)
-                    
-                    # Take peak amplitude in each segment
-                    segment = samples[start:end]
-                    if len(segment) > 0:
-                        amplitude = float(np.max(np.abs(segment)))
-                        waveform.append(amplitude)
-                
-                return waveform
-                
-            except ImportError:
-                # Fallback to a simpler approach if specialized libraries aren't available
-                # In a real implementation, you'd want to add a simpler waveform generator
-                # This is a placeholder that creates a synthetic waveform
-                import random
-                return [random.uniform(0.1, 1.0) for _ in range(num_points)]
-                
+            if self.checksum:
+                ensure_peaks(self.checksum, self.file_name, self.storage)
+                peaks = open_peaks(self.checksum, self.storage)
+            elif self.source:
+                peaks = build_peaks(self.source)
+            else:
+                with self.open_file() as file_object:
+                    peaks = build_peaks(file_object)
+            with peaks:
+                return peaks.amplitudes(num_points)
         except Exception as e:
             self.handle_error("Waveform generation failed", e)
             return None
@@ -517,11 +480,12 @@ class AudioProcessor(MediaProcessor):
         Returns:
             Path to the extracted album art or None if not found/failed
         """
-        if not self.mutagen_available or not self.file_path:
+        if not self.mutagen_available or not self.file_name:
             return None
         
         try:
-            audio = self.mutagen.File(self.file_path)
+            with self.open_file() as file_object:
+                audio = self.mutagen.File(file_object)
             
             if audio:
                 # For ID3 files (MP3)
@@ -0,0 +1,215 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, Union, BinaryIO
+
+from django.conf import settings
+from django.core.files import File
+
+from .backends import magic
+
+
+logger = logging.getLogger('utils')
+
+# Default read buffer used when streaming a file (overridable with
+# settings.UPLOAD_CHUNK_SIZE or per extractor instance).
+DEFAULT_CHUNK_SIZE = 2 * 1024 * 1024  # 2MB
+
+# Number of leading bytes handed to libmagic for MIME sniffing.
+MIME_SNIFF_BYTES = 2048
+
+EXTENSION_MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.svg': 'image/svg+xml',
+    '.mp4': 'video/mp4',
+    '.webm': 'video/webm',
+    '.mov': 'video/quicktime',
+    '.mkv': 'video/x-matroska',
+    '.avi': 'video/x-msvideo',
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/x-wav',
+    '.ogg': 'audio/ogg',
+    '.flac': 'audio/flac',
+    '.m4a': 'audio/mp4',
+    '.txt': 'text/plain',
+}
+
+
+def get_chunk_size(chunk_size: Optional[int] = None) -> int:
+    """Returns the streaming buffer size, falling back to settings.UPLOAD_CHUNK_SIZE."""
+    return chunk_size or getattr(settings, 'UPLOAD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def guess_mime_from_extension(name: Optional[str]) -> str:
+    """Extension based MIME fallback used when libmagic is unavailable or fails."""
+    ext = Path(name or '').suffix.lower()
+    return EXTENSION_MIME_TYPES.get(ext, 'application/octet-stream')
+
+
+class StreamingMetadataExtractor:
+    """
+    Computes file size, checksum and MIME type in a single pass over a stream.
+
+    The extractor is fed chunk by chunk (``update``) so it can sit next to any
+    code that is already reading the file: a storage write, an upload handler
+    or a plain loop over ``File.chunks()``. Only the first ``MIME_SNIFF_BYTES``
+    bytes are kept in memory for libmagic.
+
+    Usage:
+        >>> extractor = StreamingMetadataExtractor(name="lesson.mp4")
+        >>> for chunk in upload.chunks():
+        ...     extractor.update(chunk)
+        >>> extractor.get_metadata()
+        {'size': ..., 'checksum': ..., 'mime_type': ..., 'extension': '.mp4'}
+    """
+
+    def __init__(self,
+                 name: Optional[str] = None,
+                 algorithm: str = 'sha256',
+                 chunk_size: Optional[int] = None,
+                 expected_size: Optional[int] = None) -> None:
+        """
+        Args:
+            name: File name, used for the extension and the MIME fallback
+            algorithm: hashlib algorithm name for the checksum
+            chunk_size: Read buffer size in bytes (defaults to settings.UPLOAD_CHUNK_SIZE)
+            expected_size: Size announced by the source, used by ``is_complete``
+        """
+        self.name = name
+        self.expected_size = expected_size
+        self.algorithm = algorithm
+        self.chunk_size = get_chunk_size(chunk_size)
+        self._hash = hashlib.new(algorithm)
+        self._header = bytearray()
+        self.size = 0
+
+    def update(self, chunk: bytes) -> None:
+        """Feeds the next contiguous chunk of the file."""
+        if not chunk:
+            return
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        missing = MIME_SNIFF_BYTES - len(self._header)
+        if missing > 0:
+            self._header.extend(chunk[:missing])
+
+    def consume(self, chunks: Iterable[bytes]) -> 'StreamingMetadataExtractor':
+        """Feeds every chunk of an iterable and returns the extractor."""
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    def consume_file(self, file_object: BinaryIO) -> 'StreamingMetadataExtractor':
+        """Reads an open binary file from its start in ``chunk_size`` blocks."""
+        if hasattr(file_object, 'seek'):
+            file_object.seek(0)
+        return self.consume(iter(lambda: file_object.read(self.chunk_size), b''))
+
+    def consume_path(self, path: Union[str, os.PathLike]) -> 'StreamingMetadataExtractor':
+        """Reads a local file path in ``chunk_size`` blocks."""
+        with open(path, 'rb', buffering=0) as file_object:
+            return self.consume_file(file_object)
+
+    @property
+    def header(self) -> bytes:
+        """The leading bytes seen so far (at most ``MIME_SNIFF_BYTES``)."""
+        return bytes(self._header)
+
+    @property
+    def is_complete(self) -> bool:
+        """True when at least one byte was seen and the announced size (if any) matches."""
+        if not self.size:
+            return False
+        return self.expected_size is None or self.size == self.expected_size
+
+    @property
+    def checksum(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def extension(self) -> str:
+        return Path(self.name or '').suffix.lower()
+
+    def detect_mime_type(self) -> str:
+        """Detects the MIME type from the buffered header with libmagic."""
+        try:
+            return magic.Magic(mime=True).from_buffer(self.header)
+        except Exception as e:
+            logger.warning(f"libmagic failed for {self.name}: {e}")
+            return guess_mime_from_extension(self.name)
+
+    def get_metadata(self) -> Dict[str, Any]:
+        """
+        Returns: {
+            'size': int,
+            'checksum': str,
+            'mime_type': str,
+            'extension': str
+        }
+        """
+        return {
+            'size': self.size,
+            'checksum': self.checksum,
+            'mime_type': self.detect_mime_type(),
+            'extension': self.extension,
+        }
+
+
+class MetadataTeeFile(File):
+    """
+    File proxy that feeds a ``StreamingMetadataExtractor`` while the wrapped
+    upload is read, e.g. by ``Storage.save`` writing it to its final location.
+
+    Only bytes past what the extractor has already seen are fed to it, so a
+    storage backend that seeks back and re-reads does not corrupt the checksum.
+    ``temporary_file_path`` is deliberately not proxied: storages would move
+    the temp file without reading it and the extractor would see nothing.
+    """
+
+    def __init__(self, file: File, extractor: StreamingMetadataExtractor) -> None:
+        super().__init__(file, name=getattr(file, 'name', None))
+        self.extractor = extractor
+        self._position = 0
+
+    def read(self, *args, **kwargs) -> bytes:
+        data = self.file.read(*args, **kwargs)
+        if data:
+            # Feed only the bytes the extractor has not seen yet.
+            seen = self.extractor.size - self._position
+            if 0 <= seen < len(data):
+                self.extractor.update(data[seen:])
+            self._position += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        position = self.file.seek(offset, whence)
+        self._position = self.file.tell() if position is None else position
+        return self._position
+
+    def chunks(self, chunk_size: Optional[int] = None):
+        return super().chunks(chunk_size or self.extractor.chunk_size)
+
+
+def extract_metadata(file_object: BinaryIO,
+                     name: Optional[str] = None,
+                     chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Single pass metadata extraction for an open binary file.
+
+    Args:
+        file_object: Readable (and ideally seekable) binary file
+        name: File name used for the extension/MIME fallback
+        chunk_size: Read buffer size in bytes
+
+    Returns:
+        Dict with 'size', 'checksum', 'mime_type' and 'extension'
+    """
+    name = name or getattr(file_object, 'name', None)
+    extractor = StreamingMetadataExtractor(name=name, chunk_size=chunk_size)
+    return extractor.consume_file(file_object).get_metadata()
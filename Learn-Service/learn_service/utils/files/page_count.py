@@ -0,0 +1,432 @@
+import io
+import mmap
+import re
+import zipfile
+import zlib
+from typing import Any, BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+from xml.etree import ElementTree
+
+# startxref must be in the last 1024 bytes; allow for trailing junk.
+PDF_TAIL_BYTES = 4096
+# Window read around an object; grown when a dictionary does not fit.
+PDF_OBJECT_WINDOW = 16 * 1024
+PDF_MAX_OBJECT_WINDOW = 1024 * 1024
+
+OOXML_APP_PROPERTIES = 'docProps/app.xml'
+OOXML_EXTENDED_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}'
+
+_TOKEN = re.compile(
+    rb'(?:\s|%[^\r\n]*)*'
+    rb'(<<|>>|\[|\]|/[^\s/<>\[\]()%{}]*|\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>'
+    rb'|[+-]?(?:\d+\.?\d*|\.\d+)|[A-Za-z]+)'
+)
+_NUMBER = re.compile(rb'[+-]?(?:\d+\.?\d*|\.\d+)$')
+
+
+class PdfFormatError(ValueError):
+    """Raised when the PDF structure cannot be read without a full parse."""
+
+
+class Ref(NamedTuple):
+    number: int
+    generation: int
+
+
+class _Lexer:
+    """Tokenizer over a byte window, with the few PDF object types needed here."""
+
+    def __init__(self, data: bytes, position: int = 0) -> None:
+        self.data = data
+        self.position = position
+
+    def next(self) -> bytes:
+        match = _TOKEN.match(self.data, self.position)
+        if match is None:
+            raise PdfFormatError("Unexpected end of object")
+        self.position = match.end()
+        return match.group(1)
+
+    def peek(self, count: int = 1) -> List[bytes]:
+        position, tokens = self.position, []
+        try:
+            for _ in range(count):
+                tokens.append(self.next())
+        except PdfFormatError:
+            pass
+        self.position = position
+        return tokens
+
+    def value(self) -> Any:
+        token = self.next()
+        if token == b'<<':
+            result = {}
+            while True:
+                key = self.next()
+                if key == b'>>':
+                    return result
+                if not key.startswith(b'/'):
+                    raise PdfFormatError(f"Dictionary key expected, got {key[:20]!r}")
+                result[key[1:].decode('latin-1')] = self.value()
+        if token == b'[':
+            items = []
+            while self.peek() != [b']']:
+                items.append(self.value())
+            self.next()
+            return items
+        if token.startswith(b'/'):
+            return token[1:].decode('latin-1')
+        if _NUMBER.match(token):
+            if b'.' in token:
+                return float(token)
+            following = self.peek(2)
+            if len(following) == 2 and _NUMBER.match(following[0]) and following[1] == b'R':
+                self.next(), self.next()
+                return Ref(int(token), int(following[0]))
+            return int(token)
+        if token in (b']', b'>>'):
+            raise PdfFormatError(f"Unbalanced {token!r}")
+        return token
+
+
+def _png_unpredict(data: bytes, columns: int) -> bytes:
+    """Reverses the PNG row predictors (/Predictor >= 10) used by xref streams."""
+    row_length = columns + 1
+    previous = bytearray(columns)
+    output = bytearray()
+    for start in range(0, len(data) - row_length + 1, row_length):
+        kind, row = data[start], bytearray(data[start + 1:start + row_length])
+        for i in range(columns):
+            left = row[i - 1] if i else 0
+            up = previous[i]
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + ((left + up) >> 1)) & 0xFF
+            elif kind == 4:
+                upper_left = previous[i - 1] if i else 0
+                p = left + up - upper_left
+                pa, pb, pc = abs(p - left), abs(p - up), abs(p - upper_left)
+                predictor = left if pa <= pb and pa <= pc else up if pb <= pc else upper_left
+                row[i] = (row[i] + predictor) & 0xFF
+        output += row
+        previous = row
+    return bytes(output)
+
+
+class _ClassicSection:
+    """A classic ``xref`` table, looked up by offset arithmetic (entries are fixed width)."""
+
+    def __init__(self, subsections: List[Tuple[int, int, int, int]], reader: 'PdfPageCounter') -> None:
+        self.subsections = subsections
+        self.reader = reader
+
+    def lookup(self, number: int) -> Optional[Tuple[int, int, int]]:
+        for first, count, offset, entry_length in self.subsections:
+            if first <= number < first + count:
+                entry = self.reader.read(offset + (number - first) * entry_length, entry_length)
+                kind = 1 if entry[17:18] == b'n' else 0
+                return kind, int(entry[:10]), int(entry[11:16])
+        return None
+
+
+class _StreamSection:
+    """A cross-reference stream (PDF 1.5+), decoded once."""
+
+    def __init__(self, rows: bytes, widths: List[int], index: List[int]) -> None:
+        self.rows = rows
+        self.widths = widths
+        self.index = index
+        self.row_length = sum(widths)
+
+    def lookup(self, number: int) -> Optional[Tuple[int, int, int]]:
+        row = 0
+        for first, count in zip(self.index[::2], self.index[1::2]):
+            if first <= number < first + count:
+                start = (row + number - first) * self.row_length
+                fields, position = [], start
+                for width in self.widths:
+                    fields.append(int.from_bytes(self.rows[position:position + width], 'big'))
+                    position += width
+                if not self.widths[0]:
+                    fields[0] = 1
+                return fields[0], fields[1], fields[2]
+            row += count
+        return None
+
+
+class PdfPageCounter:
+    """
+    Reads the page count of a PDF from its cross-reference data, the
+    document catalog and the root ``/Pages`` node, without building the page
+    tree or touching page content.
+
+    The file is memory mapped when it has a file descriptor, so only the
+    trailer, the xref entries that are looked up and two or three objects
+    are ever paged in. Classic xref tables, xref streams (with PNG
+    predictors), hybrid files, incremental updates (``/Prev``) and objects
+    inside object streams are supported.
+
+    Usage:
+        >>> with open('book.pdf', 'rb') as pdf:
+        ...     PdfPageCounter(pdf).count()
+        500
+    """
+
+    def __init__(self, file_object: BinaryIO) -> None:
+        self.file_object = file_object
+        self._mmap: Optional[mmap.mmap] = None
+        try:
+            self._mmap = mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ)
+            self.size = len(self._mmap)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            file_object.seek(0, io.SEEK_END)
+            self.size = file_object.tell()
+        self._sections: List[Any] = []
+        self._object_streams: Dict[int, Tuple[bytes, Dict[int, int], int]] = {}
+
+    def read(self, offset: int, size: int) -> bytes:
+        if self._mmap is not None:
+            return self._mmap[offset:offset + size]
+        self.file_object.seek(offset)
+        return self.file_object.read(size)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def count(self) -> int:
+        """
+        Returns:
+            int: The ``/Count`` of the root page tree node.
+
+        Raises:
+            PdfFormatError: If the structure cannot be followed (damaged or
+                encrypted files); callers fall back to a full parse.
+        """
+        try:
+            trailer = self._load_xref(self._find_startxref())
+            root = self._resolve(trailer.get('Root'))
+            pages = self._resolve(root.get('Pages')) if isinstance(root, dict) else None
+            count = self._resolve(pages.get('Count')) if isinstance(pages, dict) else None
+            if not isinstance(count, int) or count < 0:
+                raise PdfFormatError("No page count in the root page tree")
+            return count
+        except (KeyError, IndexError, TypeError, ValueError, zlib.error) as e:
+            raise PdfFormatError(str(e)) from e
+        finally:
+            self.close()
+
+    def _find_startxref(self) -> int:
+        start = max(0, self.size - PDF_TAIL_BYTES)
+        tail = self.read(start, self.size - start)
+        match = None
+        for match in re.finditer(rb'startxref\s+(\d+)', tail):
+            pass
+        if match is None:
+            raise PdfFormatError("startxref not found")
+        return int(match.group(1))
+
+    def _load_xref(self, offset: int) -> Dict[str, Any]:
+        """Loads the chain of xref sections, newest first, and returns the newest trailer."""
+        newest, seen = None, set()
+        while offset is not None and offset not in seen:
+            seen.add(offset)
+            if self.read(offset, 4) == b'xref':
+                trailer = self._read_classic_section(offset)
+                if isinstance(trailer.get('XRefStm'), int):
+                    # Hybrid file: the stream holds the compressed objects.
+                    self._read_stream_section(trailer['XRefStm'])
+            else:
+                trailer = self._read_stream_section(offset)
+            newest = newest or trailer
+            offset = trailer.get('Prev')
+        if newest is None:
+            raise PdfFormatError("No cross-reference section")
+        return newest
+
+    def _read_classic_section(self, offset: int) -> Dict[str, Any]:
+        position = offset + 4
+        subsections = []
+        header = re.compile(rb'\s*(\d+)\s+(\d+)[ \t]*\r?\n?')
+        while True:
+            window = self.read(position, 64)
+            match = header.match(window)
+            if match is None:
+                break
+            first, count = int(match.group(1)), int(match.group(2))
+            entries = position + match.end()
+            # Entries are 20 bytes; some writers emit 19 (a bare newline).
+            entry_length = 20 if self.read(entries + 18, 2) in (b' \n', b' \r', b'\r\n') else 19
+            subsections.append((first, count, entries, entry_length))
+            position = entries + count * entry_length
+        window = self.read(position, PDF_OBJECT_WINDOW)
+        start = window.find(b'trailer')
+        if start < 0:
+            raise PdfFormatError("trailer not found")
+        self._sections.append(_ClassicSection(subsections, self))
+        return self._parse_window(position + start + len(b'trailer'))
+
+    def _read_stream_section(self, offset: int) -> Dict[str, Any]:
+        dictionary, data = self._read_object_at(offset, with_stream=True)
+        if dictionary.get('Type') != 'XRef':
+            raise PdfFormatError("Cross-reference stream expected")
+        size = dictionary['Size']
+        self._sections.append(_StreamSection(data, dictionary['W'], dictionary.get('Index', [0, size])))
+        return dictionary
+
+    def _parse_window(self, offset: int) -> Any:
+        """Parses one value at ``offset``, growing the read window as needed."""
+        window = PDF_OBJECT_WINDOW
+        while True:
+            lexer = _Lexer(self.read(offset, window))
+            try:
+                return lexer.value()
+            except PdfFormatError:
+                if window >= PDF_MAX_OBJECT_WINDOW or offset + window >= self.size:
+                    raise
+                window *= 4
+
+    def _read_object_at(self, offset: int, with_stream: bool = False):
+        window = PDF_OBJECT_WINDOW
+        while True:
+            data = self.read(offset, window)
+            lexer = _Lexer(data)
+            try:
+                lexer.next(), lexer.next()
+                if lexer.next() != b'obj':
+                    raise PdfFormatError(f"No object at offset {offset}")
+                value = lexer.value()
+                if not with_stream:
+                    return value
+                if lexer.next() != b'stream':
+                    raise PdfFormatError("Stream expected")
+                break
+            except PdfFormatError:
+                if window >= PDF_MAX_OBJECT_WINDOW or offset + window >= self.size:
+                    raise
+                window *= 4
+        start = offset + lexer.position
+        start += 2 if self.read(start, 2) == b'\r\n' else 1
+        length = self._resolve(value['Length'])
+        return value, self._decode_stream(value, self.read(start, length))
+
+    @staticmethod
+    def _decode_stream(dictionary: Dict[str, Any], data: bytes) -> bytes:
+        filters = dictionary.get('Filter', [])
+        filters = filters if isinstance(filters, list) else [filters]
+        if filters not in ([], ['FlateDecode']):
+            raise PdfFormatError(f"Unsupported stream filter {filters}")
+        if filters:
+            data = zlib.decompressobj().decompress(data)
+        parameters = dictionary.get('DecodeParms') or {}
+        if isinstance(parameters, list):
+            parameters = parameters[0] or {}
+        predictor = parameters.get('Predictor', 1)
+        if predictor >= 10:
+            data = _png_unpredict(data, parameters.get('Columns', 1))
+        elif predictor != 1:
+            raise PdfFormatError(f"Unsupported predictor {predictor}")
+        return data
+
+    def _resolve(self, value: Any) -> Any:
+        return self._get_object(value.number) if isinstance(value, Ref) else value
+
+    def _get_object(self, number: int) -> Any:
+        for section in self._sections:
+            entry = section.lookup(number)
+            if entry is not None:
+                break
+        else:
+            raise PdfFormatError(f"Object {number} is not in the cross-reference table")
+        kind, field, index = entry
+        if kind == 1:
+            return self._read_object_at(field)
+        if kind == 2:
+            return self._read_compressed_object(field, number)
+        raise PdfFormatError(f"Object {number} is free")
+
+    def _read_compressed_object(self, stream_number: int, number: int) -> Any:
+        if stream_number not in self._object_streams:
+            entry = next(
+                (entry for entry in (section.lookup(stream_number) for section in self._sections) if entry),
+                None,
+            )
+            if entry is None or entry[0] != 1:
+                raise PdfFormatError(f"Object stream {stream_number} not found")
+            dictionary, data = self._read_object_at(entry[1], with_stream=True)
+            numbers = _Lexer(data)
+            offsets = {}
+            for _ in range(dictionary['N']):
+                object_number = int(numbers.next())
+                offsets[object_number] = int(numbers.next())
+            self._object_streams[stream_number] = (data, offsets, dictionary['First'])
+        data, offsets, first = self._object_streams[stream_number]
+        return _Lexer(data, first + offsets[number]).value()
+
+
+def count_pdf_pages(file_object: BinaryIO) -> int:
+    """Header only PDF page count (see PdfPageCounter)."""
+    return PdfPageCounter(file_object).count()
+
+
+def _app_property(archive: zipfile.ZipFile, name: str) -> Optional[int]:
+    try:
+        root = ElementTree.fromstring(archive.read(OOXML_APP_PROPERTIES))
+    except (KeyError, ElementTree.ParseError):
+        return None
+    element = root.find(f'{OOXML_EXTENDED_NS}{name}')
+    if element is None or not (element.text or '').strip().isdigit():
+        return None
+    return int(element.text)
+
+
+def _count_parts(archive: zipfile.ZipFile, pattern: str) -> int:
+    part = re.compile(pattern)
+    return sum(1 for name in archive.namelist() if part.fullmatch(name))
+
+
+def count_ooxml_pages(file_object: BinaryIO, kind: str) -> Optional[int]:
+    """
+    Page, slide or sheet count of an Office Open XML file, read from the zip
+    central directory and ``docProps/app.xml`` only.
+
+    - docx: ``<Pages>`` as last saved by the editor
+    - pptx: the number of slide parts (``<Slides>`` goes stale when files are
+      written by libraries), falling back to ``<Slides>``
+    - xlsx: the number of worksheet parts
+
+    Args:
+        file_object: Seekable binary file
+        kind: 'docx', 'pptx' or 'xlsx'
+
+    Returns:
+        The count, or None when the archive does not record it.
+    """
+    with zipfile.ZipFile(file_object) as archive:
+        if kind == 'docx':
+            return _app_property(archive, 'Pages')
+        if kind == 'pptx':
+            return _count_parts(archive, r'ppt/slides/slide\d+\.xml') or _app_property(archive, 'Slides')
+        if kind == 'xlsx':
+            return _count_parts(archive, r'xl/worksheets/sheet\d+\.xml') or None
+    raise ValueError(f"Unknown Office Open XML kind: {kind}")
+
+
+def estimate_docx_pages(file_object: BinaryIO, chunk_size: int = 64 * 1024) -> int:
+    """
+    Fallback page count of a .docx without ``<Pages>``: rendered and explicit
+    page breaks in ``word/document.xml``, streamed in constant memory.
+    """
+    markers = (b'<w:lastRenderedPageBreak/>', b'w:type="page"')
+    overlap = max(len(marker) for marker in markers) - 1
+    breaks, tail = 0, b''
+    with zipfile.ZipFile(file_object) as archive, archive.open('word/document.xml') as document:
+        for chunk in iter(lambda: document.read(chunk_size), b''):
+            data = tail + chunk
+            # Only count markers that end past the carried over bytes.
+            breaks += sum(data.count(marker) - tail.count(marker) for marker in markers)
+            tail = data[-overlap:]
+    return breaks + 1
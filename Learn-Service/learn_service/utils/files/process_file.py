@@ -1,15 +1,17 @@
+from __future__ import annotations
+
 from django.core.files import File
-from typing import Optional, Dict, Any
-import os
+from typing import Optional, Dict, Any, BinaryIO, Iterator
+from contextlib import contextmanager
 import hashlib
 import logging
-from magic import Magic
 from pathlib import Path
 from django.core.files.storage import default_storage
-from PyPDF2 import PdfReader
-import docx
-from pptx import Presentation
-import magic
+from .backends import PyPDF2, magic, pptx
+from .metadata import StreamingMetadataExtractor
+from .page_count import PdfFormatError, count_pdf_pages, count_ooxml_pages, estimate_docx_pages
+from .ranged import open_ranged
+from .image_probe import ImageProbeError, probe_image
 
 
 logger = logging.getLogger('utils')
@@ -34,9 +36,11 @@ class FileProcessor:
             raise TypeError("Expected Django File-like object")
         
 
-    def get_metadata(self) -> Dict[str, Any]:
+    def get_metadata(self, chunk_size: Optional[int] = None) -> Dict[str, Any]:
         """
-        Extracts core file metadata (size, checksum, MIME type).
+        Extracts core file metadata (size, checksum, MIME type) in a single
+        streaming pass: the stored file is opened once and read sequentially
+        with a large buffer instead of once per metadata field.
         Returns: {
             'size': int,
             'checksum': str,
@@ -45,23 +49,17 @@ class FileProcessor:
         }
         """
         try:
-            return {
-                'size': self._get_file_size(),
-                'checksum': self._calculate_checksum(),
-                'mime_type': self._detect_mime_type(),
-                'extension': self._get_extension()
-            }
+            extractor = StreamingMetadataExtractor(name=self.file.name, chunk_size=chunk_size)
+            with default_storage.open(self.file.name, 'rb') as file_object:
+                extractor.consume(file_object.chunks(extractor.chunk_size))
+            return extractor.get_metadata()
         except Exception as e:
             logger.error(f"Metadata extraction failed: {e} to: \n {Path(__file__).resolve()}")
             raise NotImplementedError("This is abstract Method can not used to create object.")                                                                                                                                                                                                                                               
 
     def _get_file_size(self) -> int:
         """Returns file size in bytes."""
-        with default_storage.open(self.file.name, 'rb') as file_object:
-            file_object.seek(0, os.SEEK_END)
-            size = file_object.tell()
-            file_object.seek(0)  # Reset pointer
-            return size
+        return default_storage.size(self.file.name)
 
     def _calculate_checksum(self, algorithm: str = 'sha256') -> str:
         """Generates a checksum for file integrity verification."""
@@ -74,8 +72,8 @@ class FileProcessor:
     def _detect_mime_type(self) -> str:
         """Detects MIME type using libmagic with fallback to extensions."""
         try:
-            with default_storage.open(self.file.name, 'rb') as file_object: # 'rb' for binary read
-                mime = Magic(mime=True)
+            with open_ranged(self.file.name) as file_object: # only the header is fetched
+                mime = magic.Magic(mime=True)
                 chunk = file_object.read(1024)
                 return mime.from_buffer(chunk)
         except Exception:
@@ -162,16 +160,12 @@ class ImageProcessor(FileProcessor):
         return metadata
 
     def _get_image_dimensions(self) -> Optional[tuple]:
-        """Uses PIL to extract image dimensions."""
+        """Displayed (width, height) read from the image header only."""
         try:
-            from PIL import Image
-
-            with default_storage.open(self.file.name, 'rb') as file_object:
-                image_bytes = file_object.read()
-                with Image.open(io.BytesIO(image_bytes)) as img:
-                    return img.size
-        except ImportError:
-            logger.warning("Pillow not installed for image processing")
+            with open_ranged(self.file.name) as file_object:
+                return probe_image(file_object, name=self.file.name).display_size
+        except ImageProbeError as e:
+            logger.warning(f"Could not read image dimensions: {e}")
             return None
 
 
@@ -181,24 +175,57 @@ class DocumentPageCounter:
 
     Supported file types:
     - PDF (.pdf): Counts number of pages.
-    - Word (.docx): Counts number of paragraphs (not actual pages).
+    - Word (.docx): Counts number of pages.
     - PowerPoint (.pptx): Counts number of slides.
+    - Excel (.xlsx): Counts number of worksheets.
     - Plain text (.txt): Counts number of lines.
+
+    Counts are read from the file structure only (the PDF cross-reference
+    data and page tree root, the Office zip directory and docProps/app.xml);
+    the documents are only parsed in full when that information is missing.
     """
 
+    OOXML_KINDS = {
+        "wordprocessingml.document": "docx",
+        "presentationml.presentation": "pptx",
+        "spreadsheetml.sheet": "xlsx",
+    }
+
     file_name: str
     _mime_detector: magic.Magic
     mime_type: Optional[str]
 
-    def __init__(self, file: File) -> None:
+    def __init__(self,
+                 file: File,
+                 file_object: Optional[BinaryIO] = None,
+                 mime_type: Optional[str] = None) -> None:
         """
         Initializes the counter with a Django File object.
         
         :param file: Django File object
+        :param file_object: Optional open binary file to read instead of
+            re-opening ``file`` from storage (e.g. an upload not yet saved)
+        :param mime_type: Optional already detected MIME type
         """
         self.file_name: str = file.name
+        self.file_object: Optional[BinaryIO] = file_object
         self._mime_detector: magic.Magic = magic.Magic(mime=True)
-        self.mime_type: Optional[str] = self._get_mime_type()
+        self.mime_type: Optional[str] = mime_type or self._get_mime_type()
+
+    @contextmanager
+    def _open(self) -> Iterator[BinaryIO]:
+        """
+        Yields a binary file positioned at the start, either the given file
+        object or the file opened from storage for random access (ranged
+        reads on remote storages, so only the parts parsed are fetched).
+        """
+        if self.file_object is not None:
+            self.file_object.seek(0)
+            yield self.file_object
+            self.file_object.seek(0)
+            return
+        with open_ranged(self.file_name) as file_object:
+            yield file_object
 
     def _get_mime_type(self) -> Optional[str]:
         """
@@ -207,7 +234,8 @@ class DocumentPageCounter:
         :return: MIME type string or None on error
         """
         try:
-            return self._mime_detector.from_file(default_storage.path(self.file_name))
+            with self._open() as file_object:
+                return self._mime_detector.from_buffer(file_object.read(2048))
         except Exception as e:
             logger.error(f"Error detecting MIME type: {e}")
             return None
@@ -221,45 +249,71 @@ class DocumentPageCounter:
         if not self.mime_type:
             return None
 
+        kind = self._get_ooxml_kind()
         if "pdf" in self.mime_type:
             return self._count_pdf_pages()
-        elif "wordprocessingml.document" in self.mime_type:  # .docx
-            return self._count_docx_paragraphs()
-        elif "presentationml.presentation" in self.mime_type:  # .pptx
+        elif kind == "docx":
+            return self._count_docx_pages()
+        elif kind == "pptx":
             return self._count_pptx_slides()
+        elif kind == "xlsx":
+            return self._count_xlsx_sheets()
         elif "text/plain" in self.mime_type:
             return self._count_txt_lines()
         else:
             logger.warning(f"Unsupported MIME type: {self.mime_type}")
             return None
 
+    def _get_ooxml_kind(self) -> Optional[str]:
+        """
+        Returns 'docx', 'pptx' or 'xlsx' for Office Open XML files. libmagic
+        reports some of them as plain zip archives, then the extension decides.
+
+        :return: Kind or None for other files
+        """
+        for marker, kind in self.OOXML_KINDS.items():
+            if marker in self.mime_type:
+                return kind
+        extension = Path(self.file_name).suffix.lower().lstrip('.')
+        if self.mime_type in ("application/zip", "application/octet-stream") and extension in self.OOXML_KINDS.values():
+            return extension
+        return None
+
     def _count_pdf_pages(self) -> Optional[int]:
         """
-        Counts the number of pages in a PDF file.
+        Counts the number of pages in a PDF file from its page tree root,
+        falling back to PyPDF2 for files whose structure cannot be followed.
 
         :return: Page count or None on error
         """
         try:
-            with default_storage.open(self.file_name, 'rb') as file_object:
-                reader: PdfReader = PdfReader(file_object)
+            with self._open() as file_object:
+                try:
+                    return count_pdf_pages(file_object)
+                except PdfFormatError as e:
+                    logger.info(f"Falling back to a full PDF parse for {self.file_name}: {e}")
+                reader = PyPDF2.PdfReader(file_object)
                 return len(reader.pages)
         except Exception as e:
             logger.error(f"Error counting PDF pages: {e}")
             return None
 
-    def _count_docx_paragraphs(self) -> Optional[int]:
+    def _count_docx_pages(self) -> Optional[int]:
         """
-        Counts the number of paragraphs in a .docx file.
-        (Note: Not an accurate page count.)
+        Counts the number of pages in a .docx file as recorded by the editor,
+        or from the page breaks in the document body when it was not.
 
-        :return: Paragraph count or None on error
+        :return: Page count or None on error
         """
         try:
-            with default_storage.open(self.file_name, 'rb') as file_object:
-                doc: docx.Document = docx.Document(file_object)
-                return len(doc.paragraphs)
+            with self._open() as file_object:
+                pages = count_ooxml_pages(file_object, "docx")
+                if pages is None:
+                    file_object.seek(0)
+                    pages = estimate_docx_pages(file_object)
+                return pages
         except Exception as e:
-            logger.error(f"Error counting paragraphs in .docx: {e}")
+            logger.error(f"Error counting pages in .docx: {e}")
             return None
 
     def _count_pptx_slides(self) -> Optional[int]:
@@ -269,13 +323,30 @@ class DocumentPageCounter:
         :return: Slide count or None on error
         """
         try:
-            with default_storage.open(self.file_name, 'rb') as file_object:
-                presentation: Presentation = Presentation(file_object)
-                return len(presentation.slides)
+            with self._open() as file_object:
+                slides = count_ooxml_pages(file_object, "pptx")
+                if slides is None:
+                    file_object.seek(0)
+                    presentation = pptx.Presentation(file_object)
+                    slides = len(presentation.slides)
+                return slides
         except Exception as e:
             logger.error(f"Error counting slides in .pptx: {e}")
             return None
 
+    def _count_xlsx_sheets(self) -> Optional[int]:
+        """
+        Counts the number of worksheets in a .xlsx file.
+
+        :return: Sheet count or None on error
+        """
+        try:
+            with self._open() as file_object:
+                return count_ooxml_pages(file_object, "xlsx")
+        except Exception as e:
+            logger.error(f"Error counting sheets in .xlsx: {e}")
+            return None
+
     def _count_txt_lines(self) -> Optional[int]:
         """
         Counts the number of lines in a plain text file.
@@ -283,8 +354,13 @@ class DocumentPageCounter:
         :return: Line count or None on error
         """
         try:
-            with default_storage.open(self.file_name, 'r', encoding='utf-8') as file_object:
-                return sum(1 for _ in file_object)
+            lines, last = 0, b''
+            with self._open() as file_object:
+                for chunk in iter(lambda: file_object.read(64 * 1024), b''):
+                    lines += chunk.count(b'\n')
+                    last = chunk
+            # A last line without a trailing newline still counts
+            return lines + (1 if last and not last.endswith(b'\n') else 0)
         except Exception as e:
             logger.error(f"Error counting lines in text file: {e}")
             return None
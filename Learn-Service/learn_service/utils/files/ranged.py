@@ -0,0 +1,235 @@
+import io
+import logging
+import os
+import urllib.request
+from collections import OrderedDict
+from typing import BinaryIO, Callable, Optional
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.files.storage import Storage, default_storage
+
+logger = logging.getLogger('utils')
+
+DEFAULT_BLOCK_SIZE = 256 * 1024
+DEFAULT_CACHE_BLOCKS = 32
+
+
+class RangeReadError(IOError):
+    """Raised when a byte range cannot be fetched from the backing store."""
+
+
+class RangeFile(io.RawIOBase):
+    """
+    Seekable, read-only file over any source that can return a byte range.
+
+    Reads are served from an LRU cache of fixed size blocks; missing blocks
+    next to each other are fetched with a single range request. Header
+    sniffing, container parsing (MP4 atoms, zip central directories, PDF
+    trailers) and other random access readers therefore only pull the
+    blocks they touch instead of the whole object.
+
+    Usage:
+        >>> source = HttpRangeSource('https://bucket.example.com/lesson.mp4')
+        >>> with RangeFile(source.fetch, source.size, name='lesson.mp4') as file_object:
+        ...     header = file_object.read(64)
+    """
+
+    def __init__(self,
+                 fetch: Callable[[int, int], bytes],
+                 size: int,
+                 name: Optional[str] = None,
+                 url: Optional[str] = None,
+                 block_size: Optional[int] = None,
+                 cache_blocks: Optional[int] = None) -> None:
+        """
+        Args:
+            fetch: Callable returning the bytes in ``[start, end)``
+            size: Total size of the file in bytes
+            name: File name (for extension based detection)
+            url: Remote URL, for tools that can read it themselves (ffmpeg)
+            block_size: Cache block size (settings.RANGED_READ_BLOCK_SIZE)
+            cache_blocks: Blocks kept in memory (settings.RANGED_READ_CACHE_BLOCKS)
+        """
+        super().__init__()
+        self.fetch = fetch
+        self.size = size
+        self.name = name
+        self.url = url
+        self.block_size = block_size or getattr(settings, 'RANGED_READ_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)
+        self.cache_blocks = cache_blocks or getattr(settings, 'RANGED_READ_CACHE_BLOCKS', DEFAULT_CACHE_BLOCKS)
+        self._blocks: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._position = 0
+        self.requests = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+
+    def read(self, size: int = -1) -> bytes:
+        end = self.size if size is None or size < 0 else min(self._position + size, self.size)
+        if end <= self._position:
+            return b''
+        data = self.read_range(self._position, end)
+        self._position = end
+        return data
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, buffer) -> int:
+        end = min(self._position + len(buffer), self.size)
+        if end <= self._position:
+            return 0
+        data = self.read_range(self._position, end)
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def read_range(self, start: int, end: int) -> bytes:
+        """Returns ``[start, end)``, fetching only the blocks not cached yet."""
+        first, last = start // self.block_size, (end - 1) // self.block_size
+        if last - first + 1 > self.cache_blocks:
+            # Bulk read (e.g. hashing): stream it without evicting the cache.
+            return self._fetch(start, end)
+
+        missing = [index for index in range(first, last + 1) if index not in self._blocks]
+        run_start = None
+        for position, index in enumerate(missing):
+            run_start = index if run_start is None else run_start
+            if position + 1 == len(missing) or missing[position + 1] != index + 1:
+                self._load_blocks(run_start, index)
+                run_start = None
+
+        data = bytearray()
+        for index in range(first, last + 1):
+            self._blocks.move_to_end(index)
+            data += self._blocks[index]
+        while len(self._blocks) > self.cache_blocks:
+            self._blocks.popitem(last=False)
+        offset = first * self.block_size
+        return bytes(data[start - offset:end - offset])
+
+    def _load_blocks(self, first: int, last: int) -> None:
+        start = first * self.block_size
+        data = self._fetch(start, min((last + 1) * self.block_size, self.size))
+        for index in range(first, last + 1):
+            offset = (index - first) * self.block_size
+            self._blocks[index] = data[offset:offset + self.block_size]
+
+    def _fetch(self, start: int, end: int) -> bytes:
+        self.requests += 1
+        data = self.fetch(start, end)
+        if len(data) != end - start:
+            raise RangeReadError(f"Expected {end - start} bytes at {start} of {self.name}, got {len(data)}")
+        return data
+
+    def chunks(self, chunk_size: Optional[int] = None):
+        """Sequential chunks from the start, like ``django.core.files.File.chunks``."""
+        chunk_size = chunk_size or getattr(settings, 'UPLOAD_CHUNK_SIZE', 64 * 1024)
+        self.seek(0)
+        while self._position < self.size:
+            end = min(self._position + chunk_size, self.size)
+            chunk = self._fetch(self._position, end)
+            self._position = end
+            yield chunk
+
+
+class FileRangeSource:
+    """Byte ranges of an open seekable file (e.g. one returned by Storage.open)."""
+
+    def __init__(self, file_object: BinaryIO) -> None:
+        self.file_object = file_object
+
+    def fetch(self, start: int, end: int) -> bytes:
+        self.file_object.seek(start)
+        return self.file_object.read(end - start)
+
+
+class HttpRangeSource:
+    """
+    Byte ranges of a remote object over HTTP ``Range`` requests, e.g. the
+    (signed) URL an object storage backend returns from ``Storage.url``.
+    """
+
+    def __init__(self, url: str, size: Optional[int] = None, timeout: float = 30) -> None:
+        self.url = url
+        self.timeout = timeout
+        self.size = size if size is not None else self._content_length()
+
+    def _content_length(self) -> int:
+        request = urllib.request.Request(self.url, method='HEAD')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return int(response.headers['Content-Length'])
+
+    def fetch(self, start: int, end: int) -> bytes:
+        request = urllib.request.Request(self.url, headers={'Range': f'bytes={start}-{end - 1}'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status == 206:
+                return response.read()
+            # The server ignored the range: skip to it instead of buffering everything.
+            logger.warning(f"Range requests not supported for {urlparse(self.url).path}")
+            response.read(start)
+            return response.read(end - start)
+
+
+def get_local_path(name: str, storage: Optional[Storage] = None) -> Optional[str]:
+    """Local path of a stored file, or None when the storage is not on disk."""
+    storage = storage or default_storage
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def get_remote_url(name: str, storage: Optional[Storage] = None) -> Optional[str]:
+    """Absolute http(s) URL of a stored file, or None for local storages."""
+    storage = storage or default_storage
+    try:
+        url = storage.url(name)
+    except NotImplementedError:
+        return None
+    return url if urlparse(url).scheme in ('http', 'https') else None
+
+
+def open_ranged(name: str, storage: Optional[Storage] = None) -> BinaryIO:
+    """
+    Opens a stored file for random access, whatever the storage backend:
+
+    1. the local file for file system storages (the OS page cache is the
+       block cache, and mmap works on it)
+    2. a RangeFile over HTTP range requests for object storages with URLs
+    3. a RangeFile over the storage's own file object otherwise
+
+    The result is a regular binary file object and must be closed.
+    """
+    storage = storage or default_storage
+    path = get_local_path(name, storage)
+    if path:
+        return open(path, 'rb')
+    url = get_remote_url(name, storage)
+    if url:
+        source = HttpRangeSource(url, size=storage.size(name))
+        return RangeFile(source.fetch, source.size, name=name, url=url)
+    file_object = storage.open(name, 'rb')
+    return RangeFile(FileRangeSource(file_object).fetch, storage.size(name), name=name)
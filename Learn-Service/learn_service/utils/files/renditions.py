@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from .backends import Image, ImageOps
+
+logger = logging.getLogger('utils')
+
+DEFAULT_WIDTHS = (160, 320, 640, 960, 1280, 1920)
+DEFAULT_FORMATS = ('avif', 'webp', 'jpeg')
+DEFAULT_QUALITY = {'avif': 55, 'webp': 78, 'jpeg': 80}
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# format: (PIL format, MIME type, extension)
+IMAGE_FORMATS = {
+    'avif': ('AVIF', 'image/avif', '.avif'),
+    'webp': ('WEBP', 'image/webp', '.webp'),
+    'jpeg': ('JPEG', 'image/jpeg', '.jpg'),
+}
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    """One encoded size of an image."""
+    width: int
+    height: int
+    format: str
+    content: bytes
+
+    @property
+    def mime_type(self) -> str:
+        return IMAGE_FORMATS[self.format][1]
+
+    @property
+    def name(self) -> str:
+        """Immutable storage name derived from the encoded bytes."""
+        digest = hashlib.sha256(self.content).hexdigest()
+        return f"renditions/{digest[:2]}/{digest[2:4]}/{digest[:32]}_{self.width}w{IMAGE_FORMATS[self.format][2]}"
+
+
+def get_rendition_widths() -> Tuple[int, ...]:
+    return tuple(getattr(settings, 'IMAGE_RENDITION_WIDTHS', DEFAULT_WIDTHS))
+
+
+def get_rendition_formats() -> Tuple[str, ...]:
+    """Configured formats this Pillow build can encode, best compression first."""
+    register_plugins()
+    Image.init()
+    formats = getattr(settings, 'IMAGE_RENDITION_FORMATS', DEFAULT_FORMATS)
+    return tuple(name for name in formats if IMAGE_FORMATS[name][0] in Image.SAVE)
+
+
+def register_plugins() -> None:
+    """Registers the AVIF plugin on Pillow < 11.2 (once images are actually encoded)."""
+    try:
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+
+
+def plan_widths(source_width: int, widths: Sequence[int]) -> List[int]:
+    """
+    Widths to produce for a source: every configured width below the source
+    width, plus the source width itself when it is smaller than the largest
+    configured one. Images are never upscaled.
+    """
+    planned = sorted({width for width in widths if width < source_width})
+    if source_width <= max(widths, default=0):
+        planned.append(source_width)
+    return planned
+
+
+class ImageResizer:
+    """
+    Decodes an image once and encodes it at several widths and formats.
+
+    JPEG sources are decoded with DCT scaling (``Image.draft``) straight to
+    the smallest size at least as large as the biggest requested width, so a
+    20 MB phone photo is never expanded to full resolution in memory when
+    only catalog sizes are needed. EXIF orientation is applied, so every
+    rendition is stored upright.
+
+    Usage:
+        >>> with default_storage.open(name, 'rb') as file_object:
+        ...     for encoded in ImageResizer(file_object).encode([320, 640], ['webp', 'jpeg']):
+        ...         default_storage.save(encoded.name, ContentFile(encoded.content))
+    """
+
+    def __init__(self, file_object: BinaryIO, name: Optional[str] = None) -> None:
+        """
+        Args:
+            file_object: Open, seekable binary image file
+            name: File name, only used in log messages
+        """
+        self.file_object = file_object
+        self.name = name or getattr(file_object, 'name', None)
+        quality = getattr(settings, 'IMAGE_RENDITION_QUALITY', {})
+        self.quality = {**DEFAULT_QUALITY, **quality}
+
+    def _load(self, max_width: int) -> Image.Image:
+        self.file_object.seek(0)
+        image = Image.open(self.file_object)
+        rotated = image.getexif().get(0x0112, 1) in (5, 6, 7, 8)
+        upright_width = image.height if rotated else image.width
+        if image.format == 'JPEG' and upright_width > max_width:
+            scale = max_width / upright_width
+            image.draft('RGB', (max(1, int(image.width * scale)), max(1, int(image.height * scale))))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        return image
+
+    def encode(self, widths: Sequence[int], formats: Sequence[str]) -> Iterator[EncodedImage]:
+        """Yields the image at every width (largest first) in every format."""
+        if not widths:
+            return
+        register_plugins()
+        image = self._load(max(widths))
+        for width in sorted(widths, reverse=True):
+            width = min(width, image.width)
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize(
+                (width, height), Image.LANCZOS, reducing_gap=3.0)
+            for image_format in formats:
+                yield EncodedImage(width, height, image_format, self._encode(resized, image_format))
+
+    def _encode(self, image: Image.Image, image_format: str) -> bytes:
+        pil_format = IMAGE_FORMATS[image_format][0]
+        options = {'quality': self.quality[image_format]}
+        if image_format == 'jpeg':
+            if image.mode == 'RGBA':
+                background = Image.new('RGB', image.size, 'white')
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            options.update(optimize=True, progressive=True)
+        elif image_format == 'webp':
+            options.update(method=4)
+        buffer = io.BytesIO()
+        image.save(buffer, pil_format, **options)
+        return buffer.getvalue()
+
+
+class ImageDiskCache:
+    """
+    Size bounded least recently used cache of resized images on local disk.
+
+    Entries are files under ``<directory>/<source key>/``; a hit refreshes
+    the file's modification time and the oldest files are removed once the
+    total size exceeds ``max_bytes``. Several processes can share the
+    directory: writes are atomic renames and pruning tolerates files that
+    another process already removed.
+    """
+
+    # Bytes written by this process since the last prune; the directory is
+    # only walked once a twentieth of the budget has been added.
+    _written = 0
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None) -> None:
+        self.directory = str(directory or getattr(settings, 'IMAGE_RESIZE_CACHE_DIR', None)
+                             or os.path.join(tempfile.gettempdir(), 'image_resize_cache'))
+        self.max_bytes = max_bytes or getattr(settings, 'IMAGE_RESIZE_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES)
+
+    @staticmethod
+    def source_key(source: str) -> str:
+        return hashlib.sha1(source.encode()).hexdigest()
+
+    def path(self, source: str, width: int, image_format: str) -> str:
+        key = self.source_key(source)
+        return os.path.join(self.directory, key[:2], key, f"{width}{IMAGE_FORMATS[image_format][2]}")
+
+    def get(self, source: str, width: int, image_format: str) -> Optional[str]:
+        """Path of the cached file, marked as recently used, or None."""
+        path = self.path(source, width, image_format)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, source: str, width: int, image_format: str, content: bytes) -> str:
+        path = self.path(source, width, image_format)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as scratch:
+            scratch.write(content)
+        os.replace(scratch.name, path)
+        ImageDiskCache._written += len(content)
+        if ImageDiskCache._written >= self.max_bytes // 20:
+            ImageDiskCache._written = 0
+            self.prune()
+        return path
+
+    def purge(self, source: str) -> None:
+        """Drops every cached size of a source (its file was replaced or deleted)."""
+        key = self.source_key(source)
+        shutil.rmtree(os.path.join(self.directory, key[:2], key), ignore_errors=True)
+
+    def prune(self) -> None:
+        """Removes the least recently used files until the cache fits ``max_bytes``."""
+        entries, total = [], 0
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import io
+import logging
+from typing import List, Optional
+
+from django.conf import settings
+
+from .backends import Image, np
+from .waveform import Source, decode_pcm
+
+logger = logging.getLogger('utils')
+
+DEFAULT_SAMPLE_RATE = 22050
+DEFAULT_N_FFT = 2048
+DEFAULT_N_MELS = 128
+DEFAULT_SECONDS_PER_COLUMN = 0.05
+DEFAULT_FRAMES_PER_COLUMN = 4
+DEFAULT_MAX_COLUMNS = 4096
+TOP_DB = 80.0
+
+# Anchors of the magma colormap (the librosa/matplotlib default), from silent to loud
+MAGMA = (
+    (0, 0, 4), (28, 16, 68), (79, 18, 123), (129, 37, 129), (181, 54, 122),
+    (229, 80, 100), (251, 135, 97), (254, 194, 135), (252, 253, 191),
+)
+
+
+def mel_filterbank(sample_rate: int, n_fft: int, n_mels: int) -> np.ndarray:
+    """
+    Triangular mel filters (HTK mel scale) mapping ``n_fft // 2 + 1`` FFT
+    bins to ``n_mels`` bands, area normalized like librosa's default.
+
+    Returns:
+        float32 array of shape (n_mels, n_fft // 2 + 1)
+    """
+    def to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    edges = to_hz(np.linspace(0.0, to_mel(sample_rate / 2), n_mels + 2))
+    frequencies = np.linspace(0.0, sample_rate / 2, n_fft // 2 + 1)
+    lower = (frequencies[None, :] - edges[:-2, None]) / (edges[1:-1] - edges[:-2])[:, None]
+    upper = (edges[2:, None] - frequencies[None, :]) / (edges[2:] - edges[1:-1])[:, None]
+    filters = np.maximum(0.0, np.minimum(lower, upper))
+    filters *= (2.0 / (edges[2:] - edges[:-2]))[:, None]
+    return filters.astype(np.float32)
+
+
+class SpectrogramBuilder:
+    """
+    Accumulates a mel spectrogram image column by column from streamed PCM.
+
+    Every image column covers ``seconds_per_column`` of audio and is the
+    mean power of ``frames_per_column`` FFT frames spread over that span, so
+    the FFT work depends on the number of columns, not on the sample count.
+    Only the samples of the column being filled are buffered. When the
+    image would exceed ``max_columns``, neighbouring columns are merged and
+    the resolution halves, which bounds memory for any duration.
+
+    Usage:
+        >>> builder = SpectrogramBuilder(seconds_per_column=duration / 1000)
+        >>> for block in decode_pcm(path, builder.sample_rate):
+        ...     builder.feed(block)
+        >>> png = builder.render(1000, 500)
+    """
+
+    def __init__(self, sample_rate: Optional[int] = None, seconds_per_column: Optional[float] = None,
+                 n_fft: Optional[int] = None, n_mels: Optional[int] = None,
+                 frames_per_column: Optional[int] = None, max_columns: Optional[int] = None):
+        self.sample_rate = sample_rate or getattr(settings, 'SPECTROGRAM_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+        self.n_fft = n_fft or getattr(settings, 'SPECTROGRAM_N_FFT', DEFAULT_N_FFT)
+        self.n_mels = n_mels or getattr(settings, 'SPECTROGRAM_N_MELS', DEFAULT_N_MELS)
+        self.frames_per_column = frames_per_column or getattr(
+            settings, 'SPECTROGRAM_FRAMES_PER_COLUMN', DEFAULT_FRAMES_PER_COLUMN)
+        self.max_columns = max_columns or getattr(settings, 'SPECTROGRAM_MAX_COLUMNS', DEFAULT_MAX_COLUMNS)
+        seconds_per_column = seconds_per_column or getattr(
+            settings, 'SPECTROGRAM_SECONDS_PER_COLUMN', DEFAULT_SECONDS_PER_COLUMN)
+        self.column_samples = max(int(round(seconds_per_column * self.sample_rate)), 1)
+        self.window = np.hanning(self.n_fft).astype(np.float32)
+        self.filters = mel_filterbank(self.sample_rate, self.n_fft, self.n_mels)
+        self.columns: List[np.ndarray] = []
+        self.samples = 0
+        self._buffer = np.empty(0, dtype=np.float32)
+
+    @property
+    def seconds_per_column(self) -> float:
+        return self.column_samples / self.sample_rate
+
+    def feed(self, samples: np.ndarray) -> None:
+        """Adds a block of int16 samples."""
+        self.samples += len(samples)
+        block = samples.astype(np.float32) / 32768.0
+        self._buffer = np.concatenate((self._buffer, block)) if self._buffer.size else block
+        # A column needs its own span plus the tail of its last FFT frame
+        needed = self.column_samples + self.n_fft
+        while len(self._buffer) >= needed:
+            self._add_column(self._buffer[:needed])
+            self._buffer = self._buffer[self.column_samples:]
+            needed = self.column_samples + self.n_fft
+
+    def finish(self) -> None:
+        """Adds the last, partial column (padded with silence)."""
+        if self._buffer.size:
+            padded = np.zeros(self.column_samples + self.n_fft, dtype=np.float32)
+            padded[:min(len(self._buffer), len(padded))] = self._buffer[:len(padded)]
+            self._add_column(padded)
+            self._buffer = self._buffer[:0]
+
+    def _add_column(self, samples: np.ndarray) -> None:
+        frames = min(self.frames_per_column, self.column_samples)
+        offsets = np.arange(frames) * self.column_samples // frames
+        windows = samples[offsets[:, None] + np.arange(self.n_fft)[None, :]] * self.window
+        power = np.abs(np.fft.rfft(windows, axis=1)) ** 2
+        self.columns.append(self.filters @ power.mean(axis=0))
+        if len(self.columns) > self.max_columns:
+            self._merge_columns()
+
+    def _merge_columns(self) -> None:
+        """Halves the time resolution: averages neighbouring columns."""
+        stacked = np.stack(self.columns[:len(self.columns) // 2 * 2])
+        merged = list(stacked.reshape(-1, 2, self.n_mels).mean(axis=1))
+        if len(self.columns) % 2:
+            merged.append(self.columns[-1])
+        self.columns = merged
+        self.column_samples *= 2
+        logger.debug(f"Spectrogram resolution lowered to {self.seconds_per_column:.3f}s per column")
+
+    def to_db(self) -> np.ndarray:
+        """Mel power in dB relative to the loudest bin, clipped to ``TOP_DB`` below it."""
+        if not self.columns:
+            return np.full((self.n_mels, 1), -TOP_DB, dtype=np.float32)
+        power = np.stack(self.columns, axis=1)
+        db = 10.0 * np.log10(np.maximum(power, 1e-10))
+        return np.maximum(db - db.max(), -TOP_DB)
+
+    def render(self, width: Optional[int] = None, height: Optional[int] = None) -> bytes:
+        """
+        Colors the spectrogram with the magma colormap, low frequencies at the
+        bottom, and resizes it to ``width`` x ``height`` (one pixel per column
+        and mel band by default).
+
+        Returns:
+            PNG bytes
+        """
+        colormap = np.array(MAGMA, dtype=np.float32)
+        levels = (self.to_db() + TOP_DB) / TOP_DB * (len(colormap) - 1)
+        anchors = np.arange(len(colormap))
+        rgb = np.stack([np.interp(levels, anchors, colormap[:, channel]) for channel in range(3)], axis=-1)
+        image = Image.fromarray(rgb[::-1].round().astype(np.uint8))
+        if width or height:
+            image = image.resize((width or image.width, height or image.height), Image.Resampling.BILINEAR)
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG', optimize=True)
+        return buffer.getvalue()
+
+
+def build_spectrogram(source: Source, seconds_per_column: Optional[float] = None) -> SpectrogramBuilder:
+    """
+    Decodes the audio once through ffmpeg and accumulates its spectrogram.
+
+    Args:
+        source: Path, URL or binary file object (see ``decode_pcm``)
+        seconds_per_column: Time resolution (SPECTROGRAM_SECONDS_PER_COLUMN
+            by default)
+    """
+    builder = SpectrogramBuilder(seconds_per_column=seconds_per_column)
+    for block in decode_pcm(source, builder.sample_rate):
+        builder.feed(block)
+    builder.finish()
+    return builder
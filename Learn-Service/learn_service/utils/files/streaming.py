@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple, Sequence
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger('utils')
+
+HLS_MASTER = 'master.m3u8'
+DASH_MANIFEST = 'manifest.mpd'
+DEFAULT_SEGMENT_SECONDS = 6
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """One rung of the bitrate ladder (bitrates in kbit/s)."""
+    name: str
+    height: int
+    video_bitrate: int
+    audio_bitrate: int
+
+    @property
+    def bandwidth(self) -> int:
+        """Peak bandwidth in bit/s advertised in the master playlist."""
+        return int((self.video_bitrate * 1.07 + self.audio_bitrate) * 1000)
+
+    def width_for(self, source_width: int, source_height: int) -> int:
+        """Width that keeps the source aspect ratio (even, like ``scale=-2``)."""
+        return max(2, int(round(source_width * self.height / source_height / 2)) * 2)
+
+
+DEFAULT_LADDER = (
+    Rendition('240p', 240, 400, 64),
+    Rendition('360p', 360, 800, 96),
+    Rendition('720p', 720, 2800, 128),
+    Rendition('1080p', 1080, 5000, 160),
+)
+
+
+def select_ladder(source_height: int, ladder: Sequence[Rendition] = DEFAULT_LADDER) -> List[Rendition]:
+    """
+    Drops renditions taller than the source (no upscaling), keeping at least
+    the smallest one.
+    """
+    ladder = sorted(ladder, key=lambda rendition: rendition.height)
+    selected = [rendition for rendition in ladder if rendition.height <= source_height]
+    return selected or ladder[:1]
+
+
+def build_master_playlist(renditions: Sequence[Rendition], source_size: Tuple[int, int]) -> str:
+    """Returns the HLS master playlist referencing one media playlist per rendition."""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for rendition in renditions:
+        width = rendition.width_for(*source_size)
+        lines.append(
+            f'#EXT-X-STREAM-INF:BANDWIDTH={rendition.bandwidth},'
+            f'RESOLUTION={width}x{rendition.height},'
+            f'CODECS="avc1.4d401f,mp4a.40.2"'
+        )
+        lines.append(f'{rendition.name}.m3u8')
+    return '\n'.join(lines) + '\n'
+
+
+def encode_rendition(source: str,
+                     output_dir: str,
+                     rendition: Rendition,
+                     segment_seconds: int,
+                     threads: int) -> str:
+    """
+    Encodes one rendition to H.264/AAC and packages it as an HLS media
+    playlist. Runs in a worker process of the encoding pool.
+
+    Key frames are forced on segment boundaries so every rendition is cut at
+    the same timestamps and players can switch between them.
+
+    Returns:
+        Path of the intermediate MP4 (kept for DASH packaging)
+    """
+    mp4_path = os.path.join(output_dir, f'{rendition.name}.mp4')
+    maxrate = int(rendition.video_bitrate * 1.07)
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'error', '-i', source,
+        '-vf', f'scale=-2:{rendition.height}',
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+        '-b:v', f'{rendition.video_bitrate}k', '-maxrate', f'{maxrate}k',
+        '-bufsize', f'{rendition.video_bitrate * 2}k',
+        '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})',
+        '-c:a', 'aac', '-b:a', f'{rendition.audio_bitrate}k', '-ac', '2',
+        '-threads', str(threads),
+        mp4_path,
+    ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'error', '-i', mp4_path, '-c', 'copy',
+        '-f', 'hls', '-hls_time', str(segment_seconds), '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', os.path.join(output_dir, f'{rendition.name}_%05d.ts'),
+        os.path.join(output_dir, f'{rendition.name}.m3u8'),
+    ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return mp4_path
+
+
+class AdaptiveStreamPackager:
+    """
+    Transcodes a video into an adaptive bitrate ladder and packages it as
+    segmented HLS (and optionally DASH) with a master playlist.
+
+    Renditions are encoded in parallel in a process pool
+    (settings.VIDEO_ENCODING_WORKERS); the ffmpeg thread count is split
+    between them so the pool does not oversubscribe the CPU.
+
+    Usage:
+        >>> packager = AdaptiveStreamPackager('/path/lesson.mp4')
+        >>> manifests = packager.package_to_storage('uploads/lesson/hls/abc')
+        {'hls': 'uploads/lesson/hls/abc/<run>/master.m3u8', 'dash': None}
+    """
+
+    def __init__(self,
+                 source: str,
+                 ladder: Optional[Sequence[Rendition]] = None,
+                 segment_seconds: Optional[int] = None,
+                 dash: Optional[bool] = None,
+                 max_workers: Optional[int] = None) -> None:
+        """
+        Args:
+            source: Local path of the source video
+            ladder: Renditions to produce (defaults to DEFAULT_LADDER)
+            segment_seconds: Target segment duration
+            dash: Also write a DASH manifest (settings.VIDEO_STREAM_DASH)
+            max_workers: Encoding processes (settings.VIDEO_ENCODING_WORKERS)
+        """
+        self.source = source
+        self.ladder = ladder or DEFAULT_LADDER
+        self.segment_seconds = segment_seconds or getattr(
+            settings, 'VIDEO_STREAM_SEGMENT_SECONDS', DEFAULT_SEGMENT_SECONDS)
+        self.dash = getattr(settings, 'VIDEO_STREAM_DASH', False) if dash is None else dash
+        self.max_workers = max_workers or getattr(settings, 'VIDEO_ENCODING_WORKERS', 2)
+
+    def probe_size(self) -> Tuple[int, int]:
+        """Returns (width, height) of the first video stream."""
+        result = subprocess.run([
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'stream=width,height', '-of', 'json', self.source,
+        ], check=True, capture_output=True)
+        stream = json.loads(result.stdout)['streams'][0]
+        return int(stream['width']), int(stream['height'])
+
+    def package(self, output_dir: str) -> Dict[str, Any]:
+        """
+        Writes the renditions, media playlists and manifests to a local directory.
+
+        Returns:
+            Dict with the 'hls' and 'dash' manifest file names (dash may be
+            None) and the list of 'renditions'
+        """
+        source_size = self.probe_size()
+        renditions = select_ladder(source_size[1], self.ladder)
+        workers = max(1, min(self.max_workers, len(renditions)))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+
+        logger.info(f"Encoding {len(renditions)} renditions of {self.source} with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(encode_rendition, self.source, output_dir, rendition,
+                            self.segment_seconds, threads)
+                for rendition in renditions
+            ]
+            mp4_paths = [future.result() for future in futures]
+
+        with open(os.path.join(output_dir, HLS_MASTER), 'w') as playlist:
+            playlist.write(build_master_playlist(renditions, source_size))
+
+        dash_manifest = None
+        if self.dash:
+            self._package_dash(mp4_paths, output_dir)
+            dash_manifest = DASH_MANIFEST
+        for mp4_path in mp4_paths:
+            os.unlink(mp4_path)
+
+        return {
+            'hls': HLS_MASTER,
+            'dash': dash_manifest,
+            'renditions': [rendition.name for rendition in renditions],
+        }
+
+    def _package_dash(self, mp4_paths: Sequence[str], output_dir: str) -> None:
+        """Remuxes the already encoded renditions into one DASH manifest."""
+        cmd = ['ffmpeg', '-y', '-v', 'error']
+        for path in mp4_paths:
+            cmd += ['-i', path]
+        for index in range(len(mp4_paths)):
+            cmd += ['-map', f'{index}:v']
+        cmd += ['-map', '0:a?', '-c', 'copy', '-f', 'dash',
+                '-seg_duration', str(self.segment_seconds),
+                '-use_template', '1', '-use_timeline', '1',
+                '-adaptation_sets', 'id=0,streams=v id=1,streams=a',
+                os.path.join(output_dir, DASH_MANIFEST)]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def package_to_storage(self, storage_dir: str, storage=None) -> Dict[str, Optional[str]]:
+        """
+        Packages into a scratch directory and copies the result to storage,
+        into a fresh subdirectory of ``storage_dir``: two runs for the same
+        source never write into (or get renamed beside) each other's segments.
+
+        Returns:
+            Dict with the storage paths of the 'hls' and 'dash' manifests
+        """
+        storage = storage or default_storage
+        storage_dir = f'{storage_dir}/{uuid.uuid4().hex}'
+        temp_dir = getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None) or None
+        output_dir = tempfile.mkdtemp(prefix='hls_', dir=temp_dir)
+        saved = {}
+        try:
+            result = self.package(output_dir)
+            for name in sorted(os.listdir(output_dir)):
+                with open(os.path.join(output_dir, name), 'rb') as source:
+                    saved[name] = storage.save(f'{storage_dir}/{name}', File(source, name=name))
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        return {
+            'hls': saved[result['hls']],
+            'dash': saved[result['dash']] if result['dash'] else None,
+        }
+
+
+def delete_stream_directory(storage_dir: str, storage=None) -> None:
+    """Deletes a packaged stream (playlists and segments) from storage."""
+    storage = storage or default_storage
+    try:
+        _, files = storage.listdir(storage_dir)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for name in files:
+        storage.delete(f'{storage_dir}/{name}')
@@ -0,0 +1,94 @@
+import os
+from typing import Any, Dict, Optional
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+from .metadata import StreamingMetadataExtractor
+
+
+class AssembledUploadedFile(UploadedFile):
+    """
+    A file that already sits complete on local disk (e.g. assembled from
+    resumable upload chunks), handed to a FileField like a regular upload.
+
+    ``temporary_file_path`` lets file system storage move it into place
+    instead of copying it, and ``metadata`` carries the size, checksum and
+    MIME type computed while the file was written, so the media models do
+    not read it again.
+    """
+
+    def __init__(self,
+                 path: str,
+                 name: str,
+                 content_type: Optional[str] = None,
+                 metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Args:
+            path: Local path of the complete file
+            name: Client side file name
+            content_type: MIME type
+            metadata: Output of ``StreamingMetadataExtractor.get_metadata``
+        """
+        self.metadata = metadata
+        super().__init__(open(path, 'rb'), name, content_type, os.path.getsize(path))
+
+    def temporary_file_path(self) -> str:
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # The file was moved into storage.
+            pass
+
+
+class HashingUploadMixin:
+    """
+    Feeds every chunk of an uploaded file to a ``StreamingMetadataExtractor``
+    as it arrives, and attaches the size, SHA-256 and MIME type to the
+    resulting ``UploadedFile`` as ``metadata``.
+
+    The media models use that metadata instead of reading the upload again,
+    so the checksum (and the duplicate check it enables) is known before the
+    file is written to storage.
+    """
+
+    extractor: Optional[StreamingMetadataExtractor] = None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        # Before super(): the memory handler claims the file by raising StopFutureHandlers.
+        self.extractor = StreamingMetadataExtractor(name=file_name)
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+
+    def hash_chunk(self, raw_data: bytes) -> None:
+        self.extractor.update(raw_data)
+
+    def attach_metadata(self, uploaded_file):
+        if uploaded_file is not None and self.extractor is not None and self.extractor.size == uploaded_file.size:
+            uploaded_file.metadata = self.extractor.get_metadata()
+        return uploaded_file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    """MemoryFileUploadHandler that hashes the small uploads it keeps in memory."""
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.activated:
+            self.hash_chunk(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        return self.attach_metadata(super().file_complete(file_size))
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    """TemporaryFileUploadHandler that hashes uploads while spooling them to disk."""
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hash_chunk(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        return self.attach_metadata(super().file_complete(file_size))
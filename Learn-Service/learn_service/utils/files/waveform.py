@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from .backends import Image, ImageColor, np
+from .ranged import get_local_path, get_remote_url, open_ranged
+
+logger = logging.getLogger('utils')
+
+DEFAULT_SAMPLE_RATE = 22050
+DEFAULT_SAMPLES_PER_PEAK = 256
+DEFAULT_ZOOM_FACTOR = 4
+DEFAULT_LEVELS = 5  # 256, 1024, 4096, 16384 and 65536 samples per peak
+DEFAULT_BITS = 8
+DECODE_BLOCK_SAMPLES = 64 * 1024  # 128KB of 16-bit PCM read from ffmpeg at a time
+SPOOL_MAX_BYTES = 1024 * 1024  # peaks kept in memory before spilling to a temporary file
+
+# magic, version, bits per value, level count, sample rate, decoded samples
+HEADER = struct.Struct('<4sBBHIQ')
+# samples per peak, peak count
+LEVEL = struct.Struct('<II')
+MAGIC = b'LXPK'
+VERSION = 1
+
+Source = Union[str, os.PathLike, BinaryIO]
+
+
+class WaveformError(Exception):
+    """Raised when audio cannot be decoded or a peaks file is invalid."""
+    pass
+
+
+def decode_pcm(source: Source, sample_rate: Optional[int] = None,
+               block_samples: int = DECODE_BLOCK_SAMPLES) -> Iterator[np.ndarray]:
+    """
+    Streams the audio as mono 16-bit PCM blocks decoded by ffmpeg.
+
+    Only one block is held at a time, whatever the length of the audio.
+
+    Args:
+        source: Path or URL ffmpeg opens itself, or a binary file object
+            streamed to ffmpeg through stdin
+        sample_rate: Decoding sample rate (WAVEFORM_SAMPLE_RATE by default)
+        block_samples: Samples per yielded block
+
+    Yields:
+        int16 numpy arrays of at most ``block_samples`` samples
+    """
+    sample_rate = sample_rate or getattr(settings, 'WAVEFORM_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+    piped = not isinstance(source, (str, os.PathLike))
+    command = [
+        getattr(settings, 'FFMPEG_BINARY', 'ffmpeg'), '-v', 'error',
+        '-i', 'pipe:0' if piped else os.fspath(source),
+        '-vn', '-ac', '1', '-ar', str(sample_rate), '-f', 's16le', '-acodec', 'pcm_s16le', 'pipe:1',
+    ]
+    process = subprocess.Popen(
+        command, stdin=subprocess.PIPE if piped else subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    feeder = None
+    if piped:
+        feeder = threading.Thread(target=_feed_stdin, args=(source, process), daemon=True)
+        feeder.start()
+    try:
+        block_bytes = block_samples * 2
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            if len(data) % 2:
+                data += process.stdout.read(1)
+            yield np.frombuffer(data[:len(data) // 2 * 2], dtype='<i2')
+        if process.wait() != 0:
+            raise WaveformError(f"ffmpeg exited with status {process.returncode}")
+    finally:
+        if process.poll() is None:
+            process.kill()  # the consumer stopped early
+            process.wait()
+        process.stdout.close()
+        if feeder:
+            feeder.join(timeout=5)
+
+
+def _feed_stdin(file_object: BinaryIO, process: subprocess.Popen) -> None:
+    try:
+        for chunk in iter(lambda: file_object.read(1024 * 1024), b''):
+            process.stdin.write(chunk)
+    except (BrokenPipeError, ValueError):
+        pass  # ffmpeg exited or stopped reading
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+class PeakBuilder:
+    """
+    Computes min/max peaks at several zoom levels from streamed PCM blocks.
+
+    Level 0 holds one (min, max) pair per ``samples_per_peak`` samples; each
+    following level merges ``zoom_factor`` pairs of the previous one. Blocks
+    are reduced with numpy reshapes, only the samples and pairs that do not
+    fill a whole peak yet are carried over, and the peaks themselves are
+    spooled to temporary files, so memory stays bounded for any duration.
+
+    Usage:
+        >>> builder = PeakBuilder()
+        >>> for block in decode_pcm(path):
+        ...     builder.feed(block)
+        >>> builder.write(output)
+    """
+
+    def __init__(self, sample_rate: Optional[int] = None, samples_per_peak: Optional[int] = None,
+                 zoom_factor: Optional[int] = None, levels: Optional[int] = None, bits: Optional[int] = None):
+        self.sample_rate = sample_rate or getattr(settings, 'WAVEFORM_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+        self.samples_per_peak = samples_per_peak or getattr(settings, 'WAVEFORM_SAMPLES_PER_PEAK', DEFAULT_SAMPLES_PER_PEAK)
+        self.zoom_factor = zoom_factor or getattr(settings, 'WAVEFORM_ZOOM_FACTOR', DEFAULT_ZOOM_FACTOR)
+        self.levels = levels or getattr(settings, 'WAVEFORM_LEVELS', DEFAULT_LEVELS)
+        self.bits = bits or getattr(settings, 'WAVEFORM_BITS', DEFAULT_BITS)
+        if self.bits not in (8, 16):
+            raise ValueError("bits must be 8 or 16")
+        self.samples = 0
+        self._pending = np.empty(0, dtype=np.int16)
+        self._carry = [(np.empty(0, dtype=np.int16), np.empty(0, dtype=np.int16)) for _ in range(self.levels)]
+        self._spools = [tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) for _ in range(self.levels)]
+        self._lengths = [0] * self.levels
+
+    def feed(self, samples: np.ndarray) -> None:
+        """Adds a block of int16 samples."""
+        self.samples += len(samples)
+        if self._pending.size:
+            samples = np.concatenate((self._pending, samples))
+        whole = len(samples) // self.samples_per_peak * self.samples_per_peak
+        self._pending = samples[whole:].copy()
+        if whole:
+            frames = samples[:whole].reshape(-1, self.samples_per_peak)
+            self._add(0, frames.min(axis=1), frames.max(axis=1))
+
+    def _add(self, level: int, mins: np.ndarray, maxs: np.ndarray) -> None:
+        self._write(level, mins, maxs)
+        if level + 1 == self.levels:
+            return
+        carry_mins, carry_maxs = self._carry[level]
+        if carry_mins.size:
+            mins, maxs = np.concatenate((carry_mins, mins)), np.concatenate((carry_maxs, maxs))
+        whole = len(mins) // self.zoom_factor * self.zoom_factor
+        self._carry[level] = (mins[whole:].copy(), maxs[whole:].copy())
+        if whole:
+            self._add(level + 1,
+                      mins[:whole].reshape(-1, self.zoom_factor).min(axis=1),
+                      maxs[:whole].reshape(-1, self.zoom_factor).max(axis=1))
+
+    def _write(self, level: int, mins: np.ndarray, maxs: np.ndarray) -> None:
+        if self.bits == 8:
+            mins, maxs = mins >> 8, maxs >> 8
+        pairs = np.empty(len(mins) * 2, dtype='<i1' if self.bits == 8 else '<i2')
+        pairs[0::2], pairs[1::2] = mins, maxs
+        self._spools[level].write(pairs.tobytes())
+        self._lengths[level] += len(mins)
+
+    def _flush(self) -> None:
+        """Turns the samples and pairs that did not fill a whole peak into partial peaks."""
+        if self._pending.size:
+            pending, self._pending = self._pending, self._pending[:0]
+            self._add(0, pending[[pending.argmin()]], pending[[pending.argmax()]])
+        for level in range(self.levels - 1):
+            carry_mins, carry_maxs = self._carry[level]
+            if carry_mins.size:
+                self._carry[level] = (carry_mins[:0], carry_maxs[:0])
+                self._add(level + 1, carry_mins[[carry_mins.argmin()]], carry_maxs[[carry_maxs.argmax()]])
+
+    def write(self, output: BinaryIO) -> None:
+        """Writes the peaks file: header, level table, then every level in order."""
+        self._flush()
+        output.write(HEADER.pack(MAGIC, VERSION, self.bits, self.levels, self.sample_rate, self.samples))
+        for level in range(self.levels):
+            output.write(LEVEL.pack(self.samples_per_peak * self.zoom_factor ** level, self._lengths[level]))
+        for spool in self._spools:
+            spool.seek(0)
+            shutil.copyfileobj(spool, output)
+            spool.close()
+
+
+class WaveformPeaks:
+    """
+    Reader for a peaks file written by PeakBuilder.
+
+    Only the level that matches the requested resolution is read, so an
+    overview of an hour of audio touches a few kilobytes of the file.
+    """
+
+    def __init__(self, file_object: BinaryIO):
+        self.file_object = file_object
+        header = file_object.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise WaveformError("Truncated peaks file")
+        magic, version, self.bits, level_count, self.sample_rate, self.samples = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or self.bits not in (8, 16):
+            raise WaveformError("Not a peaks file")
+        table = file_object.read(LEVEL.size * level_count)
+        if len(table) < LEVEL.size * level_count:
+            raise WaveformError("Truncated peaks file")
+        self.levels: List[Tuple[int, int]] = [
+            LEVEL.unpack_from(table, index * LEVEL.size) for index in range(level_count)
+        ]
+        self._offsets = []
+        offset = HEADER.size + len(table)
+        for _, length in self.levels:
+            self._offsets.append(offset)
+            offset += length * 2 * (self.bits // 8)
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> 'WaveformPeaks':
+        return cls(io.BytesIO(content))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        self.file_object.close()
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.sample_rate if self.sample_rate else 0.0
+
+    def level(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Peaks of one zoom level.
+
+        Returns:
+            (mins, maxs) float32 arrays scaled to [-1, 1]
+        """
+        length = self.levels[index][1]
+        size = length * 2 * (self.bits // 8)
+        self.file_object.seek(self._offsets[index])
+        data = self.file_object.read(size)
+        if len(data) < size:
+            raise WaveformError("Truncated peaks file")
+        pairs = np.frombuffer(data, dtype='<i1' if self.bits == 8 else '<i2').astype(np.float32)
+        pairs /= 2 ** (self.bits - 1)
+        return pairs[0::2], pairs[1::2]
+
+    def select_level(self, points: int) -> int:
+        """Coarsest level with at least ``points`` peaks (the finest one if none has)."""
+        for index in reversed(range(len(self.levels))):
+            if self.levels[index][1] >= points:
+                return index
+        return 0
+
+    def peaks(self, points: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        At most ``points`` (min, max) pairs covering the whole audio.
+
+        Returns:
+            (mins, maxs) float32 arrays scaled to [-1, 1]
+        """
+        if not self.levels:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+        mins, maxs = self.level(self.select_level(points))
+        if len(mins) > points:
+            edges = np.arange(points) * len(mins) // points
+            mins, maxs = np.minimum.reduceat(mins, edges), np.maximum.reduceat(maxs, edges)
+        return mins, maxs
+
+    def amplitudes(self, points: int = 100) -> List[float]:
+        """Peak amplitude per point normalized to the loudest point (the waveform_data format)."""
+        mins, maxs = self.peaks(points)
+        amplitudes = np.maximum(-mins, maxs)
+        loudest = amplitudes.max(initial=0)
+        if loudest > 0:
+            amplitudes = amplitudes / loudest
+        return [round(float(value), 4) for value in amplitudes]
+
+
+def build_peaks(source: Source, output: Optional[BinaryIO] = None) -> WaveformPeaks:
+    """
+    Decodes the audio once and builds every zoom level.
+
+    Args:
+        source: Path, URL or binary file object (see ``decode_pcm``)
+        output: File object receiving the peaks file; a spooled temporary
+            file by default
+
+    Returns:
+        WaveformPeaks reading ``output``
+    """
+    builder = PeakBuilder()
+    for block in decode_pcm(source, builder.sample_rate):
+        builder.feed(block)
+    if output is None:
+        output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    start = output.tell()
+    builder.write(output)
+    output.seek(start)
+    return WaveformPeaks(output)
+
+
+def get_peaks_name(checksum: str) -> str:
+    """Storage name of the peaks file of the content with ``checksum``."""
+    return f"waveforms/{checksum[:2]}/{checksum[2:4]}/{checksum}.peaks"
+
+
+def open_peaks(checksum: str, storage=None) -> Optional[WaveformPeaks]:
+    """Opens the stored peaks file of a content, or None if it was not built."""
+    storage = storage or default_storage
+    name = get_peaks_name(checksum)
+    if not storage.exists(name):
+        return None
+    return WaveformPeaks(open_ranged(name, storage))
+
+
+def ensure_peaks(checksum: str, name: str, storage=None) -> str:
+    """
+    Builds and stores the peaks file of a stored audio file, unless the same
+    content already has one.
+
+    Args:
+        checksum: Checksum of the audio content
+        name: Storage name of the audio file
+
+    Returns:
+        Storage name of the peaks file
+    """
+    storage = storage or default_storage
+    peaks_name = get_peaks_name(checksum)
+    if storage.exists(peaks_name):
+        return peaks_name
+    source = get_local_path(name, storage) or get_remote_url(name, storage)
+    file_object = None if source else open_ranged(name, storage)
+    try:
+        with build_peaks(source or file_object) as peaks:
+            saved = storage.save(peaks_name, File(peaks.file_object, name=peaks_name))
+    finally:
+        if file_object is not None:
+            file_object.close()
+    if saved != peaks_name:
+        # Built concurrently for another upload of the same content
+        storage.delete(saved)
+    logger.debug(f"Stored waveform peaks {peaks_name}")
+    return peaks_name
+
+
+def delete_peaks(checksum: str, storage=None) -> None:
+    (storage or default_storage).delete(get_peaks_name(checksum))
+
+
+def render_waveform(peaks: WaveformPeaks, width: int = 1000, height: int = 200,
+                    color: str = '#3498db', background: Optional[str] = None) -> bytes:
+    """
+    Draws the waveform as a PNG straight from the peaks: one vertical line
+    per column from its min to its max.
+
+    Args:
+        peaks: Peaks to draw
+        width: Image width; the zoom level closest to it is used
+        height: Image height
+        color: Waveform color
+        background: Background color, transparent by default
+
+    Returns:
+        PNG bytes
+    """
+    mins, maxs = peaks.peaks(width)
+    if 0 < len(mins) < width:
+        columns = np.arange(width) * len(mins) // width
+        mins, maxs = mins[columns], maxs[columns]
+    mask = np.zeros((height, width), dtype=np.uint8)
+    if len(mins):
+        middle = (height - 1) / 2
+        top = np.floor(middle - np.clip(maxs, -1, 1) * middle).astype(int)
+        bottom = np.ceil(middle - np.clip(mins, -1, 1) * middle).astype(int)
+        rows = np.arange(height)[:, None]
+        mask[(rows >= top) & (rows <= bottom)] = 255
+    image = Image.new('RGBA', (width, height), ImageColor.getcolor(background, 'RGBA') if background else (0, 0, 0, 0))
+    image.paste(ImageColor.getcolor(color, 'RGBA'), mask=Image.fromarray(mask))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
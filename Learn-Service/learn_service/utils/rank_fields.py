@@ -0,0 +1,300 @@
+import bisect
+import re
+from collections import defaultdict
+from typing import List, Optional
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils.translation import gettext_lazy as _
+
+# Lowercase digits and letters sort the same under every collation
+RANK_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+RANK_MAX_LENGTH = 64
+RANK_PATTERN = re.compile(r'^[0-9a-z]*[1-9a-z]$')
+
+
+def validate_rank(value: str):
+    if value and not RANK_PATTERN.match(value):
+        raise ValidationError(_("Ranks are made of 0-9 and a-z and do not end with 0."), code='invalid')
+
+
+def _midpoint(low: str, high: Optional[str]) -> str:
+    """Key between ``low`` ('' being the bottom) and ``high`` (None being the top), read as base 36 fractions."""
+    if high is not None:
+        # Keep the common prefix, ``low`` being padded with zeros
+        common = 0
+        while common < len(high) and (low[common] if common < len(low) else '0') == high[common]:
+            common += 1
+        if common:
+            return high[:common] + _midpoint(low[common:], high[common:])
+    low_digit = RANK_DIGITS.index(low[0]) if low else 0
+    high_digit = RANK_DIGITS.index(high[0]) if high is not None else len(RANK_DIGITS)
+    if high_digit - low_digit > 1:
+        return RANK_DIGITS[(low_digit + high_digit) // 2]
+    # Consecutive digits: go one digit deeper
+    if high is not None and len(high) > 1:
+        return high[0]
+    return RANK_DIGITS[low_digit] + _midpoint(low[1:], None)
+
+
+def rank_between(low: Optional[str] = None, high: Optional[str] = None) -> str:
+    """
+    Key sorting strictly between ``low`` and ``high`` (None: no bound). There
+    is always one: keys are base 36 fractions, ``'i'`` being one half and
+    ``'ai'`` sitting between ``'a'`` and ``'b'``, so a key never has to be
+    given up for another row to fit.
+
+    Raises:
+        ValueError: ``low`` does not sort before ``high``, or a key is not canonical.
+    """
+    for key in (low, high):
+        if key is not None and not RANK_PATTERN.match(key):
+            raise ValueError(f"Invalid rank {key!r}")
+    if low is not None and high is not None and low >= high:
+        raise ValueError(f"Rank {low!r} does not sort before {high!r}")
+    return _midpoint(low or '', high)
+
+
+def rank_after(key: Optional[str]) -> str:
+    """
+    Key a fixed step after ``key`` (None: the first key), for appending: the
+    last digit is incremented, and a ``'z'`` goes one digit deeper. Keys grow
+    by one character per 35 appends, where halving the gap to the top would
+    add one every few rows.
+
+    Raises:
+        ValueError: ``key`` is not canonical.
+    """
+    if not key:
+        return rank_between()
+    if not RANK_PATTERN.match(key):
+        raise ValueError(f"Invalid rank {key!r}")
+    digit = RANK_DIGITS.index(key[-1])
+    if digit == len(RANK_DIGITS) - 1:
+        return key + RANK_DIGITS[1]
+    return key[:-1] + RANK_DIGITS[digit + 1]
+
+
+def rank_sequence(low: Optional[str], high: Optional[str], count: int) -> List[str]:
+    """``count`` increasing keys between ``low`` and ``high``, by halving the interval (balanced lengths)."""
+    if count <= 0:
+        return []
+    middle = count // 2
+    key = rank_between(low, high)
+    return rank_sequence(low, key, middle) + [key] + rank_sequence(key, high, count - middle - 1)
+
+
+def rank_spread(count: int) -> List[str]:
+    """``count`` increasing keys evenly spread over the key space, as short as they can be."""
+    base = len(RANK_DIGITS)
+    width = 1
+    while base ** width <= count:
+        width += 1
+    space = base ** width
+    keys = []
+    for index in range(count):
+        value = space * (index + 1) // (count + 1)
+        digits = []
+        for position in range(width):
+            value, digit = divmod(value, base)
+            digits.append(RANK_DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
+
+
+def get_rank_field(model) -> 'RankField':
+    return next(field for field in model._meta.concrete_fields if isinstance(field, RankField))
+
+
+class RankField(models.CharField):
+    """
+    Position of a row among its siblings (the rows sharing the ``scope``
+    fields) as a fractional key: a row moves between two others by taking a
+    key between theirs, the only row written. Sort on the field itself.
+
+    Keys grow by about one character per halving of the same gap, and by
+    one per 35 rows appended; ``RankQuerySet.rebalance`` gives them back
+    short even spacing. A row saved without a key is ranked after its last
+    sibling.
+
+    Usage:
+        order = RankField(scope=('module', ))
+    """
+
+    default_validators = [validate_rank]
+
+    def __init__(self, *args, scope=(), **kwargs):
+        self.scope = tuple(scope)
+        kwargs.setdefault('max_length', RANK_MAX_LENGTH)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('default', '')
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['scope'] = self.scope
+        return name, path, args, kwargs
+
+    def scope_values(self, model_instance) -> dict:
+        opts = model_instance._meta
+        return {opts.get_field(name).attname: getattr(model_instance, opts.get_field(name).attname)
+                for name in self.scope}
+
+    def siblings(self, model_instance):
+        return model_instance.__class__._default_manager.filter(**self.scope_values(model_instance))
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if not value:
+            last = (self.siblings(model_instance).order_by(f'-{self.attname}')
+                    .values_list(self.attname, flat=True).first())
+            value = rank_after(last)
+            if len(value) > self.max_length:
+                # The top of the key space is worn out: respace the siblings and look again
+                self.siblings(model_instance).rebalance()
+                return self.pre_save(model_instance, add)
+            setattr(model_instance, self.attname, value)
+        return value
+
+
+class RankedMixin:
+    """
+    Model ordered by a ``RankField``, moved with ``move()``.
+    """
+
+    def move(self, after=None, before=None, parent=None) -> str:
+        """
+        Places the row right after ``after``, right before ``before`` or
+        last under ``parent`` (the first scope field), taking a key between
+        its new neighbours. Only this row is written (with save(), so its
+        signals run); it joins the parent of the given row when that is
+        another one.
+
+        Returns:
+            The new key.
+
+        Raises:
+            ValueError: Not exactly one of the arguments given, or the row itself.
+        """
+        given = [value for value in (after, before, parent) if value is not None]
+        if len(given) != 1 or (parent is None and given[0].pk == self.pk):
+            raise ValueError("Give one other row to move after or before, or a parent")
+        field = get_rank_field(self.__class__)
+        if parent is not None:
+            setattr(self, field.scope[0], parent)
+        else:
+            for name in field.scope:
+                attname = self._meta.get_field(name).attname
+                setattr(self, attname, getattr(given[0], attname))
+        siblings = field.siblings(self).exclude(pk=self.pk)
+        keys = siblings.order_by(field.attname).values_list(field.attname, flat=True)
+        if parent is not None:
+            low, high = keys.last(), None
+        elif after is not None:
+            low = keys.get(pk=after.pk)
+            high = keys.filter(**{f'{field.attname}__gt': low}).first()
+        else:
+            high = keys.get(pk=before.pk)
+            low = keys.filter(**{f'{field.attname}__lt': high}).last()
+        key = rank_between(low, high)
+        if len(key) > field.max_length:
+            # The gap is worn out: respace the siblings and look again
+            field.siblings(self).rebalance()
+            return self.move(after=after, before=before, parent=parent)
+        setattr(self, field.attname, key)
+        self.save(update_fields=[field.name, *field.scope])
+        return key
+
+
+class RankQuerySet(models.QuerySet):
+
+    def reorder(self, pks: list) -> int:
+        """
+        Puts these rows, the children of one parent, in the order of
+        ``pks`` (all of them). The longest run of rows already in that order
+        keeps its keys; the others get keys between their new neighbours,
+        so one drag writes one row.
+
+        Returns:
+            int: Number of rewritten rows
+
+        Raises:
+            ValueError: ``pks`` are not exactly the rows of the queryset.
+        """
+        field = get_rank_field(self.model)
+        scope = [self.model._meta.get_field(name).attname for name in field.scope]
+        rows = list(self.values_list('pk', field.attname, *scope))
+        if len({row[2:] for row in rows}) > 1:
+            raise ValueError("Reorder the children of one parent at a time")
+        current = {pk: key for pk, key, *_ in rows}
+        pks = [self.model._meta.pk.to_python(pk) for pk in pks]
+        if len(pks) != len(current) or set(pks) != set(current):
+            raise ValueError("Reorder needs every row of the queryset, once")
+
+        kept = set(longest_increasing_run([current[pk] for pk in pks], pks))
+        taken = sorted(current.values())
+        moved, low, run = [], None, []
+        for pk in [*pks, None]:
+            if pk is not None and pk not in kept:
+                run.append(pk)
+                continue
+            if run:
+                high = current[pk] if pk is not None else None
+                # Below the first key of the gap: those rows are leaving, but their keys
+                # are taken until the UPDATE reaches them
+                index = bisect.bisect_right(taken, low) if low is not None else 0
+                if index < len(taken) and (high is None or taken[index] < high):
+                    high = taken[index]
+                for row_pk, key in zip(run, rank_sequence(low, high, len(run))):
+                    moved.append(self.model(pk=row_pk, **{field.attname: key}))
+                run = []
+            if pk is not None:
+                low = current[pk]
+        with transaction.atomic(using=self.db):
+            return self.model._default_manager.db_manager(self.db).bulk_update(moved, [field.attname])
+
+    def rebalance(self) -> int:
+        """
+        Rewrites the keys of these rows evenly spread, per parent and in the
+        same order, making them as short as they can be.
+
+        Returns:
+            int: Number of rewritten rows
+        """
+        field = get_rank_field(self.model)
+        scope = [self.model._meta.get_field(name).attname for name in field.scope]
+        groups = defaultdict(list)
+        for row in self.order_by(*scope, field.attname).values_list('pk', field.attname, *scope):
+            groups[row[2:]].append(row[:2])
+
+        changed, taken = [], set()
+        for rows in groups.values():
+            for (pk, key), new_key in zip(rows, rank_spread(len(rows))):
+                taken.add(key)
+                if key != new_key:
+                    changed.append(self.model(pk=pk, **{field.attname: new_key}))
+        manager = self.model._default_manager.db_manager(self.db)
+        with transaction.atomic(using=self.db):
+            if any(getattr(obj, field.attname) in taken for obj in changed):
+                # A new key still held by another row: park the rows outside the key space first
+                manager.bulk_update([self.model(pk=obj.pk, **{field.attname: f'-{obj.pk}'}) for obj in changed],
+                                    [field.attname])
+            return manager.bulk_update(changed, [field.attname])
+
+
+def longest_increasing_run(keys: list, items: list) -> list:
+    """Items of the longest subsequence of ``items`` whose ``keys`` increase (patience sorting)."""
+    tails, tail_items, previous = [], [], [None] * len(keys)
+    for index, key in enumerate(keys):
+        position = bisect.bisect_left(tails, key)
+        previous[index] = tail_items[position - 1] if position else None
+        if position == len(tails):
+            tails.append(key)
+            tail_items.append(index)
+        else:
+            tails[position] = key
+            tail_items[position] = index
+    run, index = [], tail_items[-1] if tail_items else None
+    while index is not None:
+        run.append(items[index])
+        index = previous[index]
+    return run[::-1]
@@ -1,5 +1,157 @@
 import os
-import uuid
+import re
+from collections import defaultdict
+from django.db.models import Q, UniqueConstraint
+from django.utils.text import slugify
+from django_extensions.db.fields import AutoSlugField as ExtensionsAutoSlugField
+
+# Distinct slug bases looked up per query when allocating in batch (one
+# OR-ed condition each: SQLite parses at most 1000 nested terms)
+SLUG_BATCH_SIZE = 250
+
+
+class AutoSlugField(ExtensionsAutoSlugField):
+    """
+    AutoSlugField allocating a free slug with a single query.
+
+    django-extensions tries ``slug``, ``slug-2``, ``slug-3``... with one
+    ``exists()`` query per candidate. Here the taken slugs sharing the base
+    (``slug`` and ``slug-<n>``, a prefix range of the unique index) are read
+    at once and the suffix after the highest one is used, so the slug of a
+    deleted object is not handed out again.
+
+    ``allocate_slugs`` does the same for many unsaved objects before a
+    ``bulk_create``. Concurrent saves of the same base can still pick the
+    same slug: the unique index rejects the second one.
+    """
+
+    def slug_base(self, model_instance) -> str:
+        """The slug ``populate_from`` gives, before any suffix."""
+        populate_from = self._populate_from
+        if not isinstance(populate_from, (list, tuple)):
+            populate_from = (populate_from, )
+        slugify_function = getattr(model_instance, 'slugify_function', self.slugify_function)
+        slug = self.separator.join(
+            self.slugify_func(self.get_slug_fields(model_instance, value), slugify_function=slugify_function)
+            for value in populate_from
+        )
+        if self.max_length:
+            slug = slug[:self.max_length]
+        return self._slug_strip(slug) or model_instance._meta.model_name
+
+    def scope(self, model_instance) -> dict:
+        """Filters of the rows the slug must differ from: all of them for a unique slug, else those of its unique constraints."""
+        if self.unique:
+            return {}
+        opts = model_instance._meta
+        groups = [*opts.unique_together, *(constraint.fields for constraint in opts.constraints
+                                            if isinstance(constraint, UniqueConstraint))]
+        scope = {}
+        for fields in groups:
+            if self.name in fields:
+                for name in fields:
+                    if name != self.name:
+                        attname = opts.get_field(name).attname
+                        scope[attname] = getattr(model_instance, attname)
+        return scope
+
+    def taken(self, queryset, bases) -> set:
+        """Slugs of ``queryset`` equal to one of ``bases`` or to a base followed by a numeric suffix."""
+        taken, bases = set(), list(bases)
+        for start in range(0, len(bases), SLUG_BATCH_SIZE):
+            chunk = bases[start:start + SLUG_BATCH_SIZE]
+            condition = Q(**{f"{self.attname}__in": chunk})
+            for base in chunk:
+                prefix = f"{base}{self.separator}"
+                condition |= Q(**{
+                    f"{self.attname}__startswith": prefix,
+                    f"{self.attname}__regex": rf"^{re.escape(prefix)}[0-9]+$",
+                })
+            taken.update(queryset.filter(condition).values_list(self.attname, flat=True))
+        return taken
+
+    def next_free(self, base: str, taken: set) -> str:
+        prefix = f"{base}{self.separator}"
+        suffixes = [int(slug[len(prefix):]) for slug in taken
+                    if slug.startswith(prefix) and slug[len(prefix):].isdigit()]
+        if base not in taken and not suffixes:
+            return base
+        return f"{prefix}{max(suffixes, default=1) + 1}"
+
+    def allocate(self, queryset, bases: list) -> list:
+        """
+        Free, distinct slugs for ``bases`` (repeats allowed), in order.
+
+        Args:
+            queryset: The rows the slugs must differ from.
+            bases: Slug bases, as given by ``slug_base``.
+
+        Returns:
+            The slugs, one per base.
+        """
+        slugs, allocated, shortened = [None] * len(bases), set(), {}
+        pending = dict(enumerate(bases))
+        while pending:
+            # A shortened base still needs a suffix, being a prefix of the slug it stands for
+            taken = self.taken(queryset, set(pending.values())) | allocated | set(shortened.values())
+            shortened = {}
+            for index, base in pending.items():
+                slug = self.next_free(base, taken)
+                if self.max_length and len(slug) > self.max_length:
+                    # No room for the suffix: look again with a shorter base
+                    shortened[index] = self._slug_strip(base[:self.max_length - (len(slug) - len(base))])
+                    continue
+                taken.add(slug)
+                allocated.add(slug)
+                slugs[index] = slug
+            pending = shortened
+        return slugs
+
+    def unique_queryset(self, model_instance):
+        queryset = self.get_queryset(model_instance.__class__, self).filter(**self.scope(model_instance))
+        if model_instance.pk:
+            queryset = queryset.exclude(pk=model_instance.pk)
+        return queryset
+
+    def create_slug(self, model_instance, add):
+        slug = getattr(model_instance, self.attname)
+        if slug and self.attname in getattr(model_instance, '_allocated_slugs', ()):
+            # Given by allocate_slugs
+            return slug
+        if slug and not self.overwrite and not (add and self.overwrite_on_add):
+            return slug
+
+        slug = self.slug_base(model_instance)
+        if not self.allow_duplicates:
+            [slug] = self.allocate(self.unique_queryset(model_instance), [slug])
+        setattr(model_instance, self.attname, slug)
+        return slug
+
+
+def allocate_slugs(objs, field_name: str = 'slug') -> list:
+    """
+    Gives unsaved objects of one model free, distinct slugs ahead of a
+    ``bulk_create``, reading the taken slugs with one query per
+    SLUG_BATCH_SIZE distinct bases. Without it every object would be given
+    its slug on insert by its own lookup, blind to the rest of the batch.
+
+    Usage:
+        >>> Lesson.objects.bulk_create(allocate_slugs(lessons))
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+    field = objs[0]._meta.get_field(field_name)
+    groups = defaultdict(list)
+    for obj in objs:
+        groups[tuple(sorted(field.scope(obj).items()))].append(obj)
+    for scope, members in groups.items():
+        queryset = field.get_queryset(members[0].__class__, field).filter(**dict(scope))
+        slugs = field.allocate(queryset, [field.slug_base(obj) for obj in members])
+        for obj, slug in zip(members, slugs):
+            setattr(obj, field.attname, slug)
+            obj._allocated_slugs = {*getattr(obj, '_allocated_slugs', ()), field.attname}
+    return objs
 
 
 class BaseSlug:
@@ -8,26 +160,26 @@ class BaseSlug:
     def get_slug(cls, instance):
         """ Abstract method to get slug from object. """
         raise NotImplementedError("Subclass needs to implement this get_slug method.")
-    
+
     @classmethod
     def slug_method(cls, value):
         """ Abstract method to slugify the instance from object. """
         raise NotImplementedError("The Slug method for abstract class can not be implemented.")
-    
-    
+
+
 class UserSlug(BaseSlug):
     """ Class for Generating Slug from a User Object. """
     @classmethod
     def get_slug(cls, instance):
         """ Method to get slug from user object. """
         return f"{instance.first_name}-{instance.last_name}"
-    
+
     @classmethod
     def slug_method(cls, value):
         """ Method to get slug from user object. """
-        return value.replace(' ', '-').lower()
-    
-    
+        return slugify(value, allow_unicode=True)
+
+
 class MediaSlug(BaseSlug):
     """ Class for Generating Slug from a Media Object. """
 
@@ -38,28 +190,29 @@ class MediaSlug(BaseSlug):
         if not instance.slug and instance.original_filename:
             return os.path.splitext(instance.original_filename)[0]
         return instance.title
-    
+
     @classmethod
     def slug_method(cls, value):
         """ Slug function to generate slug from string. """
-        return value.replace(' ', '-').lower()
-    
+        return slugify(value, allow_unicode=True)
+
 class CourseSlug(BaseSlug):
     """ Class for Generating Slug from a Course Object. """
 
     @classmethod
     def get_slug(cls, instance):
         """ Method to get slug from Course object. """
-        # Generate slug (unchanged)
-        if not instance.slug and instance.level:
-            return f"{instance.category.name}-{instance.level}-{instance.title}"
-        return f"{instance.category.name}-{instance.title}"     
-    
+        # A course may have no category (SET_NULL)
+        parts = [instance.category.name] if instance.category_id else []
+        if instance.level:
+            parts.append(instance.level)
+        return "-".join([*parts, instance.title])
+
     @classmethod
     def slug_method(cls, value):
         """ Slug function to generate slug from string. """
-        return value.replace(' ', '-').lower()
-    
+        return slugify(value, allow_unicode=True)
+
 class CategorySlug(BaseSlug):
     """ Class for Generating Slug from a Course Object. """
 
@@ -68,39 +221,39 @@ class CategorySlug(BaseSlug):
         """ Method to get slug from Course object. """
         # Generate slug (unchanged)
         return instance.name
-    
+
     @classmethod
     def slug_method(cls, value):
         """ Slug function to generate slug from string. """
-        return value.replace(' ', '-').lower()
-    
+        return slugify(value, allow_unicode=True)
+
 class ModuleSlug(BaseSlug):
     """ Class for Generating Slug from a Module Object. """
 
     @classmethod
     def get_slug(cls, instance):
         """ Method to get slug from Module object. """
-        # Generate slug (unchanged)
-        return f"module-{instance.title}-{uuid.uuid4()}"
-    
+        # Title only: AutoSlugField suffixes repeated titles (-2, -3...)
+        return instance.title
+
     @classmethod
     def slug_method(cls, value):
         """ Slug function to generate slug from string. """
-        return value.replace(' ', '-').lower()
-    
+        return slugify(value, allow_unicode=True)
+
 class LessonSlug(BaseSlug):
     """ Class for Generating Slug from a Lesson Object. """
 
     @classmethod
     def get_slug(cls, instance):
         """ Method to get slug from Lesson object. """
-        # Generate slug (unchanged)
-        return f"module-{instance.title}-{uuid.uuid4()}"
-    
+        # Title only: AutoSlugField suffixes repeated titles (-2, -3...)
+        return instance.title
+
     @classmethod
     def slug_method(cls, value):
         """ Slug function to generate slug from string. """
-        return value.replace(' ', '-').lower()
-    
-    
-        
+        return slugify(value, allow_unicode=True)
+
+
+
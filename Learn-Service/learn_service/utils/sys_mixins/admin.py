@@ -0,0 +1,246 @@
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.utils import unquote
+from django.contrib.admin.views.main import ORDER_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
+from django.core.paginator import Paginator
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from utils.rank_fields import get_rank_field
+
+DEFAULT_EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimate_count(queryset) -> int | None:
+    """
+    Row count of an unfiltered queryset from the planner statistics
+    (``pg_class.reltuples``, refreshed by VACUUM/ANALYZE), without scanning
+    the table.
+
+    Returns:
+        The estimate, or None when it cannot stand in for COUNT(*): the
+        queryset is filtered or distinct, the table was never analyzed, or
+        the database is not PostgreSQL.
+    """
+    if not isinstance(queryset, models.QuerySet):
+        return None
+    query = queryset.query
+    if query.has_filters() or query.distinct or query.combinator or connections[queryset.db].vendor != 'postgresql':
+        return None
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [connections[queryset.db].ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginates large tables without COUNT(*): an unfiltered changelist is
+    counted from ``pg_class.reltuples`` once the table has more than
+    ADMIN_EXACT_COUNT_THRESHOLD rows. Smaller tables, filtered and searched
+    lists are counted exactly (those counts use the indexes of the filter).
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate > getattr(settings, 'ADMIN_EXACT_COUNT_THRESHOLD', DEFAULT_EXACT_COUNT_THRESHOLD):
+            return estimate
+        return super().count
+
+
+def related_count(model, relation: str):
+    """
+    Number of ``relation`` rows (a reverse foreign key) of each ``model``
+    row, as a correlated subquery. Unlike ``Count`` it needs no GROUP BY over
+    the whole table: it is evaluated for the rows of the page only.
+
+    Usage:
+        >>> Category.objects.annotate(course_count=related_count(Category, 'courses'))
+    """
+    field = model._meta.get_field(relation)
+    rows = (
+        field.related_model._default_manager.filter(**{field.field.name: OuterRef('pk')})
+        .order_by().values(field.field.name).annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=models.IntegerField()), 0)
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Foreign key filter rendered as an autocomplete select (the admin's own
+    select2 search), so the sidebar never loads the related table. Only the
+    selected object is fetched.
+
+    The related model admin needs ``search_fields``.
+
+    Usage:
+        list_filter = (('module', AutocompleteFilter),)
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.model_admin = model_admin
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        if not self.lookup_val:
+            return []
+        return field.get_choices(include_blank=False, limit_choices_to={f'{field.target_field.name}__in': self.lookup_val})
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        # URL template the select navigates to, '__value__' being replaced by the picked key
+        self.select_url = changelist.get_query_string({self.lookup_kwarg: '__value__'}, [self.lookup_kwarg_isnull])
+        yield from super().choices(changelist)
+
+    @cached_property
+    def widget_html(self) -> str:
+        form_field = self.field.formfield(widget=AutocompleteSelect(self.field, self.model_admin.admin_site))
+        form_field.widget.attrs['id'] = f'autocomplete-filter-{self.field_path}'
+        return form_field.widget.render(self.lookup_kwarg, self.lookup_val[0] if self.lookup_val else None)
+
+
+class AdminPerformanceMixin:
+    """
+    Changelist defaults for large tables:
+
+    - ``list_select_related`` derived from ``list_display``: related lookups
+      (``course__title``) and displayed foreign keys, plus the relations
+      their ``__str__`` needs (``str_select_related`` on the related model,
+      or on the model itself for ``'__str__'``), so rows never query per
+      cell.
+    - ``count_annotations``: ``{'course_count': 'courses'}`` annotates
+      reverse foreign key counts as correlated subqueries, sortable by
+      column.
+    - Paginator estimating unfiltered counts from ``pg_class`` and no
+      second COUNT(*) for the unfiltered total.
+    - The admin autocomplete assets, for ``AutocompleteFilter``.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    count_annotations = {}
+
+    def get_list_select_related(self, request):
+        declared = super().get_list_select_related(request)
+        lookups = list(declared) if isinstance(declared, (list, tuple)) else []
+        for name in self.get_list_display(request):
+            if name == '__str__':
+                lookups.extend(getattr(self.model, 'str_select_related', ()))
+            elif isinstance(name, str):
+                lookups.extend(self._related_lookups(self.model, name))
+        return tuple(dict.fromkeys(lookups)) or declared
+
+    @staticmethod
+    def _related_lookups(model, name: str) -> list:
+        """Relations ``name`` (a field or a ``__`` lookup) crosses, and those of the last one's ``__str__``."""
+        lookups, path = [], []
+        for part in name.split('__'):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                break
+            if not (field.many_to_one or field.one_to_one) or not field.concrete:
+                break
+            path.append(part)
+            lookups.append('__'.join(path))
+            model = field.related_model
+        if lookups and lookups[-1] == name:
+            # The related object itself is displayed: follow what its __str__ reads
+            lookups.extend(f'{name}__{lookup}' for lookup in getattr(model, 'str_select_related', ()))
+        return lookups
+
+    def get_queryset(self, request):
+        # No select_related here: the changelist only applies
+        # get_list_select_related() to querysets without one
+        queryset = super().get_queryset(request)
+        if self.count_annotations:
+            queryset = queryset.annotate(**{
+                name: related_count(self.model, relation) for name, relation in self.count_annotations.items()
+            })
+        return queryset
+
+    @property
+    def media(self):
+        media = super().media
+        if any(isinstance(item, (list, tuple)) and issubclass(item[1], AutocompleteFilter) for item in self.list_filter):
+            media += AutocompleteSelect(None, self.admin_site).media
+        return media
+
+
+class SortableAdminMixin:
+    """
+    Drag-and-drop ordering of the changelist rows of a model ranked by a
+    ``RankField`` (see utils.rank_fields). Rows can be dragged while the
+    list is filtered to one parent (a ``scope`` field of the rank) and
+    sorted by rank. Each drop posts the row it landed next to to
+    ``<pk>/move/``, which moves the dragged row with one UPDATE.
+
+    The rows are found through their action checkboxes.
+    """
+    change_list_template = 'admin/sortable_change_list.html'
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('<path:object_id>/move/', self.admin_site.admin_view(self.move_view),
+                 name=f'{opts.app_label}_{opts.model_name}_move'),
+            *super().get_urls(),
+        ]
+
+    def is_sortable(self, request) -> bool:
+        scope = get_rank_field(self.model).scope
+        filtered = any(param.split('__')[0] in scope for param in request.GET)
+        return filtered and ORDER_VAR not in request.GET and self.has_change_permission(request)
+
+    def changelist_view(self, request, extra_context=None):
+        opts = self.model._meta
+        extra_context = {
+            'sortable': self.is_sortable(request),
+            'move_url': reverse(f'admin:{opts.app_label}_{opts.model_name}_move', args=['__pk__'],
+                                current_app=self.admin_site.name),
+            **(extra_context or {}),
+        }
+        return super().changelist_view(request, extra_context)
+
+    def move_view(self, request, object_id):
+        """
+        Moves a row right ``after`` or ``before`` another one (pk posted).
+
+        Returns:
+            JSON with the new key, or an ``error`` (400: bad neighbour,
+            409: a concurrent move took the same key)
+        """
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
+        if not self.has_change_permission(request, obj):
+            raise PermissionDenied
+
+        wanted = {name: request.POST[name] for name in ('after', 'before') if request.POST.get(name)}
+        rows = {str(row.pk): row for row in self.get_queryset(request).filter(pk__in=wanted.values())}
+        try:
+            with transaction.atomic():
+                key = obj.move(**{name: rows[value] for name, value in wanted.items()})
+        except KeyError:
+            return JsonResponse({'error': "Unknown row to move next to"}, status=400)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except IntegrityError:
+            return JsonResponse({'error': "The row was moved at the same time, reload the page"}, status=409)
+        self.log_change(request, obj, [{'changed': {'fields': [str(get_rank_field(self.model).verbose_name)]}}])
+        return JsonResponse({'pk': str(obj.pk), 'order': key})
@@ -1,31 +1,80 @@
 from django.core.files.storage import default_storage
-from django.db import models
+from django.db import models, transaction
+from django.db.models.fields.files import FieldFile
 
 class AutoDeleteFileMixin:
     """
     Mixin to automatically delete a file when it is replaced or the object is deleted.
     And it is specific only on the models specifically on the media files.
+
+    The values a row was loaded with are kept in ``_loaded_values`` so that a
+    replaced file can be detected without fetching the row again on save.
     """
 
-    def delete_old_file_on_change(self, field_name: str):
+    @classmethod
+    def from_db(cls, db, field_names, values):
         """
-        Deletes the old file from storage if a new file is uploaded.
+        Snapshots the original field values at load time.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        """
+        Keeps the file field snapshot in sync with the reloaded values.
+        """
+        super().refresh_from_db(*args, **kwargs)
+        deferred = self.get_deferred_fields()
+        for field in self._meta.concrete_fields:
+            if isinstance(field, models.FileField) and field.attname not in deferred:
+                self.remember_value(field.attname)
+
+    def get_original_value(self, field_name: str):
         """
+        Returns the value the field had in the database, using the load time
+        snapshot and only querying when the field was not loaded (deferred, or
+        the instance was built by hand with a pk).
+        """
+        loaded_values = getattr(self, '_loaded_values', None)
+        if loaded_values is not None and field_name in loaded_values:
+            return loaded_values[field_name]
         if not self.pk:
-            return  # Object is not saved yet, no need to check
-        
-        try:
-            old_instance = self.__class__.objects.get(pk=self.pk)
-        except self.__class__.DoesNotExist:
-            return  # New object, nothing to compare
-        
-        old_file = getattr(old_instance, field_name, None)
+            return None
+        return (
+            self.__class__._base_manager
+            .filter(pk=self.pk)
+            .values_list(field_name, flat=True)
+            .first()
+        )
+
+    def remember_value(self, field_name: str):
+        """
+        Refreshes the snapshot for a field after it has been saved.
+        """
+        value = getattr(self, field_name, None)
+        if isinstance(value, FieldFile):
+            value = value.name
+        if getattr(self, '_loaded_values', None) is None:
+            self._loaded_values = {}
+        self._loaded_values[field_name] = value
+
+    def delete_old_file_on_change(self, field_name: str, old_name: str = None):
+        """
+        Deletes the old file from storage if a new file is uploaded.
+        ``old_name`` is the file the row had, when the caller already knows it.
+        """
+        if old_name is None:
+            if not self.pk:
+                return  # Object is not saved yet, no need to check
+            old_name = self.get_original_value(field_name)
         new_file = getattr(self, field_name, None)
 
-        if not old_file or not old_file.name:
+        if not old_name:
             return  # No old file to delete
 
-        if old_file.name != getattr(new_file, 'name', None):
+        if old_name != getattr(new_file, 'name', None):
+            old_file = FieldFile(self, self._meta.get_field(field_name), old_name)
             self._delete_file_safely(old_file)
 
     def delete_file(self, field_name: str):
@@ -37,15 +86,36 @@ class AutoDeleteFileMixin:
             self._delete_file_safely(file)
 
 
-    def _delete_file_safely(self, file: models.FileField):
+    def release_file(self, name: str) -> bool:
         """
-        Deletes the file from storage, handling common exceptions.
+        Drops this instance's reference to a stored file.
+
+        Returns True when no other row uses the file, so it can be deleted.
+        Models whose files can be shared (content addressed blobs) override it.
+        """
+        return True
+
+    def discard_file(self, name: str):
+        """
+        Deletes a released file from storage, handling common exceptions.
+        Models that derive files from it (renditions) extend it.
         """
         try:
-            if default_storage.exists(file.name):
-                default_storage.delete(file.name)
+            if default_storage.exists(name):
+                default_storage.delete(name)
         except Exception as e:
             # Log this in real-world apps instead of printing
-            print(f"[Warning] Could not delete file '{file.name}': {e}")
+            print(f"[Warning] Could not delete file '{name}': {e}")
+
+    def _delete_file_safely(self, file: models.FileField):
+        """
+        Drops this instance's reference to the file in the current
+        transaction and, once no other row uses it, deletes it from storage
+        when the transaction commits: a save or delete that is rolled back
+        keeps both its reference and its file.
+        """
+        name = file.name
+        if self.release_file(name):
+            transaction.on_commit(lambda: self.discard_file(name))
 
         
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.test import SimpleTestCase
+from ..files.backends import MissingBackend, lazy_import
+
+
+class LazyImportTests(SimpleTestCase):
+    """
+    Test suite for the media backends imported on first use.
+    """
+
+    def tearDown(self):
+        sys.modules.pop('json.tool', None)
+
+    def test_module_runs_on_first_attribute(self):
+        sys.modules.pop('json.tool', None)
+        module = lazy_import('json.tool')
+        self.assertEqual(type(module).__name__, '_LazyModule')
+        self.assertTrue(callable(module.main))
+        self.assertIs(sys.modules['json.tool'], module)
+
+    def test_loaded_module_is_returned_as_is(self):
+        self.assertIs(lazy_import('json'), sys.modules['json'])
+
+    def test_missing_backend_fails_on_use(self):
+        module = lazy_import('no_such_media_backend')
+        self.assertIsInstance(module, MissingBackend)
+        with self.assertRaises(ImportError):
+            module.open
+
+    def test_boot_does_not_load_heavy_backends(self):
+        script = (
+            "import sys, django; django.setup();"
+            "from django.conf import settings; __import__(settings.ROOT_URLCONF);"
+            "import sys_media.models, utils.files.converter, utils.files.process_file;"
+            "print('loaded:' + ','.join(name for name in ('numpy', 'PIL.Image', 'magic', 'PyPDF2', 'pptx') if name in sys.modules"
+            " and type(sys.modules[name]).__name__ != '_LazyModule'))"
+        )
+        environment = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        completed = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                                   cwd=settings.BASE_DIR, env=environment, check=True)
+        self.assertEqual(completed.stdout.strip().splitlines()[-1], 'loaded:')
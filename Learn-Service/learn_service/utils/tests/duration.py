@@ -0,0 +1,94 @@
+import io
+import struct
+import wave
+from django.test import SimpleTestCase
+from ..files.duration import MediaDurationProbe, probe_duration
+
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def mp4_bytes(timescale: int, duration: int, moov_last: bool = True) -> bytes:
+    mvhd = box(b'mvhd', b'\x00\x00\x00\x00' + struct.pack('>IIII', 0, 0, timescale, duration) + b'\x00' * 80)
+    moov = box(b'moov', mvhd)
+    ftyp = box(b'ftyp', b'isom\x00\x00\x02\x00isomiso2')
+    mdat = box(b'mdat', b'\x00' * 50000)
+    return ftyp + mdat + moov if moov_last else ftyp + moov + mdat
+
+
+def ebml_element(element_id: int, payload: bytes) -> bytes:
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+    return id_bytes + (0x01 << 56 | len(payload)).to_bytes(8, 'big') + payload
+
+
+def ogg_page(serial: int, granule: int, payload: bytes) -> bytes:
+    header = b'OggS\x00\x00' + struct.pack('<qIII', granule, serial, 0, 0)
+    return header + bytes([1, len(payload)]) + payload
+
+
+class MediaDurationProbeTests(SimpleTestCase):
+    """
+    Test suite for header only duration parsing.
+    """
+
+    def assertDuration(self, data: bytes, expected: float):
+        duration = probe_duration(io.BytesIO(data), fallback=False)
+        self.assertIsNotNone(duration)
+        self.assertAlmostEqual(duration, expected, places=2)
+
+    def test_mp4_mvhd_after_mdat(self):
+        self.assertDuration(mp4_bytes(1000, 95500), 95.5)
+        self.assertDuration(mp4_bytes(600, 6000, moov_last=False), 10.0)
+
+    def test_matroska_segment_info(self):
+        info = ebml_element(0x1549A966, ebml_element(0x2AD7B1, (1000000).to_bytes(3, 'big'))
+                            + ebml_element(0x4489, struct.pack('>d', 42500.0)))
+        data = ebml_element(0x1A45DFA3, b'\x42\x82\x84webm') + ebml_element(0x18538067, info)
+        self.assertDuration(data, 42.5)
+
+    def test_wav_data_chunk(self):
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as writer:
+            writer.setnchannels(2)
+            writer.setsampwidth(2)
+            writer.setframerate(8000)
+            writer.writeframes(b'\x00' * 8000 * 4 * 3)
+        self.assertDuration(buffer.getvalue(), 3.0)
+
+    def test_flac_streaminfo(self):
+        packed = (44100 << 44) | (1 << 41) | (15 << 36) | (44100 * 7)
+        streaminfo = b'\x00' * 10 + packed.to_bytes(8, 'big') + b'\x00' * 16
+        data = b'fLaC' + bytes([0x80]) + len(streaminfo).to_bytes(3, 'big') + streaminfo
+        self.assertDuration(data, 7.0)
+
+    def test_ogg_vorbis_last_granule(self):
+        ident = b'\x01vorbis' + struct.pack('<IBI', 0, 2, 48000) + b'\x00' * 16
+        data = ogg_page(7, 0, ident) + ogg_page(7, 48000 * 2, b'x') + ogg_page(7, 48000 * 5, b'y')
+        self.assertDuration(data, 5.0)
+
+    def test_mp3_xing_frame_count(self):
+        # MPEG1 Layer III, 128 kbps, 44.1 kHz, stereo
+        frame = b'\xff\xfb\x90\x00' + b'\x00' * 32 + b'Xing' + struct.pack('>II', 1, 1000)
+        data = b'ID3\x03\x00\x00\x00\x00\x00\x0a' + b'\x00' * 10 + frame + b'\x00' * 400
+        self.assertDuration(data, 1000 * 1152 / 44100)
+
+    def test_mp3_constant_bitrate(self):
+        frame = b'\xff\xfb\x90\x00' + b'\x00' * 413
+        self.assertDuration(frame * 100, len(frame) * 100 * 8 / 128000)
+
+    def test_unknown_format_without_fallback(self):
+        self.assertIsNone(probe_duration(io.BytesIO(b'not a media file'), fallback=False))
+
+    def test_only_headers_are_read(self):
+        data = mp4_bytes(1000, 2000)
+        reads = []
+
+        class CountingBytesIO(io.BytesIO):
+            def read(self, size=-1):
+                chunk = super().read(size)
+                reads.append(len(chunk))
+                return chunk
+
+        MediaDurationProbe(CountingBytesIO(data)).get_duration(fallback=False)
+        self.assertLess(sum(reads), 100)
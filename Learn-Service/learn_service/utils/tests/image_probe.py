@@ -0,0 +1,60 @@
+import io
+from django.test import SimpleTestCase
+from PIL import Image
+from ..files.image_probe import ImageHeaderProbe, ImageProbeError, probe_image
+
+
+def encode(image_format: str, size=(40, 30), **options) -> io.BytesIO:
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format, **options)
+    buffer.seek(0)
+    return buffer
+
+
+class ImageHeaderProbeTests(SimpleTestCase):
+    """
+    Test suite for header only image dimension probing.
+    """
+
+    def assertProbe(self, file_object, image_format, size):
+        info = probe_image(file_object)
+        self.assertEqual(info.format, image_format)
+        self.assertEqual((info.width, info.height), size)
+
+    def test_raster_formats(self):
+        self.assertProbe(encode('PNG'), 'png', (40, 30))
+        self.assertProbe(encode('GIF'), 'gif', (40, 30))
+        self.assertProbe(encode('JPEG', progressive=True), 'jpeg', (40, 30))
+
+    def test_webp_variants(self):
+        self.assertProbe(encode('WEBP', quality=80), 'webp', (40, 30))
+        self.assertProbe(encode('WEBP', lossless=True), 'webp', (40, 30))
+        exif = Image.Exif()
+        exif[0x0112] = 1
+        self.assertProbe(encode('WEBP', exif=exif.tobytes()), 'webp', (40, 30))
+
+    def test_jpeg_exif_orientation_swaps_display_size(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        info = probe_image(encode('JPEG', exif=exif.tobytes()))
+        self.assertEqual(info.orientation, 6)
+        self.assertEqual(info.display_size, (30, 40))
+
+    def test_jpeg_segments_are_skipped_not_read(self):
+        icc = b'\x00' * 500000  # large embedded profile before the frame header
+        file_object = encode('JPEG', size=(400, 300), icc_profile=icc)
+        probe = ImageHeaderProbe(file_object)
+        self.assertEqual(probe.probe().display_size, (400, 300))
+        self.assertLess(probe.bytes_read, 1024)
+
+    def test_svg_size_and_view_box(self):
+        svg = b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" width="120px" height="80">'
+        self.assertProbe(io.BytesIO(svg), 'svg', (120, 80))
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 300 150" width="100%"></svg>'
+        self.assertProbe(io.BytesIO(svg), 'svg', (300, 150))
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0,0,300,150" width="600"></svg>'
+        self.assertProbe(io.BytesIO(svg), 'svg', (600, 300))
+
+    def test_unknown_format_raises(self):
+        with self.assertRaises(ImageProbeError):
+            probe_image(io.BytesIO(b'BM' + bytes(64)))
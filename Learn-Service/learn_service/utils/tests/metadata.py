@@ -0,0 +1,65 @@
+import hashlib
+import io
+from django.test import SimpleTestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..files.metadata import (
+    StreamingMetadataExtractor,
+    MetadataTeeFile,
+    extract_metadata,
+    MIME_SNIFF_BYTES,
+)
+
+
+class StreamingMetadataExtractorTests(SimpleTestCase):
+    """
+    Test suite for the single pass metadata extractor.
+    """
+
+    def setUp(self):
+        self.content = b"%PDF-1.4\n" + b"0123456789" * 5000
+
+    def test_single_pass_matches_hashlib(self):
+        """Size and checksum match a plain hashlib pass."""
+        metadata = extract_metadata(io.BytesIO(self.content), name="notes.pdf", chunk_size=1024)
+        self.assertEqual(metadata["size"], len(self.content))
+        self.assertEqual(metadata["checksum"], hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(metadata["mime_type"], "application/pdf")
+        self.assertEqual(metadata["extension"], ".pdf")
+
+    def test_header_is_bounded(self):
+        """Only the leading bytes are buffered for MIME sniffing."""
+        extractor = StreamingMetadataExtractor(chunk_size=4096)
+        extractor.consume_file(io.BytesIO(self.content))
+        self.assertEqual(len(extractor.header), MIME_SNIFF_BYTES)
+
+    def test_is_complete_uses_expected_size(self):
+        extractor = StreamingMetadataExtractor(expected_size=len(self.content))
+        extractor.update(self.content[:10])
+        self.assertFalse(extractor.is_complete)
+        extractor.update(self.content[10:])
+        self.assertTrue(extractor.is_complete)
+
+
+class MetadataTeeFileTests(SimpleTestCase):
+    """
+    Test suite for feeding the extractor while a storage reads the upload.
+    """
+
+    def test_chunks_feed_extractor(self):
+        content = b"abc" * 10000
+        upload = SimpleUploadedFile("lesson.txt", content)
+        extractor = StreamingMetadataExtractor(name=upload.name, chunk_size=1000)
+        tee = MetadataTeeFile(upload, extractor)
+        written = b"".join(tee.chunks())
+        self.assertEqual(written, content)
+        self.assertEqual(extractor.checksum, hashlib.sha256(content).hexdigest())
+
+    def test_rereads_are_not_hashed_twice(self):
+        content = b"0123456789" * 100
+        extractor = StreamingMetadataExtractor()
+        tee = MetadataTeeFile(SimpleUploadedFile("a.txt", content), extractor)
+        tee.read(100)
+        tee.seek(0)
+        b"".join(tee.chunks(64))
+        self.assertEqual(extractor.size, len(content))
+        self.assertEqual(extractor.checksum, hashlib.sha256(content).hexdigest())
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from django.test import SimpleTestCase, override_settings
+from ..files.media import MediaProcessor
+from ..files.metadata_cache import MetadataCache, get_cache_path, get_metadata_cache
+
+
+class MetadataCacheTests(SimpleTestCase):
+    """
+    Test suite for the durable, single-flight media metadata cache.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'metadata.sqlite3')
+        self.cache = MetadataCache(self.path, lock_timeout=5)
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def test_entries_are_durable_and_versioned(self):
+        self.cache.set('abc', 'media.VideoProcessor', 1, {'width': 640})
+        other_process = MetadataCache(self.path)
+        self.assertEqual(other_process.get('abc', 'media.VideoProcessor', 1), {'width': 640})
+        self.assertIsNone(other_process.get('abc', 'media.VideoProcessor', 2))
+        self.assertIsNone(other_process.get('abc', 'media.AudioProcessor', 1))
+        self.assertEqual(other_process.prune('media.VideoProcessor', 2), 1)
+        self.assertIsNone(self.cache.get('abc', 'media.VideoProcessor', 1))
+        other_process.close()
+
+    def test_newer_versions_are_not_pruned(self):
+        for version in (1, 2, 10):
+            self.cache.set('abc', 'probe', version, {'version': version})
+        # A worker still running version 2 during a deploy of version 10
+        self.assertEqual(self.cache.get_or_compute('abc', 'probe', 2, dict), {'version': 2})
+        self.assertIsNone(self.cache.get('abc', 'probe', 1))
+        self.assertEqual(self.cache.get('abc', 'probe', 10), {'version': 10})
+
+    def test_default_path_is_persistent(self):
+        with override_settings(MEDIA_METADATA_CACHE_PATH=None, BASE_DIR='/app'):
+            self.assertEqual(get_cache_path(), '/app/sys_media/cache/metadata.sqlite3')
+
+    def test_concurrent_callers_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'duration': 42}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_compute('abc', 'probe', 1, compute)))
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'duration': 42}] * 6)
+
+    def test_failed_results_are_not_stored(self):
+        self.cache.get_or_compute('abc', 'probe', 1, lambda: {'duration': None}, should_store=lambda value: False)
+        self.assertIsNone(self.cache.get('abc', 'probe', 1))
+
+    def test_lock_of_a_dead_worker_expires(self):
+        self.cache.lock_timeout = 0.1
+        self.assertTrue(self.cache._acquire(('abc', 'probe', '1'), 'dead-worker'))
+        self.assertEqual(self.cache.get_or_compute('abc', 'probe', 1, lambda: {'pages': 3}), {'pages': 3})
+
+
+class CountingProcessor(MediaProcessor):
+    calls = 0
+
+    def process(self):
+        return self.get_metadata()
+
+    def extract_metadata(self):
+        type(self).calls += 1
+        return {'duration': 10}
+
+
+class MediaProcessorCacheTests(SimpleTestCase):
+    """
+    Test suite for metadata caching in the media processors.
+    """
+
+    def test_metadata_is_extracted_once_per_checksum(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(MEDIA_METADATA_CACHE_PATH=os.path.join(directory, 'cache.sqlite3')):
+                field = SimpleNamespace(name=None)
+                CountingProcessor(field, checksum='abc').get_metadata()
+                self.assertEqual(CountingProcessor(field, checksum='abc').get_metadata(), {'duration': 10})
+                CountingProcessor(field).get_metadata()
+                self.assertEqual(CountingProcessor.calls, 2)
+                get_metadata_cache().close()
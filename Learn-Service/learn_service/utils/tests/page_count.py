@@ -0,0 +1,154 @@
+import io
+import tempfile
+import zipfile
+import zlib
+from unittest.mock import patch
+from django.test import SimpleTestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PyPDF2 import PdfWriter
+from pptx import Presentation
+from ..files.page_count import PdfFormatError, count_pdf_pages, count_ooxml_pages, estimate_docx_pages
+from ..files.process_file import DocumentPageCounter
+
+
+def page_objects(count: int, first: int = 3) -> dict:
+    kids = ' '.join(f'{number} 0 R' for number in range(first, first + count))
+    objects = {1: b'<< /Type /Catalog /Pages 2 0 R >>',
+               2: f'<< /Type /Pages /Kids [{kids}] /Count {count} >>'.encode()}
+    for number in range(first, first + count):
+        objects[number] = b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>'
+    return objects
+
+
+def classic_pdf(objects: dict, base: bytes = b'', prev: int = None) -> bytes:
+    """PDF (or incremental update of ``base``) with a classic xref table."""
+    data = bytearray(base or b'%PDF-1.4\n')
+    offsets = {}
+    for number, body in objects.items():
+        offsets[number] = len(data)
+        data += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(data)
+    data += b'xref\n'
+    for number in sorted(offsets):
+        data += b'%d 1\n%010d 00000 n \n' % (number, offsets[number])
+    size = max(offsets) + 1
+    data += b'trailer\n<< /Size %d /Root 1 0 R%s >>\n' % (size, b' /Prev %d' % prev if prev else b'')
+    data += b'startxref\n%d\n%%%%EOF\n' % xref
+    return bytes(data)
+
+
+def compressed_pdf(objects: dict) -> bytes:
+    """PDF 1.5 with every object in an object stream and a predicted xref stream."""
+    numbers = sorted(objects)
+    bodies, header, position = b'', [], 0
+    for number in numbers:
+        header.append(b'%d %d' % (number, position))
+        bodies += objects[number] + b'\n'
+        position = len(bodies)
+    header = b' '.join(header) + b'\n'
+    stream_number, xref_number = max(numbers) + 1, max(numbers) + 2
+    packed = zlib.compress(header + bodies)
+
+    data = bytearray(b'%PDF-1.5\n')
+    stream_offset = len(data)
+    data += (b'%d 0 obj\n<< /Type /ObjStm /N %d /First %d /Filter /FlateDecode /Length %d >>\nstream\n'
+             % (stream_number, len(numbers), len(header), len(packed)))
+    data += packed + b'\nendstream\nendobj\n'
+
+    rows = [(0, 0, 0)] + [(2, stream_number, index) for index in range(len(numbers))]
+    rows += [(1, stream_offset, 0), (1, len(data), 0)]
+    raw, previous = b'', bytes(4)
+    for kind, field, index in rows:
+        row = bytes([kind]) + field.to_bytes(2, 'big') + bytes([index])
+        raw += b'\x02' + bytes((a - b) & 0xFF for a, b in zip(row, previous))  # PNG "up"
+        previous = row
+    packed = zlib.compress(raw)
+    xref = len(data)
+    data += (b'%d 0 obj\n<< /Type /XRef /Size %d /W [1 2 1] /Root 1 0 R /Filter /FlateDecode '
+             b'/DecodeParms << /Predictor 12 /Columns 4 >> /Length %d >>\nstream\n'
+             % (xref_number, len(rows), len(packed)))
+    data += packed + b'\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n' % xref
+    return bytes(data)
+
+
+def office_zip(parts: dict) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in parts.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def app_xml(element: str, value: int) -> str:
+    return ('<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+            f'<{element}>{value}</{element}></Properties>')
+
+
+class PdfPageCountTests(SimpleTestCase):
+    """
+    Test suite for header only PDF page counting.
+    """
+
+    def test_classic_xref(self):
+        self.assertEqual(count_pdf_pages(io.BytesIO(classic_pdf(page_objects(5)))), 5)
+
+    def test_incremental_update_uses_newest_page_tree(self):
+        base = classic_pdf(page_objects(2))
+        update = page_objects(3)
+        del update[1], update[3], update[4]
+        xref = int(base.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+        self.assertEqual(count_pdf_pages(io.BytesIO(classic_pdf(update, base=base, prev=xref))), 3)
+
+    def test_xref_stream_and_object_stream(self):
+        self.assertEqual(count_pdf_pages(io.BytesIO(compressed_pdf(page_objects(4)))), 4)
+
+    def test_memory_mapped_file(self):
+        writer = PdfWriter()
+        for _ in range(7):
+            writer.add_blank_page(width=612, height=792)
+        with tempfile.TemporaryFile() as pdf:
+            writer.write(pdf)
+            pdf.flush()
+            self.assertEqual(count_pdf_pages(pdf), 7)
+
+    def test_damaged_file_raises(self):
+        with self.assertRaises(PdfFormatError):
+            count_pdf_pages(io.BytesIO(b'%PDF-1.4\nnot really a pdf'))
+
+    def test_page_counter_does_not_build_page_tree(self):
+        upload = SimpleUploadedFile('book.pdf', classic_pdf(page_objects(500)))
+        with patch('utils.files.process_file.PyPDF2.PdfReader') as reader:
+            pages = DocumentPageCounter(upload, file_object=upload, mime_type='application/pdf').count_pages()
+        reader.assert_not_called()
+        self.assertEqual(pages, 500)
+
+
+class OfficePageCountTests(SimpleTestCase):
+    """
+    Test suite for Office Open XML counts read from the zip directory.
+    """
+
+    def test_docx_pages_from_app_properties(self):
+        docx = office_zip({'docProps/app.xml': app_xml('Pages', 12), 'word/document.xml': '<w:document/>'})
+        self.assertEqual(count_ooxml_pages(docx, 'docx'), 12)
+
+    def test_docx_without_pages_counts_breaks(self):
+        body = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>' * 3 + '<w:lastRenderedPageBreak/>'
+        docx = office_zip({'word/document.xml': f'<w:document>{body}</w:document>'})
+        self.assertIsNone(count_ooxml_pages(docx, 'docx'))
+        docx.seek(0)
+        self.assertEqual(estimate_docx_pages(docx, chunk_size=7), 5)
+
+    def test_pptx_slides(self):
+        presentation = Presentation()
+        for _ in range(3):
+            presentation.slides.add_slide(presentation.slide_layouts[6])
+        buffer = io.BytesIO()
+        presentation.save(buffer)
+        buffer.seek(0)
+        self.assertEqual(count_ooxml_pages(buffer, 'pptx'), 3)
+
+    def test_xlsx_sheets(self):
+        xlsx = office_zip({f'xl/worksheets/sheet{index}.xml': '<worksheet/>' for index in range(1, 4)})
+        self.assertEqual(count_ooxml_pages(xlsx, 'xlsx'), 3)
@@ -0,0 +1,122 @@
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.test import SimpleTestCase
+from ..files.ranged import HttpRangeSource, RangeFile, RangeReadError
+from ..files.page_count import count_pdf_pages
+from .page_count import classic_pdf, page_objects
+
+
+class RecordingSource:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.ranges = []
+
+    def fetch(self, start: int, end: int) -> bytes:
+        self.ranges.append((start, end))
+        return self.data[start:end]
+
+
+class RangeFileTests(SimpleTestCase):
+    """
+    Test suite for block cached random access reads.
+    """
+
+    data = bytes(range(256)) * 64  # 16KB
+
+    def open(self, **kwargs):
+        source = RecordingSource(self.data)
+        kwargs.setdefault('block_size', 1024)
+        kwargs.setdefault('cache_blocks', 4)
+        return source, RangeFile(source.fetch, len(self.data), **kwargs)
+
+    def test_reads_match_source(self):
+        source, file_object = self.open()
+        file_object.seek(1000)
+        self.assertEqual(file_object.read(100), self.data[1000:1100])
+        file_object.seek(-10, io.SEEK_END)
+        self.assertEqual(file_object.read(), self.data[-10:])
+        self.assertEqual(file_object.read(5), b'')
+
+    def test_adjacent_missing_blocks_are_fetched_together(self):
+        source, file_object = self.open()
+        file_object.seek(500)
+        file_object.read(2000)
+        self.assertEqual(source.ranges, [(0, 3072)])
+        file_object.seek(1024)
+        file_object.read(10)
+        self.assertEqual(len(source.ranges), 1)
+
+    def test_least_recently_used_block_is_evicted(self):
+        source, file_object = self.open()
+        for block in (0, 1, 2, 3, 0, 4):
+            file_object.seek(block * 1024)
+            file_object.read(1)
+        file_object.seek(1024)
+        file_object.read(1)
+        self.assertEqual(source.ranges[-1], (1024, 2048))
+        file_object.seek(0)
+        file_object.read(1)
+        self.assertEqual(len(source.ranges), 6)
+
+    def test_large_reads_bypass_the_cache(self):
+        source, file_object = self.open()
+        self.assertEqual(file_object.read(), self.data)
+        self.assertEqual(source.ranges, [(0, len(self.data))])
+
+    def test_short_fetch_raises(self):
+        file_object = RangeFile(lambda start, end: b'', 10, block_size=4)
+        with self.assertRaises(RangeReadError):
+            file_object.read(2)
+
+    def test_pdf_page_count_skips_content_streams(self):
+        objects = page_objects(30)
+        objects[40] = b'<< /Length 500000 >>\nstream\n' + b'x' * 500000 + b'\nendstream'
+        pdf = classic_pdf(objects)
+        source = RecordingSource(pdf)
+        file_object = RangeFile(source.fetch, len(pdf), block_size=4096, cache_blocks=8)
+        self.assertEqual(count_pdf_pages(file_object), 30)
+        fetched = sum(end - start for start, end in source.ranges)
+        self.assertLess(fetched, len(pdf) // 10)
+
+
+class HttpRangeSourceTests(SimpleTestCase):
+    """
+    Test suite for reading stored objects with HTTP range requests.
+    """
+
+    data = b'0123456789' * 1000
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        data, cls.requests = cls.data, []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                cls.requests.append(self.headers['Range'])
+                start, end = map(int, self.headers['Range'][len('bytes='):].split('-'))
+                self.send_response(206)
+                self.send_header('Content-Length', str(end - start + 1))
+                self.end_headers()
+                self.wfile.write(data[start:end + 1])
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_range_requests(self):
+        url = f'http://127.0.0.1:{self.server.server_port}/lesson.pdf'
+        source = HttpRangeSource(url, size=len(self.data))
+        file_object = RangeFile(source.fetch, source.size, url=url, block_size=1024)
+        file_object.seek(5000)
+        self.assertEqual(file_object.read(20), self.data[5000:5020])
+        self.assertEqual(self.requests, ['bytes=4096-5119'])
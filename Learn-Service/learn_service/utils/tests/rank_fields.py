@@ -0,0 +1,118 @@
+import random
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from courses.models import Course, Lesson, Module
+from users.models import User
+from ..rank_fields import RANK_MAX_LENGTH, RANK_PATTERN, rank_after, rank_between, rank_sequence, rank_spread
+
+
+class RankKeyTests(SimpleTestCase):
+    """
+    Test suite for the fractional order keys.
+    """
+
+    def test_keys_fit_between_any_neighbours(self):
+        keys, rng = [], random.Random(7)
+        for _ in range(500):
+            index = rng.randint(0, len(keys))
+            low = keys[index - 1] if index else None
+            high = keys[index] if index < len(keys) else None
+            keys.insert(index, rank_between(low, high))
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertTrue(all(RANK_PATTERN.match(key) for key in keys))
+
+    def test_repeated_moves_to_the_top(self):
+        keys = ['i']
+        for _ in range(100):
+            keys.insert(0, rank_between(None, keys[0]))
+        self.assertEqual(keys, sorted(keys))
+        self.assertLess(len(keys[0]), RANK_MAX_LENGTH // 2)
+        with self.assertRaises(ValueError):
+            rank_between('b', 'a')
+
+    def test_appends_take_a_fixed_step(self):
+        self.assertEqual([rank_after(key) for key in (None, 'i', 'az', 'z', 'zz')], ['i', 'j', 'az1', 'z1', 'zz1'])
+        with self.assertRaises(ValueError):
+            rank_after('a0')
+
+    def test_spread_and_sequence(self):
+        spread = rank_spread(1000)
+        self.assertEqual(spread, sorted(set(spread)))
+        self.assertLessEqual(max(map(len, spread)), 2)
+        sequence = rank_sequence('a', 'b', 50)
+        self.assertEqual(sequence, sorted(set(sequence)))
+        self.assertTrue('a' < sequence[0] and sequence[-1] < 'b')
+
+
+class RankedModelTests(TestCase):
+    """
+    Test suite for moving, reordering and rebalancing ranked rows.
+    """
+
+    def setUp(self):
+        instructor = User.objects.create_user(email="teacher@example.com", password="secret",
+                                              first_name="Ada", last_name="Lovelace")
+        course = Course.objects.create(title="Django", instructor=instructor,
+                                       short_description="short", description="long")
+        self.module = Module.objects.create(course=course, title="Basics")
+        self.lessons = [Lesson.objects.create(module=self.module, title=f"Lesson {index}") for index in range(6)]
+
+    def titles(self) -> list:
+        return list(Lesson.objects.filter(module=self.module).order_by('order').values_list('title', flat=True))
+
+    def test_move_writes_one_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.lessons[4].move(before=self.lessons[0])
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE "courses_lesson"')]
+        self.assertEqual(len(updates), 1)
+        self.lessons[1].move(after=self.lessons[5])
+        self.assertEqual(self.titles(), ["Lesson 4", "Lesson 0", "Lesson 2", "Lesson 3", "Lesson 5", "Lesson 1"])
+        with self.assertRaises(ValueError):
+            self.lessons[1].move(after=self.lessons[1])
+
+    def test_reorder_rewrites_rows_out_of_place(self):
+        siblings = Lesson.objects.filter(module=self.module)
+        pks = [lesson.pk for lesson in self.lessons]
+        self.assertEqual(siblings.reorder([pks[3], *pks[:3], *pks[4:]]), 1)
+        self.assertEqual(self.titles(), ["Lesson 3", "Lesson 0", "Lesson 1", "Lesson 2", "Lesson 4", "Lesson 5"])
+        # Lessons 3 and 2 already are in that order
+        self.assertEqual(siblings.reorder(pks[::-1]), 4)
+        self.assertEqual(self.titles(), [f"Lesson {index}" for index in range(5, -1, -1)])
+        with self.assertRaises(ValueError):
+            siblings.reorder(pks[:3])
+
+    def test_rebalance_keeps_the_order(self):
+        # Two rows taking turns in the same gap halve it every time
+        for _ in range(30):
+            self.lessons[5].move(after=self.lessons[0])
+            self.lessons[4].move(after=self.lessons[0])
+        before = self.titles()
+        keys = Lesson.objects.values_list('order', flat=True)
+        self.assertGreater(max(map(len, keys.all())), 5)
+        self.assertEqual(Lesson.objects.filter(module=self.module).rebalance(), 6)
+        self.assertEqual(self.titles(), before)
+        self.assertEqual(max(map(len, keys.all())), 1)
+
+        # New keys still held by other rows ('i', 'j', 'k' respaced to '9', 'i', 'r')
+        module = Module.objects.create(course=self.module.course, title="More")
+        lessons = [Lesson.objects.create(module=module, title=f"More {index}").order for index in range(3)]
+        self.assertEqual(lessons, ['i', 'j', 'k'])
+        self.assertEqual(Lesson.objects.filter(module=module).rebalance(), 3)
+        self.assertEqual(list(Lesson.objects.filter(module=module).values_list('title', 'order')),
+                         [("More 0", '9'), ("More 1", 'i'), ("More 2", 'r')])
+
+    def test_appends_keep_keys_short(self):
+        for index in range(400):
+            Lesson.objects.create(module=self.module, title=f"Appended {index}")
+        keys = list(Lesson.objects.filter(module=self.module).order_by('order').values_list('order', flat=True))
+        self.assertEqual(self.titles()[6:], [f"Appended {index}" for index in range(400)])
+        self.assertEqual(len(keys), len(set(keys)))
+        # One character per 35 rows, where halving the gap to the top took about 6
+        self.assertLessEqual(max(map(len, keys)), 2 + len(keys) // 35)
+
+        # A last key at the length limit: the siblings are respaced first
+        Lesson.objects.filter(pk=self.lessons[0].pk).update(order='z' * RANK_MAX_LENGTH)
+        lesson = Lesson.objects.create(module=self.module, title="Last")
+        self.assertEqual(self.titles()[-1], "Last")
+        self.assertLessEqual(len(lesson.order), 2)
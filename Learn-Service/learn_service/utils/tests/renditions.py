@@ -0,0 +1,77 @@
+import io
+import os
+import tempfile
+import time
+from django.test import SimpleTestCase
+from PIL import Image
+from ..files.renditions import ImageDiskCache, ImageResizer, plan_widths
+
+
+def jpeg(size=(800, 600), orientation=None) -> io.BytesIO:
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    Image.new('RGB', size, 'blue').save(buffer, 'JPEG', exif=exif.tobytes())
+    buffer.seek(0)
+    return buffer
+
+
+class ImageResizerTests(SimpleTestCase):
+    """
+    Test suite for encoding image renditions.
+    """
+
+    def test_plan_never_upscales(self):
+        self.assertEqual(plan_widths(800, (160, 320, 640, 960, 1280)), [160, 320, 640, 800])
+        self.assertEqual(plan_widths(4000, (160, 320)), [160, 320])
+        self.assertEqual(plan_widths(100, (160, 320)), [100])
+
+    def test_sizes_and_formats(self):
+        encoded = list(ImageResizer(jpeg()).encode([320, 640], ['webp', 'jpeg']))
+        self.assertEqual([(item.width, item.height, item.format) for item in encoded],
+                         [(640, 480, 'webp'), (640, 480, 'jpeg'), (320, 240, 'webp'), (320, 240, 'jpeg')])
+        with Image.open(io.BytesIO(encoded[0].content)) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (640, 480)))
+        self.assertNotEqual(encoded[0].name, encoded[2].name)
+        self.assertTrue(encoded[3].name.startswith('renditions/') and encoded[3].name.endswith('_320w.jpg'))
+
+    def test_exif_orientation_is_applied(self):
+        encoded = next(ImageResizer(jpeg(orientation=6)).encode([300], ['jpeg']))
+        self.assertEqual((encoded.width, encoded.height), (300, 400))
+
+    def test_transparent_png_to_jpeg(self):
+        buffer = io.BytesIO()
+        Image.new('RGBA', (200, 100), (255, 0, 0, 0)).save(buffer, 'PNG')
+        encoded = next(ImageResizer(buffer).encode([100], ['jpeg']))
+        with Image.open(io.BytesIO(encoded.content)) as image:
+            self.assertEqual(image.mode, 'RGB')
+            self.assertEqual(image.getpixel((50, 25)), (255, 255, 255))
+
+
+class ImageDiskCacheTests(SimpleTestCase):
+    """
+    Test suite for the size bounded LRU cache of resized images.
+    """
+
+    def test_least_recently_used_files_are_pruned(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ImageDiskCache(directory, max_bytes=10 ** 6)
+            for index, source in enumerate(('a.jpg', 'b.jpg', 'c.jpg')):
+                path = cache.put(source, 320, 'webp', b'x' * 1000)
+                os.utime(path, (time.time() - 100 + index, time.time() - 100 + index))
+            self.assertIsNotNone(cache.get('a.jpg', 320, 'webp'))  # refreshes a.jpg
+            cache.max_bytes = 2500
+            cache.prune()
+            self.assertIsNotNone(cache.get('a.jpg', 320, 'webp'))
+            self.assertIsNone(cache.get('b.jpg', 320, 'webp'))
+            self.assertIsNotNone(cache.get('c.jpg', 320, 'webp'))
+
+    def test_purge_drops_every_size_of_a_source(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ImageDiskCache(directory)
+            cache.put('a.jpg', 320, 'webp', b'x')
+            cache.put('a.jpg', 640, 'jpeg', b'x')
+            cache.purge('a.jpg')
+            self.assertIsNone(cache.get('a.jpg', 320, 'webp'))
+            self.assertIsNone(cache.get('a.jpg', 640, 'jpeg'))
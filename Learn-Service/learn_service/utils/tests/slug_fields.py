@@ -0,0 +1,61 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from courses.models import Category, Course, Lesson, Module
+from users.models import User
+from ..rank_fields import rank_sequence
+from ..slug_fields import SLUG_BATCH_SIZE, allocate_slugs
+
+
+class SlugAllocationTests(TestCase):
+    """
+    Test suite for the single query slug allocation.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(email="teacher@example.com", password="secret",
+                                                  first_name="Ada", last_name="Lovelace")
+        category = Category.objects.create(name="Programming")
+        course = Course.objects.create(title="Django", category=category, instructor=cls.instructor,
+                                       short_description="short", description="long")
+        cls.module = Module.objects.create(course=course, title="Basics")
+
+    def slug_lookups(self, queries) -> int:
+        return sum('"courses_lesson"."slug"' in query['sql'] and query['sql'].startswith('SELECT')
+                   for query in queries.captured_queries)
+
+    def test_repeated_titles_take_the_next_suffix(self):
+        slugs = [Lesson.objects.create(module=self.module, title="Getting started").slug
+                 for index in range(3)]
+        self.assertEqual(slugs, ['getting-started', 'getting-started-2', 'getting-started-3'])
+
+        Lesson.objects.filter(slug='getting-started-2').delete()
+        with CaptureQueriesContext(connection) as queries:
+            lesson = Lesson.objects.create(module=self.module, title="Getting started")
+        self.assertEqual(lesson.slug, 'getting-started-4')
+        self.assertEqual(self.slug_lookups(queries), 1)
+
+    def test_suffix_fits_the_column(self):
+        title = "a very long lesson title " * 4
+        first = Lesson.objects.create(module=self.module, title=title)
+        second = Lesson.objects.create(module=self.module, title=title)
+        self.assertLessEqual(len(first.slug), 50)
+        self.assertLessEqual(len(second.slug), 50)
+        self.assertEqual(second.slug, f"{first.slug[:48].rstrip('-')}-2")
+
+    def test_batch_allocation(self):
+        intro = Lesson.objects.create(module=self.module, title="Intro")
+        titles = ["Intro", "Intro", "Intro"] + [f"Lesson {index}" for index in range(SLUG_BATCH_SIZE)]
+        lessons = [Lesson(module=self.module, title=title, order=key)
+                   for title, key in zip(titles, rank_sequence(intro.order, None, len(titles)))]
+        with CaptureQueriesContext(connection) as queries:
+            Lesson.objects.bulk_create(allocate_slugs(lessons))
+        self.assertEqual(self.slug_lookups(queries), 2)
+        self.assertEqual([lesson.slug for lesson in lessons[:4]], ['intro-2', 'intro-3', 'intro-4', 'lesson-0'])
+        self.assertEqual(Lesson.objects.values('slug').distinct().count(), len(titles) + 1)
+
+    def test_course_without_category(self):
+        course = Course.objects.create(title="Free course", category=None, instructor=self.instructor,
+                                       short_description="short", description="long", level='beginner')
+        self.assertEqual(course.slug, 'beginner-free-course')
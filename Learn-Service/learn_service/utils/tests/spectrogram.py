@@ -0,0 +1,58 @@
+import io
+import numpy as np
+from django.test import SimpleTestCase
+from PIL import Image
+from ..files.spectrogram import SpectrogramBuilder, mel_filterbank
+
+
+def tone(frequency, seconds, sample_rate=8000) -> np.ndarray:
+    time = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (np.sin(2 * np.pi * frequency * time) * 16000).astype(np.int16)
+
+
+def build(samples, block=1000, **kwargs) -> SpectrogramBuilder:
+    options = dict(sample_rate=8000, seconds_per_column=0.1, n_fft=256, n_mels=32, frames_per_column=2)
+    options.update(kwargs)
+    builder = SpectrogramBuilder(**options)
+    for start in range(0, len(samples), block):
+        builder.feed(samples[start:start + block])
+    builder.finish()
+    return builder
+
+
+class SpectrogramBuilderTests(SimpleTestCase):
+    """
+    Test suite for the streaming mel spectrogram.
+    """
+
+    def test_filterbank_covers_the_spectrum(self):
+        filters = mel_filterbank(8000, 256, 32)
+        self.assertEqual(filters.shape, (32, 129))
+        self.assertTrue((filters.max(axis=1) > 0).all())
+
+    def test_one_column_per_time_step(self):
+        builder = build(tone(440, 2.0))
+        self.assertEqual(len(builder.columns), 20)
+        self.assertEqual(builder.to_db().shape, (32, 20))
+
+    def test_pitch_moves_the_loudest_band(self):
+        builder = build(np.concatenate((tone(300, 1.0), tone(3000, 1.0))))
+        low, high = builder.to_db()[:, 2].argmax(), builder.to_db()[:, 15].argmax()
+        self.assertLess(low, high)
+
+    def test_block_size_does_not_matter(self):
+        samples = tone(440, 1.0)
+        np.testing.assert_allclose(build(samples, block=137).to_db(), build(samples, block=len(samples)).to_db(),
+                                   atol=1e-3)
+
+    def test_columns_are_merged_beyond_the_limit(self):
+        builder = build(tone(440, 2.0), max_columns=8)
+        self.assertLessEqual(len(builder.columns), 8)
+        self.assertEqual(builder.seconds_per_column, 0.4)
+
+    def test_render(self):
+        png = build(np.concatenate((tone(300, 1.0), tone(3000, 1.0)))).render(200, 64)
+        with Image.open(io.BytesIO(png)) as image:
+            self.assertEqual((image.format, image.size, image.mode), ('PNG', (200, 64), 'RGB'))
+            # High bands are dark while the low tone plays
+            self.assertLess(sum(image.getpixel((10, 0))), 100)
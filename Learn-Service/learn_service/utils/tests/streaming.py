@@ -0,0 +1,28 @@
+from django.test import SimpleTestCase
+from ..files.streaming import DEFAULT_LADDER, Rendition, build_master_playlist, select_ladder
+
+
+class AdaptiveLadderTests(SimpleTestCase):
+    """
+    Test suite for the bitrate ladder and HLS master playlist.
+    """
+
+    def test_ladder_never_upscales(self):
+        names = [rendition.name for rendition in select_ladder(720)]
+        self.assertEqual(names, ['240p', '360p', '720p'])
+
+    def test_small_source_keeps_lowest_rendition(self):
+        self.assertEqual(select_ladder(144), [DEFAULT_LADDER[0]])
+
+    def test_width_keeps_aspect_ratio_and_is_even(self):
+        rendition = Rendition('360p', 360, 800, 96)
+        self.assertEqual(rendition.width_for(1920, 1080), 640)
+        self.assertEqual(rendition.width_for(1000, 750) % 2, 0)
+
+    def test_master_playlist_lists_renditions(self):
+        playlist = build_master_playlist(select_ladder(1080), (1920, 1080))
+        lines = playlist.splitlines()
+        self.assertEqual(lines[0], '#EXTM3U')
+        self.assertIn('1080p.m3u8', lines)
+        self.assertIn('RESOLUTION=1280x720', playlist)
+        self.assertEqual(playlist.count('#EXT-X-STREAM-INF'), 4)
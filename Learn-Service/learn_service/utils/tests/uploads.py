@@ -0,0 +1,35 @@
+import hashlib
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, SimpleUploadedFile, TemporaryUploadedFile
+from ..files.uploads import HashingMemoryFileUploadHandler, HashingTemporaryFileUploadHandler
+
+
+class HashingUploadHandlerTests(SimpleTestCase):
+    """
+    Test suite for hashing uploads while they are received.
+    """
+
+    content = b"%PDF-1.4\n" + b"0123456789" * 5000
+
+    def upload(self):
+        request = RequestFactory().post('/upload/', {'file': SimpleUploadedFile('notes.pdf', self.content)})
+        request.upload_handlers = [HashingMemoryFileUploadHandler(request),
+                                   HashingTemporaryFileUploadHandler(request)]
+        return request.FILES['file']
+
+    def assertMetadata(self, uploaded):
+        self.assertEqual(uploaded.metadata['checksum'], hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(uploaded.metadata['size'], len(self.content))
+        self.assertEqual(uploaded.metadata['extension'], '.pdf')
+        self.assertEqual(uploaded.read(), self.content)
+
+    def test_memory_upload_is_hashed(self):
+        uploaded = self.upload()
+        self.assertIsInstance(uploaded, InMemoryUploadedFile)
+        self.assertMetadata(uploaded)
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_temporary_upload_is_hashed_once(self):
+        uploaded = self.upload()
+        self.assertIsInstance(uploaded, TemporaryUploadedFile)
+        self.assertMetadata(uploaded)
@@ -0,0 +1,110 @@
+import io
+import shutil
+import tempfile
+import wave
+import numpy as np
+from unittest import skipUnless
+from django.test import SimpleTestCase
+from PIL import Image
+from ..files.waveform import HEADER, LEVEL, PeakBuilder, WaveformError, WaveformPeaks, build_peaks, render_waveform
+
+
+def build(samples, block=1000, **kwargs) -> WaveformPeaks:
+    builder = PeakBuilder(sample_rate=8000, samples_per_peak=16, zoom_factor=4, levels=3, **kwargs)
+    for start in range(0, len(samples), block):
+        builder.feed(samples[start:start + block])
+    output = io.BytesIO()
+    builder.write(output)
+    output.seek(0)
+    return WaveformPeaks(output)
+
+
+class PeakBuilderTests(SimpleTestCase):
+    """
+    Test suite for streaming min/max peak generation.
+    """
+
+    def setUp(self):
+        self.samples = np.random.default_rng(7).integers(-32768, 32767, 16 * 4 * 4 * 10 + 5, dtype=np.int16)
+
+    def test_levels_match_direct_reduction(self):
+        peaks = build(self.samples, bits=16)
+        self.assertEqual(peaks.levels, [(16, 161), (64, 41), (256, 11)])
+        self.assertEqual(peaks.samples, len(self.samples))
+        for index, (samples_per_peak, length) in enumerate(peaks.levels):
+            mins, maxs = peaks.level(index)
+            for peak in range(length):
+                chunk = self.samples[peak * samples_per_peak:(peak + 1) * samples_per_peak]
+                self.assertEqual(mins[peak], chunk.min() / 32768)
+                self.assertEqual(maxs[peak], chunk.max() / 32768)
+
+    def test_block_boundaries_do_not_matter(self):
+        whole = build(self.samples, block=len(self.samples))
+        for block in (1, 17, 333):
+            chunked = build(self.samples, block=block)
+            for index in range(3):
+                np.testing.assert_array_equal(chunked.level(index), whole.level(index))
+
+    def test_eight_bit_file_size(self):
+        peaks = build(self.samples)
+        size = len(peaks.file_object.getvalue())
+        self.assertEqual(size, HEADER.size + 3 * LEVEL.size + (161 + 41 + 11) * 2)
+
+    def test_resolution_picks_the_closest_level(self):
+        peaks = build(self.samples)
+        self.assertEqual(peaks.select_level(20), 1)
+        self.assertEqual(peaks.select_level(3), 2)
+        self.assertEqual(peaks.select_level(1000), 0)
+        mins, maxs = peaks.peaks(5)
+        self.assertEqual(len(mins), 5)
+        self.assertEqual(maxs.max(), peaks.level(0)[1].max())
+        amplitudes = peaks.amplitudes(5)
+        self.assertEqual(max(amplitudes), 1.0)
+
+    def test_empty_audio(self):
+        peaks = build(np.empty(0, dtype=np.int16))
+        self.assertEqual(peaks.amplitudes(10), [])
+        with Image.open(io.BytesIO(render_waveform(peaks, 50, 20))) as image:
+            self.assertEqual(image.size, (50, 20))
+
+    def test_invalid_file(self):
+        with self.assertRaises(WaveformError):
+            WaveformPeaks.from_bytes(b'not a peaks file at all')
+
+
+class RenderWaveformTests(SimpleTestCase):
+    """
+    Test suite for drawing waveforms from peaks.
+    """
+
+    def test_columns_span_min_to_max(self):
+        quiet = np.full(16 * 64, 1000, dtype=np.int16)
+        loud = np.tile(np.array([-32768, 32767], dtype=np.int16), 16 * 32)
+        peaks = build(np.concatenate((quiet, loud)))
+        with Image.open(io.BytesIO(render_waveform(peaks, 100, 41, color='#ff0000'))) as image:
+            self.assertEqual(image.size, (100, 41))
+            alpha = np.array(image.getchannel('A'))
+        self.assertEqual((alpha[:, 99] > 0).sum(), 41)
+        self.assertLessEqual((alpha[:, 0] > 0).sum(), 2)
+        self.assertEqual(alpha[0, 0], 0)
+
+
+@skipUnless(shutil.which('ffmpeg'), "ffmpeg is not installed")
+class DecodeTests(SimpleTestCase):
+    """
+    Test suite for building peaks from audio decoded by ffmpeg.
+    """
+
+    def test_wav_file_and_pipe(self):
+        tone = (np.sin(np.linspace(0, 2000 * np.pi, 22050)) * 16000).astype('<i2')
+        with tempfile.NamedTemporaryFile(suffix='.wav') as file_object:
+            with wave.open(file_object.name, 'wb') as output:
+                output.setnchannels(1)
+                output.setsampwidth(2)
+                output.setframerate(22050)
+                output.writeframes(tone.tobytes())
+            with build_peaks(file_object.name) as peaks:
+                self.assertAlmostEqual(peaks.duration, 1.0, places=2)
+                self.assertAlmostEqual(float(peaks.peaks(1)[1][0]), 16000 / 32768, places=1)
+            with open(file_object.name, 'rb') as source, build_peaks(source) as piped:
+                self.assertAlmostEqual(piped.duration, 1.0, places=2)
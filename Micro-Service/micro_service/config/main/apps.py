@@ -1,6 +1,16 @@
+import os
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ConfigurationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'config.main'
+
+    def ready(self):
+        # Uploads are spooled here by Django, which does not create it. Other
+        # directories (logs, media, locale) are created when first written.
+        temp_dir = getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None)
+        if temp_dir:
+            os.makedirs(temp_dir, exist_ok=True)
@@ -13,9 +13,7 @@ import os
 from pathlib import Path
 import environ
 import logging
-from utils.helper import create_dir
 from .logging_v import SysLogging, creating_loging_config
-from .helper import ensure_env_file
 
 env = environ.Env(
     DEBUG=(bool,False)
@@ -28,7 +26,7 @@ TEMPLATES = (
     BASE_DIR / "templates",
 )
 
-LOG = create_dir(BASE_DIR / "../../" / "configs/logs/services/payment_service")
+LOG = BASE_DIR / "../../" / "configs/logs/services/payment_service"
 
 
 
@@ -68,8 +66,7 @@ for env_file in ENVIRONMENT_DIR_FILES:
             settings_log.error(f"Error reading environment file {env_file}: {e}")
             # Consider what to do if reading the .env file fails.
             # Should the program exit?  Use default values?
-    
-    ensure_env_file(env_file)
+
         
 
 
@@ -206,12 +203,7 @@ LANGUAGES = (
     ('rw', 'Kinyarwanda'),
 )
 
-LOCALE_PATH = create_dir(BASE_DIR / 'locale')
-
-
-# Create subdirectories for each language
-for code, _ in LANGUAGES:
-    language_dir = create_dir(LOCALE_PATH / code / 'LC_MESSAGES')
+LOCALE_PATH = BASE_DIR / 'locale'
 
 
 # Static files (CSS, JavaScript, Images)
@@ -222,9 +214,9 @@ STATICFILES_DIRS = [BASE_DIR / "dev_static/"]
 STATIC_ROOT = BASE_DIR / "sys_static/micro"
 
 MEDIA_URL = '/learn_files/'
-MEDIA_ROOT = create_dir(BASE_DIR / "sys_media/media/micro")
+MEDIA_ROOT = BASE_DIR / "sys_media/media/micro"
 
-FILE_UPLOAD_TEMP_DIR = create_dir(BASE_DIR / 'sys_media'/ 'media' / 'temp')
+FILE_UPLOAD_TEMP_DIR = BASE_DIR / 'sys_media'/ 'media' / 'temp'
 
 # For optimal performance with model.save():
 FILE_UPLOAD_MAX_MEMORY_SIZE = 200 * 1024 * 1024  # 200MB
@@ -234,6 +226,13 @@ UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024  # 2MB chunks
 DATA_UPLOAD_MAX_MEMORY_SIZE = 200 * 1024 * 1024  # 200MB
 REQUEST_TIMEOUT = 300  # 5 minutes
 
+# Extracted metadata (ffprobe, mutagen) cached by checksum in a SQLite file shared
+# by every worker; point all services at the same file to share it between them.
+# Keep it on a persistent volume (see configs/docker-compose.yaml).
+MEDIA_METADATA_CACHE_PATH = env("MEDIA_METADATA_CACHE_PATH",
+                                default=str(BASE_DIR / "sys_media" / "cache" / "metadata.sqlite3"))
+MEDIA_METADATA_CACHE_LOCK_TIMEOUT = 5 * 60  # seconds to wait for another worker's extraction
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -10,7 +10,7 @@ from .helper import get_file_upload_path
 from utils.files.process_file import FileProcessor, DocumentPageCounter
 from django.core.files.storage import default_storage
 import io
-from PIL import Image
+from utils.files.backends import Image
 from utils.sys_mixins.media import AutoDeleteFileMixin
 
 logger = logging.getLogger('models')
@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger('utils')
+
+DEFAULT_LOCK_TIMEOUT = 5 * 60
+POLL_INTERVAL = 0.05
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS metadata (
+        checksum TEXT NOT NULL,
+        processor TEXT NOT NULL,
+        version TEXT NOT NULL,
+        value TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (checksum, processor, version)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS metadata_processor ON metadata (processor, version)",
+    """CREATE TABLE IF NOT EXISTS locks (
+        checksum TEXT NOT NULL,
+        processor TEXT NOT NULL,
+        version TEXT NOT NULL,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        PRIMARY KEY (checksum, processor, version)
+    ) WITHOUT ROWID""",
+)
+
+
+def get_cache_path() -> str:
+    """
+    MEDIA_METADATA_CACHE_PATH, or sys_media/cache/metadata.sqlite3 under
+    BASE_DIR. Services and workers pointing at the same file share their
+    results; it belongs on a persistent volume, not in a temp dir.
+    """
+    path = getattr(settings, 'MEDIA_METADATA_CACHE_PATH', None)
+    if path:
+        return os.fspath(path)
+    return os.path.join(settings.BASE_DIR, 'sys_media', 'cache', 'metadata.sqlite3')
+
+
+def version_number(version) -> Optional[int]:
+    """A processor version as an integer, None when it is not one."""
+    version = str(version)
+    return int(version) if version.isdigit() else None
+
+
+class MetadataCache:
+    """
+    Durable store of extracted media metadata, keyed by
+    ``(checksum, processor, version)``.
+
+    Entries live in a SQLite database in WAL mode, so every gunicorn worker,
+    media worker and service using the same file reads the same results and
+    they survive restarts. Content never changes under a checksum, so
+    entries do not expire; bumping a processor's version makes its old
+    entries unreachable, and ``prune`` deletes them. Entries of newer
+    versions are kept: during a rolling deploy, workers still running the
+    old code use the old entries and the new ones theirs.
+
+    ``get_or_compute`` is single-flight: the first caller takes a lock row
+    and extracts, concurrent callers (threads or processes) wait for its
+    result instead of probing the same file again.
+    """
+
+    def __init__(self, path: Optional[str] = None, lock_timeout: Optional[float] = None):
+        self.path = path or get_cache_path()
+        self.lock_timeout = lock_timeout or getattr(settings, 'MEDIA_METADATA_CACHE_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT)
+        self._local = threading.local()
+        self._pruned = set()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread and process (SQLite connections are not shareable)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            connection.execute(statement)
+        self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def close(self) -> None:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def get(self, checksum: str, processor: str, version: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT value FROM metadata WHERE checksum = ? AND processor = ? AND version = ?",
+            (checksum, processor, str(version)),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, checksum: str, processor: str, version: str, value: Dict[str, Any]) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO metadata (checksum, processor, version, value, created_at) VALUES (?, ?, ?, ?, ?)",
+            (checksum, processor, str(version), json.dumps(value), time.time()),
+        )
+
+    def delete(self, checksum: str) -> None:
+        """Drops every processor's entry for a content."""
+        self._connection().execute("DELETE FROM metadata WHERE checksum = ?", (checksum,))
+
+    def prune(self, processor: str, version: str) -> int:
+        """
+        Deletes the entries older versions of ``processor`` left behind.
+        Versions are compared as integers; newer versions and versions that
+        are not integers are kept.
+
+        Returns:
+            int: Number of deleted entries
+        """
+        current = version_number(version)
+        if current is None:
+            return 0
+        connection = self._connection()
+        versions = connection.execute(
+            "SELECT DISTINCT version FROM metadata WHERE processor = ?", (processor,),
+        ).fetchall()
+        older = [row[0] for row in versions
+                 if version_number(row[0]) is not None and version_number(row[0]) < current]
+        if not older:
+            return 0
+        cursor = connection.execute(
+            f"DELETE FROM metadata WHERE processor = ? AND version IN ({', '.join('?' * len(older))})",
+            (processor, *older),
+        )
+        return cursor.rowcount
+
+    def _acquire(self, key: tuple, owner: str) -> bool:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "DELETE FROM locks WHERE checksum = ? AND processor = ? AND version = ? AND expires_at < ?",
+                (*key, time.time()),
+            )
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO locks (checksum, processor, version, owner, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (*key, owner, time.time() + self.lock_timeout),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def _release(self, key: tuple, owner: str) -> None:
+        self._connection().execute(
+            "DELETE FROM locks WHERE checksum = ? AND processor = ? AND version = ? AND owner = ?",
+            (*key, owner),
+        )
+
+    def get_or_compute(self, checksum: str, processor: str, version: str,
+                       compute: Callable[[], Dict[str, Any]],
+                       should_store: Callable[[Dict[str, Any]], bool] = lambda value: True) -> Dict[str, Any]:
+        """
+        Cached metadata of a content, extracted by ``compute`` at most once
+        across all processes sharing the cache.
+
+        Args:
+            checksum: Checksum of the content
+            processor: Name of the extracting code
+            version: Version of the extracting code
+            compute: Extracts the metadata
+            should_store: Whether a computed value may be cached (e.g. not
+                when the extraction failed)
+
+        Returns:
+            Dict: The cached or freshly computed metadata
+        """
+        version = str(version)
+        if (processor, version) not in self._pruned:
+            self._pruned.add((processor, version))
+            if self.prune(processor, version):
+                logger.info(f"Pruned metadata cached by older versions of {processor}")
+
+        key = (checksum, processor, version)
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            value = self.get(*key)
+            if value is not None:
+                return value
+            if self._acquire(key, owner):
+                break
+            if time.monotonic() > deadline:
+                logger.warning(f"Waited {self.lock_timeout}s for {processor} on {checksum}, extracting anyway")
+                return compute()
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            value = self.get(*key)  # stored between our last read and the lock
+            if value is None:
+                value = compute()
+                if should_store(value):
+                    self.set(*key, value)
+            return value
+        finally:
+            self._release(key, owner)
+
+
+_caches: Dict[str, MetadataCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_metadata_cache() -> MetadataCache:
+    """The process wide cache for the configured path."""
+    path = get_cache_path()
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = MetadataCache(path)
+        return _caches[path]
@@ -0,0 +1,27 @@
+import os
+import tempfile
+from django.conf import settings
+from django.test import SimpleTestCase
+from ..files.metadata_cache import MetadataCache, get_cache_path
+
+
+class MetadataCacheSmokeTests(SimpleTestCase):
+    """
+    Smoke tests for the media metadata cache shared with the other services.
+    """
+
+    def test_cache_path_comes_from_settings(self):
+        self.assertEqual(get_cache_path(), os.fspath(settings.MEDIA_METADATA_CACHE_PATH))
+
+    def test_entries_survive_and_only_older_versions_are_pruned(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metadata.sqlite3')
+            cache = MetadataCache(path)
+            for version in (1, 2, 3):
+                cache.set('abc', 'probe', version, {'version': version})
+            self.assertEqual(cache.get_or_compute('abc', 'probe', 2, dict), {'version': 2})
+            self.assertIsNone(cache.get('abc', 'probe', 1))
+            cache.close()
+            reopened = MetadataCache(path)
+            self.assertEqual(reopened.get('abc', 'probe', 3), {'version': 3})
+            reopened.close()
@@ -1,5 +1,23 @@
-from utils.helper import create_dir
 import logging
+import os
+from logging.handlers import RotatingFileHandler
+
+
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that creates its directory and opens its file when the
+    first record is written, so configuring logging touches no file system.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        kwargs['delay'] = True
+        super().__init__(filename, *args, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
 class SysLogging:
     def __init__(self,**kwargs):
         self.logger = kwargs
@@ -12,12 +30,12 @@ class SysLogging:
 
 def creating_loging_config(LOG):
     
-    SYS_LOG = create_dir(LOG / 'system')
-    SETTINGS_LOG = create_dir(LOG / 'settings')
-    UTILS_LOG = create_dir(LOG / 'utils')
-    VIEW_LOG = create_dir(LOG / 'views')
-    TEST_LOG = create_dir(LOG / 'tests')
-    MODEL_LOG = create_dir(LOG / 'models')   
+    SYS_LOG = LOG / 'system'
+    SETTINGS_LOG = LOG / 'settings'
+    UTILS_LOG = LOG / 'utils'
+    VIEW_LOG = LOG / 'views'
+    TEST_LOG = LOG / 'tests'
+    MODEL_LOG = LOG / 'models'   
         
     return  {
         'version': 1,
@@ -33,7 +51,7 @@ def creating_loging_config(LOG):
         'handlers': {
             'system_file': {
                 'level': 'INFO',
-                'class': 'logging.handlers.RotatingFileHandler',
+                'class': 'config.main.logging_v.LazyRotatingFileHandler',
                 'filename': str(SYS_LOG / 'system.log'),
                 'maxBytes': 1024 * 1024 * 5,
                 'backupCount': 5,
@@ -41,7 +59,7 @@ def creating_loging_config(LOG):
             },
             'settings_file': {
                 'level': 'INFO',
-                'class': 'logging.handlers.RotatingFileHandler',
+                'class': 'config.main.logging_v.LazyRotatingFileHandler',
                 'filename': SETTINGS_LOG / 'settings.log',
                 'maxBytes': 1024 * 1024 * 2,
                 'backupCount': 3,
@@ -49,7 +67,7 @@ def creating_loging_config(LOG):
             },
             'utils_file': {
                 'level': 'INFO',
-                'class': 'logging.handlers.RotatingFileHandler',
+                'class': 'config.main.logging_v.LazyRotatingFileHandler',
                 'filename': UTILS_LOG / 'utils.log',
                 'maxBytes': 1024 * 1024 * 2,
                 'backupCount': 3,
@@ -57,7 +75,7 @@ def creating_loging_config(LOG):
             },
             'views_file': {
                 'level': 'INFO',
-                'class': 'logging.handlers.RotatingFileHandler',
+                'class': 'config.main.logging_v.LazyRotatingFileHandler',
                 'filename': VIEW_LOG / 'views.log',
                 'maxBytes': 1024 * 1024 * 2,
                 'backupCount': 3,
@@ -65,7 +83,7 @@ def creating_loging_config(LOG):
             },
             'models_file': {
                 'level': 'INFO',
-                'class': 'logging.handlers.RotatingFileHandler',
+                'class': 'config.main.logging_v.LazyRotatingFileHandler',
                 'filename': MODEL_LOG / 'model.log',
                 'maxBytes': 1024 * 1024 * 2,
                 'backupCount': 3,
@@ -73,7 +91,7 @@ def creating_loging_config(LOG):
             },
             'tests_file': {
                 'level': 'INFO',
-                'class': 'logging.handlers.RotatingFileHandler',
+                'class': 'config.main.logging_v.LazyRotatingFileHandler',
                 'filename': TEST_LOG / 'tests.log',
                 'maxBytes': 1024 * 1024 * 2,
                 'backupCount': 3,
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from config.main.helper import ensure_env_file
+
+
+class Command(BaseCommand):
+    help = ("Creates the environment files the settings read (ENVIRONMENT_DIR_FILES) with placeholder "
+            "content when they are missing. Settings no longer write them on every import.")
+
+    def handle(self, *args, **options):
+        for env_file in settings.ENVIRONMENT_DIR_FILES:
+            ensure_env_file(env_file)
+        self.stdout.write(self.style.SUCCESS(f"Checked {len(settings.ENVIRONMENT_DIR_FILES)} environment file(s)"))
@@ -6,16 +6,13 @@ from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any, List, Tuple, BinaryIO, Union
 from pathlib import Path
 
-import ffmpeg
-import numpy as np
-from PIL import Image
-import librosa
-import matplotlib.pyplot as plt
 from django.core.files import File
 from django.core.files.uploadedfile import UploadedFile
 from django.conf import settings
 from django.utils import timezone
 
+from .backends import Image, ffmpeg, np
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -573,6 +570,11 @@ class AudioProcessor(Processor):
         try:
             file_path = self._prepare_file()
             
+            # librosa pulls in numba and scipy, matplotlib a GUI stack: import them only here
+            import librosa
+            import librosa.display
+            import matplotlib.pyplot as plt
+
             # Load audio using librosa
             y, sr = librosa.load(file_path, sr=None)
             
@@ -621,6 +623,11 @@ class AudioProcessor(Processor):
         try:
             file_path = self._prepare_file()
             
+            # librosa pulls in numba and scipy, matplotlib a GUI stack: import them only here
+            import librosa
+            import librosa.display
+            import matplotlib.pyplot as plt
+
             # Load audio using librosa
             y, sr = librosa.load(file_path, sr=None)
             
@@ -9,9 +9,10 @@ from typing import Dict, Any, Optional, List, Tuple, Union
 from abc import ABC, abstractmethod
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
-from django.core.cache import cache
 from pathlib import Path
 
+from .metadata_cache import get_metadata_cache
+
 logger = logging.getLogger('media.processors')
 
 class MediaProcessorException(Exception):
@@ -25,6 +26,10 @@ class MediaProcessor(ABC):
     Provides common functionality for processing different types of media files.
     """
     
+    # Bump when extract_metadata returns different values: cached results of
+    # the previous version are then ignored and pruned.
+    METADATA_VERSION = 1
+    
     def __init__(self, file_field, checksum=None):
         """
         Initialize with a file field and optional checksum.
@@ -51,7 +56,7 @@ class MediaProcessor(ABC):
         pass
     
     @abstractmethod
-    def get_metadata(self) -> Dict[str, Any]:
+    def extract_metadata(self) -> Dict[str, Any]:
         """
         Extract metadata from the media file.
         Must be implemented by subclasses.
@@ -61,29 +66,28 @@ class MediaProcessor(ABC):
         """
         pass
     
-    def get_cached_result(self, cache_key: str, timeout: int = 3600) -> Optional[Dict[str, Any]]:
+    def get_metadata(self) -> Dict[str, Any]:
         """
-        Get cached processing result if available.
+        Metadata of the media file, extracted once per content.
+        
+        With a checksum the result is kept in the shared metadata cache under
+        (checksum, processor, METADATA_VERSION): other workers and services
+        reuse it, and concurrent calls for the same content wait for a single
+        extraction. Failed extractions are not cached.
         
-        Args:
-            cache_key: Key for cache lookup
-            timeout: Cache timeout in seconds
-            
         Returns:
-            Cached result or None if not available
+            Dict containing metadata specific to the media type
         """
-        return cache.get(cache_key)
+        if not self.checksum:
+            return self.extract_metadata()
+        return get_metadata_cache().get_or_compute(
+            self.checksum, self.get_cache_name(), self.METADATA_VERSION,
+            self.extract_metadata, should_store=lambda metadata: not self.errors,
+        )
     
-    def set_cached_result(self, cache_key: str, result: Dict[str, Any], timeout: int = 3600) -> None:
-        """
-        Cache processing result for future use.
-        
-        Args:
-            cache_key: Key for cache storage
-            result: Data to cache
-            timeout: Cache timeout in seconds
-        """
-        cache.set(cache_key, result, timeout)
+    @classmethod
+    def get_cache_name(cls) -> str:
+        return f"{cls.__module__}.{cls.__qualname__}"
     
     def handle_error(self, error_message: str, exception: Optional[Exception] = None) -> None:
         """
@@ -143,20 +147,13 @@ class VideoProcessor(MediaProcessor):
             self.handle_error("Video processing failed", e)
             return {}
     
-    def get_metadata(self) -> Dict[str, Any]:
+    def extract_metadata(self) -> Dict[str, Any]:
         """
         Extract metadata from video file using FFmpeg or similar tool.
         
         Returns:
             Dict containing video metadata (duration, dimensions, codec, etc.)
         """
-        # Use caching if checksum is available
-        if self.checksum:
-            cache_key = f"video_metadata_{self.checksum}"
-            cached_result = self.get_cached_result(cache_key)
-            if cached_result:
-                return cached_result
-        
         metadata = {
             'duration': None,
             'width': None,
@@ -207,11 +204,6 @@ class VideoProcessor(MediaProcessor):
             except Exception as e:
                 self.handle_error("FFmpeg metadata extraction failed", e)
         
-        # Cache the result if we have a checksum
-        if self.checksum:
-            cache_key = f"video_metadata_{self.checksum}"
-            self.set_cached_result(cache_key, metadata)
-        
         return metadata
     
     def generate_thumbnail(self, timestamp: float = 0.0, size: Tuple[int, int] = (640, 360)) -> Optional[str]:
@@ -352,20 +344,13 @@ class AudioProcessor(MediaProcessor):
             self.handle_error("Audio processing failed", e)
             return {}
     
-    def get_metadata(self) -> Dict[str, Any]:
+    def extract_metadata(self) -> Dict[str, Any]:
         """
         Extract metadata from audio file using Mutagen or similar library.
         
         Returns:
             Dict containing audio metadata (duration, sample rate, etc.)
         """
-        # Use caching if checksum is available
-        if self.checksum:
-            cache_key = f"audio_metadata_{self.checksum}"
-            cached_result = self.get_cached_result(cache_key)
-            if cached_result:
-                return cached_result
-        
         metadata = {
             'duration': None,
             'bitrate': None,
@@ -443,11 +428,6 @@ class AudioProcessor(MediaProcessor):
             except Exception as e:
                 self.handle_error("Mutagen metadata extraction failed", e)
         
-        # Cache the result if we have a checksum
-        if self.checksum:
-            cache_key = f"audio_metadata_{self.checksum}"
-            self.set_cached_result(cache_key, metadata)
-        
         return metadata
     
     def generate_waveform_data(self, num_points: int = 100) -> Optional[List[float]]:
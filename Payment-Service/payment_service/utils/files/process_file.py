@@ -1,15 +1,13 @@
+from __future__ import annotations
+
 from django.core.files import File
 from typing import Optional, Dict, Any
 import os
 import hashlib
 import logging
-from magic import Magic
 from pathlib import Path
 from django.core.files.storage import default_storage
-from PyPDF2 import PdfReader
-import docx
-from pptx import Presentation
-import magic
+from .backends import PyPDF2, docx, magic, pptx
 
 
 logger = logging.getLogger('utils')
@@ -75,7 +73,7 @@ class FileProcessor:
         """Detects MIME type using libmagic with fallback to extensions."""
         try:
             with default_storage.open(self.file.name, 'rb') as file_object: # 'rb' for binary read
-                mime = Magic(mime=True)
+                mime = magic.Magic(mime=True)
                 chunk = file_object.read(1024)
                 return mime.from_buffer(chunk)
         except Exception:
@@ -241,7 +239,7 @@ class DocumentPageCounter:
         """
         try:
             with default_storage.open(self.file_name, 'rb') as file_object:
-                reader: PdfReader = PdfReader(file_object)
+                reader = PyPDF2.PdfReader(file_object)
                 return len(reader.pages)
         except Exception as e:
             logger.error(f"Error counting PDF pages: {e}")
@@ -270,7 +268,7 @@ class DocumentPageCounter:
         """
         try:
             with default_storage.open(self.file_name, 'rb') as file_object:
-                presentation: Presentation = Presentation(file_object)
+                presentation = pptx.Presentation(file_object)
                 return len(presentation.slides)
         except Exception as e:
             logger.error(f"Error counting slides in .pptx: {e}")